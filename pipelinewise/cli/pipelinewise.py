@@ -52,6 +52,14 @@ FASTSYNC_PAIRS = {
     },
 }
 
+# Taps whose fastsync applies the transformations to the exported rows in Python, transformations
+# on json properties are supported by their fastsync components
+FASTSYNC_ROW_TRANSFORMATION_TAPS = {
+    ConnectorType.TAP_MYSQL,
+    ConnectorType.TAP_S3_CSV,
+    ConnectorType.TAP_MONGODB,
+}
+
 
 # pylint: disable=too-many-lines,too-many-instance-attributes,too-many-public-methods
 class PipelineWise:
@@ -1524,10 +1532,11 @@ class PipelineWise:
 
             # If there is a fastsync component for this tap-target combo and transformations on json properties are
             # configured then fail the validation.
-            # The reason being that at the time of writing this, transformations in Fastsync are done on the
-            # target side using mostly SQL UPDATE, and transformations on properties in json fields are not
-            # implemented due to the need of converting XPATH syntax to SQL which has been deemed as not worth it
-            if self.__does_fastsync_component_exist(targets[tap_yml['target']], tap_yml['type']):
+            # The reason being that fastsync of the other taps transforms the loaded tables on the target side using
+            # mostly SQL UPDATE, and transformations on properties in json fields are not implemented due to the
+            # need of converting XPATH syntax to SQL which has been deemed as not worth it
+            if self.__does_fastsync_component_exist(targets[tap_yml['target']], tap_yml['type']) \
+                    and ConnectorType(tap_yml['type']) not in FASTSYNC_ROW_TRANSFORMATION_TAPS:
                 self.logger.debug('FastSync component found for tap %s', tap_yml['id'])
 
                 # Load the transformations
@@ -0,0 +1,87 @@
+"""Snowflake client side encryption of the files streamed to S3, without writing an encrypted copy."""
+import base64
+import os
+
+from typing import BinaryIO, Dict
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+AES_BLOCK_SIZE = algorithms.AES.block_size // 8
+DEFAULT_READ_SIZE_MB = 1
+
+
+class EncryptingReader:
+    """
+    Read only file like object that returns the content of a file encrypted like the client side
+    encryption of Snowflake: AES-CBC with a random file key and PKCS#5 padding. The file key is
+    encrypted with the master key of the stage (AES-ECB) and sent in the metadata of the S3 object.
+
+    The file is encrypted block by block while it's read, so only the requested bytes are kept in
+    memory. The reader is not seekable, S3 uploads read it once in order.
+    """
+
+    def __init__(self, file: BinaryIO, master_key: str, read_size: int = DEFAULT_READ_SIZE_MB * (1 << 20)):
+        """
+        Args:
+            file: File opened in binary mode
+            master_key: Base64 encoded master key of the external stage
+            read_size: Number of bytes read from the file at once. (Default: 1 MB)
+        """
+        decoded_master_key = base64.standard_b64decode(master_key)
+        file_key = os.urandom(len(decoded_master_key))
+        init_vector = os.urandom(AES_BLOCK_SIZE)
+
+        self.file = file
+        self.read_size = read_size
+        self.encryptor = Cipher(algorithms.AES(file_key), modes.CBC(init_vector), backend=default_backend()).encryptor()
+        self.padder = padding.PKCS7(algorithms.AES.block_size).padder()
+        self.buffer = bytearray()
+        self.finished = False
+        self.metadata = {
+            'x-amz-key': base64.b64encode(self._encrypt_file_key(decoded_master_key, file_key)).decode('utf-8'),
+            'x-amz-iv': base64.b64encode(init_vector).decode('utf-8'),
+        }
+
+    @staticmethod
+    def _encrypt_file_key(master_key: bytes, file_key: bytes) -> bytes:
+        padder = padding.PKCS7(algorithms.AES.block_size).padder()
+        encryptor = Cipher(algorithms.AES(master_key), modes.ECB(), backend=default_backend()).encryptor()
+        return encryptor.update(padder.update(file_key) + padder.finalize()) + encryptor.finalize()
+
+    def get_metadata(self) -> Dict[str, str]:
+        """S3 object metadata with the encrypted file key and the IV, required by Snowflake to decrypt"""
+        return self.metadata
+
+    @staticmethod
+    def readable() -> bool:
+        """The reader can be read"""
+        return True
+
+    @staticmethod
+    def seekable() -> bool:
+        """The reader is read once, S3 uploads buffer the chunks of the multipart upload in memory"""
+        return False
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read at most size encrypted bytes
+
+        Returns:
+            Empty bytes at the end of the file
+        """
+        while not self.finished and (size is None or size < 0 or len(self.buffer) < size):
+            chunk = self.file.read(self.read_size)
+            if chunk:
+                self.buffer += self.encryptor.update(self.padder.update(chunk))
+            else:
+                self.buffer += self.encryptor.update(self.padder.finalize()) + self.encryptor.finalize()
+                self.finished = True
+
+        if size is None or size < 0:
+            size = len(self.buffer)
+
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
@@ -0,0 +1,57 @@
+"""Compression codecs of the files exported by fastsync."""
+import builtins
+import gzip
+
+import zstandard
+
+CODEC_GZIP = 'gzip'
+CODEC_ZSTD = 'zstd'
+CODEC_NONE = 'none'
+
+CODECS = [CODEC_GZIP, CODEC_ZSTD, CODEC_NONE]
+
+# Extensions of the exported csv files
+FILE_EXTENSIONS = {
+    CODEC_GZIP: 'csv.gz',
+    CODEC_ZSTD: 'csv.zst',
+    CODEC_NONE: 'csv',
+}
+
+# Default compression levels if not defined in the config
+DEFAULT_COMPRESSLEVELS = {
+    CODEC_GZIP: 9,
+    CODEC_ZSTD: 3,
+}
+
+
+def validate_codec(codec: str) -> None:
+    """
+    Raise ValueError if the codec is not supported
+
+    Args:
+        codec: Name of the codec
+    """
+    if codec not in CODECS:
+        raise ValueError(f'Invalid codec: {codec}. Supported codecs: {", ".join(CODECS)}')
+
+
+def open_reader(filepath: str, codec: str = CODEC_GZIP):
+    """
+    Open an exported file to read the decompressed data in binary mode
+
+    Args:
+        filepath: Path of the exported file
+        codec: Codec the file compressed with. (Default: gzip)
+
+    Returns:
+        File like object
+    """
+    validate_codec(codec)
+
+    if codec == CODEC_GZIP:
+        return gzip.open(filepath, 'rb')
+
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdDecompressor().stream_reader(builtins.open(filepath, 'rb'))
+
+    return builtins.open(filepath, 'rb')
@@ -0,0 +1,113 @@
+"""Target connections kept open by a process to run the queries of every table it syncs."""
+import collections
+import contextlib
+import logging
+import os
+import time
+
+from typing import Any, Callable, Dict, Hashable, Iterator, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+# Connections idle for longer than this are pinged before being reused
+HEALTH_CHECK_IDLE_SECONDS = 60
+
+# Number of connections opened by the process by type of target
+OPENED_CONNECTIONS = collections.Counter()
+
+
+# pylint: disable=too-few-public-methods
+class CachedConnection:
+    """Connection with the time it was last used and the session state set on it"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.last_used = time.monotonic()
+        self.state = {}
+
+
+# Connections by process id and key. Forked processes cannot use the connections of their parent,
+# they are not closed either to not end the session of the parent.
+_CONNECTIONS: Dict[Tuple[int, Hashable], CachedConnection] = {}
+
+
+def _is_healthy(
+    cached: CachedConnection, is_closed: Callable[[Any], bool], ping: Callable[[Any], None]
+) -> bool:
+    try:
+        if is_closed(cached.connection):
+            return False
+
+        if time.monotonic() - cached.last_used > HEALTH_CHECK_IDLE_SECONDS:
+            ping(cached.connection)
+
+        return True
+    except Exception as exc:
+        LOGGER.info('Connection is not usable anymore: %s', exc)
+        return False
+
+
+def discard(key: Hashable) -> None:
+    """
+    Close and forget the connection of the process
+
+    Args:
+        key: Key of the connection
+    """
+    cached = _CONNECTIONS.pop((os.getpid(), key), None)
+    if cached is None:
+        return
+
+    try:
+        cached.connection.close()
+    except Exception as exc:
+        LOGGER.debug('Cannot close connection: %s', exc)
+
+
+@contextlib.contextmanager
+def reuse_connection(
+    key: Hashable,
+    connect: Callable[[], Any],
+    is_closed: Callable[[Any], bool],
+    ping: Callable[[Any], None],
+) -> Iterator[CachedConnection]:
+    """
+    Context manager returning the open connection of the process or a new one if there is no
+    healthy connection. The connection is discarded if it's closed by an error.
+
+    Args:
+        key: Key of the connection, a tuple of the type of the target and the connection parameters
+        connect: Function that opens a new connection
+        is_closed: Function that checks if a connection is closed without querying the server
+        ping: Function that runs a trivial query, called on the connections idle for a while
+
+    Returns:
+        CachedConnection
+    """
+    cached = _CONNECTIONS.get((os.getpid(), key))
+
+    if cached is not None and not _is_healthy(cached, is_closed, ping):
+        LOGGER.info('Reconnecting to %s', key[0])
+        discard(key)
+        cached = None
+
+    if cached is None:
+        cached = CachedConnection(connect())
+        _CONNECTIONS[(os.getpid(), key)] = cached
+        OPENED_CONNECTIONS[key[0]] += 1
+        LOGGER.info(
+            'Opened connection to %s, %s connections opened by process %s',
+            key[0],
+            OPENED_CONNECTIONS[key[0]],
+            os.getpid(),
+        )
+
+    try:
+        yield cached
+    except Exception:
+        with contextlib.suppress(Exception):
+            if is_closed(cached.connection):
+                discard(key)
+        raise
+    finally:
+        cached.last_used = time.monotonic()
@@ -0,0 +1,78 @@
+"""Column type inference over a bounded random sample of the exported csv rows."""
+import random
+
+from typing import Dict, Iterable
+
+from messytables import jts
+from messytables.types import TYPES, StringType
+
+DEFAULT_SAMPLE_SIZE = 1000
+
+
+class ColumnTypeAccumulator:
+    """
+    Candidate types of a column, the types that cannot parse a value of the column are dropped.
+
+    Same rules as the strict type guessing of messytables: empty values are ignored and the remaining
+    type with the highest guessing weight wins, columns without values are strings.
+    """
+
+    def __init__(self):
+        self.candidates = [instance for cell_type in TYPES for instance in cell_type.instances()]
+        self.has_values = False
+
+    def add(self, value) -> None:
+        """Drop the candidate types that cannot parse the value as written into the csv"""
+        if value is None or value == '':
+            return
+
+        value = str(value)
+        self.has_values = True
+        self.candidates = [cell_type for cell_type in self.candidates if cell_type.test(value)]
+
+    def guess(self) -> str:
+        """Json table schema type of the column: string, integer, number, date or boolean"""
+        if not self.has_values:
+            return jts.celltype_as_string(StringType())
+
+        # max returns the first of the types with the same weight, like messytables
+        return jts.celltype_as_string(max(self.candidates, key=lambda cell_type: cell_type.guessing_weight))
+
+
+class CsvTypeSampler:
+    """
+    Keeps a uniform random sample of the rows added one by one (reservoir sampling) to guess the
+    types of the columns without reading the rows again.
+    """
+
+    def __init__(self, sample_size: int = DEFAULT_SAMPLE_SIZE, seed: int = 0):
+        self.sample_size = sample_size
+        self.rows_count = 0
+        self.sample = []
+        self.random = random.Random(seed)
+
+    def add(self, row: Dict) -> None:
+        """Add a row to the sample, replacing a random sampled row once the sample is full"""
+        self.rows_count += 1
+
+        if len(self.sample) < self.sample_size:
+            self.sample.append(row)
+            return
+
+        index = self.random.randrange(self.rows_count)
+        if index < self.sample_size:
+            self.sample[index] = row
+
+    def guess_types(self, columns: Iterable[str]) -> Dict[str, str]:
+        """
+        Guess the types of the columns from the sampled rows
+        :param columns: names of the columns
+        :return: dictionary of column name and json table schema type
+        """
+        accumulators = {column: ColumnTypeAccumulator() for column in columns}
+
+        for row in self.sample:
+            for column, accumulator in accumulators.items():
+                accumulator.add(row.get(column))
+
+        return {column: accumulator.guess() for column, accumulator in accumulators.items()}
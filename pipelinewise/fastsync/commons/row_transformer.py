@@ -0,0 +1,371 @@
+"""Transformations of the exported rows in Python, before they are written into the export files."""
+import base64
+import datetime
+import hashlib
+import re
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+import ujson
+from dateutil import parser as date_parser
+
+from .transform_utils import TransformationType
+
+# Transformations that give the same value whatever the original value is, NULLs included
+CONSTANT_TRANSFORMATIONS = {
+    TransformationType.SET_NULL: None,
+    TransformationType.MASK_NUMBER: 0,
+    TransformationType.MASK_HIDDEN: 'hidden',
+}
+
+
+# Encodings of the hashes, the same as the ones of the HASH transformations in the SQL of the targets
+HASH_SHA256_HEX = 'sha256-hex'
+HASH_SHA256_BASE64 = 'sha256-base64'
+HASH_SHA1_HEX = 'sha1-hex'
+
+HASH_FUNCTIONS = {
+    HASH_SHA256_HEX: lambda data: hashlib.sha256(data).hexdigest(),
+    HASH_SHA256_BASE64: lambda data: base64.b64encode(hashlib.sha256(data).digest()).decode('ascii'),
+    HASH_SHA1_HEX: lambda data: hashlib.sha1(data).hexdigest(),
+}
+
+# Semantics of the regex_match conditions, the same as the regex operators in the SQL of the targets:
+# a match anywhere in the value like ~ and REGEXP_CONTAINS, or a match of the whole value like REGEXP
+REGEX_SEARCH = 'search'
+REGEX_FULL_MATCH = 'fullmatch'
+
+REGEX_MATCHES = (REGEX_SEARCH, REGEX_FULL_MATCH)
+
+
+def normalize_column_name(column: str) -> str:
+    """Column name without quotes in upper case, the columns of the rows and of the config are matched by it"""
+    return column.strip('"`').upper()
+
+
+def to_export_text(value: Any) -> str:
+    """
+    Text of a value as written into the csv export files, e.g. 2020-01-01 00:00:00 for a datetime or 1.50
+    for a Decimal. Columns loaded as text contain this text, so it is the text the target hashes or masks.
+    """
+    if isinstance(value, str):
+        return value
+
+    # csv.writer writes the repr of floats and the str of the other values
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def hash_value(value: Any, hash_encoding: str = HASH_SHA256_HEX) -> str:
+    """Hash of the exported text of the value in the given encoding, hex encoded SHA-256 by default"""
+    if not isinstance(value, (bytes, bytearray)):
+        value = to_export_text(value).encode('utf-8')
+
+    return HASH_FUNCTIONS[hash_encoding](value)
+
+
+def mask_date(value: Any) -> Any:
+    """Same date and time but on the 1st of January, strings are returned in ISO format"""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.replace(month=1, day=1)
+
+    return date_parser.parse(str(value)).replace(month=1, day=1).isoformat()
+
+
+def mask_string_skip_ends(value: Any, skip_ends_n: int) -> str:
+    """Replace every character with * but the first and last n ones, strings too short are fully masked"""
+    value = to_export_text(value)
+    if len(value) > 2 * skip_ends_n:
+        return value[:skip_ends_n] + '*' * (len(value) - 2 * skip_ends_n) + value[-skip_ends_n:]
+
+    return '*' * len(value)
+
+
+def is_null(value: Any) -> bool:
+    """Checks if the value is loaded as NULL, empty strings are written into the csv files like NULLs"""
+    return value is None or value == ''
+
+
+def get_transform_function(
+    transform_type: TransformationType, hash_encoding: str = HASH_SHA256_HEX
+) -> Callable[[Any], Any]:
+    """
+    Function that transforms a single value, NULLs are only replaced by the constant transformations
+
+    Args:
+        transform_type: the transformation to apply
+        hash_encoding: encoding of the hashes, one of HASH_FUNCTIONS
+
+    Returns: function of the value to transform
+    """
+    if transform_type in CONSTANT_TRANSFORMATIONS:
+        constant = CONSTANT_TRANSFORMATIONS[transform_type]
+        return lambda value: constant
+
+    if transform_type == TransformationType.HASH:
+
+        def function(value):
+            return hash_value(value, hash_encoding)
+
+    elif transform_type.value.startswith('HASH-SKIP-FIRST-'):
+        skip_first_n = int(transform_type.value[-1])
+
+        def function(value):
+            value = to_export_text(value)
+            return value[:skip_first_n] + hash_value(value[skip_first_n:], hash_encoding)
+
+    elif transform_type == TransformationType.MASK_DATE:
+        function = mask_date
+
+    else:
+        skip_ends_n = int(transform_type.value[-1])
+
+        def function(value):
+            return mask_string_skip_ends(value, skip_ends_n)
+
+    return lambda value: value if is_null(value) else function(value)
+
+
+def _parse_path(path: str) -> List[Union[str, int]]:
+    return [int(key) if key.isdigit() else key for key in path.strip('/').split('/')]
+
+
+def _load_json(value: Any) -> Any:
+    if isinstance(value, (str, bytes)):
+        return ujson.loads(value)
+
+    return value
+
+
+def _get_path_value(document: Any, path: List[Union[str, int]]) -> Any:
+    for key in path:
+        try:
+            document = document[key]
+        except (KeyError, IndexError, TypeError):
+            return None
+
+    return document
+
+
+def _get_value(row: Union[List, Dict], key: Union[int, str]) -> Any:
+    # csv records have no value for the columns missing from their file
+    return row.get(key) if isinstance(row, dict) else row[key]
+
+
+def _equals(value: Any, expected: Any) -> bool:
+    if expected is None or is_null(value):
+        return expected is None and is_null(value)
+
+    # csv values are strings, numbers of the config match their string form
+    return value == expected or str(value) == str(expected)
+
+
+# pylint: disable=too-few-public-methods
+class _Condition:
+    """Condition of the "when" list of a transformation on the value of a column or of a json property"""
+
+    def __init__(self, condition: Dict, column_index: int, column_name: str, regex_match: str = REGEX_SEARCH):
+        self.column_index = column_index
+        self.column_name = column_name
+        self.path = _parse_path(condition['field_path']) if condition.get('field_path') else None
+        self.equals = condition.get('equals')
+        self.has_equals = 'equals' in condition
+        # re.search or re.fullmatch of the compiled regex
+        self.regex_match = (
+            getattr(re.compile(condition['regex_match']), regex_match) if 'regex_match' in condition else None
+        )
+
+    def matches(self, row: Union[List, Dict], by_name: bool) -> bool:
+        """Checks if the value of the row meets the condition, conditions without a comparison always match"""
+        value = _get_value(row, self.column_name if by_name else self.column_index)
+
+        if self.path is not None:
+            value = None if is_null(value) else _get_path_value(_load_json(value), self.path)
+
+        if self.has_equals:
+            return _equals(value, self.equals)
+
+        if self.regex_match is not None:
+            return not is_null(value) and self.regex_match(str(value)) is not None
+
+        return True
+
+
+class _Rule:
+    """Transformation of a column or of json properties of a column, applied if every condition matches"""
+
+    def __init__(
+        self,
+        transform_type: TransformationType,
+        column_index: int,
+        column_name: str,
+        field_paths: Optional[List[str]],
+        conditions: List[_Condition],
+        hash_encoding: str = HASH_SHA256_HEX,
+    ):
+        self.transform_type = transform_type
+        self.transform = get_transform_function(transform_type, hash_encoding)
+        self.column_index = column_index
+        self.column_name = column_name
+        self.paths = [_parse_path(path) for path in field_paths] if field_paths else None
+        self.conditions = conditions
+
+    def _transform_paths(self, value: Any) -> Any:
+        if is_null(value):
+            return value
+
+        is_serialized = isinstance(value, (str, bytes))
+        document = _load_json(value)
+
+        for path in self.paths:
+            parent = _get_path_value(document, path[:-1])
+            try:
+                parent[path[-1]] = self.transform(parent[path[-1]])
+            except (KeyError, IndexError, TypeError):
+                # missing properties are left missing
+                continue
+
+        return ujson.dumps(document) if is_serialized else document
+
+    def apply(self, rows: Iterable[Union[List, Dict]], by_name: bool = False) -> None:
+        """Transform the column of the rows in place, one column of the whole batch at a time"""
+        key = self.column_name if by_name else self.column_index
+        transform = self._transform_paths if self.paths else self.transform
+        conditions = self.conditions
+
+        for row in rows:
+            if conditions and not all(condition.matches(row, by_name) for condition in conditions):
+                continue
+
+            row[key] = transform(_get_value(row, key))
+
+
+class RowTransformer:
+    """
+    Applies the transformations of a stream to the exported rows, so the sensitive values are masked
+    before they are written into the export files and the target does not update the loaded table.
+
+    The values are the same as the ones of the SQL UPDATEs of the targets run one after the other: the
+    conditional transformations in order, then the transformations without conditions. Unlike the
+    targets, transformations on json properties (field_paths and field_path conditions) are supported.
+    Hashes are encoded like the ones of the target, hex encoded SHA-256 digests by default like the ones
+    of transform-field in the singer pipelines. Regexes of the conditions match like the regex operator of
+    the target, anywhere in the value by default.
+    """
+
+    def __init__(
+        self,
+        transformations: List[Dict],
+        columns: Sequence[str],
+        hash_encoding: str = HASH_SHA256_HEX,
+        regex_match: str = REGEX_SEARCH,
+    ):
+        """
+        Args:
+            transformations: Transformations of the stream, as generated by the cli
+            columns: Column names of the rows, in the order of the values
+            hash_encoding: Encoding of the hashes, the HASH_ENCODING of the target. (Default: sha256-hex)
+            regex_match: Semantics of the regex_match conditions, the REGEX_MATCH of the target. (Default: search)
+
+        Raises: ValueError if a transformation or a condition refers to a column not in the columns,
+                or if the hash encoding or the regex semantics are unknown
+        """
+        if hash_encoding not in HASH_FUNCTIONS:
+            raise ValueError(f'Unknown hash encoding: {hash_encoding}')
+
+        if regex_match not in REGEX_MATCHES:
+            raise ValueError(f'Unknown regex match: {regex_match}')
+
+        self.columns = list(columns)
+        column_indexes = {normalize_column_name(column): index for index, column in enumerate(self.columns)}
+
+        def find_column(column: str) -> int:
+            try:
+                return column_indexes[normalize_column_name(column)]
+            except KeyError:
+                raise ValueError(f'Cannot transform column {column}, it is not in the exported columns') from None
+
+        conditional_rules = []
+        unconditional_rules = []
+
+        for trans_item in transformations:
+            index = find_column(trans_item['field_id'])
+            conditions = [
+                _Condition(
+                    condition,
+                    find_column(condition['column']),
+                    self.columns[find_column(condition['column'])],
+                    regex_match,
+                )
+                for condition in trans_item.get('when') or []
+            ]
+            rule = _Rule(
+                TransformationType(trans_item['type']),
+                index,
+                self.columns[index],
+                trans_item.get('field_paths'),
+                conditions,
+                hash_encoding,
+            )
+            (conditional_rules if conditions else unconditional_rules).append(rule)
+
+        self.rules = conditional_rules + unconditional_rules
+
+    @classmethod
+    def from_config(
+        cls,
+        transformation_config: Optional[Dict],
+        stream_name: str,
+        columns: Sequence[str],
+        hash_encoding: str = HASH_SHA256_HEX,
+        regex_match: str = REGEX_SEARCH,
+    ) -> Optional['RowTransformer']:
+        """
+        Transformer of a stream
+
+        Args:
+            transformation_config: Transformation config of the tap, with the transformations of every stream
+            stream_name: the full stream name in the format {schema}-{table}
+            columns: Column names of the rows, in the order of the values
+            hash_encoding: Encoding of the hashes, the HASH_ENCODING of the target. (Default: sha256-hex)
+            regex_match: Semantics of the regex_match conditions, the REGEX_MATCH of the target. (Default: search)
+
+        Returns: None if the stream has no transformations
+        """
+        transformations = [
+            trans_item
+            for trans_item in (transformation_config or {}).get('transformations', [])
+            if trans_item.get('tap_stream_name', '').lower() == stream_name.lower()
+        ]
+        if not transformations:
+            return None
+
+        return cls(transformations, columns, hash_encoding, regex_match)
+
+    def transform_rows(self, rows: Iterable[Sequence]) -> List[List]:
+        """
+        Transform a batch of rows
+
+        Args:
+            rows: Rows with the values in the order of the columns
+
+        Returns: list of the transformed rows
+        """
+        rows = [list(row) for row in rows]
+        for rule in self.rules:
+            rule.apply(rows)
+
+        return rows
+
+    def transform_record(self, record: Dict) -> Dict:
+        """
+        Transform a row keyed by column name in place
+
+        Args:
+            record: Values by column name, the names are the same as the columns of the transformer
+
+        Returns: the transformed record
+        """
+        for rule in self.rules:
+            rule.apply((record,), by_name=True)
+
+        return record
@@ -0,0 +1,103 @@
+"""Persisted listing of the S3 keys of a table to list only the new keys on the next syncs."""
+import gzip
+import json
+import logging
+import os
+
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+# pylint: disable=too-many-instance-attributes
+class S3KeyManifest:
+    """
+    Keys, ETags, sizes and last modified dates of the files matching a table in a bucket.
+
+    S3 lists keys in lexicographic order, so the last listed key of every prefix shard is kept to
+    list only the keys added since with StartAfter. Keys overwritten or deleted after they were
+    listed are not listed again, they are refreshed or removed when the sync finds them changed.
+    """
+
+    def __init__(self, path: str, bucket: str, search_prefix: Optional[str], search_pattern: str):
+        self.path = path
+        self.bucket = bucket
+        self.search_prefix = search_prefix
+        self.search_pattern = search_pattern
+        # last listed key directly under the search prefix
+        self.last_key = None
+        # last listed key of every shard
+        self.shard_last_keys = {}
+        # most recent last modified date of the exported files
+        self.last_modified = None
+        self.files = {}
+
+    def _get_header(self) -> Dict:
+        return {
+            'version': MANIFEST_VERSION,
+            'bucket': self.bucket,
+            'search_prefix': self.search_prefix,
+            'search_pattern': self.search_pattern,
+        }
+
+    def load(self) -> bool:
+        """
+        Load the manifest file if it exists and was created for the same listing
+        :return: True if the manifest was loaded
+        """
+        if not os.path.exists(self.path):
+            return False
+
+        with gzip.open(self.path, 'rt', encoding='utf-8') as manifest_file:
+            header = json.loads(manifest_file.readline() or 'null')
+            if not header or {key: header.get(key) for key in self._get_header()} != self._get_header():
+                LOGGER.info('Ignoring key manifest %s created for another bucket or search pattern', self.path)
+                return False
+
+            self.last_key = header.get('last_key')
+            self.shard_last_keys = header.get('shard_last_keys', {})
+            self.last_modified = header.get('last_modified')
+
+            for line in manifest_file:
+                s3_file = json.loads(line)
+                s3_file['last_modified'] = datetime.fromisoformat(s3_file['last_modified'])
+                self.files[s3_file['key']] = s3_file
+
+        LOGGER.info('Loaded %s keys from key manifest %s', len(self.files), self.path)
+        return True
+
+    def add(self, s3_file: Dict) -> None:
+        """Add or replace a listed file"""
+        self.files[s3_file['key']] = s3_file
+
+    def remove(self, key: str) -> None:
+        """Remove a file that does not exist anymore"""
+        self.files.pop(key, None)
+
+    def get_files(self) -> Iterator[Dict]:
+        """Files of the manifest in key order"""
+        for key in sorted(self.files):
+            yield self.files[key]
+
+    def save(self) -> None:
+        """Write the manifest file, replacing the previous one at once"""
+        header = {
+            **self._get_header(),
+            'last_key': self.last_key,
+            'shard_last_keys': self.shard_last_keys,
+            'last_modified': self.last_modified,
+        }
+
+        tmp_path = f'{self.path}.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as manifest_file:
+            manifest_file.write(json.dumps(header) + '\n')
+            for s3_file in self.get_files():
+                manifest_file.write(
+                    json.dumps({**s3_file, 'last_modified': s3_file['last_modified'].isoformat()}) + '\n'
+                )
+
+        os.replace(tmp_path, self.path)
+        LOGGER.info('Saved %s keys into key manifest %s', len(self.files), self.path)
@@ -1,21 +1,53 @@
-"""Functions that write chunked gzipped files."""
+"""Functions that write chunked compressed files."""
 import io
 import logging
 import gzip
 import builtins
+import collections
+import os
+import struct
+import time
+import zlib
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import zstandard
+
+from pipelinewise.fastsync.commons import compression
 
 LOGGER = logging.getLogger(__name__)
 
 DEFAULT_CHUNK_SIZE_MB = 1000
 DEFAULT_MAX_CHUNKS = 20
+DEFAULT_COMPRESSLEVEL = compression.DEFAULT_COMPRESSLEVELS[compression.CODEC_GZIP]
+DEFAULT_COMPRESS_THREADS = 1
+
+# Valid compression levels by codec
+COMPRESSLEVEL_RANGES = {
+    compression.CODEC_GZIP: (1, 9),
+    compression.CODEC_ZSTD: (1, 22),
+}
+
+# Size of the uncompressed blocks that are compressed independently by parallel compression
+PARALLEL_COMPRESS_BLOCK_SIZE = 1 << 17
 
-# Detecting compressed file size at write time is not possible by GzipFile.
-# The data hase to be written into the file first before the actual compression performed.
-# We need to use a good estimate for a text gzip file to split the file at write time.
+# Size of the uncompressed jobs that zstd compresses independently on its worker threads
+PARALLEL_ZSTD_JOB_SIZE = 1 << 20
+
+# Chunks are split by the compressed bytes actually written to disk. Data that is accepted by the writer
+# but not compressed yet is estimated by the compression rate measured so far, starting from this
+# estimate for a text gzip file until enough data is compressed to measure the actual rate.
 EST_COMPR_RATE = 0.12
 
+# Size of uncompressed data written between two measurements of the active chunk size on disk
+SIZE_CHECK_BYTES = 1 << 16
+
+# Minimum size of compressed input data to measure a reliable compression rate
+COMPR_RATE_SAMPLE_BYTES = 1 << 17
 
-# pylint: disable=W0622,R1732
+
+# pylint: disable=W0622,R1732,R0913
 def open(
     base_filename,
     mode='wb',
@@ -23,8 +55,13 @@ def open(
     max_chunks=None,
     est_compr_rate=None,
     compress=True,
+    on_chunk_closed=None,
+    compresslevel=None,
+    compress_threads=None,
+    codec=None,
+    header=None,
 ):
-    """Open a gzip-compressed file in binary or text mode.
+    """Open a compressed file in binary or text mode.
 
     Args:
         base_filename: Path where to create the zip file(s) with the exported data.
@@ -33,10 +70,19 @@ def open(
         chunk_size_mb: File chunk sizes. (Default: 1000)
         max_chunks: Max number of chunks. If set to 0 then splitting is disabled and one single
                     file will be created (Default: 20)
-        est_compr_rate: Detecting compressed file size at write time is not possible by GzipFile.
-                        The data hase to be written into the file first before the actual compression performed.
-                        We need to use a good estimate for a text gzip file to split the file at write time.
+        est_compr_rate: Initial estimate of the compression rate that is used to estimate the size of
+                        the data not compressed yet, until the actual compression rate is measured.
                         (Default 0.12)
+        on_chunk_closed: Optional function called with the filename of every chunk once the chunk is
+                         closed and will not be written anymore. (Default: None)
+        compresslevel: Compression level from 1 (fastest) to 9 (smallest) for gzip and
+                       from 1 to 22 for zstd. (Default: 9 for gzip, 3 for zstd)
+        compress_threads: Number of threads compressing blocks of data in parallel. If greater than 1
+                          then the chunks are compressed like pigz does, without blocking the writer. (Default: 1)
+        codec: Compression codec of the chunks, gzip, zstd or none. If not set then the compress
+               flag decides between gzip and none. (Default: None)
+        header: Optional header written at the start of every chunk, str in text mode and bytes
+                in binary mode. (Default: None)
 
     Return:
         File like object
@@ -47,8 +93,26 @@ def open(
         raise ValueError('Invalid chunk_size_mb: %d' % (chunk_size_mb,))
     if max_chunks is not None and max_chunks < 0:
         raise ValueError('Invalid max_chunks: %d' % (max_chunks,))
+    if codec is not None:
+        compression.validate_codec(codec)
+    if compresslevel is not None and codec != compression.CODEC_NONE:
+        min_level, max_level = COMPRESSLEVEL_RANGES[codec or compression.CODEC_GZIP]
+        if not min_level <= compresslevel <= max_level:
+            raise ValueError('Invalid compresslevel: %d' % (compresslevel,))
+    if compress_threads is not None and compress_threads < 1:
+        raise ValueError('Invalid compress_threads: %d' % (compress_threads,))
     return SplitGzipFile(
-        base_filename, mode, chunk_size_mb, max_chunks, est_compr_rate, compress
+        base_filename,
+        mode,
+        chunk_size_mb,
+        max_chunks,
+        est_compr_rate,
+        compress,
+        on_chunk_closed,
+        compresslevel,
+        compress_threads,
+        codec,
+        header,
     )
 
 
@@ -59,6 +123,7 @@ class SplitGzipFile(io.BufferedIOBase):
     This class only supports writing files in binary mode.
     """
 
+    # pylint: disable=R0913
     def __init__(
         self,
         base_filename,
@@ -67,6 +132,11 @@ class SplitGzipFile(io.BufferedIOBase):
         max_chunks: int = None,
         est_compr_rate: float = None,
         compress=True,
+        on_chunk_closed: Optional[Callable[[str], None]] = None,
+        compresslevel: int = None,
+        compress_threads: int = None,
+        codec: str = None,
+        header=None,
     ):
         super().__init__()
 
@@ -74,8 +144,15 @@ class SplitGzipFile(io.BufferedIOBase):
         self.mode = mode
         self.chunk_size_mb = chunk_size_mb or DEFAULT_CHUNK_SIZE_MB
         self.max_chunks = max_chunks if max_chunks is not None else DEFAULT_MAX_CHUNKS
-        self.compress = compress
-        if compress:
+        if codec is None:
+            codec = compression.CODEC_GZIP if compress else compression.CODEC_NONE
+        self.codec = codec
+        self.compress = codec != compression.CODEC_NONE
+        self.on_chunk_closed = on_chunk_closed
+        self.header = header
+        self.compresslevel = compresslevel or compression.DEFAULT_COMPRESSLEVELS.get(codec)
+        self.compress_threads = compress_threads or DEFAULT_COMPRESS_THREADS
+        if self.compress:
             self.est_compr_rate = (
                 est_compr_rate if est_compr_rate is not None else EST_COMPR_RATE
             )
@@ -85,6 +162,9 @@ class SplitGzipFile(io.BufferedIOBase):
         self.current_chunk_size_mb = 0
         self.chunk_filename = None
         self.chunk_file = None
+        self.chunk_binary_file = None
+        self.chunk_unmeasured_bytes = 0
+        self.chunk_write_seconds = 0
 
     def _gen_chunk_filename(self) -> str:
         """
@@ -119,12 +199,27 @@ class SplitGzipFile(io.BufferedIOBase):
         # Close the actual chunk file if exists and open a new one
         if self.chunk_filename != chunk_filename:
             if self.chunk_file:
-                self.chunk_file.close()
+                self._close_chunk_file()
 
-            # Open the actual chunk file with gzip data writer
+            # Open the actual chunk file with the data writer of the codec
             self.chunk_filename = chunk_filename
-            if self.compress:
-                self.chunk_file = gzip.open(self.chunk_filename, self.mode)
+            self.chunk_unmeasured_bytes = 0
+            self.chunk_write_seconds = 0
+            if self.codec == compression.CODEC_ZSTD or (self.compress and self.compress_threads > 1):
+                if self.codec == compression.CODEC_ZSTD:
+                    self.chunk_file = ZstdFile(
+                        self.chunk_filename, self.compresslevel, self.compress_threads
+                    )
+                else:
+                    self.chunk_file = ParallelGzipFile(
+                        self.chunk_filename, self.compresslevel, self.compress_threads
+                    )
+                if 't' in self.mode:
+                    self.chunk_file = io.TextIOWrapper(self.chunk_file, encoding='utf-8')
+            elif self.compress:
+                self.chunk_file = gzip.open(
+                    self.chunk_filename, self.mode, compresslevel=self.compresslevel
+                )
             else:
                 if 'b' in self.mode:
                     self.chunk_file = builtins.open(  # pylint: disable=unspecified-encoding
@@ -135,6 +230,15 @@ class SplitGzipFile(io.BufferedIOBase):
                         self.chunk_filename, self.mode, encoding='utf-8'
                     )
 
+            # Binary file object under the optional text wrapper
+            self.chunk_binary_file = (
+                self.chunk_file.buffer if 't' in self.mode else self.chunk_file
+            )
+
+            # Every chunk starts with the header to be loadable on its own
+            if self.header:
+                self.chunk_file.write(self.header)
+
     @staticmethod
     def _bytes_to_megabytes(size: int) -> float:
         """
@@ -147,22 +251,94 @@ class SplitGzipFile(io.BufferedIOBase):
         """
         return size / float(1 << 20)
 
+    def _measure_chunk_size(self):
+        """
+        Measure the size of the active chunk file on disk and update the measured compression rate.
+
+        The compressed size is the number of bytes written to disk, plus the estimated compressed size
+        of the data that is accepted by the writer but not compressed yet.
+        """
+        self.chunk_unmeasured_bytes = 0
+        uncompressed_size = self.chunk_binary_file.tell()
+
+        if isinstance(self.chunk_binary_file, (ParallelGzipFile, ZstdFile)):
+            written_size = self.chunk_binary_file.fileobj.tell()
+            pending_size = self.chunk_binary_file.pending_size
+        elif isinstance(self.chunk_binary_file, gzip.GzipFile):
+            written_size = self.chunk_binary_file.fileobj.tell()
+            pending_size = 0
+        else:
+            written_size = uncompressed_size
+            pending_size = 0
+
+        compressed_input_size = uncompressed_size - pending_size
+        if self.compress and compressed_input_size >= COMPR_RATE_SAMPLE_BYTES:
+            self.est_compr_rate = written_size / compressed_input_size
+
+        self.current_chunk_size_mb = SplitGzipFile._bytes_to_megabytes(
+            written_size + pending_size * self.est_compr_rate
+        )
+
     def write(self, _bytes):
         """
-        Writes bytes into the active chunk file and updates the estimated new size of the file after compression.
+        Writes bytes into the active chunk file and updates the size of the file after compression.
 
-        Compressed file size cannot be calculated at write time because compression is a separated
-        process that performs only when we finished writing the file. We need to estimate the compressed size.
+        The size on disk is measured after every SIZE_CHECK_BYTES of written data and estimated by
+        the measured compression rate in between.
 
         Args:
             _bytes: Bytes to write
         """
         self._activate_chunk_file()
 
+        write_started_at = time.monotonic()
         self.chunk_file.write(_bytes)
-        self.current_chunk_size_mb = SplitGzipFile._bytes_to_megabytes(
-            self.chunk_file.tell() * self.est_compr_rate
+        self.chunk_write_seconds += time.monotonic() - write_started_at
+
+        self.chunk_unmeasured_bytes += len(_bytes)
+        if self.chunk_unmeasured_bytes >= SIZE_CHECK_BYTES:
+            self._measure_chunk_size()
+        else:
+            self.current_chunk_size_mb += SplitGzipFile._bytes_to_megabytes(
+                len(_bytes) * self.est_compr_rate
+            )
+
+    def _close_chunk_file(self, notify: bool = True):
+        """
+        Close the active chunk file, log the write throughput and notify the on_chunk_closed callback
+
+        Args:
+            notify: Call on_chunk_closed with the closed chunk, false if the chunk is incomplete
+        """
+        uncompressed_size = self.chunk_binary_file.tell()
+        close_started_at = time.monotonic()
+        self.chunk_file.close()
+        self.chunk_file = None
+        self.chunk_binary_file = None
+        self.chunk_write_seconds += time.monotonic() - close_started_at
+
+        # The exact compression rate of the closed chunk is the best estimate for the next chunk
+        compressed_size = os.path.getsize(self.chunk_filename)
+        if self.compress and uncompressed_size >= COMPR_RATE_SAMPLE_BYTES:
+            self.est_compr_rate = compressed_size / uncompressed_size
+
+        size_mb = SplitGzipFile._bytes_to_megabytes(uncompressed_size)
+        LOGGER.info(
+            'Written %.1f MB into %s of %.1f MB in %.1f seconds (%.1f MB/s)',
+            size_mb,
+            self.chunk_filename,
+            SplitGzipFile._bytes_to_megabytes(compressed_size),
+            self.chunk_write_seconds,
+            size_mb / self.chunk_write_seconds if self.chunk_write_seconds else 0,
         )
+        if notify and self.on_chunk_closed:
+            self.on_chunk_closed(self.chunk_filename)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # The active chunk of a failed export is incomplete, it is closed without notifying on_chunk_closed
+        if exc_type is not None and self.chunk_file is not None:
+            self._close_chunk_file(notify=False)
+        return super().__exit__(exc_type, exc_value, traceback)
 
     def close(self):
         """
@@ -170,10 +346,222 @@ class SplitGzipFile(io.BufferedIOBase):
         """
         if self.chunk_file is None:
             return
-        self.chunk_file.close()
+        self._close_chunk_file()
 
     def flush(self):
         """
         Flush the active chunk write buffers
         """
         self.chunk_file.flush()
+
+
+# pylint: disable=R0902
+class ParallelGzipFile(io.BufferedIOBase):
+    """Write only gzip file that compresses blocks of data on multiple threads, similarly to pigz.
+
+    Every block is compressed independently into raw deflate data that is byte aligned by a sync flush,
+    so the compressed blocks can be written one after the other into one standard gzip member.
+    zlib releases the GIL while compressing so the blocks are compressed in parallel.
+    """
+
+    def __init__(
+        self,
+        filename,
+        compresslevel: int = DEFAULT_COMPRESSLEVEL,
+        threads: int = DEFAULT_COMPRESS_THREADS,
+        block_size: int = PARALLEL_COMPRESS_BLOCK_SIZE,
+    ):
+        super().__init__()
+
+        self.compresslevel = compresslevel
+        self.block_size = block_size
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        # Limit the number of blocks in memory waiting to be written
+        self.max_pending_blocks = threads * 2
+        self.pending_blocks = collections.deque()
+        self.buffer = bytearray()
+        self.crc = zlib.crc32(b'')
+        self.size = 0
+        # Uncompressed size of the data that is not written to the file yet
+        self.pending_size = 0
+
+        self.fileobj = builtins.open(filename, 'wb')  # pylint: disable=R1732
+        self._write_gzip_header()
+
+    def _write_gzip_header(self):
+        """
+        Write the gzip member header, see RFC 1952
+        """
+        if self.compresslevel == 9:
+            extra_flags = b'\002'
+        elif self.compresslevel == 1:
+            extra_flags = b'\004'
+        else:
+            extra_flags = b'\000'
+
+        self.fileobj.write(b'\037\213\010\000')
+        self.fileobj.write(struct.pack('<L', int(time.time())))
+        self.fileobj.write(extra_flags)
+        self.fileobj.write(b'\377')
+
+    def _compress_block(self, block: bytes) -> bytes:
+        """
+        Compress one block into byte aligned raw deflate data
+        """
+        compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+        return compressor.compress(block) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def _submit_block(self, block: bytes):
+        """
+        Compress a block in the background and write the compressed blocks in order
+        """
+        self.crc = zlib.crc32(block, self.crc)
+        self.pending_blocks.append((len(block), self.executor.submit(self._compress_block, block)))
+
+        while len(self.pending_blocks) > self.max_pending_blocks:
+            self._write_pending_block()
+
+    def _write_pending_block(self):
+        """
+        Write the oldest compressed block into the file
+        """
+        block_size, future = self.pending_blocks.popleft()
+        self.fileobj.write(future.result())
+        self.pending_size -= block_size
+
+    def write(self, _bytes):
+        """
+        Writes bytes into the file
+
+        Args:
+            _bytes: Bytes to write
+        """
+        self.buffer += _bytes
+        self.size += len(_bytes)
+        self.pending_size += len(_bytes)
+
+        while len(self.buffer) >= self.block_size:
+            self._submit_block(bytes(self.buffer[: self.block_size]))
+            del self.buffer[: self.block_size]
+
+        return len(_bytes)
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        # Text wrappers can tell the position only of seekable files
+        return True
+
+    def tell(self):
+        """
+        Uncompressed number of bytes written
+        """
+        return self.size
+
+    def flush(self):
+        """
+        Flush the compressed blocks written so far. Data of incomplete blocks remains in memory
+        """
+        self.fileobj.flush()
+
+    def close(self):
+        """
+        Compress the remaining data, write the gzip trailer and close the file
+        """
+        if self.fileobj.closed:
+            return
+
+        try:
+            if self.buffer:
+                self._submit_block(bytes(self.buffer))
+                self.buffer = bytearray()
+
+            while self.pending_blocks:
+                self._write_pending_block()
+
+            # Empty final deflate block and the gzip trailer
+            self.fileobj.write(zlib.compressobj(self.compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS).flush())
+            self.fileobj.write(struct.pack('<LL', self.crc & 0xFFFFFFFF, self.size & 0xFFFFFFFF))
+        finally:
+            self.executor.shutdown(wait=True)
+            super().close()
+            self.fileobj.close()
+
+
+class ZstdFile(io.BufferedIOBase):
+    """Write only zstd file that keeps track of the uncompressed size and the data not compressed yet.
+
+    If threads is greater than 1 then zstd compresses the data on its own worker threads.
+    """
+
+    def __init__(
+        self,
+        filename,
+        compresslevel: int = compression.DEFAULT_COMPRESSLEVELS[compression.CODEC_ZSTD],
+        threads: int = DEFAULT_COMPRESS_THREADS,
+    ):
+        super().__init__()
+
+        self.size = 0
+        self.fileobj = builtins.open(filename, 'wb')  # pylint: disable=R1732
+        if threads > 1:
+            # Small jobs make the compressed data written regularly, so the chunk size can be measured
+            params = zstandard.ZstdCompressionParameters.from_level(
+                compresslevel, threads=threads, job_size=PARALLEL_ZSTD_JOB_SIZE
+            )
+            self.compressor = zstandard.ZstdCompressor(compression_params=params)
+        else:
+            self.compressor = zstandard.ZstdCompressor(level=compresslevel)
+        self.writer = self.compressor.stream_writer(self.fileobj, closefd=False)
+
+    @property
+    def pending_size(self) -> int:
+        """
+        Uncompressed size of the data that is not written to the file yet
+        """
+        ingested, consumed, _ = self.compressor.frame_progression()
+        return ingested - consumed
+
+    def write(self, _bytes):
+        """
+        Writes bytes into the file
+
+        Args:
+            _bytes: Bytes to write
+        """
+        self.writer.write(_bytes)
+        self.size += len(_bytes)
+        return len(_bytes)
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        # Text wrappers can tell the position only of seekable files
+        return True
+
+    def tell(self):
+        """
+        Uncompressed number of bytes written
+        """
+        return self.size
+
+    def flush(self):
+        """
+        Flush the compressed data written so far. Data that is not compressed yet remains in memory
+        """
+        self.fileobj.flush()
+
+    def close(self):
+        """
+        Compress the remaining data, end the zstd frame and close the file
+        """
+        if self.fileobj.closed:
+            return
+
+        try:
+            self.writer.close()
+        finally:
+            super().close()
+            self.fileobj.close()
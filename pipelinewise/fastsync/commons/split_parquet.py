@@ -0,0 +1,242 @@
+"""Functions that write chunked parquet files."""
+import logging
+import os
+import time
+
+from typing import Callable, List, Optional, Sequence
+
+import pyarrow
+import pyarrow.parquet
+
+LOGGER = logging.getLogger(__name__)
+
+EXPORT_FORMAT_CSV = 'csv'
+EXPORT_FORMAT_PARQUET = 'parquet'
+
+EXPORT_FORMATS = [EXPORT_FORMAT_CSV, EXPORT_FORMAT_PARQUET]
+
+FILE_EXTENSION = 'parquet'
+
+DEFAULT_CHUNK_SIZE_MB = 1000
+DEFAULT_MAX_CHUNKS = 20
+DEFAULT_COMPRESSION = 'snappy'
+
+
+# pylint: disable=W0622,R0913
+def open(
+    base_filename,
+    schema: pyarrow.Schema,
+    chunk_size_mb=None,
+    max_chunks=None,
+    on_chunk_closed=None,
+    compression=None,
+):
+    """Open a parquet file to write batches of rows into.
+
+    Args:
+        base_filename: Path where to create the parquet file(s) with the exported data.
+                       Dynamic chunk numbers are appended to the base_filename
+        schema: Arrow schema of the rows
+        chunk_size_mb: File chunk sizes. (Default: 1000)
+        max_chunks: Max number of chunks. If set to 0 then splitting is disabled and one single
+                    file will be created (Default: 20)
+        on_chunk_closed: Optional function called with the filename of every chunk once the chunk is
+                         closed and will not be written anymore. (Default: None)
+        compression: Compression codec of the parquet pages. (Default: snappy)
+
+    Return:
+        File like object
+    """
+    if chunk_size_mb is not None and chunk_size_mb < 1:
+        raise ValueError('Invalid chunk_size_mb: %d' % (chunk_size_mb,))
+    if max_chunks is not None and max_chunks < 0:
+        raise ValueError('Invalid max_chunks: %d' % (max_chunks,))
+    return SplitParquetFile(
+        base_filename,
+        schema,
+        chunk_size_mb,
+        max_chunks,
+        on_chunk_closed,
+        compression,
+    )
+
+
+def _get_value_converter(arrow_type: pyarrow.DataType) -> Optional[Callable]:
+    """
+    Get the function that converts the values arrow cannot convert to an arrow type
+
+    Args:
+        arrow_type: Arrow type of the values
+
+    Returns:
+        None if the values of the type are not converted
+    """
+    if pyarrow.types.is_floating(arrow_type):
+        return float
+    if pyarrow.types.is_boolean(arrow_type):
+        return bool
+    if pyarrow.types.is_string(arrow_type):
+        return str
+    return None
+
+
+def rows_to_record_batch(rows: Sequence[Sequence], schema: pyarrow.Schema) -> pyarrow.RecordBatch:
+    """
+    Convert a batch of rows into a columnar arrow record batch
+
+    Args:
+        rows: Rows with values in the order of the schema fields
+        schema: Arrow schema of the rows
+
+    Returns:
+        Arrow record batch
+    """
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    arrays = []
+    for values, field in zip(columns, schema):
+        try:
+            arrays.append(pyarrow.array(values, type=field.type))
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+            # Decimal values of floating point and string columns and integer values of boolean
+            # columns are not converted by arrow
+            convert = _get_value_converter(field.type)
+            if convert is None:
+                raise
+            arrays.append(
+                pyarrow.array([convert(v) if v is not None else None for v in values], type=field.type)
+            )
+
+    return pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+# pylint: disable=R0902
+class SplitParquetFile:
+    """Writes batches of rows into parquet files split by the size of the files."""
+
+    # pylint: disable=R0913
+    def __init__(
+        self,
+        base_filename,
+        schema: pyarrow.Schema,
+        chunk_size_mb: int = None,
+        max_chunks: int = None,
+        on_chunk_closed: Optional[Callable[[str], None]] = None,
+        compression: str = None,
+    ):
+        self.base_filename = base_filename
+        self.schema = schema
+        self.chunk_size_mb = chunk_size_mb or DEFAULT_CHUNK_SIZE_MB
+        self.max_chunks = max_chunks if max_chunks is not None else DEFAULT_MAX_CHUNKS
+        self.on_chunk_closed = on_chunk_closed
+        self.compression = compression or DEFAULT_COMPRESSION
+        self.chunk_seq = 1
+        self.chunk_filename = None
+        self.chunk_file = None
+        self.chunk_writer = None
+        self.chunk_rows = 0
+        self.chunk_write_seconds = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # The active chunk of a failed export is incomplete, it is closed without notifying on_chunk_closed
+        if exc_type is not None and self.chunk_writer is not None:
+            self._close_chunk_file(notify=False)
+        self.close()
+
+    def _gen_chunk_filename(self) -> str:
+        """
+        Generates a chunk filename
+
+        Pattern if max_chunks is zero: <base_filename>
+        Pattern if max_chunks is greater than zero: <base_filename>.part<chunk-number-padded-five-digits>
+
+        Returns:
+            string
+        """
+        if self.max_chunks == 0:
+            return self.base_filename
+
+        return f'{self.base_filename}.part{self.chunk_seq:05d}'
+
+    def _activate_chunk_file(self):
+        """
+        Open a new chunk file if no chunk is active
+        """
+        if self.chunk_writer is not None:
+            return
+
+        self.chunk_filename = self._gen_chunk_filename()
+        self.chunk_rows = 0
+        self.chunk_write_seconds = 0
+        self.chunk_file = pyarrow.OSFile(self.chunk_filename, 'wb')
+        self.chunk_writer = pyarrow.parquet.ParquetWriter(
+            self.chunk_file, self.schema, compression=self.compression
+        )
+
+    def write_rows(self, rows: List[Sequence]):
+        """
+        Writes a batch of rows into the active chunk file as one row group.
+
+        A new chunk is started once the active chunk file reaches the chunk size.
+
+        Args:
+            rows: Rows with values in the order of the schema fields
+        """
+        if not rows:
+            return
+
+        self.write_batch(rows_to_record_batch(rows, self.schema))
+
+    def write_batch(self, batch: pyarrow.RecordBatch):
+        """
+        Writes an arrow record batch into the active chunk file as one row group
+
+        Args:
+            batch: Record batch with the schema of the file
+        """
+        self._activate_chunk_file()
+
+        write_started_at = time.monotonic()
+        self.chunk_writer.write_table(pyarrow.Table.from_batches([batch], schema=self.schema))
+        self.chunk_write_seconds += time.monotonic() - write_started_at
+        self.chunk_rows += batch.num_rows
+
+        if (
+            self.max_chunks != 0
+            and self.chunk_seq < self.max_chunks
+            and self.chunk_file.tell() >= self.chunk_size_mb * (1 << 20)
+        ):
+            self._close_chunk_file()
+            self.chunk_seq += 1
+
+    def _close_chunk_file(self, notify: bool = True):
+        """
+        Close the active chunk file, log the write throughput and notify the on_chunk_closed callback
+
+        Args:
+            notify: Call on_chunk_closed with the closed chunk, false if the chunk is incomplete
+        """
+        self.chunk_writer.close()
+        self.chunk_file.close()
+        self.chunk_writer = None
+        self.chunk_file = None
+
+        LOGGER.info(
+            'Written %s rows into %s of %.1f MB in %.1f seconds',
+            self.chunk_rows,
+            self.chunk_filename,
+            os.path.getsize(self.chunk_filename) / float(1 << 20),
+            self.chunk_write_seconds,
+        )
+        if notify and self.on_chunk_closed:
+            self.on_chunk_closed(self.chunk_filename)
+
+    def close(self):
+        """
+        Close the active chunk file
+        """
+        if self.chunk_writer is None:
+            return
+        self._close_chunk_file()
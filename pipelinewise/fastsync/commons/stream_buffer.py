@@ -0,0 +1,167 @@
+"""Bounded in-memory buffer to stream exported data directly into a target."""
+import collections
+import logging
+import threading
+
+from typing import Any, Callable, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_BUFFER_SIZE_MB = 16
+
+
+class StreamAborted(Exception):
+    """Raised on writing into a stream buffer that is not read anymore"""
+
+
+# pylint: disable=too-many-instance-attributes
+class StreamBuffer:
+    """
+    File like object that passes the data written by one thread to another thread reading it.
+
+    Writing blocks while the buffered data reaches the max size, so the producer cannot get ahead of
+    the consumer by more than max_size bytes. Written str values are encoded to utf-8.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_BUFFER_SIZE_MB * (1 << 20)):
+        if max_size < 1:
+            raise ValueError('Invalid max_size: %d' % (max_size,))
+
+        self.max_size = max_size
+        self.chunks = collections.deque()
+        self.size = 0
+        self.total_size = 0
+        self.closed = False
+        self.error = None
+        self.aborted = False
+        self.cond = threading.Condition()
+
+    def write(self, data) -> int:
+        """
+        Append data to the buffer, waits while the buffer is full
+
+        Raises:
+            StreamAborted: if the reader aborted the stream
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        with self.cond:
+            while self.size >= self.max_size and not self.aborted:
+                self.cond.wait()
+
+            if self.aborted:
+                raise StreamAborted('Stream is not read anymore')
+            if self.closed:
+                raise ValueError('Write to closed stream buffer')
+
+            if data:
+                self.chunks.append(bytes(data))
+                self.size += len(data)
+                self.total_size += len(data)
+                self.cond.notify_all()
+
+        return len(data)
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read at most size bytes, waits until data is available.
+
+        Returns:
+            Empty bytes at the end of the stream
+
+        Raises:
+            Exception: the error the writer closed the stream with
+        """
+        with self.cond:
+            while not self.chunks and not self.closed:
+                self.cond.wait()
+
+            if self.error is not None:
+                raise self.error
+
+            if size is None or size < 0:
+                size = self.size
+
+            data = bytearray()
+            while self.chunks and len(data) < size:
+                chunk = self.chunks.popleft()
+                missing = size - len(data)
+                if len(chunk) > missing:
+                    self.chunks.appendleft(chunk[missing:])
+                    chunk = chunk[:missing]
+                data += chunk
+
+            self.size -= len(data)
+            self.cond.notify_all()
+
+        return bytes(data)
+
+    def close(self, error: Optional[BaseException] = None):
+        """
+        Mark the end of the stream. The reader gets the error instead of the end of the stream if set
+        """
+        with self.cond:
+            self.closed = True
+            self.error = error
+            self.cond.notify_all()
+
+    def abort(self):
+        """
+        Stop reading the stream, the writer gets StreamAborted instead of waiting for free space
+        """
+        with self.cond:
+            self.aborted = True
+            self.chunks.clear()
+            self.size = 0
+            self.cond.notify_all()
+
+
+def transfer(
+    produce: Callable[[StreamBuffer], Any],
+    consume: Callable[[StreamBuffer], Any],
+    buffer_size_mb: int = None,
+) -> StreamBuffer:
+    """
+    Stream data from a producer to a consumer through a bounded in-memory buffer.
+
+    The producer writes the data into the buffer in a background thread while the consumer reads it
+    in the calling thread. Errors of the producer are raised to the consumer by the buffer and the
+    producer is stopped if the consumer fails.
+
+    Args:
+        produce: Function that writes the data into the buffer
+        consume: Function that reads the buffer until the end of the stream
+        buffer_size_mb: Max size of the data in the buffer. (Default: 16)
+
+    Returns:
+        The buffer with the total_size of the transferred data
+    """
+    stream = StreamBuffer((buffer_size_mb or DEFAULT_BUFFER_SIZE_MB) * (1 << 20))
+    producer_errors = []
+
+    def run_producer():
+        try:
+            produce(stream)
+        except StreamAborted:
+            stream.close()
+        except BaseException as exc:  # pylint: disable=broad-except
+            producer_errors.append(exc)
+            stream.close(exc)
+        else:
+            stream.close()
+
+    producer = threading.Thread(target=run_producer, name='stream-producer', daemon=True)
+    producer.start()
+    try:
+        consume(stream)
+    finally:
+        # Unblock the producer if the consumer stopped before the end of the stream
+        stream.abort()
+        producer.join()
+
+    if producer_errors:
+        raise producer_errors[0]
+
+    LOGGER.info('Streamed %.1f MB', stream.total_size / float(1 << 20))
+    return stream
@@ -1,10 +1,12 @@
 import base64
 import csv
 import datetime
+import functools
 import gzip
 import ujson
 import logging
 import os
+import queue
 import subprocess
 import uuid
 import bson
@@ -12,10 +14,11 @@ import pytz
 import tzlocal
 from urllib import parse
 
-from typing import Tuple, Optional, Dict, Callable, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple, Optional, Dict, Callable, Any, Iterable, List
 from pymongo import MongoClient
+from pymongo.errors import OperationFailure
 from pymongo.database import Database
-from singer.utils import strftime as singer_strftime
 
 from . import utils, split_gzip
 from .errors import (
@@ -24,9 +27,25 @@ from .errors import (
     MongoDBInvalidDatetimeError,
     UnsupportedKeyTypeException,
 )
+from .row_transformer import HASH_SHA256_HEX, REGEX_SEARCH, RowTransformer
 
 LOGGER = logging.getLogger(__name__)
 DEFAULT_WRITE_BATCH_ROWS = 50000
+DEFAULT_EXPORT_PARALLELISM = 1
+
+# Number of sampled _id values per range to find the range boundaries if splitVector is not allowed
+ID_SAMPLES_PER_RANGE = 100
+
+# Types of _id values that can be used as the boundaries of _id ranges
+SPLITTABLE_ID_TYPES = (bson.objectid.ObjectId, int, float, str, datetime.datetime)
+
+
+class _InvalidDatetime(Exception):
+    """Raised on a datetime value that cannot be converted to UTC"""
+
+    def __init__(self, value):
+        super().__init__(value)
+        self.value = value
 
 
 def serialize_document(document: Dict) -> Dict:
@@ -38,11 +57,40 @@ def serialize_document(document: Dict) -> Dict:
 
     Returns: Dict
     """
-    return {
-        key: transform_value(val, [key])
-        for key, val in document.items()
-        if not isinstance(val, (bson.min_key.MinKey, bson.max_key.MaxKey))
-    }
+    try:
+        return {
+            key: transform_value(val)
+            for key, val in document.items()
+            if val.__class__ not in _SKIPPED_FIELD_TYPES
+        }
+    except _InvalidDatetime as exc:
+        # The path of the invalid value is searched only when it is needed for the error message
+        path = _find_value_path(document, exc.value) or []
+        raise MongoDBInvalidDatetimeError(
+            'Found invalid datetime at [{}]: {}'.format('.'.join(map(str, path)), exc.value)
+        ) from exc.__cause__
+
+
+def _find_value_path(value: Any, target: Any) -> Optional[List]:
+    """
+    Find the path of keys and list indexes to an object in a nested value
+    """
+    if value is target:
+        return []
+
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        items = enumerate(value)
+    else:
+        return None
+
+    for key, item in items:
+        path = _find_value_path(item, target)
+        if path is not None:
+            return [key] + path
+
+    return None
 
 
 def class_to_string(key_value: Any, key_type: str) -> str:
@@ -57,14 +105,7 @@ def class_to_string(key_value: Any, key_type: str) -> str:
     Raises: UnsupportedKeyTypeException if key_type is not supported
     """
     if key_type == 'datetime':
-        if key_value.tzinfo is None:
-            timezone = tzlocal.get_localzone()
-            local_datetime = timezone.localize(key_value)
-            utc_datetime = local_datetime.astimezone(pytz.UTC)
-        else:
-            utc_datetime = key_value.astimezone(pytz.UTC)
-
-        return singer_strftime(utc_datetime)
+        return transform_datetime(key_value)
 
     if key_type == 'Timestamp':
         return '{}.{}'.format(key_value.time, key_value.inc)
@@ -78,79 +119,126 @@ def class_to_string(key_value: Any, key_type: str) -> str:
     raise UnsupportedKeyTypeException('{} is not a supported key type'.format(key_type))
 
 
-def safe_transform_datetime(value: datetime.datetime, path) -> str:
+@functools.lru_cache(maxsize=None)
+def get_local_timezone():
     """
-    Safely transform datetime from local tz to UTC if applicable
-    Args:
-        value: datetime value to transform
-        path:
+    Get the local timezone once, looking it up is expensive
+    """
+    return tzlocal.get_localzone()
+
+
+@functools.lru_cache(maxsize=None)
+def _is_local_timezone_utc() -> bool:
+    """
+    Check if naive datetime values can be pegged at UTC without converting them
+    """
+    return str(get_local_timezone()) in ('UTC', 'Etc/UTC', 'Etc/Universal', 'Universal', 'Zulu', 'Etc/Zulu')
+
+
+def format_utc_datetime(value: datetime.datetime) -> str:
+    """
+    Format a UTC datetime the same way as singer.utils.strftime, without checking the offset
+    """
+    return '{:04d}-{:02d}-{:02d}T{:02d}:{:02d}:{:02d}.{:06d}Z'.format(
+        value.year,
+        value.month,
+        value.day,
+        value.hour,
+        value.minute,
+        value.second,
+        value.microsecond,
+    )
+
 
-    Returns: utc datetime as string
+def transform_datetime(value: datetime.datetime) -> str:
+    """
+    Convert a datetime to UTC string. Naive datetime values are in the local timezone.
 
+    Raises: _InvalidDatetime if the datetime cannot be converted to UTC
     """
-    timezone = tzlocal.get_localzone()
     try:
-        local_datetime = timezone.localize(value)
-        utc_datetime = local_datetime.astimezone(pytz.UTC)
-    except Exception as ex:
-        if str(ex) == 'year is out of range' and value.year == 0:
-            # NB: Since datetimes are persisted as strings, it doesn't
-            # make sense to blow up on invalid Python datetimes (e.g.,
-            # year=0). In this case we're formatting it as a string and
-            # passing it along down the pipeline.
-            return '{:04d}-{:02d}-{:02d}T{:02d}:{:02d}:{:02d}.{:06d}Z'.format(
-                value.year,
-                value.month,
-                value.day,
-                value.hour,
-                value.minute,
-                value.second,
-                value.microsecond,
-            )
-        raise MongoDBInvalidDatetimeError(
-            'Found invalid datetime at [{}]: {}'.format('.'.join(map(str, path)), value)
-        ) from ex
-    return singer_strftime(utc_datetime)
+        if value.tzinfo is None:
+            if _is_local_timezone_utc():
+                return format_utc_datetime(value)
+
+            utc_datetime = get_local_timezone().localize(value).astimezone(pytz.UTC)
+        else:
+            utc_datetime = value.astimezone(pytz.UTC)
+    except (OverflowError, ValueError) as exc:
+        raise _InvalidDatetime(value) from exc
+
+    return format_utc_datetime(utc_datetime)
+
+
+def _transform_dict(value: Dict) -> Dict:
+    return {key: transform_value(val) for key, val in value.items()}
+
+
+def _transform_list(value: List) -> List:
+    return [transform_value(val) for val in value]
+
+
+def _transform_code(value: bson.code.Code) -> Any:
+    return dict(value=str(value), scope=str(value.scope)) if value.scope else str(value)
+
 
+# Conversions of the values by exact type to json friendly ones, None if the value is kept as it is.
+# Subclasses of the types are added on their first occurrence by _get_conversion
+_CONVERSIONS: Dict[type, Optional[Callable[[Any], Any]]] = {
+    str: None,
+    int: None,
+    float: None,
+    bool: None,
+    type(None): None,
+    dict: _transform_dict,
+    list: _transform_list,
+    uuid.UUID: str,
+    bson.objectid.ObjectId: str,
+    datetime.datetime: transform_datetime,
+    bson.timestamp.Timestamp: lambda val: format_utc_datetime(val.as_datetime()),
+    bson.int64.Int64: str,
+    bytes: lambda val: base64.b64encode(val).decode('utf-8'),
+    bson.decimal128.Decimal128: lambda val: val.to_decimal(),
+    bson.regex.Regex: lambda val: dict(pattern=val.pattern, flags=val.flags),
+    bson.code.Code: _transform_code,
+    bson.dbref.DBRef: lambda val: dict(id=str(val.id), collection=val.collection, database=val.database),
+}
 
-def transform_value(value: Any, path) -> Any:
+_SKIPPED_FIELD_TYPES = (bson.min_key.MinKey, bson.max_key.MaxKey)
+
+
+def _get_conversion(value_type: type) -> Optional[Callable[[Any], Any]]:
+    """
+    Find and cache the conversion of a type that is not in the conversions by its base classes
+    """
+    conversion = None
+    for base_type in value_type.__mro__[1:]:
+        if base_type in _CONVERSIONS and base_type is not object:
+            conversion = _CONVERSIONS[base_type]
+            break
+
+    _CONVERSIONS[value_type] = conversion
+    return conversion
+
+
+def transform_value(value: Any) -> Any:
     """
     transform values to json friendly ones
     Args:
         value: value to transform
-        path:
 
     Returns: transformed value
 
     """
-    conversion = {
-        list: lambda val, pat: list(
-            map(lambda v: transform_value(v[1], pat + [v[0]]), enumerate(val))
-        ),
-        dict: lambda val, pat: {
-            k: transform_value(v, pat + [k]) for k, v in val.items()
-        },
-        uuid.UUID: lambda val, _: class_to_string(val, 'UUID'),
-        bson.objectid.ObjectId: lambda val, _: class_to_string(val, 'ObjectId'),
-        bson.datetime.datetime: safe_transform_datetime,
-        bson.timestamp.Timestamp: lambda val, _: singer_strftime(val.as_datetime()),
-        bson.int64.Int64: lambda val, _: class_to_string(val, 'Int64'),
-        bytes: lambda val, _: class_to_string(val, 'bytes'),
-        datetime.datetime: lambda val, _: class_to_string(val, 'datetime'),
-        bson.decimal128.Decimal128: lambda val, _: val.to_decimal(),
-        bson.regex.Regex: lambda val, _: dict(pattern=val.pattern, flags=val.flags),
-        bson.code.Code: lambda val, _: dict(value=str(val), scope=str(val.scope))
-        if val.scope
-        else str(val),
-        bson.dbref.DBRef: lambda val, _: dict(
-            id=str(val.id), collection=val.collection, database=val.database
-        ),
-    }
+    try:
+        conversion = _CONVERSIONS[value.__class__]
+    except KeyError:
+        conversion = _get_conversion(value.__class__)
 
-    if isinstance(value, tuple(conversion.keys())):
-        return conversion[type(value)](value, path)
+    if conversion is None:
+        return value
 
-    return value
+    return conversion(value)
 
 
 def get_connection_string(config: Dict):
@@ -202,21 +290,40 @@ class FastSyncTapMongoDB:
     Common functions for fastsync from a MongoDB database
     """
 
-    def __init__(self, connection_config: Dict, tap_type_to_target_type: Callable):
+    def __init__(
+        self,
+        connection_config: Dict,
+        tap_type_to_target_type: Callable,
+        transformation_config: Optional[Dict] = None,
+        hash_encoding: str = HASH_SHA256_HEX,
+        regex_match: str = REGEX_SEARCH,
+    ):
         """
         FastSyncTapMongoDB constructor
         Args:
             connection_config: A map of tap source config
             tap_type_to_target_type: Function that maps tap types to target ones
+            transformation_config: Transformations applied to the exported rows, the target does
+                                   not need to transform the loaded tables. (Default: None)
+            hash_encoding: Encoding of the hashes of the transformations, the HASH_ENCODING of
+                           the target. (Default: sha256-hex)
+            regex_match: Semantics of the regex_match conditions of the transformations, the
+                         REGEX_MATCH of the target. (Default: search)
         """
         self.connection_config = connection_config
         self.connection_config['write_batch_rows'] = connection_config.get(
             'write_batch_rows', DEFAULT_WRITE_BATCH_ROWS
         )
+        self.connection_config['export_compression_threads'] = connection_config.get(
+            'export_compression_threads', split_gzip.DEFAULT_COMPRESS_THREADS
+        )
 
         self.connection_config['connection_string'] = get_connection_string(self.connection_config)
 
         self.tap_type_to_target_type = tap_type_to_target_type
+        self.transformation_config = transformation_config
+        self.hash_encoding = hash_encoding
+        self.regex_match = regex_match
         self.database: Optional[Database] = None
 
     def open_connection(self):
@@ -244,6 +351,7 @@ class FastSyncTapMongoDB:
         split_file_chunk_size_mb=1000,
         split_file_max_chunks=20,
         compress=True,
+        codec=None,
     ):
         """
         Export data from table to a zipped csv
@@ -256,82 +364,59 @@ class FastSyncTapMongoDB:
             split_file_chunk_size_mb: File chunk sizes if `split_large_files` enabled. (Default: 1000)
             split_file_max_chunks: Max number of chunks if `split_large_files` enabled. (Default: 20)
             compress: Flag to indicate whether to compress export files
+            codec: Compression codec of the export files, gzip, zstd or none. Overrides the
+                   compress flag if set. (Default: None)
+
+        If `export_parallelism` is greater than 1 in the connection config then the collection is
+        exported without mongodump by parallel cursors reading disjoint _id ranges, every range
+        into its own -partXYZ file, split further into chunks if `split_large_files` enabled.
+        Every file part starts with a csv header.
         """
         table_dict = utils.tablename_to_dict(table_name, '.')
 
         if table_dict['table_name'] not in self.database.list_collection_names():
             raise TableNotFoundError(f'{table_name} table not found!')
 
-        export_file_path = self._export_collection(temp_dir, table_dict['table_name'])
-        extracted_at = datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
-
-        write_batch_rows = self.connection_config['write_batch_rows']
-        exported_rows = 0
+        row_transformer = RowTransformer.from_config(
+            self.transformation_config,
+            utils.get_tap_stream_name(table_name),
+            [elem[0] for elem in self._get_collection_columns()],
+            self.hash_encoding,
+            self.regex_match,
+        )
 
-        try:
-            gzip_splitter = split_gzip.open(
+        export_parallelism = self.connection_config.get('export_parallelism', DEFAULT_EXPORT_PARALLELISM)
+        if export_parallelism > 1:
+            exported_rows = self.copy_collection_in_ranges(
+                table_dict['table_name'],
                 filepath,
-                mode='wt',
+                num_ranges=max(export_parallelism, split_file_max_chunks if split_large_files else 0),
                 chunk_size_mb=split_file_chunk_size_mb,
                 max_chunks=split_file_max_chunks if split_large_files else 0,
                 compress=compress,
+                codec=codec,
+                row_transformer=row_transformer,
             )
-            with gzip.open(
-                export_file_path, 'rb'
-            ) as export_file, gzip_splitter as gzfile:
-                writer = csv.DictWriter(
-                    gzfile,
-                    fieldnames=[elem[0] for elem in self._get_collection_columns()],
-                    delimiter=',',
-                    quotechar='"',
-                    quoting=csv.QUOTE_MINIMAL,
-                )
+            LOGGER.info('Exported total of %s rows from %s...', exported_rows, table_name)
+            return
 
-                writer.writeheader()
-                rows = []
+        export_file_path = self._export_collection(temp_dir, table_dict['table_name'])
 
+        try:
+            with gzip.open(export_file_path, 'rb') as export_file:
                 LOGGER.info('Starting data processing...')
 
                 # bson.decode_file_iter will generate one document at a time from the exported file
-                for document in bson.decode_file_iter(export_file):
-                    try:
-                        rows.append(
-                            {
-                                '_ID': str(document['_id']),
-                                'DOCUMENT': ujson.dumps(serialize_document(document)),
-                                utils.SDC_EXTRACTED_AT: extracted_at,
-                                utils.SDC_BATCHED_AT: datetime.datetime.utcnow().strftime(
-                                    '%Y-%m-%d %H:%M:%S.%f'
-                                ),
-                                utils.SDC_DELETED_AT: None,
-                            }
-                        )
-                    except TypeError:
-                        LOGGER.error(
-                            'TypeError encountered when processing document ID: %s',
-                            document['_id'],
-                        )
-                        raise
-
-                    exported_rows += 1
-
-                    # writes batch to csv file and log some nice message on the progress.
-                    if exported_rows % write_batch_rows == 0:
-                        LOGGER.info(
-                            'Exporting batch from %s to %s rows from %s...',
-                            (exported_rows - write_batch_rows),
-                            exported_rows,
-                            table_name,
-                        )
-
-                        writer.writerows(rows)
-                        rows.clear()
-
-                # write rows one last time
-                if rows:
-                    LOGGER.info('Exporting last batch ...')
-                    writer.writerows(rows)
-                    rows.clear()
+                exported_rows = self.export_documents(
+                    bson.decode_file_iter(export_file),
+                    filepath,
+                    table_name,
+                    chunk_size_mb=split_file_chunk_size_mb,
+                    max_chunks=split_file_max_chunks if split_large_files else 0,
+                    compress=compress,
+                    codec=codec,
+                    row_transformer=row_transformer,
+                )
 
         finally:
             # whether the code in try succeeds or fails
@@ -340,6 +425,256 @@ class FastSyncTapMongoDB:
 
         LOGGER.info('Exported total of %s rows from %s...', exported_rows, table_name)
 
+    # pylint: disable=R0913,R0914
+    def export_documents(
+        self,
+        documents: Iterable[Dict],
+        path: str,
+        export_name: str,
+        chunk_size_mb=1000,
+        max_chunks=0,
+        compress=True,
+        codec=None,
+        row_transformer: Optional[RowTransformer] = None,
+    ) -> int:
+        """
+        Write documents into zipped csv file(s), every file starting with the header
+
+        Args:
+            documents: Documents to export
+            path: Path where to create the zip file(s) with the exported data
+            export_name: Name of the exported data in the log messages
+            chunk_size_mb: File chunk sizes. (Default: 1000)
+            max_chunks: Max number of chunks. 0 disables splitting. (Default: 0)
+            compress: Flag to indicate whether to compress export files
+            codec: Compression codec of the export files. Overrides the compress flag if set
+            row_transformer: Transformer of the rows before they are written. (Default: None)
+
+        Returns:
+            Number of exported documents
+        """
+        extracted_at = datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+        write_batch_rows = self.connection_config['write_batch_rows']
+        exported_rows = 0
+
+        gzip_splitter = split_gzip.open(
+            path,
+            mode='wt',
+            chunk_size_mb=chunk_size_mb,
+            max_chunks=max_chunks,
+            compress=compress,
+            codec=codec,
+            compresslevel=self.connection_config.get('export_compression_level'),
+            compress_threads=self.connection_config['export_compression_threads'],
+            header=','.join(elem[0] for elem in self._get_collection_columns()) + '\r\n',
+        )
+        with gzip_splitter as gzfile:
+            writer = csv.writer(
+                gzfile,
+                delimiter=',',
+                quotechar='"',
+                quoting=csv.QUOTE_MINIMAL,
+            )
+
+            def write_rows(rows):
+                if row_transformer is not None:
+                    rows = row_transformer.transform_rows(rows)
+                writer.writerows(rows)
+
+            rows = []
+            batched_at = datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+
+            for document in documents:
+                try:
+                    rows.append(
+                        (
+                            str(document['_id']),
+                            ujson.dumps(serialize_document(document)),
+                            extracted_at,
+                            batched_at,
+                            None,
+                        )
+                    )
+                except TypeError:
+                    LOGGER.error(
+                        'TypeError encountered when processing document ID: %s',
+                        document['_id'],
+                    )
+                    raise
+
+                exported_rows += 1
+
+                # writes batch to csv file and log some nice message on the progress.
+                if exported_rows % write_batch_rows == 0:
+                    LOGGER.info(
+                        'Exporting batch from %s to %s rows from %s...',
+                        (exported_rows - write_batch_rows),
+                        exported_rows,
+                        export_name,
+                    )
+
+                    write_rows(rows)
+                    rows.clear()
+                    batched_at = datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+
+            # write rows one last time
+            if rows:
+                LOGGER.info('Exporting last batch of %s...', export_name)
+                write_rows(rows)
+                rows.clear()
+
+        return exported_rows
+
+    def get_id_boundaries(self, collection_name: str, num_ranges: int) -> List:
+        """
+        Find _id values that split a collection into ranges of about the same size
+
+        The boundaries are the split points of splitVector if the user is allowed to run it,
+        otherwise the quantiles of a random sample of the _id values.
+
+        Args:
+            collection_name: Name of the collection to split
+            num_ranges: Number of ranges to split the collection into
+
+        Returns:
+            Sorted _id values of the same type, num_ranges - 1 at most
+        """
+        try:
+            collection_size = self.database.command('collStats', collection_name)['size']
+            split_keys = [
+                key['_id']
+                for key in self.database.command(
+                    'splitVector',
+                    f'{self.database.name}.{collection_name}',
+                    keyPattern={'_id': 1},
+                    maxChunkSizeBytes=max(collection_size // num_ranges, 1),
+                )['splitKeys']
+            ]
+        except OperationFailure as exc:
+            LOGGER.info('Cannot run splitVector on %s, sampling _id values: %s', collection_name, exc)
+            split_keys = [
+                document['_id']
+                for document in self.database[collection_name].aggregate(
+                    [
+                        {'$sample': {'size': num_ranges * ID_SAMPLES_PER_RANGE}},
+                        {'$project': {'_id': 1}},
+                    ]
+                )
+            ]
+
+        # Values of different BSON types are compared by type first, that cannot be done in python
+        key_types = {type(key) for key in split_keys}
+        if len(key_types) != 1 or not issubclass(key_types.pop(), SPLITTABLE_ID_TYPES):
+            return []
+
+        split_keys = sorted(set(split_keys))
+        boundaries = []
+        for range_no in range(1, num_ranges):
+            key = split_keys[range_no * len(split_keys) // num_ranges]
+            if not boundaries or key > boundaries[-1]:
+                boundaries.append(key)
+
+        return boundaries
+
+    @staticmethod
+    def get_id_range_filters(boundaries: List) -> List[Dict]:
+        """
+        Get disjoint query filters of the _id ranges between the boundaries that cover every document
+
+        Range operators match only the values of the same BSON type, so the first range matches
+        every _id that is not greater than or equal to the first boundary, including the _id values
+        of other types.
+
+        Args:
+            boundaries: Sorted _id values of the same type
+
+        Returns:
+            Query filters, len(boundaries) + 1
+        """
+        if not boundaries:
+            return [{}]
+
+        filters = [{'_id': {'$not': {'$gte': boundaries[0]}}}]
+        for lower_bound, upper_bound in zip(boundaries, boundaries[1:]):
+            filters.append({'_id': {'$gte': lower_bound, '$lt': upper_bound}})
+        filters.append({'_id': {'$gte': boundaries[-1]}})
+
+        return filters
+
+    # pylint: disable=too-many-arguments
+    def copy_collection_in_ranges(
+        self,
+        collection_name: str,
+        path: str,
+        num_ranges: int,
+        chunk_size_mb=1000,
+        max_chunks=0,
+        compress=True,
+        codec=None,
+        row_transformer: Optional[RowTransformer] = None,
+    ) -> int:
+        """
+        Export a collection to zipped csv files by parallel cursors reading disjoint _id ranges.
+
+        Every range is exported into its own <path>.part<range-number-padded-five-digits>
+        file by `export_parallelism` threads. If max_chunks is greater than zero then every range
+        is split further into chunks of chunk_size_mb, named <path>.part<range-number>.part<chunk-number>,
+        with a budget of max_chunks per range. Ranges do not hold the same number of documents,
+        so a range can hold most of the collection.
+
+        Args:
+            collection_name: Name of the collection to export
+            path: Base path of the zip files with the exported data
+            num_ranges: Number of ranges to export
+            chunk_size_mb: File chunk sizes of every range if max_chunks is greater than zero
+            max_chunks: Max number of chunks of every range, 0 to export every range in one file
+            compress: Flag to indicate whether to compress export files
+            codec: Compression codec of the export files. Overrides the compress flag if set
+            row_transformer: Transformer of the rows before they are written. (Default: None)
+
+        Returns:
+            Number of exported documents
+        """
+        range_filters = self.get_id_range_filters(self.get_id_boundaries(collection_name, num_ranges))
+        export_parallelism = min(self.connection_config['export_parallelism'], len(range_filters))
+        LOGGER.info(
+            'Exporting %s in %s _id ranges over %s cursors...',
+            collection_name,
+            len(range_filters),
+            export_parallelism,
+        )
+
+        range_queue = queue.Queue()
+        for part_no, range_filter in enumerate(range_filters, start=1):
+            range_queue.put((part_no, range_filter))
+
+        def export_ranges() -> int:
+            exported_rows = 0
+            while True:
+                try:
+                    part_no, range_filter = range_queue.get_nowait()
+                except queue.Empty:
+                    return exported_rows
+
+                cursor = self.database[collection_name].find(
+                    range_filter, batch_size=self.connection_config['write_batch_rows']
+                )
+                with cursor:
+                    exported_rows += self.export_documents(
+                        cursor,
+                        f'{path}.part{part_no:05d}',
+                        f'{collection_name} (part {part_no})',
+                        chunk_size_mb=chunk_size_mb,
+                        max_chunks=max_chunks,
+                        compress=compress,
+                        codec=codec,
+                        row_transformer=row_transformer,
+                    )
+
+        with ThreadPoolExecutor(max_workers=export_parallelism) as executor:
+            futures = [executor.submit(export_ranges) for _ in range(export_parallelism)]
+            return sum(future.result() for future in futures)
+
     @staticmethod
     def _get_collection_columns() -> Tuple:
         """
@@ -1,19 +1,26 @@
 import csv
 import datetime
 import decimal
+import io
 import logging
-from typing import Tuple
+import queue
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
 
+import pyarrow
 import pymysql
 from pymysql import InterfaceError, OperationalError
 
 from ...utils import safe_column_name
-from . import split_gzip, utils
+from . import split_gzip, split_parquet, utils
+from .row_transformer import HASH_SHA256_HEX, REGEX_SEARCH, RowTransformer
 
 LOGGER = logging.getLogger(__name__)
 
 DEFAULT_CHARSET = 'utf8'
 DEFAULT_EXPORT_BATCH_ROWS = 50000
+DEFAULT_EXPORT_PARALLELISM = 1
 DEFAULT_SESSION_SQLS = [
     'SET @@session.time_zone="+0:00"',
     'SET @@session.wait_timeout=28800',
@@ -21,13 +28,59 @@ DEFAULT_SESSION_SQLS = [
     'SET @@session.innodb_lock_wait_timeout=3600',
 ]
 
-
+# Data types of primary key columns that can be used to export a table in key ranges
+RANGE_SPLIT_DATA_TYPES = ('smallint', 'integer', 'bigint', 'mediumint', 'int')
+
+# Arrow types of the exported values by MySQL data type, other data types are exported as strings
+ARROW_TYPES = {
+    'smallint': pyarrow.int64(),
+    'integer': pyarrow.int64(),
+    'bigint': pyarrow.int64(),
+    'mediumint': pyarrow.int64(),
+    'int': pyarrow.int64(),
+    'bit': pyarrow.bool_(),
+    'double': pyarrow.float64(),
+    'float': pyarrow.float64(),
+    'real': pyarrow.float64(),
+    'datetime': pyarrow.timestamp('us'),
+    'timestamp': pyarrow.timestamp('us'),
+}
+
+# Max precision of the decimal columns exported as arrow decimals, wider decimals are exported as strings
+MAX_ARROW_DECIMAL_PRECISION = 38
+
+
+# pylint: disable=too-many-public-methods,too-many-instance-attributes
 class FastSyncTapMySql:
     """
     Common functions for fastsync from a MySQL database
     """
 
-    def __init__(self, connection_config: dict, tap_type_to_target_type, target_quote=None):
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        connection_config: dict,
+        tap_type_to_target_type,
+        target_quote=None,
+        catalog=None,
+        transformation_config=None,
+        hash_encoding=HASH_SHA256_HEX,
+        regex_match=REGEX_SEARCH,
+    ):
+        """
+        Args:
+            connection_config: A map of tap source config
+            tap_type_to_target_type: Function that maps tap types to target ones
+            target_quote: Quote character of the column names in the target. (Default: None)
+            catalog: Columns and primary keys of the tables prefetched by prefetch_catalog. Metadata
+                     of the tables in the catalog is not queried again. (Default: None)
+            transformation_config: Transformations applied to the exported rows, the target does
+                                   not need to transform the loaded tables. (Default: None)
+            hash_encoding: Encoding of the hashes of the transformations, the HASH_ENCODING of
+                           the target. (Default: sha256-hex)
+            regex_match: Semantics of the regex_match conditions of the transformations, the
+                         REGEX_MATCH of the target. (Default: search)
+        """
         self.connection_config = connection_config
         self.connection_config['charset'] = connection_config.get(
             'charset', DEFAULT_CHARSET
@@ -38,8 +91,18 @@ class FastSyncTapMySql:
         self.connection_config['session_sqls'] = connection_config.get(
             'session_sqls', DEFAULT_SESSION_SQLS
         )
+        self.connection_config['export_parallelism'] = connection_config.get(
+            'export_parallelism', DEFAULT_EXPORT_PARALLELISM
+        )
+        self.connection_config['export_compression_threads'] = connection_config.get(
+            'export_compression_threads', split_gzip.DEFAULT_COMPRESS_THREADS
+        )
         self.tap_type_to_target_type = tap_type_to_target_type
         self.target_quote = target_quote
+        self.catalog = catalog
+        self.transformation_config = transformation_config
+        self.hash_encoding = hash_encoding
+        self.regex_match = regex_match
         self.conn = None
         self.conn_unbuffered = None
         self.is_replica = False
@@ -236,20 +299,92 @@ class FastSyncTapMySql:
             'version': 1,
         }
 
-    def get_primary_keys(self, table_name):
+    def get_cached_table(self, table_name: str) -> Optional[Dict]:
         """
-        Get the primary key of a table
+        Get the prefetched columns and primary key of a table
+
+        Returns:
+            Dictionary with columns and primary_key or None if the table is not in the catalog
+        """
+        if not self.catalog:
+            return None
+
+        return self.catalog['tables'].get(table_name)
+
+    def prefetch_catalog(self, table_names: Iterable[str], max_num=None, date_type='date') -> Dict:
+        """
+        Get the columns and primary keys of multiple tables in two bulk queries,
+        so the sync of the tables does not need to query them one by one
+
+        Args:
+            table_names: Fully qualified table names
+            max_num: Max absolute value of the exported numbers, as in get_table_columns
+            date_type: Data type the date columns are exported as, as in get_table_columns
+
+        Returns:
+            Catalog that can be passed to the constructor of other FastSyncTapMySql objects
+        """
+        table_dicts = {table_name: utils.tablename_to_dict(table_name) for table_name in table_names}
+        table_filter = '(table_schema, table_name) IN ({})'.format(
+            ','.join(
+                "('{}', '{}')".format(t['schema_name'], t['table_name']) for t in table_dicts.values()
+            )
+        )
+
+        columns = {}
+        primary_keys = {}
+        if table_dicts:
+            for column in self.query(self._get_table_columns_sql(table_filter, max_num, date_type)):
+                columns.setdefault((column['table_schema'], column['table_name']), []).append(column)
+
+            pk_sql = f"""
+                SELECT table_schema AS table_schema,
+                    table_name AS table_name,
+                    column_name AS column_name
+                FROM information_schema.statistics
+                WHERE index_name = 'PRIMARY'
+                    AND {table_filter}
+                ORDER BY table_schema, table_name, seq_in_index
+            """
+            for key in self.query(pk_sql):
+                primary_keys.setdefault((key['table_schema'], key['table_name']), []).append(key['column_name'])
+
+        self.catalog = {
+            'max_num': max_num,
+            'date_type': date_type,
+            'tables': {
+                table_name: {
+                    'columns': columns[(t['schema_name'], t['table_name'])],
+                    'primary_key': primary_keys.get((t['schema_name'], t['table_name']), []),
+                }
+                for table_name, t in table_dicts.items()
+                if (t['schema_name'], t['table_name']) in columns
+            },
+        }
+        LOGGER.info('Prefetched the columns of %s tables', len(self.catalog['tables']))
+        return self.catalog
+
+    def get_primary_key_columns(self, table_name: str) -> List[str]:
+        """
+        Get the original names of the primary key columns of a table
         """
+        cached_table = self.get_cached_table(table_name)
+        if cached_table:
+            return cached_table['primary_key']
+
         table_dict = utils.tablename_to_dict(table_name)
         sql = "SHOW KEYS FROM `{}`.`{}` WHERE Key_name = 'PRIMARY'".format(
             table_dict['schema_name'], table_dict['table_name']
         )
-        pk_specs = self.query(sql)
-        if len(pk_specs) > 0:
-            return [
-                safe_column_name(k.get('Column_name'), self.target_quote)
-                for k in pk_specs
-            ]
+        return [k.get('Column_name') for k in self.query(sql)]
+
+    def get_primary_keys(self, table_name):
+        """
+        Get the primary key of a table
+        """
+        pk_columns = self.get_primary_key_columns(table_name)
+        if len(pk_columns) > 0:
+            return [safe_column_name(k, self.target_quote) for k in pk_columns]
 
         return None
 
@@ -257,8 +392,25 @@ class FastSyncTapMySql:
         """
         Get MySQL table column details from information_schema
         """
+        cached_table = self.get_cached_table(table_name)
+        if (
+            cached_table
+            and self.catalog['max_num'] == max_num
+            and self.catalog['date_type'] == date_type
+        ):
+            return cached_table['columns']
+
         table_dict = utils.tablename_to_dict(table_name)
+        table_filter = "table_schema = '{}' AND table_name = '{}'".format(
+            table_dict.get('schema_name'), table_dict.get('table_name')
+        )
+        return self.query(self._get_table_columns_sql(table_filter, max_num, date_type))
 
+    @staticmethod
+    def _get_table_columns_sql(table_filter: str, max_num=None, date_type='date') -> str:
+        """
+        Generate the query of the column details of the tables matching a filter
+        """
         if max_num:
             decimals = len(max_num.split('.')[1]) if '.' in max_num else 0
             decimal_format = f"""
@@ -273,15 +425,16 @@ class FastSyncTapMySql:
             """
             integer_format = decimal_format
 
-        schema_name = table_dict.get('schema_name')
-        table_name = table_dict.get('table_name')
-
-        sql = f"""
-                SELECT column_name AS column_name,
+        return f"""
+                SELECT table_schema AS table_schema,
+                    table_name AS table_name,
+                    column_name AS column_name,
                     data_type AS data_type,
                     column_type AS column_type,
                     safe_sql_value AS safe_sql_value
-                FROM (SELECT column_name,
+                FROM (SELECT table_schema,
+                            table_name,
+                            column_name,
                             data_type,
                             column_type,
                             CASE
@@ -309,18 +462,18 @@ class FastSyncTapMySql:
                                 END AS safe_sql_value,
                             ordinal_position
                     FROM information_schema.columns
-                    WHERE table_schema = '{schema_name}'
-                        AND table_name = '{table_name}') x
+                    WHERE {table_filter}) x
                 ORDER BY
                         ordinal_position
             """  # noqa: E501
-        return self.query(sql)
 
     def map_column_types_to_target(self, table_name):
         """
         Map MySQL column types to equivalent types in target
         """
-        mysql_columns = self.get_table_columns(table_name)
+        # Only the names and data types are used that do not depend on the max_num and date_type
+        cached_table = self.get_cached_table(table_name)
+        mysql_columns = cached_table['columns'] if cached_table else self.get_table_columns(table_name)
         mapped_columns = [
             '{} {}'.format(
                 safe_column_name(pc.get('column_name'), self.target_quote),
@@ -336,29 +489,165 @@ class FastSyncTapMySql:
             'primary_key': self.get_primary_keys(table_name),
         }
 
-    # pylint: disable=too-many-locals
-    def copy_table(
-        self,
-        table_name,
-        path,
-        max_num=None,
-        date_type='date',
-        split_large_files=False,
-        split_file_chunk_size_mb=1000,
-        split_file_max_chunks=20,
-        compress=True,
-    ):
+    @staticmethod
+    def get_arrow_schema(table_columns: List[dict], date_type: str = 'date') -> pyarrow.Schema:
         """
-        Export data from table to a zipped csv
+        Get the arrow schema of the rows exported by copy_table
+
+        Args:
+            table_columns: Column details of the table returned by get_table_columns
+            date_type: Data type the date columns are exported as, date or datetime. (Default: date)
+
+        Returns:
+            Arrow schema with the table columns and the metadata columns
+        """
+        fields = []
+        for column in table_columns:
+            data_type = column.get('data_type')
+            if column.get('column_name') == 'raw_data_hash':
+                arrow_type = pyarrow.string()
+            elif column.get('column_type') == 'tinyint(1)':
+                arrow_type = pyarrow.bool_()
+            elif data_type in ('decimal', 'numeric'):
+                arrow_type = FastSyncTapMySql.get_arrow_decimal_type(column.get('column_type'))
+            elif data_type == 'date':
+                arrow_type = pyarrow.date32() if date_type == 'date' else pyarrow.timestamp('us')
+            elif data_type == 'bigint' and 'unsigned' in (column.get('column_type') or ''):
+                arrow_type = pyarrow.uint64()
+            else:
+                arrow_type = ARROW_TYPES.get(data_type, pyarrow.string())
+            fields.append(pyarrow.field(column.get('column_name'), arrow_type))
+
+        return pyarrow.schema(
+            fields
+            + [
+                pyarrow.field(utils.SDC_EXTRACTED_AT, pyarrow.timestamp('us')),
+                pyarrow.field(utils.SDC_BATCHED_AT, pyarrow.timestamp('us')),
+                pyarrow.field(utils.SDC_DELETED_AT, pyarrow.string()),
+            ]
+        )
+
+    @staticmethod
+    def get_arrow_decimal_type(column_type: str) -> pyarrow.DataType:
+        """
+        Get the arrow type of a decimal column that keeps the exact values
+
+        Args:
+            column_type: Column type of the decimal column in information_schema, like decimal(10,2)
+
+        Returns:
+            Arrow decimal with the precision and scale of the column, or string if the
+            column is wider than the arrow decimals
+        """
+        match = re.match(r'\w+\((\d+),(\d+)\)', column_type or '')
+        if not match or int(match.group(1)) > MAX_ARROW_DECIMAL_PRECISION:
+            return pyarrow.string()
+
+        return pyarrow.decimal128(int(match.group(1)), int(match.group(2)))
+
+    def get_table_size(self, table_name: str) -> Optional[int]:
+        """
+        Get the estimated size of the data of a table from information_schema
+
+        Args:
+            table_name: Fully qualified table name
+
+        Returns:
+            Size in bytes or None if the table is not found
+        """
+        table_dict = utils.tablename_to_dict(table_name)
+        sql = """
+            SELECT data_length
+            FROM information_schema.tables
+            WHERE table_schema = '{}' AND table_name = '{}'
+        """.format(table_dict.get('schema_name'), table_dict.get('table_name'))
+
+        result = self.query(sql)
+        return result[0]['data_length'] if result else None
+
+    def get_range_split_column(self, table_name: str, table_columns: List[dict]) -> Optional[str]:
+        """
+        Get the column that can be used to export the table in primary key ranges.
+        Only tables with a single column integer primary key can be split into ranges.
+
+        Args:
+            table_name: Fully qualified table name
+            table_columns: Column details of the table returned by get_table_columns
+
+        Returns:
+            Name of the primary key column or None if the table cannot be split
+        """
+        pk_columns = self.get_primary_key_columns(table_name)
+        if len(pk_columns) != 1:
+            return None
+
+        pk_column = pk_columns[0]
+        data_types = {c.get('column_name'): c.get('data_type') for c in table_columns}
+        if data_types.get(pk_column) not in RANGE_SPLIT_DATA_TYPES:
+            return None
+
+        return pk_column
+
+    def open_snapshot_connections(self, table_name: str, num_connections: int) -> List:
+        """
+        Open unbuffered connections that read the same consistent snapshot of a table.
+
+        The table is locked for writes until every connection started its own transaction
+        with consistent snapshot, so each connection sees exactly the same committed rows.
+
+        Args:
+            table_name: Fully qualified table name
+            num_connections: Number of connections to open
+
+        Returns:
+            List of connections, or empty list if the table could not be locked
+        """
+        table_dict = utils.tablename_to_dict(table_name)
+        conn_params, _ = self.get_connection_parameters()
+        snapshot_conns = []
+
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(
+                    'LOCK TABLES `{}`.`{}` READ'.format(
+                        table_dict['schema_name'], table_dict['table_name']
+                    )
+                )
+        except pymysql.err.MySQLError as exc:
+            LOGGER.warning('Cannot lock %s to open snapshot connections: %s', table_name, exc)
+            return snapshot_conns
+
+        try:
+            for _ in range(num_connections):
+                conn = pymysql.connect(**conn_params, cursorclass=pymysql.cursors.SSCursor)
+                snapshot_conns.append(conn)
+                with conn.cursor() as cur:
+                    for sql in self.connection_config['session_sqls'] or []:
+                        try:
+                            cur.execute(sql)
+                        except pymysql.err.InternalError:
+                            LOGGER.warning('Could not set session variable: %s', sql)
+                    cur.execute('SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+                    cur.execute('START TRANSACTION WITH CONSISTENT SNAPSHOT')
+        except Exception:
+            for conn in snapshot_conns:
+                conn.close()
+            raise
+        finally:
+            with self.conn.cursor() as cur:
+                cur.execute('UNLOCK TABLES')
+
+        return snapshot_conns
+
+    @staticmethod
+    def get_export_sql(table_name, table_columns) -> str:
+        """
+        Get the query that selects every row of a table with the metadata columns to export
+
         Args:
             table_name: Fully qualified table name to export
-            path: Path where to create the zip file(s) with the exported data
-            split_large_files: Split large files to multiple pieces and create multiple zip files
-                               with -partXYZ postfix in the filename. (Default: False)
-            split_file_chunk_size_mb: File chunk sizes if `split_large_files` enabled. (Default: 1000)
-            split_file_max_chunks: Max number of chunks if `split_large_files` enabled. (Default: 20)
+            table_columns: Column details of the table returned by get_table_columns
         """
-        table_columns = self.get_table_columns(table_name, max_num, date_type)
         column_safe_sql_values = [c.get('safe_sql_value') for c in table_columns]
 
         # If self.get_table_columns returns zero row then table not exist
@@ -366,7 +655,7 @@ class FastSyncTapMySql:
             raise Exception('{} table not found.'.format(table_name))
 
         table_dict = utils.tablename_to_dict(table_name)
-        sql = """SELECT {}
+        return """SELECT {}
         ,CONVERT_TZ( NOW(),@@session.time_zone,'+00:00') AS _SDC_EXTRACTED_AT
         ,CONVERT_TZ( NOW(),@@session.time_zone,'+00:00') AS _SDC_BATCHED_AT
         ,null AS _SDC_DELETED_AT
@@ -376,47 +665,359 @@ class FastSyncTapMySql:
             table_dict['schema_name'],
             table_dict['table_name'],
         )
-        export_batch_rows = self.connection_config['export_batch_rows']
+
+    def get_row_transformer(self, table_name, table_columns) -> Optional[RowTransformer]:
+        """
+        Get the transformer of the exported rows of a table
+
+        Args:
+            table_name: Fully qualified table name to export
+            table_columns: Column details of the table returned by get_table_columns
+
+        Returns:
+            None if the table has no transformations
+        """
+        return RowTransformer.from_config(
+            self.transformation_config,
+            utils.get_tap_stream_name(table_name),
+            [c.get('column_name') for c in table_columns]
+            + [utils.SDC_EXTRACTED_AT, utils.SDC_BATCHED_AT, utils.SDC_DELETED_AT],
+            self.hash_encoding,
+            self.regex_match,
+        )
+
+    # pylint: disable=too-many-arguments,too-many-locals
+    def export_query(
+        self,
+        cur,
+        sql,
+        path,
+        export_name,
+        chunk_size_mb=1000,
+        max_chunks=0,
+        compress=True,
+        on_chunk_closed=None,
+        codec=None,
+        arrow_schema=None,
+        row_transformer=None,
+    ) -> int:
+        """
+        Run an export query and write the result set into zipped csv file(s),
+        or into parquet file(s) if arrow_schema is set
+
+        Args:
+            cur: Unbuffered cursor to run the query
+            sql: Query to run
+            path: Path where to create the zip file(s) with the exported data
+            export_name: Name of the exported data in the log messages
+            chunk_size_mb: File chunk sizes. (Default: 1000)
+            max_chunks: Max number of chunks. 0 disables splitting. (Default: 0)
+            compress: Flag to indicate whether to compress export files
+            on_chunk_closed: Optional function called with the filename of every finished file part
+            codec: Compression codec of the export files. Overrides the compress flag if set
+            arrow_schema: Arrow schema of the result set to export it in parquet format. (Default: None)
+            row_transformer: Transformer of the rows before they are written. (Default: None)
+
+        Returns:
+            Number of exported rows
+        """
         exported_rows = 0
-        with self.conn_unbuffered.cursor() as cur:
-            cur.execute(sql)
-            gzip_splitter = split_gzip.open(
+
+        cur.execute(sql)
+        if arrow_schema is not None:
+            splitter = split_parquet.open(
+                path,
+                arrow_schema,
+                chunk_size_mb=chunk_size_mb,
+                max_chunks=max_chunks,
+                on_chunk_closed=on_chunk_closed,
+            )
+        else:
+            splitter = split_gzip.open(
                 path,
                 mode='wt',
-                chunk_size_mb=split_file_chunk_size_mb,
-                max_chunks=split_file_max_chunks if split_large_files else 0,
+                chunk_size_mb=chunk_size_mb,
+                max_chunks=max_chunks,
                 compress=compress,
+                on_chunk_closed=on_chunk_closed,
+                codec=codec,
+                compresslevel=self.connection_config.get('export_compression_level'),
+                compress_threads=self.connection_config['export_compression_threads'],
             )
 
-            with gzip_splitter as split_gzip_files:
-                writer = csv.writer(
-                    split_gzip_files,
+        with splitter as split_files:
+            if arrow_schema is not None:
+                write_rows = split_files.write_rows
+            else:
+                write_rows = csv.writer(
+                    split_files,
                     delimiter=',',
                     quotechar='"',
                     quoting=csv.QUOTE_MINIMAL,
+                ).writerows
+
+            for rows in self.fetch_batches(cur, export_name, row_transformer):
+                exported_rows += len(rows)
+                # Write rows to file in one go
+                write_rows(rows)
+
+        return exported_rows
+
+    def fetch_batches(self, cur, export_name, row_transformer=None) -> Iterable[List]:
+        """
+        Fetch the result set of an executed query in batches of export_batch_rows
+
+        Args:
+            cur: Unbuffered cursor that executed the query
+            export_name: Name of the exported data in the log messages
+            row_transformer: Transformer of the fetched rows. (Default: None)
+        """
+        export_batch_rows = self.connection_config['export_batch_rows']
+        fetched_rows = 0
+
+        while True:
+            rows = cur.fetchmany(export_batch_rows)
+
+            # No more rows to fetch, stop loop
+            if not rows:
+                break
+
+            # Log export status
+            fetched_rows += len(rows)
+            if len(rows) == export_batch_rows:
+                # Then we believe this to be just an interim batch and not the final one so report on progress
+
+                LOGGER.info(
+                    'Exporting batch from %s to %s rows from %s...',
+                    (fetched_rows - export_batch_rows),
+                    fetched_rows,
+                    export_name,
                 )
 
-                while True:
-                    rows = cur.fetchmany(export_batch_rows)
+            if row_transformer is not None:
+                rows = row_transformer.transform_rows(rows)
 
-                    # No more rows to fetch, stop loop
-                    if not rows:
-                        break
+            yield rows
 
-                    # Log export status
-                    exported_rows += len(rows)
-                    if len(rows) == export_batch_rows:
-                        # Then we believe this to be just an interim batch and not the final one so report on progress
+    # pylint: disable=too-many-locals
+    def copy_table_in_ranges(
+        self,
+        table_name,
+        sql,
+        path,
+        split_column,
+        num_ranges,
+        chunk_size_mb=1000,
+        max_chunks=0,
+        compress=True,
+        on_chunk_closed=None,
+        codec=None,
+        arrow_schema=None,
+        row_transformer=None,
+    ) -> Optional[int]:
+        """
+        Export data from table to zipped csv files in parallel by primary key ranges.
 
-                        LOGGER.info(
-                            'Exporting batch from %s to %s rows from %s...',
-                            (exported_rows - export_batch_rows),
-                            exported_rows,
-                            table_name,
+        Every range is exported into its own <path>.part<range-number-padded-five-digits>
+        file over `export_parallelism` connections sharing the same consistent snapshot.
+        If max_chunks is greater than zero then every range is split further into chunks of
+        chunk_size_mb, named <path>.part<range-number>.part<chunk-number>, with a budget of
+        max_chunks per range. Key ranges split the key values evenly and not the rows, so
+        a range of a skewed key can hold most of the table.
+
+        Args:
+            table_name: Fully qualified table name to export
+            sql: Query that selects every row of the table
+            path: Base path of the zip files with the exported data
+            split_column: Integer primary key column to split the table by
+            num_ranges: Number of primary key ranges to export
+            chunk_size_mb: File chunk sizes of every range if max_chunks is greater than zero
+            max_chunks: Max number of chunks of every range, 0 to export every range in one file
+            compress: Flag to indicate whether to compress export files
+            on_chunk_closed: Optional function called with the filename of every finished file part
+            codec: Compression codec of the export files. Overrides the compress flag if set
+            arrow_schema: Arrow schema of the rows to export the table in parquet format
+            row_transformer: Transformer of the rows before they are written
+
+        Returns:
+            Number of exported rows or None if snapshot connections cannot be opened
+        """
+        table_dict = utils.tablename_to_dict(table_name)
+        snapshot_conns = self.open_snapshot_connections(
+            table_name, self.connection_config['export_parallelism']
+        )
+        if not snapshot_conns:
+            return None
+
+        try:
+            # Find the key space in the snapshot
+            with snapshot_conns[0].cursor() as cur:
+                cur.execute(
+                    'SELECT MIN(`{0}`), MAX(`{0}`) FROM `{1}`.`{2}`'.format(
+                        split_column, table_dict['schema_name'], table_dict['table_name']
+                    )
+                )
+                min_value, max_value = cur.fetchone()
+
+            key_ranges = utils.get_key_ranges(min_value, max_value, num_ranges)
+            LOGGER.info(
+                'Exporting %s in %s ranges of `%s` over %s connections...',
+                table_name,
+                len(key_ranges),
+                split_column,
+                len(snapshot_conns),
+            )
+
+            range_queue = queue.Queue()
+            for part_no, key_range in enumerate(key_ranges, start=1):
+                range_queue.put((part_no, key_range))
+
+            def export_ranges(conn) -> int:
+                exported_rows = 0
+                while True:
+                    try:
+                        part_no, (lower_bound, upper_bound) = range_queue.get_nowait()
+                    except queue.Empty:
+                        return exported_rows
+
+                    condition = utils.get_key_range_condition(
+                        f'`{split_column}`', lower_bound, upper_bound
+                    )
+                    with conn.cursor() as cur:
+                        exported_rows += self.export_query(
+                            cur,
+                            f'{sql} WHERE {condition}',
+                            f'{path}.part{part_no:05d}',
+                            f'{table_name} (part {part_no})',
+                            chunk_size_mb=chunk_size_mb,
+                            max_chunks=max_chunks,
+                            compress=compress,
+                            on_chunk_closed=on_chunk_closed,
+                            codec=codec,
+                            arrow_schema=arrow_schema,
+                            row_transformer=row_transformer,
                         )
-                    # Write rows to file in one go
-                    writer.writerows(rows)
 
+            with ThreadPoolExecutor(max_workers=len(snapshot_conns)) as executor:
+                return sum(executor.map(export_ranges, snapshot_conns))
+        finally:
+            for conn in snapshot_conns:
+                conn.close()
+
+    # pylint: disable=too-many-locals
+    def copy_table(
+        self,
+        table_name,
+        path,
+        max_num=None,
+        date_type='date',
+        split_large_files=False,
+        split_file_chunk_size_mb=1000,
+        split_file_max_chunks=20,
+        compress=True,
+        on_chunk_closed=None,
+        codec=None,
+        export_format=split_parquet.EXPORT_FORMAT_CSV,
+    ):
+        """
+        Export data from table to a zipped csv
+        Args:
+            table_name: Fully qualified table name to export
+            path: Path where to create the zip file(s) with the exported data
+            split_large_files: Split large files to multiple pieces and create multiple zip files
+                               with -partXYZ postfix in the filename. (Default: False)
+            split_file_chunk_size_mb: File chunk sizes if `split_large_files` enabled. (Default: 1000)
+            split_file_max_chunks: Max number of chunks if `split_large_files` enabled. (Default: 20)
+            on_chunk_closed: Optional function called with the filename of every finished file part
+                             while the export is still running. (Default: None)
+            codec: Compression codec of the export files, gzip, zstd or none. Overrides the
+                   compress flag if set. (Default: None)
+            export_format: Format of the export files, csv or parquet. The codec and compress
+                           parameters apply only to csv. (Default: csv)
+
+        If `export_parallelism` is greater than 1 in the connection config and the table has
+        a single column integer primary key then the table is exported in primary key ranges
+        in parallel, every range into its own -partXYZ file, split further into chunks if
+        `split_large_files` enabled.
+        """
+        table_columns = self.get_table_columns(table_name, max_num, date_type)
+        sql = self.get_export_sql(table_name, table_columns)
+        row_transformer = self.get_row_transformer(table_name, table_columns)
+
+        arrow_schema = None
+        if export_format == split_parquet.EXPORT_FORMAT_PARQUET:
+            arrow_schema = self.get_arrow_schema(table_columns, date_type)
+
+        exported_rows = None
+        if self.connection_config['export_parallelism'] > 1:
+            split_column = self.get_range_split_column(table_name, table_columns)
+            if split_column:
+                exported_rows = self.copy_table_in_ranges(
+                    table_name,
+                    sql,
+                    path,
+                    split_column,
+                    num_ranges=max(
+                        self.connection_config['export_parallelism'],
+                        split_file_max_chunks if split_large_files else 0,
+                    ),
+                    chunk_size_mb=split_file_chunk_size_mb,
+                    max_chunks=split_file_max_chunks if split_large_files else 0,
+                    compress=compress,
+                    on_chunk_closed=on_chunk_closed,
+                    codec=codec,
+                    arrow_schema=arrow_schema,
+                    row_transformer=row_transformer,
+                )
+            else:
                 LOGGER.info(
-                    'Exported total of %s rows from %s...', exported_rows, table_name
+                    '%s has no single column integer primary key, exporting in one stream',
+                    table_name,
+                )
+
+        if exported_rows is None:
+            with self.conn_unbuffered.cursor() as cur:
+                exported_rows = self.export_query(
+                    cur,
+                    sql,
+                    path,
+                    table_name,
+                    chunk_size_mb=split_file_chunk_size_mb,
+                    max_chunks=split_file_max_chunks if split_large_files else 0,
+                    compress=compress,
+                    on_chunk_closed=on_chunk_closed,
+                    codec=codec,
+                    arrow_schema=arrow_schema,
+                    row_transformer=row_transformer,
                 )
+
+        LOGGER.info('Exported total of %s rows from %s...', exported_rows, table_name)
+
+    def stream_table(self, table_name, fileobj, max_num=None, date_type='date') -> int:
+        """
+        Export data from table as uncompressed csv into a file like object, without writing any file
+
+        Args:
+            table_name: Fully qualified table name to export
+            fileobj: File like object to write the csv data into, like a stream_buffer.StreamBuffer
+
+        Returns:
+            Number of exported rows
+        """
+        table_columns = self.get_table_columns(table_name, max_num, date_type)
+        sql = self.get_export_sql(table_name, table_columns)
+        row_transformer = self.get_row_transformer(table_name, table_columns)
+        exported_rows = 0
+
+        with self.conn_unbuffered.cursor() as cur:
+            cur.execute(sql)
+            for rows in self.fetch_batches(cur, table_name, row_transformer):
+                exported_rows += len(rows)
+
+                # Write every batch in one go to not pass the rows one by one to the reader
+                batch = io.StringIO()
+                csv.writer(batch, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL).writerows(rows)
+                fileobj.write(batch.getvalue())
+
+        LOGGER.info('Exported total of %s rows from %s...', exported_rows, table_name)
+        return exported_rows
@@ -1,12 +1,15 @@
 import datetime
 import decimal
 import logging
+import queue
 import re
 import sys
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
 
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
 
 
 from . import utils, split_gzip
@@ -14,16 +17,35 @@ from ...utils import safe_column_name
 
 LOGGER = logging.getLogger(__name__)
 
+DEFAULT_EXPORT_PARALLELISM = 1
 
+# Data types of primary key columns that can be used to export a table in key ranges
+RANGE_SPLIT_DATA_TYPES = ('smallint', 'integer', 'bigint')
+
+# Tables without integer primary key are split by ctid ranges, that is efficient
+# only with the TID range scans available from PostgreSQL 14
+MIN_CTID_RANGE_SCAN_VERSION = 140000
+
+
+# pylint: disable=too-many-public-methods,too-many-instance-attributes
 class FastSyncTapPostgres:
     """
     Common functions for fastsync from a Postgres database
     """
 
-    def __init__(self, connection_config, tap_type_to_target_type, target_quote=None):
+    def __init__(self, connection_config, tap_type_to_target_type, target_quote=None, catalog=None):
+        """
+        Args:
+            connection_config: A map of tap source config
+            tap_type_to_target_type: Function that maps tap types to target ones
+            target_quote: Quote character of the column names in the target. (Default: None)
+            catalog: Columns and primary keys of the tables prefetched by prefetch_catalog. Metadata
+                     of the tables in the catalog is not queried again. (Default: None)
+        """
         self.connection_config = connection_config
         self.tap_type_to_target_type = tap_type_to_target_type
         self.target_quote = target_quote
+        self.catalog = catalog
         self.conn = None
         self.curr = None
         self.primary_host_conn = None
@@ -361,10 +383,78 @@ class FastSyncTapPostgres:
             'version': 1,
         }
 
-    def get_primary_keys(self, table):
+    def get_cached_table(self, table_name: str) -> Optional[Dict]:
         """
-        Get the primary key of a table
+        Get the prefetched columns and primary key of a table
+
+        Returns:
+            Dictionary with columns and primary_key or None if the table is not in the catalog
+        """
+        if not self.catalog:
+            return None
+
+        return self.catalog['tables'].get(table_name)
+
+    def prefetch_catalog(self, table_names: Iterable[str], max_num=None, date_type='date') -> Dict:
         """
+        Get the columns and primary keys of multiple tables in two bulk queries,
+        so the sync of the tables does not need to query them one by one
+
+        Args:
+            table_names: Fully qualified table names
+            max_num: Max absolute value of the exported numbers, as in get_table_columns
+            date_type: Data type the date columns are exported as, as in get_table_columns
+
+        Returns:
+            Catalog that can be passed to the constructor of other FastSyncTapPostgres objects
+        """
+        table_dicts = {table_name: utils.tablename_to_dict(table_name) for table_name in table_names}
+        table_values = ','.join(
+            "('{}', '{}')".format(t['schema_name'], t['table_name']) for t in table_dicts.values()
+        )
+
+        columns = {}
+        primary_keys = {}
+        if table_dicts:
+            table_filter = f'(table_schema, table_name) IN ({table_values})'
+            for column in self.query(self._get_table_columns_sql(table_filter, max_num, date_type)):
+                columns.setdefault((column[4], column[5]), []).append(column)
+
+            pk_sql = f"""SELECT pg_namespace.nspname, pg_class.relname, pg_attribute.attname
+                    FROM pg_index, pg_class, pg_attribute, pg_namespace
+                    WHERE
+                        (pg_namespace.nspname, pg_class.relname) IN ({table_values}) AND
+                        indrelid = pg_class.oid AND
+                        pg_class.relnamespace = pg_namespace.oid AND
+                        pg_attribute.attrelid = pg_class.oid AND
+                        pg_attribute.attnum = any(pg_index.indkey)
+                    AND indisprimary"""
+            for key in self.query(pk_sql):
+                primary_keys.setdefault((key[0], key[1]), []).append(key[2])
+
+        self.catalog = {
+            'max_num': max_num,
+            'date_type': date_type,
+            'tables': {
+                table_name: {
+                    'columns': columns[(t['schema_name'], t['table_name'])],
+                    'primary_key': primary_keys.get((t['schema_name'], t['table_name']), []),
+                }
+                for table_name, t in table_dicts.items()
+                if (t['schema_name'], t['table_name']) in columns
+            },
+        }
+        LOGGER.info('Prefetched the columns of %s tables', len(self.catalog['tables']))
+        return self.catalog
+
+    def get_primary_key_columns(self, table) -> List[str]:
+        """
+        Get the original names of the primary key columns of a table
+        """
+        cached_table = self.get_cached_table(table)
+        if cached_table:
+            return cached_table['primary_key']
+
         schema_name, table_name = table.split('.')
 
         sql = """SELECT pg_attribute.attname
@@ -378,9 +468,27 @@ class FastSyncTapPostgres:
                     AND indisprimary""".format(
             schema_name, table_name
         )
-        pk_specs = self.query(sql)
-        if len(pk_specs) > 0:
-            return [safe_column_name(k[0], self.target_quote) for k in pk_specs]
+        return [k[0] for k in self.query(sql)]
+
+    def get_table_size(self, table) -> Optional[int]:
+        """
+        Get the size of a table on disk, without its indexes
+
+        Returns:
+            Size in bytes or None if the size is unknown
+        """
+        schema_name, table_name = table.split('.')
+
+        result = self.query(f"SELECT pg_table_size('{schema_name}.\"{table_name}\"'::regclass)")
+        return result[0][0] if result else None
+
+    def get_primary_keys(self, table):
+        """
+        Get the primary key of a table
+        """
+        pk_columns = self.get_primary_key_columns(table)
+        if len(pk_columns) > 0:
+            return [safe_column_name(k, self.target_quote) for k in pk_columns]
 
         return None
 
@@ -388,8 +496,25 @@ class FastSyncTapPostgres:
         """
         Get PG table column details from information_schema
         """
+        cached_table = self.get_cached_table(table_name)
+        if (
+            cached_table
+            and self.catalog['max_num'] == max_num
+            and self.catalog['date_type'] == date_type
+        ):
+            return cached_table['columns']
+
         table_dict = utils.tablename_to_dict(table_name)
+        table_filter = "table_schema = '{}' AND table_name = '{}'".format(
+            table_dict.get('schema_name'), table_dict.get('table_name')
+        )
+        return self.query(self._get_table_columns_sql(table_filter, max_num, date_type))
 
+    @staticmethod
+    def _get_table_columns_sql(table_filter: str, max_num=None, date_type='date') -> str:
+        """
+        Generate the query of the column details of the tables matching a filter
+        """
         if max_num:
             decimals = len(max_num.split('.')[1]) if '.' in max_num else 0
             decimal_format = f"""
@@ -404,16 +529,17 @@ class FastSyncTapPostgres:
             """
             integer_format = decimal_format
 
-        schema_name = table_dict.get('schema_name')
-        table_name = table_dict.get('table_name')
-
-        sql = f"""
+        return f"""
                 SELECT
                     column_name
                     ,data_type
                     ,safe_sql_value
                     ,character_maximum_length
+                    ,table_schema
+                    ,table_name
                 FROM (SELECT
+                table_schema,
+                table_name,
                 column_name,
                 data_type,
                 CASE
@@ -434,18 +560,18 @@ class FastSyncTapPostgres:
                 END AS safe_sql_value,
                 character_maximum_length
                 FROM information_schema.columns
-                WHERE table_schema = '{schema_name}'
-                    AND table_name = '{table_name}'
+                WHERE {table_filter}
                 ORDER BY ordinal_position
                 ) AS x
             """  # noqa: E501
-        return self.query(sql)
 
     def map_column_types_to_target(self, table_name):
         """
         Map PG column types to equivalent types in target
         """
-        postgres_columns = self.get_table_columns(table_name)
+        # Only the names and data types are used that do not depend on the max_num and date_type
+        cached_table = self.get_cached_table(table_name)
+        postgres_columns = cached_table['columns'] if cached_table else self.get_table_columns(table_name)
         mapped_columns = []
         for pc in postgres_columns:
             column_type = self.tap_type_to_target_type(pc[1])
@@ -463,6 +589,283 @@ class FastSyncTapPostgres:
             'primary_key': self.get_primary_keys(table_name),
         }
 
+    def open_snapshot_connection(self):
+        """
+        Open a connection with a read only repeatable read transaction and export its snapshot
+        so other connections can read exactly the same data
+
+        Returns:
+            Tuple of the connection and the exported snapshot id
+        """
+        conn = self.get_connection(self.connection_config, prioritize_primary=False)
+        try:
+            conn.autocommit = False
+            conn.set_session(
+                isolation_level=psycopg2.extensions.ISOLATION_LEVEL_REPEATABLE_READ,
+                readonly=True,
+            )
+            with conn.cursor() as cur:
+                cur.execute('SELECT pg_export_snapshot()')
+                snapshot_id = cur.fetchone()[0]
+        except Exception:
+            conn.close()
+            raise
+
+        return conn, snapshot_id
+
+    def open_worker_connection(self, snapshot_id):
+        """
+        Open a connection with a read only repeatable read transaction that imports an exported snapshot
+
+        Args:
+            snapshot_id: Snapshot id returned by pg_export_snapshot()
+
+        Returns:
+            pg Connection instance
+        """
+        conn = self.get_connection(self.connection_config, prioritize_primary=False)
+        try:
+            conn.autocommit = False
+            conn.set_session(
+                isolation_level=psycopg2.extensions.ISOLATION_LEVEL_REPEATABLE_READ,
+                readonly=True,
+            )
+            with conn.cursor() as cur:
+                cur.execute('SET TRANSACTION SNAPSHOT %s', (snapshot_id,))
+        except Exception:
+            conn.close()
+            raise
+
+        return conn
+
+    @staticmethod
+    def get_ctid_range_condition(lower_block: Optional[int], upper_block: Optional[int]) -> str:
+        """
+        Generate SQL WHERE condition that selects the rows stored in a range of table blocks
+
+        Args:
+            lower_block: Inclusive lower block number of the range. None if unbounded
+            upper_block: Exclusive upper block number of the range. None if unbounded
+
+        Returns:
+            SQL condition as string
+        """
+        conditions = []
+        if lower_block is not None:
+            conditions.append(f"ctid >= '({int(lower_block)},0)'::tid")
+        if upper_block is not None:
+            conditions.append(f"ctid < '({int(upper_block)},0)'::tid")
+
+        return ' AND '.join(conditions) or 'TRUE'
+
+    def get_range_conditions(self, cur, table_name, table_columns, num_ranges) -> Optional[List[str]]:
+        """
+        Split a table into disjoint ranges that can be exported independently.
+
+        Tables with a single column integer primary key are split by primary key ranges,
+        other tables are split by ctid block ranges if the server supports TID range scans.
+
+        Args:
+            cur: Cursor of the connection holding the shared snapshot
+            table_name: Fully qualified table name
+            table_columns: Column details of the table returned by get_table_columns
+            num_ranges: Number of ranges to generate
+
+        Returns:
+            List of SQL WHERE conditions, one per range, or None if the table cannot be split
+        """
+        schema_name, table = table_name.split('.')
+
+        pk_columns = self.get_primary_key_columns(table_name)
+        data_types = {c.get('column_name'): c.get('data_type') for c in table_columns}
+        if len(pk_columns) == 1 and data_types.get(pk_columns[0]) in RANGE_SPLIT_DATA_TYPES:
+            cur.execute(
+                f'SELECT MIN("{pk_columns[0]}"), MAX("{pk_columns[0]}") FROM {schema_name}."{table}"'
+            )
+            min_value, max_value = cur.fetchone()
+            return [
+                utils.get_key_range_condition(f'"{pk_columns[0]}"', lower_bound, upper_bound)
+                for lower_bound, upper_bound in utils.get_key_ranges(min_value, max_value, num_ranges)
+            ]
+
+        cur.execute("SELECT current_setting('server_version_num')::int")
+        if cur.fetchone()[0] < MIN_CTID_RANGE_SCAN_VERSION:
+            return None
+
+        cur.execute(
+            f"SELECT pg_relation_size('{schema_name}.\"{table}\"'::regclass) "
+            f"/ current_setting('block_size')::int"
+        )
+        num_blocks = cur.fetchone()[0]
+        if num_blocks == 0:
+            return ['TRUE']
+
+        return [
+            self.get_ctid_range_condition(lower_block, upper_block)
+            for lower_block, upper_block in utils.get_key_ranges(0, num_blocks - 1, num_ranges)
+        ]
+
+    @staticmethod
+    def get_export_sql(table_name, table_columns) -> str:
+        """
+        Get the query that selects every row of a table with the metadata columns to export
+
+        Args:
+            table_name: Fully qualified table name to export
+            table_columns: Column details of the table returned by get_table_columns
+        """
+        column_safe_sql_values = [c.get('safe_sql_value') for c in table_columns]
+
+        # If self.get_table_columns returns zero row then table not exist
+        if len(column_safe_sql_values) == 0:
+            raise Exception('{} table not found.'.format(table_name))
+
+        schema_name, table = table_name.split('.')
+
+        return """SELECT {}
+        ,now() AT TIME ZONE 'UTC'
+        ,now() AT TIME ZONE 'UTC'
+        ,null
+        FROM {}."{}"
+        """.format(
+            ','.join(column_safe_sql_values), schema_name, table
+        )
+
+    # pylint: disable=too-many-arguments
+    def export_query(
+        self, cur, sql, path, chunk_size_mb=1000, max_chunks=0, compress=True, on_chunk_closed=None, codec=None
+    ):
+        """
+        Export the result of a query into zipped csv file(s) by COPY
+
+        Args:
+            cur: Cursor to run the COPY command
+            sql: Query to export
+            path: Path where to create the zip file(s) with the exported data
+            chunk_size_mb: File chunk sizes. (Default: 1000)
+            max_chunks: Max number of chunks. 0 disables splitting. (Default: 0)
+            compress: Flag to indicate whether to compress export files
+            on_chunk_closed: Optional function called with the filename of every finished file part
+            codec: Compression codec of the export files. Overrides the compress flag if set
+        """
+        copy_sql = f"COPY ({sql}) TO STDOUT with CSV DELIMITER ','"
+        LOGGER.info('Exporting data: %s', copy_sql)
+
+        gzip_splitter = split_gzip.open(
+            path,
+            mode='wb',
+            chunk_size_mb=chunk_size_mb,
+            max_chunks=max_chunks,
+            compress=compress,
+            on_chunk_closed=on_chunk_closed,
+            codec=codec,
+            compresslevel=self.connection_config.get('export_compression_level'),
+            compress_threads=self.connection_config.get(
+                'export_compression_threads', split_gzip.DEFAULT_COMPRESS_THREADS
+            ),
+        )
+
+        with gzip_splitter as split_gzip_files:
+            cur.copy_expert(copy_sql, split_gzip_files, size=131072)
+
+    # pylint: disable=too-many-arguments,too-many-locals
+    def copy_table_in_ranges(
+        self,
+        table_name,
+        sql,
+        path,
+        table_columns,
+        num_ranges,
+        chunk_size_mb=1000,
+        max_chunks=0,
+        compress=True,
+        on_chunk_closed=None,
+        codec=None,
+    ) -> bool:
+        """
+        Export data from table to zipped csv files in parallel by disjoint ranges.
+
+        Every range is exported into its own <path>.part<range-number-padded-five-digits>
+        file over `export_parallelism` connections importing the same snapshot.
+        If max_chunks is greater than zero then every range is split further into chunks of
+        chunk_size_mb, named <path>.part<range-number>.part<chunk-number>, with a budget of
+        max_chunks per range. Ranges do not hold the same number of rows, so a range of
+        a skewed key can hold most of the table.
+
+        Args:
+            table_name: Fully qualified table name to export
+            sql: Query that selects every row of the table
+            path: Base path of the zip files with the exported data
+            table_columns: Column details of the table returned by get_table_columns
+            num_ranges: Number of ranges to export
+            chunk_size_mb: File chunk sizes of every range if max_chunks is greater than zero
+            max_chunks: Max number of chunks of every range, 0 to export every range in one file
+            compress: Flag to indicate whether to compress export files
+            on_chunk_closed: Optional function called with the filename of every finished file part
+            codec: Compression codec of the export files. Overrides the compress flag if set
+
+        Returns:
+            True if the table exported, False if the table cannot be exported in ranges
+        """
+        try:
+            snapshot_conn, snapshot_id = self.open_snapshot_connection()
+        except psycopg2.Error as exc:
+            LOGGER.warning('Cannot export snapshot to export %s in ranges: %s', table_name, exc)
+            return False
+
+        worker_conns = []
+        try:
+            with snapshot_conn.cursor() as cur:
+                range_conditions = self.get_range_conditions(cur, table_name, table_columns, num_ranges)
+
+            if not range_conditions:
+                LOGGER.info('%s cannot be split into ranges, exporting in one stream', table_name)
+                return False
+
+            # The snapshot connection holds the exported snapshot until every worker imported it
+            for _ in range(self.connection_config.get('export_parallelism', DEFAULT_EXPORT_PARALLELISM)):
+                worker_conns.append(self.open_worker_connection(snapshot_id))
+
+            LOGGER.info(
+                'Exporting %s in %s ranges over %s connections...',
+                table_name,
+                len(range_conditions),
+                len(worker_conns),
+            )
+
+            range_queue = queue.Queue()
+            for part_no, condition in enumerate(range_conditions, start=1):
+                range_queue.put((part_no, condition))
+
+            def export_ranges(conn):
+                while True:
+                    try:
+                        part_no, condition = range_queue.get_nowait()
+                    except queue.Empty:
+                        return
+
+                    with conn.cursor() as cur:
+                        self.export_query(
+                            cur,
+                            f'{sql} WHERE {condition}',
+                            f'{path}.part{part_no:05d}',
+                            chunk_size_mb=chunk_size_mb,
+                            max_chunks=max_chunks,
+                            compress=compress,
+                            on_chunk_closed=on_chunk_closed,
+                            codec=codec,
+                        )
+
+            with ThreadPoolExecutor(max_workers=len(worker_conns)) as executor:
+                # Consume the results to raise the exceptions of the workers
+                list(executor.map(export_ranges, worker_conns))
+        finally:
+            for conn in worker_conns:
+                conn.close()
+            snapshot_conn.close()
+
+        return True
+
     # pylint: disable=too-many-arguments
     def copy_table(
         self,
@@ -474,6 +877,8 @@ class FastSyncTapPostgres:
         split_file_chunk_size_mb=1000,
         split_file_max_chunks=20,
         compress=True,
+        on_chunk_closed=None,
+        codec=None,
     ):
         """
         Export data from table to a zipped csv
@@ -484,33 +889,55 @@ class FastSyncTapPostgres:
                                with -partXYZ postfix in the filename. (Default: False)
             split_file_chunk_size_mb: File chunk sizes if `split_large_files` enabled. (Default: 1000)
             split_file_max_chunks: Max number of chunks if `split_large_files` enabled. (Default: 20)
+            on_chunk_closed: Optional function called with the filename of every finished file part
+                             while the export is still running. (Default: None)
+            codec: Compression codec of the export files, gzip, zstd or none. Overrides the
+                   compress flag if set. (Default: None)
+
+        If `export_parallelism` is greater than 1 in the connection config then the table is exported
+        in disjoint primary key or ctid ranges in parallel by connections sharing the same snapshot,
+        every range into its own -partXYZ file, split further into chunks if `split_large_files` enabled.
         """
         table_columns = self.get_table_columns(table_name, max_num, date_type)
-        column_safe_sql_values = [c.get('safe_sql_value') for c in table_columns]
-
-        # If self.get_table_columns returns zero row then table not exist
-        if len(column_safe_sql_values) == 0:
-            raise Exception('{} table not found.'.format(table_name))
-
-        schema_name, table_name = table_name.split('.')
+        sql = self.get_export_sql(table_name, table_columns)
 
-        sql = """COPY (SELECT {}
-        ,now() AT TIME ZONE 'UTC'
-        ,now() AT TIME ZONE 'UTC'
-        ,null
-        FROM {}."{}") TO STDOUT with CSV DELIMITER ','
-        """.format(
-            ','.join(column_safe_sql_values), schema_name, table_name
-        )
-        LOGGER.info('Exporting data: %s', sql)
-
-        gzip_splitter = split_gzip.open(
+        export_parallelism = self.connection_config.get('export_parallelism', DEFAULT_EXPORT_PARALLELISM)
+        if export_parallelism > 1 and self.copy_table_in_ranges(
+            table_name,
+            sql,
             path,
-            mode='wb',
+            table_columns,
+            num_ranges=max(export_parallelism, split_file_max_chunks if split_large_files else 0),
             chunk_size_mb=split_file_chunk_size_mb,
             max_chunks=split_file_max_chunks if split_large_files else 0,
             compress=compress,
+            on_chunk_closed=on_chunk_closed,
+            codec=codec,
+        ):
+            return
+
+        self.export_query(
+            self.curr,
+            sql,
+            path,
+            chunk_size_mb=split_file_chunk_size_mb,
+            max_chunks=split_file_max_chunks if split_large_files else 0,
+            compress=compress,
+            on_chunk_closed=on_chunk_closed,
+            codec=codec,
         )
 
-        with gzip_splitter as split_gzip_files:
-            self.curr.copy_expert(sql, split_gzip_files, size=131072)
+    def stream_table(self, table_name, fileobj, max_num=None, date_type='date'):
+        """
+        Export data from table as uncompressed csv into a file like object by COPY,
+        without writing any file
+
+        Args:
+            table_name: Fully qualified table name to export
+            fileobj: File like object to write the csv data into, like a stream_buffer.StreamBuffer
+        """
+        sql = self.get_export_sql(table_name, self.get_table_columns(table_name, max_num, date_type))
+        copy_sql = f"COPY ({sql}) TO STDOUT with CSV DELIMITER ','"
+        LOGGER.info('Streaming data: %s', copy_sql)
+
+        self.curr.copy_expert(copy_sql, fileobj, size=131072)
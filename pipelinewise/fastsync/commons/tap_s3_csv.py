@@ -1,14 +1,21 @@
+import collections
 import csv
 import gzip
+import io
+import itertools
+import json
 import logging
 import os
 import re
 import sys
 import boto3
+import botocore.config
+from botocore.exceptions import ClientError
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from time import struct_time
-from typing import Callable, Dict, List, Optional, Set
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from messytables import (
     CSVTableSet,
     headers_guess,
@@ -20,11 +27,33 @@ from messytables import (
 from singer.utils import strptime_with_tz
 from singer_encodings import csv as singer_encodings_csv
 
-from .utils import retry_pattern
+from . import split_gzip
+from .csv_type_sampler import CsvTypeSampler
+from .row_transformer import HASH_SHA256_HEX, REGEX_SEARCH, RowTransformer
+from .s3_key_manifest import S3KeyManifest
+from .utils import get_client_error_code, retry_pattern
 from ...utils import safe_column_name
 
 LOGGER = logging.getLogger(__name__)
 
+# Number of files or parts of files downloaded at the same time
+DEFAULT_EXPORT_PARALLELISM = 4
+# Files bigger than this are downloaded in parts of this size
+DEFAULT_EXPORT_RANGE_SIZE_MB = 16
+
+# Error codes of the requests of keys deleted since they were listed, GET gives NoSuchKey and HEAD gives 404
+NO_SUCH_KEY_ERROR_CODES = ('NoSuchKey', '404')
+# Error codes of the requests with the ETag of a key overwritten since it was listed
+PRECONDITION_FAILED_ERROR_CODES = ('PreconditionFailed', '412')
+
+
+class _UnexpectedColumnsError(Exception):
+    """Raised on writing a record with columns that are not in the header of the csv"""
+
+    def __init__(self, columns: Set):
+        super().__init__(columns)
+        self.columns = columns
+
 
 # pylint: disable=missing-function-docstring,no-self-use
 class FastSyncTapS3Csv:
@@ -32,17 +61,28 @@ class FastSyncTapS3Csv:
     Common functions for fastsync from a S3 CSV
     """
 
-    # pylint: disable=bare-except
+    # pylint: disable=bare-except,too-many-arguments
     def __init__(
         self,
         connection_config: Dict,
         tap_type_to_target_type: Callable,
         target_quote=None,
+        state_file=None,
+        transformation_config=None,
+        hash_encoding=HASH_SHA256_HEX,
+        regex_match=REGEX_SEARCH,
     ):
         """
         Constructor
         :param connection_config: tap connection config
         :param tap_type_to_target_type: callable that maps a tap type to target type
+        :param target_quote: character to quote the column names with
+        :param state_file: path of the state file, the key manifests are stored next to it
+        :param transformation_config: transformations applied to the copied records, the target does
+                                      not need to transform the loaded tables
+        :param hash_encoding: encoding of the hashes of the transformations, the HASH_ENCODING of the target
+        :param regex_match: semantics of the regex_match conditions of the transformations, the REGEX_MATCH
+                            of the target
         """
         try:
             # Check if bucket can be accessed without credentials/assuming role
@@ -62,7 +102,12 @@ class FastSyncTapS3Csv:
         self.connection_config = connection_config
         self.tap_type_to_target_type = tap_type_to_target_type
         self.target_quote = target_quote
+        self.state_file = state_file
+        self.transformation_config = transformation_config
+        self.hash_encoding = hash_encoding
+        self.regex_match = regex_match
         self.tables_last_modified = {}
+        self.tables_column_types = {}
 
     def _find_table_spec_by_name(self, table_name: str) -> Dict:
         # look in tables array for the full specs dict of given table
@@ -73,11 +118,92 @@ class FastSyncTapS3Csv:
             )
         )
 
-    def copy_table(self, table_name: str, file_path: str) -> None:
+    def _get_table_state_path(self, prefix: str, table_name: str, extension: str) -> str:
+        """
+        Path of a file of the table stored next to the state file
+        :param prefix: prefix of the file name
+        :param table_name: Name of the table
+        :param extension: extension of the file name
+        :return: path of the file
+        """
+        return os.path.join(
+            os.path.dirname(os.path.abspath(self.state_file)),
+            '{}_{}.{}'.format(prefix, re.sub(r'[^\w.-]', '_', table_name), extension),
+        )
+
+    def _get_key_manifest(self, table_name: str, table_spec: Dict) -> Optional[S3KeyManifest]:
+        """
+        Loads the key manifest of the table if it's enabled by `export_key_manifest`
+        :param table_name: Name of the table
+        :param table_spec: dict of table with its specs
+        :return: S3KeyManifest or None if disabled
+        """
+        if not self.connection_config.get('export_key_manifest') or not self.state_file:
+            return None
+
+        manifest = S3KeyManifest(
+            self._get_table_state_path('key_manifest', table_name, 'jsonl.gz'),
+            self.connection_config['bucket'],
+            table_spec.get('search_prefix'),
+            table_spec['search_pattern'],
+        )
+        manifest.load()
+        return manifest
+
+    def _load_column_types(self, table_name: str, table_spec: Dict) -> Optional[Dict[str, str]]:
+        """
+        Loads the column types inferred by a previous sync if `export_type_cache` is enabled
+        :param table_name: Name of the table
+        :param table_spec: dict of table with its specs, the cached types are ignored if it changed
+        :return: dictionary of column name and type, None if not available
+        """
+        if not self.connection_config.get('export_type_cache') or not self.state_file:
+            return None
+
+        path = self._get_table_state_path('column_types', table_name, 'json')
+        if not os.path.exists(path):
+            return None
+
+        with open(path, encoding='utf-8') as types_file:
+            cache = json.load(types_file)
+
+        return cache['columns'] if cache.get('table_spec') == table_spec else None
+
+    def _save_column_types(self, table_name: str, table_spec: Dict, column_types: Dict[str, str]) -> None:
+        """
+        Saves the inferred column types if `export_type_cache` is enabled
+        :param table_name: Name of the table
+        :param table_spec: dict of table with its specs the types were inferred with
+        :param column_types: dictionary of column name and type
+        """
+        if not self.connection_config.get('export_type_cache') or not self.state_file:
+            return
+
+        path = self._get_table_state_path('column_types', table_name, 'json')
+        with open(path, 'w', encoding='utf-8') as types_file:
+            json.dump({'table_spec': table_spec, 'columns': column_types}, types_file)
+
+    # pylint: disable=too-many-arguments,too-many-locals
+    def copy_table(
+        self,
+        table_name: str,
+        file_path: str,
+        split_large_files=False,
+        split_file_chunk_size_mb=1000,
+        split_file_max_chunks=20,
+    ) -> None:
         """
         Copies data from all csv files that match the search_pattern and into the csv file in file_path
+
+        The rows are streamed file by file into the compressed csv, only one row is kept in memory.
+        The columns are the union of the headers of the matching files that are read in a first pass.
+        The types of the columns are inferred from a random sample of the rows while they are copied,
+        unless the types of all the columns are cached by a previous sync.
         :param table_name: Name of the table
         :param file_path: Path of the gzip compressed csv file into which data is copied
+        :param split_large_files: Split the csv into multiple files with .partXYZ postfix. (Default: False)
+        :param split_file_chunk_size_mb: File chunk sizes if `split_large_files` enabled. (Default: 1000)
+        :param split_file_max_chunks: Max number of chunks if `split_large_files` enabled. (Default: 20)
         :return: None
         """
         if not re.match(r'^.+\.csv\.gz$', file_path):
@@ -89,68 +215,315 @@ class FastSyncTapS3Csv:
         # extract the start_date from the specs
         modified_since = strptime_with_tz(self.connection_config['start_date'])
 
+        # the files are listed and downloaded concurrently by a pool of threads sharing one client
+        parallelism = self.connection_config.get('export_parallelism') or DEFAULT_EXPORT_PARALLELISM
+        s3_client = S3Helper.get_s3_client(self.connection_config, max_pool_connections=parallelism)
+
+        # keys listed by the previous syncs, only the new keys are listed if available
+        manifest = self._get_key_manifest(table_name, table_spec)
+
         # get all the files in the bucket that match the criteria and were modified after start date
-        s3_files = S3Helper.get_input_files_for_table(
-            self.connection_config, table_spec, modified_since
+        s3_files = list(
+            S3Helper.get_input_files_for_table(
+                self.connection_config,
+                table_spec,
+                modified_since,
+                manifest=manifest,
+                s3_client=s3_client,
+                parallelism=parallelism,
+            )
         )
 
-        # variable to hold all the records from all matching files
-        records = []
-        # variable to hold the set of column names from all matching files
-        headers = set()
+        # set of column names from all matching files, the files deleted or overwritten since they were listed
+        # are skipped or refreshed
+        s3_files, headers = self._get_files_headers(s3_files, table_spec, s3_client, parallelism, manifest)
+
+        cached_column_types = self._load_column_types(table_name, table_spec)
+
+        while True:
+            # infer the types unless they are known for every column
+            if cached_column_types is not None and headers.issubset(cached_column_types):
+                sampler = None
+            else:
+                sampler = CsvTypeSampler()
+
+            try:
+                self._write_files_records(
+                    s3_files,
+                    table_spec,
+                    file_path,
+                    sorted(headers),
+                    s3_client,
+                    parallelism,
+                    chunk_size_mb=split_file_chunk_size_mb,
+                    max_chunks=split_file_max_chunks if split_large_files else 0,
+                    sampler=sampler,
+                )
+                break
+            except _UnexpectedColumnsError as exc:
+                # rows with more values than the header have the extra values in a column
+                # that is not in the header so the files have to be written again
+                LOGGER.warning('Found columns %s that are not in the headers, copying again...', exc.columns)
+                headers.update(exc.columns)
+
+        if sampler is None:
+            LOGGER.info('Using the cached column types of table %s', table_name)
+            self.tables_column_types[table_name] = {column: cached_column_types[column] for column in sorted(headers)}
+        else:
+            self.tables_column_types[table_name] = sampler.guess_types(sorted(headers))
+            self._save_column_types(table_name, table_spec, self.tables_column_types[table_name])
 
         # given that there might be several files matching the search pattern
         # we want to keep the most recent date one of them was modified to use it as state bookmark
-        max_last_modified = None
+        self.tables_last_modified[table_name] = max(
+            (s3_file['last_modified'] for s3_file in s3_files), default=None
+        )
 
-        for s3_file in s3_files:
+        if manifest is not None:
+            if self.tables_last_modified[table_name]:
+                manifest.last_modified = self.tables_last_modified[table_name].isoformat()
+            manifest.save()
 
-            # this function will add records to the `records` list passed to it and add to the `headers` set as well
-            self._get_file_records(s3_file['key'], table_spec, records, headers)
+    # pylint: disable=too-many-arguments
+    def _get_files_headers(
+        self, s3_files: List[Dict], table_spec: Dict, s3_client, parallelism: int = 1, manifest: S3KeyManifest = None
+    ) -> Tuple[List[Dict], Set]:
+        """
+        Reads only the header and the first row of every file to find the columns of the records
 
-            # check if the current file has the most recent modification date
-            if (
-                max_last_modified is None
-                or max_last_modified < s3_file['last_modified']
-            ):
-                max_last_modified = s3_file['last_modified']
+        The files are read with the ETag they were listed with. Files deleted since are skipped and
+        files overwritten since are read again with their new ETag, both are updated in the manifest.
+        :param s3_files: files to read
+        :param table_spec: dict of table with its specs
+        :param s3_client: boto3 S3 client shared by the threads
+        :param parallelism: number of files read at the same time
+        :param manifest: optional manifest the files were listed from
+        :return: tuple of the files to download and the set of safe column names of the files that have rows,
+                 including the custom columns
+        """
+        headers = set()
 
-        # add the found last modified date to the dictionary
-        self.tables_last_modified[table_name] = max_last_modified
+        # rows can have large fields, see _get_file_records
+        csv.field_size_limit(sys.maxsize)
+
+        def get_file_headers(s3_file: Dict) -> Tuple[Optional[Dict], List[str]]:
+            s3_file, s3_file_handle = self._open_listed_file(s3_file, s3_client)
+            if s3_file_handle is None:
+                return None, []
 
-        # write to the given compressed csv file
-        with gzip.open(file_path, 'wt') as gzfile:
+            try:
+                # pylint:disable=protected-access
+                iterator = singer_encodings_csv.get_row_iterator(
+                    s3_file_handle._raw_stream, table_spec
+                )
+
+                # files without rows do not add columns
+                if next(iter(iterator), None) is None:
+                    return s3_file, []
+
+                return s3_file, [safe_column_name(column, self.target_quote) for column in iterator.fieldnames]
+            finally:
+                s3_file_handle.close()
+
+        files = []
+        with ThreadPoolExecutor(max_workers=parallelism) as executor:
+            for listed_file, (s3_file, file_headers) in zip(s3_files, executor.map(get_file_headers, s3_files)):
+                if s3_file is None:
+                    if manifest is not None:
+                        manifest.remove(listed_file['key'])
+                    continue
+
+                if manifest is not None and s3_file is not listed_file:
+                    manifest.add(s3_file)
+
+                files.append(s3_file)
+                headers.update(file_headers)
+
+        if headers:
+            headers.update(
+                [
+                    S3Helper.SDC_SOURCE_BUCKET_COLUMN,
+                    S3Helper.SDC_SOURCE_FILE_COLUMN,
+                    S3Helper.SDC_SOURCE_LINENO_COLUMN,
+                    '_SDC_EXTRACTED_AT',
+                    '_SDC_BATCHED_AT',
+                    '_SDC_DELETED_AT',
+                ]
+            )
 
+        return files, headers
+
+    def _open_listed_file(self, s3_file: Dict, s3_client) -> Tuple[Optional[Dict], Optional[object]]:
+        """
+        Opens a listed file if it has not changed since it was listed
+        :param s3_file: listed file with key and etag
+        :param s3_client: boto3 S3 client
+        :return: tuple of the file, refreshed if it was overwritten since it was listed, and its body,
+                 (None, None) if the file was deleted since it was listed
+        """
+        try:
+            try:
+                return s3_file, S3Helper.get_file_handle(
+                    self.connection_config, s3_file['key'], s3_client=s3_client, etag=s3_file.get('etag')
+                )
+            except ClientError as exc:
+                if get_client_error_code(exc) not in PRECONDITION_FAILED_ERROR_CODES:
+                    raise
+
+            LOGGER.info('File "%s" was overwritten since it was listed, reading it again', s3_file['key'])
+            s3_file = S3Helper.get_file_metadata(self.connection_config, s3_file['key'], s3_client=s3_client)
+            return s3_file, S3Helper.get_file_handle(
+                self.connection_config, s3_file['key'], s3_client=s3_client, etag=s3_file['etag']
+            )
+        except ClientError as exc:
+            if get_client_error_code(exc) not in NO_SUCH_KEY_ERROR_CODES:
+                raise
+
+            LOGGER.warning('Skipping file "%s" as it was deleted since it was listed', s3_file['key'])
+            return None, None
+
+    # pylint: disable=too-many-arguments,too-many-locals
+    def _write_files_records(
+        self,
+        s3_files: List[Dict],
+        table_spec: Dict,
+        file_path: str,
+        fieldnames: List[str],
+        s3_client,
+        parallelism: int = 1,
+        chunk_size_mb=1000,
+        max_chunks=0,
+        sampler: CsvTypeSampler = None,
+    ) -> None:
+        """
+        Streams the records of every file into the compressed csv file(s)
+
+        The files are downloaded concurrently but their records are written in the order of the files.
+        :param s3_files: files to copy
+        :param table_spec: dict of table with its specs
+        :param file_path: Path of the gzip compressed csv file into which data is copied
+        :param fieldnames: columns of the csv
+        :param s3_client: boto3 S3 client shared by the download threads
+        :param parallelism: number of files or parts of files downloaded at the same time
+        :param chunk_size_mb: File chunk sizes
+        :param max_chunks: Max number of chunks. 0 disables splitting
+        :param sampler: optional sampler of the records to infer the column types
+        :raise _UnexpectedColumnsError: if a record has columns that are not in the fieldnames
+        """
+        records_copied = 0
+
+        # every chunk starts with the header, the targets skip the first line of every file they load
+        header = io.StringIO()
+        csv.writer(header, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL).writerow(fieldnames)
+
+        with split_gzip.open(
+            file_path, mode='wt', chunk_size_mb=chunk_size_mb, max_chunks=max_chunks, header=header.getvalue()
+        ) as gzfile:
             writer = csv.DictWriter(
                 gzfile,
-                fieldnames=sorted(list(headers)),
+                fieldnames=fieldnames,
                 # we need to sort the headers so that copying into snowflake works
                 delimiter=',',
                 quotechar='"',
                 quoting=csv.QUOTE_MINIMAL,
             )
-            # write the header
-            writer.writeheader()
-            # write all records at once
-            writer.writerows(records)
+            # create the first chunk with the header even if there are no records
+            gzfile.write('')
+
+            # the values are transformed before they are sampled to infer the types of the written values
+            row_transformer = RowTransformer.from_config(
+                self.transformation_config,
+                table_spec.get('table_name', ''),
+                fieldnames,
+                self.hash_encoding,
+                self.regex_match,
+            )
+
+            downloads = self._download_files(s3_files, s3_client, parallelism)
+            try:
+                # consecutive downloaded parts belong to the same file
+                for s3_path, parts in itertools.groupby(downloads, key=lambda download: download[0]):
+                    lines = _iter_lines(data for _, data in parts)
+
+                    for record in self._get_file_records(s3_path, table_spec, lines, records_copied):
+                        if row_transformer is not None:
+                            record = row_transformer.transform_record(record)
+
+                        try:
+                            writer.writerow(record)
+                        except ValueError as exc:
+                            raise _UnexpectedColumnsError(set(record) - set(fieldnames)) from exc
+
+                        if sampler is not None:
+                            sampler.add(record)
+
+                        records_copied += 1
+            finally:
+                downloads.close()
+
+    def _download_files(
+        self, s3_files: List[Dict], s3_client, parallelism: int = 1
+    ) -> Iterator[Tuple[str, bytes]]:
+        """
+        Downloads the files concurrently, big files are downloaded in byte ranges
+        :param s3_files: files to download
+        :param s3_client: boto3 S3 client shared by the download threads
+        :param parallelism: number of files or parts of files downloaded at the same time
+        :return: iterator of the path and the downloaded data of every part in the order of the files
+        """
+        range_size = (
+            self.connection_config.get('export_range_size_mb') or DEFAULT_EXPORT_RANGE_SIZE_MB
+        ) * (1 << 20)
+        parts = (
+            (s3_file, byte_range)
+            for s3_file in s3_files
+            for byte_range in get_byte_ranges(s3_file.get('size'), range_size)
+        )
+
+        # the downloads can only get ahead of the writer by a few parts to keep the memory bounded
+        pending = collections.deque()
+        with ThreadPoolExecutor(max_workers=parallelism) as executor:
+            try:
+                for s3_file, byte_range in parts:
+                    pending.append(
+                        (
+                            s3_file['key'],
+                            executor.submit(
+                                S3Helper.download_file,
+                                self.connection_config,
+                                s3_file['key'],
+                                s3_client=s3_client,
+                                byte_range=byte_range,
+                                etag=s3_file.get('etag') if byte_range else None,
+                            ),
+                        )
+                    )
+
+                    if len(pending) >= 2 * parallelism:
+                        s3_path, future = pending.popleft()
+                        yield s3_path, future.result()
+
+                while pending:
+                    s3_path, future = pending.popleft()
+                    yield s3_path, future.result()
+            finally:
+                for _, future in pending:
+                    future.cancel()
 
     # pylint: disable=too-many-locals
     def _get_file_records(
-        self, s3_path: str, table_spec: Dict, records: List[Dict], headers: Set
-    ) -> None:
+        self, s3_path: str, table_spec: Dict, lines: Iterable[bytes], records_copied: int = 0
+    ) -> Iterator[Dict]:
         """
-        Reads the file in s3_path and inserts the rows in records
-        :param config: tap connection configuration
+        Parses the lines of the file in s3_path and yields its rows one by one
         :param s3_path: full path of file in S3 bucket
         :param table_spec: dict of table with its specs
-        :param records: list into which to insert the rows from file
-        :param headers: set to update with any new column names
-        :return: None
+        :param lines: lines of the file
+        :param records_copied: number of records copied before from other files
+        :return: iterator of the records with safe column names and custom columns
         """
         bucket = self.connection_config['bucket']
 
-        s3_file_handle = S3Helper.get_file_handle(self.connection_config, s3_path)
-
         # We observed data whose field size exceeded the default maximum of
         # 131072. We believe the primary consequence of the following setting
         # is that a malformed, wide CSV would potentially parse into a single
@@ -160,12 +533,7 @@ class FastSyncTapS3Csv:
         # memory consumption but that's acceptable as well.
         csv.field_size_limit(sys.maxsize)
 
-        # pylint:disable=protected-access
-        iterator = singer_encodings_csv.get_row_iterator(
-            s3_file_handle._raw_stream, table_spec
-        )
-
-        records_copied = len(records)
+        iterator = singer_encodings_csv.get_row_iterator(lines, table_spec)
 
         for row in iterator:
             now_datetime = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
@@ -185,16 +553,17 @@ class FastSyncTapS3Csv:
             for k, v in row.items():
                 new_row[safe_column_name(k, self.target_quote)] = v
 
-            record = {**new_row, **custom_columns}
-
-            records.append(record)
-            headers.update(record.keys())
+            yield {**new_row, **custom_columns}
 
             records_copied += 1
 
     def map_column_types_to_target(self, filepath: str, table: str):
 
-        csv_columns = self._get_table_columns(filepath)
+        # the types are inferred while the table is copied, the exported file is read otherwise
+        if table in self.tables_column_types:
+            csv_columns = self.tables_column_types[table].items()
+        else:
+            csv_columns = self._get_table_columns(filepath)
 
         specs = None
 
@@ -325,10 +694,27 @@ class S3Helper:
         else:
             boto3.setup_default_session(profile_name=aws_profile)
 
+    # pylint: disable=too-many-arguments,too-many-locals,too-many-branches
     @classmethod
     def get_input_files_for_table(
-        cls, config: Dict, table_spec: Dict, modified_since: struct_time = None
+        cls,
+        config: Dict,
+        table_spec: Dict,
+        modified_since: struct_time = None,
+        manifest: S3KeyManifest = None,
+        s3_client=None,
+        parallelism: int = 1,
     ):
+        """
+        Lists the files of the table
+        :param config: connection config
+        :param table_spec: dict of table with its specs
+        :param modified_since: only the files modified after this date are returned
+        :param manifest: optional manifest of the previously listed keys, only new keys are listed and added to it
+        :param s3_client: boto3 S3 client, a new one is created if not set
+        :param parallelism: number of prefix shards listed at the same time if manifest is set
+        :return: iterator of the files with key, last_modified, size and etag
+        """
         bucket = config['bucket']
         prefix = table_spec.get('search_prefix')
         pattern = table_spec['search_pattern']
@@ -347,13 +733,18 @@ class S3Helper:
 
         LOGGER.info('Checking bucket "%s" for keys matching "%s"', bucket, pattern)
 
+        if manifest is None:
+            s3_objects = cls.list_files_in_bucket(
+                bucket, prefix, aws_endpoint_url=config.get('aws_endpoint_url'), s3_client=s3_client
+            )
+        else:
+            s3_objects = cls.list_new_files_in_bucket(config, prefix, manifest, s3_client, parallelism)
+
         matched_files_count = 0
         unmatched_files_count = 0
         max_files_before_log = 30000
 
-        for s3_object in cls.list_files_in_bucket(
-            bucket, prefix, aws_endpoint_url=config.get('aws_endpoint_url')
-        ):
+        for s3_object in s3_objects:
             key = s3_object['Key']
             last_modified = s3_object['LastModified']
 
@@ -364,13 +755,22 @@ class S3Helper:
 
             if matcher.search(key):
                 matched_files_count += 1
-                if modified_since is None or modified_since < last_modified:
+                s3_file = {
+                    'key': key,
+                    'last_modified': last_modified,
+                    'size': s3_object['Size'],
+                    'etag': s3_object.get('ETag'),
+                }
+
+                if manifest is not None:
+                    manifest.add(s3_file)
+                elif modified_since is None or modified_since < last_modified:
                     LOGGER.info(
                         'Will download key "%s" as it was last modified %s',
                         key,
                         last_modified,
                     )
-                    yield {'key': key, 'last_modified': last_modified}
+                    yield s3_file
             else:
                 unmatched_files_count += 1
 
@@ -397,6 +797,21 @@ class S3Helper:
                         unmatched_files_count,
                     )
 
+        if manifest is not None:
+            LOGGER.info(
+                'Found %s new matching files, %s matching files in total',
+                matched_files_count,
+                len(manifest.files),
+            )
+            matched_files_count = len(manifest.files)
+
+            # the files listed by the previous syncs are synced again
+            yield from (
+                s3_file
+                for s3_file in manifest.get_files()
+                if modified_since is None or modified_since < s3_file['last_modified']
+            )
+
         if matched_files_count == 0:
             if prefix:
                 raise Exception(
@@ -408,14 +823,100 @@ class S3Helper:
                 f'No files found in bucket "{bucket}" that matches pattern "{pattern}"'
             )
 
+    @classmethod
+    def list_new_files_in_bucket(
+        cls, config: Dict, search_prefix: Optional[str], manifest: S3KeyManifest, s3_client=None, parallelism=1
+    ) -> Iterator[Dict]:
+        """
+        Lists the keys added since the manifest was saved, the listing is split by prefix shards
+
+        The shards are the sub-prefixes up to the next `/` after the search prefix, like the date
+        partitions of the files. Every shard is listed in parallel from its last key in the manifest.
+        :param config: connection config
+        :param search_prefix: prefix of the keys
+        :param manifest: manifest of the previously listed keys, its last keys are updated
+        :param s3_client: boto3 S3 client shared by the threads, a new one is created if not set
+        :param parallelism: number of shards listed at the same time
+        :return: iterator of the new S3 objects
+        """
+        bucket = config['bucket']
+        if s3_client is None:
+            s3_client = cls.get_s3_client(config, max_pool_connections=parallelism)
+
+        # new keys and shards directly under the search prefix, listed after the last known key or
+        # shard, whichever comes first, so that new keys and new shards are both listed
+        last_positions = [
+            position
+            for position in [manifest.last_key, max(manifest.shard_last_keys, default=None)]
+            if position
+        ]
+        new_shards, s3_objects = cls.list_shards_in_bucket(
+            bucket, search_prefix, s3_client, start_after=min(last_positions, default=None)
+        )
+
+        for s3_object in s3_objects:
+            manifest.last_key = max(manifest.last_key or '', s3_object['Key'])
+            if s3_object['Key'] not in manifest.files:
+                yield s3_object
+
+        shards = sorted(set(manifest.shard_last_keys) | set(new_shards))
+        LOGGER.info('Listing %s prefix shards of bucket "%s"', len(shards), bucket)
+
+        def list_shard(shard):
+            return list(
+                cls.list_files_in_bucket(
+                    bucket,
+                    shard,
+                    s3_client=s3_client,
+                    start_after=manifest.shard_last_keys.get(shard),
+                )
+            )
+
+        with ThreadPoolExecutor(max_workers=parallelism) as executor:
+            for shard, shard_objects in zip(shards, executor.map(list_shard, shards)):
+                if shard_objects:
+                    manifest.shard_last_keys[shard] = shard_objects[-1]['Key']
+                else:
+                    manifest.shard_last_keys.setdefault(shard, None)
+
+                yield from shard_objects
+
     @classmethod
     @retry_pattern()
-    def list_files_in_bucket(cls, bucket, search_prefix=None, aws_endpoint_url=None):
-        # override default endpoint for non aws s3 services
-        if aws_endpoint_url is not None:
-            s3_client = boto3.client('s3', endpoint_url=aws_endpoint_url)
-        else:
-            s3_client = boto3.client('s3')
+    def list_shards_in_bucket(
+        cls, bucket, search_prefix, s3_client, start_after=None
+    ) -> Tuple[List[str], List[Dict]]:
+        """
+        Lists the sub-prefixes up to the next `/` and the keys directly under the search prefix
+        :param bucket: S3 bucket name
+        :param search_prefix: prefix of the keys
+        :param s3_client: boto3 S3 client
+        :param start_after: only the keys and prefixes after this key are listed
+        :return: tuple of the sub-prefixes and the S3 objects
+        """
+        args = {'Bucket': bucket, 'Prefix': search_prefix or '', 'Delimiter': '/'}
+        if start_after:
+            args['StartAfter'] = start_after
+
+        shards = []
+        s3_objects = []
+        for page in s3_client.get_paginator('list_objects_v2').paginate(**args):
+            shards.extend(common_prefix['Prefix'] for common_prefix in page.get('CommonPrefixes', []))
+            s3_objects.extend(page.get('Contents', []))
+
+        return shards, s3_objects
+
+    @classmethod
+    @retry_pattern()
+    def list_files_in_bucket(
+        cls, bucket, search_prefix=None, aws_endpoint_url=None, s3_client=None, start_after=None
+    ):
+        if s3_client is None:
+            # override default endpoint for non aws s3 services
+            if aws_endpoint_url is not None:
+                s3_client = boto3.client('s3', endpoint_url=aws_endpoint_url)
+            else:
+                s3_client = boto3.client('s3')
 
         s3_object_count = 0
 
@@ -428,6 +929,9 @@ class S3Helper:
         if search_prefix is not None:
             args['Prefix'] = search_prefix
 
+        if start_after is not None:
+            args['StartAfter'] = start_after
+
         paginator = s3_client.get_paginator('list_objects_v2')
         pages = 0
         for page in paginator.paginate(**args):
@@ -445,17 +949,109 @@ class S3Helper:
             )
 
     @classmethod
-    @retry_pattern()
-    def get_file_handle(cls, config, s3_path):
-        bucket = config['bucket']
-        aws_endpoint_url = config.get('aws_endpoint_url')
+    def get_s3_client(cls, config, max_pool_connections=None):
+        """
+        Create an S3 client that can be shared by threads
+        :param config: connection config
+        :param max_pool_connections: number of HTTP connections kept open, at least the number of threads
+        """
+        kwargs = {}
 
         # override default endpoint for non aws s3 services
-        if aws_endpoint_url is not None:
-            s3_client = boto3.resource('s3', endpoint_url=aws_endpoint_url)
-        else:
-            s3_client = boto3.resource('s3')
+        if config.get('aws_endpoint_url') is not None:
+            kwargs['endpoint_url'] = config['aws_endpoint_url']
+
+        if max_pool_connections:
+            kwargs['config'] = botocore.config.Config(max_pool_connections=max_pool_connections)
+
+        return boto3.client('s3', **kwargs)
+
+    @classmethod
+    @retry_pattern(giveup_error_codes=NO_SUCH_KEY_ERROR_CODES + PRECONDITION_FAILED_ERROR_CODES)
+    def get_file_handle(cls, config, s3_path, s3_client=None, etag=None):
+        if s3_client is None:
+            s3_client = cls.get_s3_client(config)
+
+        args = {'Bucket': config['bucket'], 'Key': s3_path}
+        if etag:
+            args['IfMatch'] = etag
+
+        return s3_client.get_object(**args)['Body']
+
+    @classmethod
+    @retry_pattern(giveup_error_codes=NO_SUCH_KEY_ERROR_CODES)
+    def get_file_metadata(cls, config, s3_path, s3_client=None) -> Dict:
+        """
+        Get the current key, last modified date, size and ETag of a file, like the listed files
+        :param config: connection config
+        :param s3_path: full path of file in S3 bucket
+        :param s3_client: boto3 S3 client, a new one is created if not set
+        :return: file with key, last_modified, size and etag
+        """
+        if s3_client is None:
+            s3_client = cls.get_s3_client(config)
+
+        s3_object = s3_client.head_object(Bucket=config['bucket'], Key=s3_path)
+        return {
+            'key': s3_path,
+            'last_modified': s3_object['LastModified'],
+            'size': s3_object['ContentLength'],
+            'etag': s3_object.get('ETag'),
+        }
+
+    # pylint: disable=too-many-arguments
+    @classmethod
+    @retry_pattern(giveup_error_codes=NO_SUCH_KEY_ERROR_CODES + PRECONDITION_FAILED_ERROR_CODES)
+    def download_file(cls, config, s3_path, s3_client=None, byte_range=None, etag=None) -> bytes:
+        """
+        Download a file or a byte range of it into memory
+        :param config: connection config
+        :param s3_path: full path of file in S3 bucket
+        :param s3_client: boto3 S3 client, a new one is created if not set
+        :param byte_range: optional tuple of the first and last byte to download
+        :param etag: optional ETag the file must have, to not mix the parts of different versions
+        :return: downloaded data
+        """
+        if s3_client is None:
+            s3_client = cls.get_s3_client(config)
 
-        s3_bucket = s3_client.Bucket(bucket)
-        s3_object = s3_bucket.Object(s3_path)
-        return s3_object.get()['Body']
+        args = {'Bucket': config['bucket'], 'Key': s3_path}
+        if byte_range:
+            args['Range'] = 'bytes={}-{}'.format(*byte_range)
+        if etag:
+            args['IfMatch'] = etag
+
+        return s3_client.get_object(**args)['Body'].read()
+
+
+def get_byte_ranges(size: Optional[int], range_size: int) -> List[Optional[Tuple[int, int]]]:
+    """
+    Split a file into byte ranges to download
+    :param size: size of the file in bytes
+    :param range_size: max size of the ranges
+    :return: list of the first and last byte of every range, [None] to download the file at once
+    """
+    if not size or size <= range_size:
+        return [None]
+
+    return [(start, min(start + range_size, size) - 1) for start in range(0, size, range_size)]
+
+
+def _iter_lines(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Split the downloaded parts of a file into lines, the parts can end in the middle of a line
+    :param chunks: consecutive parts of the file
+    :return: iterator of lines with line endings
+    """
+    remainder = b''
+    for chunk in chunks:
+        lines = io.BytesIO(chunk).readlines()
+        if not lines:
+            continue
+
+        lines[0] = remainder + lines[0]
+        remainder = lines.pop() if not lines[-1].endswith(b'\n') else b''
+        yield from lines
+
+    if remainder:
+        yield remainder
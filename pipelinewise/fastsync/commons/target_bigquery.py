@@ -1,19 +1,28 @@
 import logging
 import json
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict
 
 from google.cloud import bigquery
 from google.api_core import exceptions
 
 from .transform_utils import TransformationHelper, SQLFlavor
-from . import utils
+from . import compression, connection_cache, row_transformer, split_parquet, utils
+from .errors import ExportError
 
 LOGGER = logging.getLogger(__name__)
 
 # tone down snowflake connector logging level.
 logging.getLogger('bigquery.connector').setLevel(logging.WARNING)
 
+# Max number of load jobs of the file parts of a table running at the same time
+DEFAULT_LOAD_CONCURRENCY = 4
+
+# Max size of a gzip compressed csv file that a load job accepts
+MAX_GZIP_CSV_FILE_SIZE_BYTES = 4 * (1 << 30)
+
 
 def safe_name(name, quotes=True):
     """
@@ -34,15 +43,35 @@ class FastSyncTargetBigquery:
     Common functions for fastsync to BigQuery
     """
 
+    # Compression codecs of the export files that load jobs can load, in the order of preference
+    EXPORT_CODECS = (compression.CODEC_GZIP, compression.CODEC_NONE)
+
+    # Encoding of the hashes of the HASH transformations: base64 SHA-256, like TO_BASE64(SHA256(col))
+    HASH_ENCODING = row_transformer.HASH_SHA256_BASE64
+
+    # Semantics of the regex_match conditions of the transformations: match anywhere, like REGEXP_CONTAINS
+    REGEX_MATCH = row_transformer.REGEX_SEARCH
+
     def __init__(self, connection_config, transformation_config=None):
         self.connection_config = connection_config
         self.transformation_config = transformation_config
+        self.client = None
+        # Tables loaded with their transformations applied, nothing left to obfuscate after the load
+        self.tables_transformed_at_load = set()
 
     def open_connection(self):
         project_id = self.connection_config['project_id']
         location = self.connection_config.get('location', None)
         return bigquery.Client(project=project_id, location=location)
 
+    def get_client(self):
+        """Client of the instance, the HTTP session and credentials are reused by every request"""
+        if self.client is None:
+            self.client = self.open_connection()
+            connection_cache.OPENED_CONNECTIONS['bigquery'] += 1
+
+        return self.client
+
     def query(self, query, params=None):
         def to_query_parameter(value):
             if isinstance(value, int):
@@ -71,7 +100,7 @@ class FastSyncTargetBigquery:
         else:
             queries = [query]
 
-        client = self.open_connection()
+        client = self.get_client()
         LOGGER.info('TARGET_BIGQUERY - Running query: %s', query)
         query_job = client.query(';\n'.join(queries), job_config=job_config)
         query_job.result()
@@ -81,7 +110,7 @@ class FastSyncTargetBigquery:
     def create_schema(self, schema_name):
         temp_schema = self.connection_config.get('temp_schema', schema_name)
 
-        client = self.open_connection()
+        client = self.get_client()
         for schema in set([schema_name, temp_schema]):
             datasets = client.list_datasets()
             dataset_ids = [d.dataset_id.lower() for d in datasets]
@@ -158,6 +187,7 @@ class FastSyncTargetBigquery:
         skip_csv_header=False,
         allow_quoted_newlines=True,
         write_truncate=True,
+        export_format=split_parquet.EXPORT_FORMAT_CSV,
     ):
         LOGGER.info('BIGQUERY - Loading %s into Bigquery...', filepath)
         table_dict = utils.tablename_to_dict(table_name)
@@ -168,21 +198,145 @@ class FastSyncTargetBigquery:
             quotes=False,
         )
 
-        client = self.open_connection()
+        client = self.get_client()
         dataset_ref = client.dataset(target_schema)
         table_ref = dataset_ref.table(target_table)
         table_schema = client.get_table(table_ref).schema
+
+        # Load jobs cannot transform the loaded columns, tables with transformations are loaded into
+        # a staging table first and inserted transformed, the table is written only once
+        trans_expressions = self.__get_trans_expressions(table_name) if is_temporary else {}
+        staging_table = f'{target_table}_staging'
+        load_table_ref = dataset_ref.table(staging_table) if trans_expressions else table_ref
+
+        job_config = self.__get_load_job_config(
+            table_schema,
+            'WRITE_TRUNCATE' if write_truncate or trans_expressions else 'WRITE_APPEND',
+            skip_csv_header,
+            allow_quoted_newlines,
+            export_format,
+        )
+        job = self.__load_file(filepath, load_table_ref, job_config)
+        inserts = job.output_rows
+
+        if trans_expressions:
+            self.__insert_transformed(
+                trans_expressions, target_schema, staging_table, target_table, write_truncate
+            )
+            client.delete_table(load_table_ref, not_found_ok=True)
+            self.tables_transformed_at_load.add(table_name)
+        LOGGER.info(
+            'Loading into %s."%s": %s',
+            target_schema,
+            target_table,
+            json.dumps({'inserts': inserts, 'updates': 0, 'size_bytes': size_bytes}),
+        )
+
+        LOGGER.info(job.errors)
+
+    # pylint: disable=R0913,R0914
+    def copy_parts_to_table(
+        self,
+        file_parts,
+        target_schema,
+        table_name,
+        size_bytes,
+        is_temporary,
+        skip_csv_header=False,
+        allow_quoted_newlines=True,
+        export_format=split_parquet.EXPORT_FORMAT_CSV,
+    ):
+        """
+        Load every file part of a table by concurrent load jobs appending to the table, that is
+        expected to be empty. Gzip compressed csv files are loaded as they are.
+
+        The number of load jobs running at the same time is the load_concurrency of the connection
+        config. (Default: 4)
+
+        Raises ExportError before loading anything if a gzip compressed csv file part is larger than
+        the 4 GB that BigQuery accepts.
+        """
+        LOGGER.info('BIGQUERY - Loading %s file parts into Bigquery...', len(file_parts))
+        if export_format == split_parquet.EXPORT_FORMAT_CSV:
+            self.__check_gzip_file_sizes(file_parts)
+        table_dict = utils.tablename_to_dict(table_name)
+        target_table = safe_name(
+            table_dict.get(
+                'table_name' if not is_temporary else 'temp_table_name'
+            ).lower(),
+            quotes=False,
+        )
+
+        client = self.get_client()
+        dataset_ref = client.dataset(target_schema)
+        table_ref = dataset_ref.table(target_table)
+        table_schema = client.get_table(table_ref).schema
+
+        # Tables with transformations are loaded into an empty staging table and inserted transformed
+        trans_expressions = self.__get_trans_expressions(table_name) if is_temporary else {}
+        staging_table = f'{target_table}_staging'
+        load_table_ref = dataset_ref.table(staging_table) if trans_expressions else table_ref
+        if trans_expressions:
+            client.delete_table(load_table_ref, not_found_ok=True)
+            client.create_table(bigquery.Table(load_table_ref, schema=table_schema))
+
+        job_config = self.__get_load_job_config(
+            table_schema, 'WRITE_APPEND', skip_csv_header, allow_quoted_newlines, export_format
+        )
+        load_concurrency = self.connection_config.get('load_concurrency') or DEFAULT_LOAD_CONCURRENCY
+        with ThreadPoolExecutor(max_workers=max(min(load_concurrency, len(file_parts)), 1)) as executor:
+            jobs = list(
+                executor.map(lambda file_part: self.__load_file(file_part, load_table_ref, job_config), file_parts)
+            )
+        inserts = sum(job.output_rows or 0 for job in jobs)
+
+        if trans_expressions:
+            self.__insert_transformed(trans_expressions, target_schema, staging_table, target_table, True)
+            client.delete_table(load_table_ref, not_found_ok=True)
+            self.tables_transformed_at_load.add(table_name)
+        LOGGER.info(
+            'Loading into %s."%s": %s',
+            target_schema,
+            target_table,
+            json.dumps({'inserts': inserts, 'updates': 0, 'size_bytes': size_bytes}),
+        )
+
+    @staticmethod
+    def __get_load_job_config(
+        table_schema, write_disposition, skip_csv_header, allow_quoted_newlines, export_format
+    ) -> bigquery.LoadJobConfig:
         job_config = bigquery.LoadJobConfig()
-        job_config.source_format = bigquery.SourceFormat.CSV
         job_config.schema = table_schema
-        job_config.write_disposition = (
-            'WRITE_TRUNCATE' if write_truncate else 'WRITE_APPEND'
-        )
-        job_config.allow_quoted_newlines = allow_quoted_newlines
-        job_config.skip_leading_rows = 1 if skip_csv_header else 0
+        job_config.write_disposition = write_disposition
+        if export_format == split_parquet.EXPORT_FORMAT_PARQUET:
+            job_config.source_format = bigquery.SourceFormat.PARQUET
+        else:
+            job_config.source_format = bigquery.SourceFormat.CSV
+            job_config.allow_quoted_newlines = allow_quoted_newlines
+            job_config.skip_leading_rows = 1 if skip_csv_header else 0
+
+        return job_config
+
+    @staticmethod
+    def __check_gzip_file_sizes(file_parts):
+        """Raise ExportError if a gzip compressed file part is too large to be loaded"""
+        gzip_extension = compression.FILE_EXTENSIONS[compression.CODEC_GZIP]
+        for file_part in file_parts:
+            if gzip_extension not in os.path.basename(file_part):
+                continue
+            file_size = os.path.getsize(file_part)
+            if file_size > MAX_GZIP_CSV_FILE_SIZE_BYTES:
+                raise ExportError(
+                    f'{file_part} is {file_size} bytes, larger than the {MAX_GZIP_CSV_FILE_SIZE_BYTES} bytes '
+                    'BigQuery accepts for gzip compressed csv files. Decrease split_file_chunk_size_mb or '
+                    'increase split_file_max_chunks to export smaller file parts.'
+                )
+
+    def __load_file(self, filepath, load_table_ref, job_config) -> bigquery.LoadJob:
+        """Run a load job of a local file and wait until it finishes"""
         with open(filepath, 'rb') as exported_data:
-            job = client.load_table_from_file(
-                exported_data, table_ref, job_config=job_config
+            job = self.get_client().load_table_from_file(
+                exported_data, load_table_ref, job_config=job_config
             )
         try:
             job.result()
@@ -193,15 +347,7 @@ class FastSyncTargetBigquery:
 
         LOGGER.info('Job %s', job)
         LOGGER.info('Job.output_rows %s', job.output_rows)
-        inserts = job.output_rows
-        LOGGER.info(
-            'Loading into %s."%s": %s',
-            target_schema,
-            target_table,
-            json.dumps({'inserts': inserts, 'updates': 0, 'size_bytes': size_bytes}),
-        )
-
-        LOGGER.info(job.errors)
+        return job
 
     # grant_... functions are common functions called by utils.py: grant_privilege function
     # "to_group" is not used here but exists for compatibility reasons with other database types
@@ -244,27 +390,21 @@ class FastSyncTargetBigquery:
             target_schema: target schema name
             table_name: table name
         """
+        if table_name in self.tables_transformed_at_load:
+            LOGGER.info('Obfuscation rules applied while loading.')
+            return
+
         LOGGER.info('Starting obfuscation rules...')
 
         table_dict = utils.tablename_to_dict(table_name)
         temp_table = table_dict.get('temp_table_name')
-        transformations = self.transformation_config.get('transformations', [])
-
-        # Input table_name is formatted as {{schema}}.{{table}}
-        # Stream name in taps transformation.json is formatted as {{schema}}-{{table}}
-        #
-        # We need to convert to the same format to find the transformation
-        # has that has to be applied
-        tap_stream_name_by_table_name = (
-            '{}-{}'.format(table_dict['schema_name'], table_dict['table_name'])
-            if table_dict['schema_name'] is not None
-            else table_dict['table_name']
-        )
 
         # Find obfuscation rules for the current table
-        # trans_map = self.__get_stream_transformation_map(tap_stream_name_by_table_name, transformations)
         trans_map = TransformationHelper.get_trans_in_sql_flavor(
-            tap_stream_name_by_table_name, transformations, SQLFlavor('bigquery')
+            utils.get_tap_stream_name(table_name),
+            self.__get_transformations(),
+            SQLFlavor('bigquery'),
+            combined=True,
         )
 
         self.__apply_transformations(trans_map, target_schema, temp_table)
@@ -281,16 +421,43 @@ class FastSyncTargetBigquery:
         table_id = '{}.{}.{}'.format(project_id, schema, target_table)
         temp_table_id = '{}.{}.{}'.format(project_id, schema, temp_table)
 
-        # we cant swap tables in bigquery, so we copy the temp into the table
-        # then delete the temp table
-        job_config = bigquery.CopyJobConfig()
-        job_config.write_disposition = 'WRITE_TRUNCATE'
-        client = self.open_connection()
-        replace_job = client.copy_table(temp_table_id, table_id, job_config=job_config)
-        replace_job.result()
+        # we cant swap tables in bigquery, so we replace the table by a clone of the temp table
+        # in one statement, the clone shares the storage of the temp table without copying the data
+        self.query(f'CREATE OR REPLACE TABLE `{table_id}` CLONE `{temp_table_id}`')
 
         # delete the temp table
-        client.delete_table(temp_table_id)
+        self.get_client().delete_table(temp_table_id)
+
+    def __get_transformations(self) -> List[Dict]:
+        return (self.transformation_config or {}).get('transformations', [])
+
+    def __get_trans_expressions(self, table_name: str) -> Dict[str, str]:
+        return TransformationHelper.get_trans_expressions(
+            utils.get_tap_stream_name(table_name), self.__get_transformations(), SQLFlavor('bigquery')
+        )
+
+    def __insert_transformed(
+        self,
+        trans_expressions: Dict[str, str],
+        target_schema: str,
+        staging_table: str,
+        table_name: str,
+        write_truncate: bool,
+    ) -> None:
+        """
+        Insert the rows of the staging table into the given table with the transformed values
+        """
+        full_qual_table_name = '{}.{}'.format(target_schema, safe_name(table_name))
+        replace_list = ', '.join(f'{expression} AS {column}' for column, expression in trans_expressions.items())
+
+        if write_truncate:
+            self.query(f'TRUNCATE TABLE {full_qual_table_name}')
+
+        query_job = self.query(
+            f'INSERT INTO {full_qual_table_name} '
+            f'SELECT * REPLACE ({replace_list}) FROM {target_schema}.{safe_name(staging_table)}'
+        )
+        LOGGER.info('Inserted %s transformed rows into %s', query_job.num_dml_affected_rows, full_qual_table_name)
 
     def __apply_transformations(
         self, transformations: List[Dict], target_schema: str, table_name: str
@@ -1,16 +1,20 @@
 import logging
+import queue
 import psycopg2
 import psycopg2.extras
 import json
-import gzip
 
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 
-from . import utils
+from . import compression, connection_cache, row_transformer, utils
 from .transform_utils import SQLFlavor, TransformationHelper
 
 LOGGER = logging.getLogger(__name__)
 
+# Number of connections loading the file parts of a table at the same time
+DEFAULT_LOAD_CONCURRENCY = 1
+
 
 # pylint: disable=missing-function-docstring,no-self-use,too-many-arguments
 class FastSyncTargetPostgres:
@@ -22,6 +26,16 @@ class FastSyncTargetPostgres:
     BATCHED_AT_COLUMN = '_SDC_BATCHED_AT'
     DELETED_AT_COLUMN = '_SDC_DELETED_AT'
 
+    # Compression codecs of the export files that COPY can load, in the order of preference.
+    # Export files are loaded from the local disk so compressing them is not needed by default
+    EXPORT_CODECS = (compression.CODEC_NONE, compression.CODEC_ZSTD, compression.CODEC_GZIP)
+
+    # Encoding of the hashes of the HASH transformations: hex SHA-256, like ENCODE(DIGEST(col, 'sha256'), 'hex')
+    HASH_ENCODING = row_transformer.HASH_SHA256_HEX
+
+    # Semantics of the regex_match conditions of the transformations: match anywhere, like ~
+    REGEX_MATCH = row_transformer.REGEX_SEARCH
+
     def __init__(self, connection_config, transformation_config=None):
         self.connection_config = connection_config
         self.transformation_config = transformation_config
@@ -40,16 +54,49 @@ class FastSyncTargetPostgres:
 
         return psycopg2.connect(conn_string)
 
+    def get_connection_key(self):
+        """Connections are shared by the instances with the same connection parameters"""
+        return (
+            'postgres',
+            self.connection_config['host'],
+            self.connection_config['port'],
+            self.connection_config['dbname'],
+            self.connection_config['user'],
+        )
+
+    @staticmethod
+    def _is_connection_closed(connection):
+        return connection.closed != 0
+
+    @staticmethod
+    def _ping_connection(connection):
+        with connection:
+            with connection.cursor() as cur:
+                cur.execute('SELECT 1')
+
+    def reuse_connection(self):
+        """
+        Context manager returning the cached connection of the process, opened on first use and
+        reopened if it's closed. The psycopg2 connection is a context manager of a transaction.
+        """
+        return connection_cache.reuse_connection(
+            self.get_connection_key(),
+            self.open_connection,
+            self._is_connection_closed,
+            self._ping_connection,
+        )
+
     def query(self, query, params=None):
         LOGGER.info('Running query: %s', query)
-        with self.open_connection() as connection:
-            with connection.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-                cur.execute(query, params)
+        with self.reuse_connection() as cached:
+            with cached.connection as connection:
+                with connection.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+                    cur.execute(query, params)
 
-                if cur.rowcount > 0 and cur.description:
-                    return cur.fetchall()
+                    if cur.rowcount > 0 and cur.description:
+                        return cur.fetchall()
 
-                return []
+                    return []
 
     def create_schema(self, schema):
         sql = 'CREATE SCHEMA IF NOT EXISTS {}'.format(schema)
@@ -111,10 +158,16 @@ class FastSyncTargetPostgres:
         if sort_columns:
             columns.sort()
 
+        # Temp tables of bulk loads are not written to the WAL and get their primary key after the load
+        is_bulk_load = is_temporary and self.connection_config.get('bulk_load', False)
+        if is_bulk_load:
+            primary_key = None
+
         sql_columns = ','.join(columns).lower()
         sql_primary_keys = ','.join(primary_key).lower() if primary_key else None
         sql = (
-            f'CREATE TABLE IF NOT EXISTS {target_schema}."{target_table.lower()}" ('
+            f'CREATE {"UNLOGGED TABLE" if is_bulk_load else "TABLE"} IF NOT EXISTS '
+            f'{target_schema}."{target_table.lower()}" ('
             f'{sql_columns}'
             f'{f", PRIMARY KEY ({sql_primary_keys}))" if primary_key else ")"}'
         )
@@ -129,8 +182,111 @@ class FastSyncTargetPostgres:
         size_bytes: int,
         is_temporary: bool = False,
         skip_csv_header: bool = False,
-    ):
+        codec: str = compression.CODEC_GZIP,
+    ) -> int:
         LOGGER.info('Loading %s into Postgres...', filepath)
+        with compression.open_reader(filepath, codec) as file:
+            return self.copy_from_file(file, target_schema, table_name, size_bytes, is_temporary, skip_csv_header)
+
+    def copy_parts_to_table(
+        self,
+        file_parts: List[str],
+        target_schema: str,
+        table_name: str,
+        size_bytes: int,
+        is_temporary: bool = False,
+        skip_csv_header: bool = False,
+        codec: str = compression.CODEC_GZIP,
+    ) -> int:
+        """
+        Load the file parts of a table at the same time over load_concurrency connections of the
+        connection config, every connection loads and decompresses one file part at a time on its own
+        thread. Every file part is committed when loaded. (Default: 1 connection)
+
+        Returns:
+            Number of loaded rows
+        """
+        load_concurrency = min(
+            self.connection_config.get('load_concurrency') or DEFAULT_LOAD_CONCURRENCY, len(file_parts)
+        )
+        if load_concurrency <= 1:
+            return sum(
+                self.copy_to_table(
+                    file_part, target_schema, table_name, size_bytes, is_temporary, skip_csv_header, codec
+                )
+                for file_part in file_parts
+            )
+
+        pending_parts = queue.SimpleQueue()
+        for file_part in file_parts:
+            pending_parts.put(file_part)
+
+        def load_pending_parts() -> int:
+            # psycopg2 connections cannot run queries of multiple threads at once, every thread has its own
+            connection = self.open_connection()
+            inserts = 0
+            try:
+                while True:
+                    try:
+                        file_part = pending_parts.get_nowait()
+                    except queue.Empty:
+                        return inserts
+
+                    LOGGER.info('Loading %s into Postgres...', file_part)
+                    with compression.open_reader(file_part, codec) as file:
+                        inserts += self.__copy_expert(
+                            connection, file, target_schema, table_name, size_bytes, is_temporary, skip_csv_header
+                        )
+            finally:
+                connection.close()
+
+        LOGGER.info('Loading %s file parts over %s connections', len(file_parts), load_concurrency)
+        with ThreadPoolExecutor(max_workers=load_concurrency) as executor:
+            futures = [executor.submit(load_pending_parts) for _ in range(load_concurrency)]
+            return sum(future.result() for future in futures)
+
+    def copy_from_file(
+        self,
+        file,
+        target_schema: str,
+        table_name: str,
+        size_bytes: int = None,
+        is_temporary: bool = False,
+        skip_csv_header: bool = False,
+    ) -> int:
+        """
+        Load uncompressed csv data into a table by COPY FROM STDIN
+
+        Args:
+            file: File like object to read the csv data from, like a stream_buffer.StreamBuffer
+                  that streams the data directly from the source database
+            target_schema: target schema name
+            table_name: table name
+            size_bytes: Size of the loaded data in the log message
+            is_temporary: Load into the temp table
+            skip_csv_header: Skip the first line of the csv data
+
+        Returns:
+            Number of loaded rows
+        """
+        with self.reuse_connection() as cached:
+            return self.__copy_expert(
+                cached.connection, file, target_schema, table_name, size_bytes, is_temporary, skip_csv_header
+            )
+
+    def __copy_expert(
+        self,
+        connection,
+        file,
+        target_schema: str,
+        table_name: str,
+        size_bytes: int,
+        is_temporary: bool,
+        skip_csv_header: bool,
+    ) -> int:
+        """
+        Load uncompressed csv data into a table by COPY FROM STDIN in a transaction of the connection
+        """
         table_dict = utils.tablename_to_dict(table_name)
         target_table = (
             table_dict.get('table_name')
@@ -138,7 +294,7 @@ class FastSyncTargetPostgres:
             else table_dict.get('temp_table_name')
         )
 
-        with self.open_connection() as connection:
+        with connection:
             with connection.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
                 inserts = 0
 
@@ -146,8 +302,7 @@ class FastSyncTargetPostgres:
                 FROM STDIN WITH (FORMAT CSV, HEADER {'TRUE' if skip_csv_header else 'FALSE'}, ESCAPE '"')
                 """
 
-                with gzip.open(filepath, 'rb') as file:
-                    cur.copy_expert(copy_sql, file)
+                cur.copy_expert(copy_sql, file, size=131072)
 
                 inserts = cur.rowcount
                 LOGGER.info(
@@ -159,6 +314,8 @@ class FastSyncTargetPostgres:
                     ),
                 )
 
+        return inserts
+
     # grant_... functions are common functions called by utils.py: grant_privilege function
     # "to_group" is not used here but exists for compatibility reasons with other database types
     # "to_group" is for databases that can grant to users and groups separately like Amazon Redshift
@@ -212,7 +369,7 @@ class FastSyncTargetPostgres:
             if not is_temporary
             else table_dict.get('temp_table_name')
         )
-        transformations = self.transformation_config.get('transformations', [])
+        transformations = (self.transformation_config or {}).get('transformations', [])
 
         # Input table_name is formatted as {{schema}}.{{table}}
         # Stream name in taps transformation.json is formatted as {{schema}}-{{table}}
@@ -224,13 +381,35 @@ class FastSyncTargetPostgres:
         )
 
         trans_cols = TransformationHelper.get_trans_in_sql_flavor(
-            tap_stream_name_by_table_name, transformations, SQLFlavor('postgres')
+            tap_stream_name_by_table_name, transformations, SQLFlavor('postgres'), combined=True
         )
 
         self.__apply_transformations(trans_cols, target_schema, target_table)
 
         LOGGER.info('Obfuscation rules applied.')
 
+    def finish_bulk_load(self, target_schema: str, table_name: str, primary_key: List[str]):
+        """
+        Make the loaded temp table durable if bulk_load is enabled in the connection config: switch it to
+        LOGGED, build the primary key in one pass and collect the statistics of the table. The table is
+        switched first because SET LOGGED rewrites the table with all its indexes.
+
+        Args:
+            target_schema: target schema name
+            table_name: table name
+            primary_key: primary key columns of the table
+        """
+        if not self.connection_config.get('bulk_load', False):
+            return
+
+        table_dict = utils.tablename_to_dict(table_name)
+        temp_table = f'{target_schema}."{table_dict.get("temp_table_name").lower()}"'
+
+        self.query(f'ALTER TABLE {temp_table} SET LOGGED')
+        if primary_key:
+            self.query(f'ALTER TABLE {temp_table} ADD PRIMARY KEY ({",".join(primary_key).lower()})')
+        self.query(f'ANALYZE {temp_table}')
+
     def swap_tables(self, schema, table_name):
         table_dict = utils.tablename_to_dict(table_name)
         target_table = table_dict.get('table_name')
@@ -1,12 +1,16 @@
 import os
 import logging
+import re
 import json
 import boto3
+import botocore.config
 import psycopg2
 import psycopg2.extras
-from typing import List
+from typing import Dict, List
 
-from . import utils
+from pipelinewise.cli.utils import generate_random_string
+
+from . import compression, connection_cache, row_transformer, split_parquet, uploader, utils
 
 
 LOGGER = logging.getLogger(__name__)
@@ -22,10 +26,28 @@ class FastSyncTargetRedshift:
     BATCHED_AT_COLUMN = '_SDC_BATCHED_AT'
     DELETED_AT_COLUMN = '_SDC_DELETED_AT'
 
+    # Compression codecs of the export files that COPY can load, in the order of preference
+    EXPORT_CODECS = (compression.CODEC_ZSTD, compression.CODEC_GZIP, compression.CODEC_NONE)
+
+    # Encoding of the hashes of the HASH transformations: hex SHA-1, like FUNC_SHA1(col)
+    HASH_ENCODING = row_transformer.HASH_SHA1_HEX
+
+    # Semantics of the regex_match conditions of the transformations: match anywhere, like ~
+    REGEX_MATCH = row_transformer.REGEX_SEARCH
+
+    # Data format parameters of COPY by compression codec
+    COPY_FORMATS = {
+        compression.CODEC_GZIP: 'CSV GZIP',
+        compression.CODEC_ZSTD: 'CSV ZSTD',
+        compression.CODEC_NONE: 'CSV',
+    }
+
     # pylint: disable=invalid-name
     def __init__(self, connection_config, transformation_config=None):
         self.connection_config = connection_config
         self.transformation_config = transformation_config
+        # Tables loaded with their transformations applied, nothing left to obfuscate after the load
+        self.tables_transformed_at_load = set()
 
         # Get the required parameters from config file and/or environment variables
         aws_profile = self.connection_config.get('aws_profile') or os.environ.get(
@@ -59,7 +81,14 @@ class FastSyncTargetRedshift:
         else:
             aws_session = boto3.session.Session(profile_name=aws_profile)
 
-        self.s3 = aws_session.client('s3')
+        # S3 client shared by the threads uploading the file parts
+        self.s3 = aws_session.client(
+            's3',
+            config=botocore.config.Config(
+                max_pool_connections=uploader.get_max_pool_connections(self.connection_config)
+            ),
+        )
+        self.transfer_config = uploader.get_transfer_config(self.connection_config)
 
     def open_connection(self):
         conn_string = "host='{}' dbname='{}' user='{}' password='{}' port='{}'".format(
@@ -72,16 +101,49 @@ class FastSyncTargetRedshift:
 
         return psycopg2.connect(conn_string)
 
+    def get_connection_key(self):
+        """Connections are shared by the instances with the same connection parameters"""
+        return (
+            'redshift',
+            self.connection_config['host'],
+            self.connection_config['port'],
+            self.connection_config['dbname'],
+            self.connection_config['user'],
+        )
+
+    @staticmethod
+    def _is_connection_closed(connection):
+        return connection.closed != 0
+
+    @staticmethod
+    def _ping_connection(connection):
+        with connection:
+            with connection.cursor() as cur:
+                cur.execute('SELECT 1')
+
+    def reuse_connection(self):
+        """
+        Context manager returning the cached connection of the process, opened on first use and
+        reopened if it's closed. The psycopg2 connection is a context manager of a transaction.
+        """
+        return connection_cache.reuse_connection(
+            self.get_connection_key(),
+            self.open_connection,
+            self._is_connection_closed,
+            self._ping_connection,
+        )
+
     def query(self, query, params=None):
         LOGGER.debug('Running query: %s', query)
-        with self.open_connection() as connection:
-            with connection.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-                cur.execute(query, params)
+        with self.reuse_connection() as cached:
+            with cached.connection as connection:
+                with connection.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+                    cur.execute(query, params)
 
-                if cur.rowcount > 0 and cur.description:
-                    return cur.fetchall()
+                    if cur.rowcount > 0 and cur.description:
+                        return cur.fetchall()
 
-                return []
+                    return []
 
     def upload_to_s3(self, file):
         bucket = self.connection_config['s3_bucket']
@@ -98,10 +160,44 @@ class FastSyncTargetRedshift:
             s3_key,
         )
 
-        self.s3.upload_file(file, bucket, s3_key, ExtraArgs=extra_args)
+        self.s3.upload_file(file, bucket, s3_key, ExtraArgs=extra_args, Config=self.transfer_config)
 
         return s3_key
 
+    def get_slice_count(self) -> int:
+        """Number of slices of the cluster, every slice loads one file at a time"""
+        return self.query('SELECT COUNT(*) AS slice_count FROM stv_slices')[0]['slice_count']
+
+    def upload_manifest(self, s3_keys: List[str], key_sizes: Dict[str, int] = None) -> str:
+        """
+        Upload a COPY manifest listing the uploaded file parts of a table
+
+        Args:
+            s3_keys: Keys of the file parts
+            key_sizes: Size of the file parts by key, required to load parquet files
+
+        Returns:
+            Key of the manifest, next to the first file part
+        """
+        bucket = self.connection_config['s3_bucket']
+        s3_acl = self.connection_config.get('s3_acl')
+        manifest_key = '{}.manifest'.format(re.sub(r'(\.part\d+)+$', '', s3_keys[0]))
+
+        entries = []
+        for s3_key in s3_keys:
+            entry = {'url': f's3://{bucket}/{s3_key}', 'mandatory': True}
+            if key_sizes and s3_key in key_sizes:
+                entry['meta'] = {'content_length': key_sizes[s3_key]}
+            entries.append(entry)
+
+        LOGGER.info('Uploading manifest of %s files to S3 key: %s', len(s3_keys), manifest_key)
+        extra_args = {'ACL': s3_acl} if s3_acl else {}
+        self.s3.put_object(
+            Bucket=bucket, Key=manifest_key, Body=json.dumps({'entries': entries}).encode('utf-8'), **extra_args
+        )
+
+        return manifest_key
+
     def create_schema(self, schema):
         sql = 'CREATE SCHEMA IF NOT EXISTS {}'.format(schema)
         self.query(sql)
@@ -172,6 +268,7 @@ class FastSyncTargetRedshift:
 
         self.query(sql)
 
+    # pylint: disable=too-many-locals
     def copy_to_table(
         self,
         s3_key,
@@ -180,6 +277,9 @@ class FastSyncTargetRedshift:
         size_bytes,
         is_temporary,
         skip_csv_header=False,
+        codec=compression.CODEC_GZIP,
+        export_format=split_parquet.EXPORT_FORMAT_CSV,
+        is_manifest=False,
     ):
         LOGGER.info('Loading %s into Redshift...', s3_key)
         table_dict = utils.tablename_to_dict(table_name)
@@ -223,18 +323,53 @@ class FastSyncTargetRedshift:
         """,
         )
 
-        # Step3: Using the built-in CSV COPY option to load
-        copy_sql = (
-            f'COPY {target_schema}."{target_table.upper()}" FROM \'s3://{bucket}/{s3_key}\''
-            f'{copy_credentials}'
-            f'{copy_options}'
-            f'CSV GZIP'
-        )
-
-        # Get number of inserted records - COPY does insert only
-        results = self.query(copy_sql)
-        if len(results) > 0:
-            inserts = results[0].get('rows_loaded', 0)
+        # COPY cannot transform the loaded columns, tables with transformations are loaded into
+        # a staging table first and inserted transformed, the table is written only once
+        target = f'{target_schema}."{target_table.upper()}"'
+        trans_expressions = self.__get_trans_expressions(table_name) if is_temporary else {}
+        if trans_expressions:
+            # temp tables cannot be created in a schema and the cached sessions are shared by the
+            # loads of every schema, the name is unique to not collide with another staging table
+            copy_target = (
+                f'"{target_schema.upper()}_{target_table.upper()}_STAGING_{generate_random_string()}"'
+            )
+            self.query(f'CREATE TEMP TABLE {copy_target} (LIKE {target})')
+        else:
+            copy_target = target
+
+        # Step3: Using the built-in CSV or PARQUET COPY option to load
+        if export_format == split_parquet.EXPORT_FORMAT_PARQUET:
+            # Parquet columns are loaded by position and the CSV data conversion options do not apply
+            copy_sql = (
+                f'COPY {copy_target} FROM \'s3://{bucket}/{s3_key}\''
+                f'{copy_credentials}'
+                f'FORMAT AS PARQUET'
+            )
+            if is_manifest:
+                copy_sql += ' MANIFEST'
+        else:
+            copy_sql = (
+                f'COPY {copy_target} FROM \'s3://{bucket}/{s3_key}\''
+                f'{copy_credentials}'
+                f'{copy_options}'
+                f'{self.COPY_FORMATS[codec]}'
+            )
+            if is_manifest:
+                copy_sql += ' MANIFEST'
+
+        try:
+            # Get number of inserted records - COPY does insert only
+            results = self.query(copy_sql)
+            if len(results) > 0:
+                inserts = results[0].get('rows_loaded', 0)
+
+            if trans_expressions:
+                self.__insert_transformed(trans_expressions, copy_target, target_schema, target_table)
+                self.tables_transformed_at_load.add(table_name)
+        finally:
+            # the staging table is dropped even if the load failed, the session can be reused
+            if trans_expressions:
+                self.query(f'DROP TABLE IF EXISTS {copy_target}')
 
         LOGGER.info(
             'Loading into %s."%s": %s',
@@ -246,6 +381,54 @@ class FastSyncTargetRedshift:
         LOGGER.info('Deleting %s from S3...', s3_key)
         self.s3.delete_object(Bucket=bucket, Key=s3_key)
 
+    def copy_parts_to_table(
+        self,
+        s3_keys,
+        target_schema,
+        table_name,
+        size_bytes,
+        is_temporary,
+        key_sizes=None,
+        codec=compression.CODEC_GZIP,
+        export_format=split_parquet.EXPORT_FORMAT_CSV,
+    ):
+        """
+        Load every file part of a table with one COPY from a manifest, so the slices of the cluster
+        load the files in parallel. A single file is loaded without manifest.
+
+        Args:
+            s3_keys: Keys of the uploaded file parts
+            key_sizes: Size of the file parts by key, required to load parquet files
+        """
+        if len(s3_keys) <= 1:
+            for s3_key in s3_keys:
+                self.copy_to_table(
+                    s3_key,
+                    target_schema,
+                    table_name,
+                    size_bytes,
+                    is_temporary,
+                    codec=codec,
+                    export_format=export_format,
+                )
+            return
+
+        manifest_key = self.upload_manifest(s3_keys, key_sizes)
+        self.copy_to_table(
+            manifest_key,
+            target_schema,
+            table_name,
+            size_bytes,
+            is_temporary,
+            codec=codec,
+            export_format=export_format,
+            is_manifest=True,
+        )
+
+        LOGGER.info('Deleting %s file parts from S3...', len(s3_keys))
+        for s3_key in s3_keys:
+            self.s3.delete_object(Bucket=self.connection_config['s3_bucket'], Key=s3_key)
+
     def grant_select_on_table(
         self, target_schema, table_name, grantee, is_temporary, to_group=False
     ):
@@ -281,13 +464,36 @@ class FastSyncTargetRedshift:
             )
             self.query(sql)
 
-    # pylint: disable=duplicate-string-formatting-argument
     def obfuscate_columns(self, target_schema, table_name):
+        if table_name in self.tables_transformed_at_load:
+            LOGGER.info('Obfuscation rules applied while loading')
+            return
+
         LOGGER.info('Applying obfuscation rules')
         table_dict = utils.tablename_to_dict(table_name)
         temp_table = table_dict.get('temp_table_name')
-        transformations = self.transformation_config.get('transformations', [])
-        trans_cols = []
+        trans_cols = [
+            '"{}" = {}'.format(column, expression)
+            for column, expression in self.__get_trans_expressions(table_name).items()
+        ]
+
+        # Generate and run UPDATE if at least one obfuscation rule found
+        if len(trans_cols) > 0:
+            sql = f"""UPDATE {target_schema}."{temp_table.upper()}"
+            SET {','.join(trans_cols)}
+            """
+
+            self.query(sql)
+
+    # pylint: disable=duplicate-string-formatting-argument
+    def __get_trans_expressions(self, table_name) -> Dict[str, str]:
+        """
+        Find the obfuscation rules of the table
+        Returns: dictionary of column names and the sql expressions of the obfuscated values
+        """
+        table_dict = utils.tablename_to_dict(table_name)
+        transformations = (self.transformation_config or {}).get('transformations', [])
+        trans_cols = {}
 
         # Find obfuscation rule for the current table
         for trans in transformations:
@@ -303,32 +509,40 @@ class FastSyncTargetRedshift:
                 column = trans.get('field_id')
                 transform_type = trans.get('type')
                 if transform_type == 'SET-NULL':
-                    trans_cols.append('"{}" = NULL'.format(column))
+                    trans_cols[column] = 'NULL'
                 elif transform_type == 'HASH':
-                    trans_cols.append('"{}" = FUNC_SHA1("{}")'.format(column, column))
+                    trans_cols[column] = 'FUNC_SHA1("{}")'.format(column)
                 elif 'HASH-SKIP-FIRST' in transform_type:
                     skip_first_n = transform_type[-1]
-                    trans_cols.append(
-                        '"{}" = CONCAT(SUBSTRING("{}", 1, {}), FUNC_SHA1(SUBSTRING("{}", {} + 1)))'.format(
-                            column, column, skip_first_n, column, skip_first_n
-                        )
+                    trans_cols[column] = 'CONCAT(SUBSTRING("{}", 1, {}), FUNC_SHA1(SUBSTRING("{}", {} + 1)))'.format(
+                        column, skip_first_n, column, skip_first_n
                     )
                 elif transform_type == 'MASK-DATE':
-                    trans_cols.append(
-                        '"{}" = TO_CHAR("{}"::DATE, \'YYYY-01-01\')::DATE'.format(
-                            column, column
-                        )
-                    )
+                    trans_cols[column] = 'TO_CHAR("{}"::DATE, \'YYYY-01-01\')::DATE'.format(column)
                 elif transform_type == 'MASK-NUMBER':
-                    trans_cols.append('"{}" = 0'.format(column))
-
-        # Generate and run UPDATE if at least one obfuscation rule found
-        if len(trans_cols) > 0:
-            sql = f"""UPDATE {target_schema}."{temp_table.upper()}"
-            SET {','.join(trans_cols)}
-            """
+                    trans_cols[column] = '0'
+
+        return trans_cols
+
+    def __insert_transformed(self, trans_expressions, staging_table, target_schema, target_table):
+        """
+        Insert the rows of the staging table into the target table with the obfuscated values
+        """
+        columns = self.query(
+            'SELECT column_name FROM information_schema.columns'
+            ' WHERE LOWER(table_schema) = LOWER(%s) AND LOWER(table_name) = LOWER(%s)'
+            ' ORDER BY ordinal_position',
+            (target_schema, target_table),
+        )
+        expressions = {column.lower(): expression for column, expression in trans_expressions.items()}
+        select_list = ', '.join(
+            expressions.get(column['column_name'].lower(), '"{}"'.format(column['column_name']))
+            for column in columns
+        )
 
-            self.query(sql)
+        self.query(
+            f'INSERT INTO {target_schema}."{target_table.upper()}" SELECT {select_list} FROM {staging_table}'
+        )
 
     def swap_tables(self, schema, table_name):
         table_dict = utils.tablename_to_dict(table_name)
@@ -2,13 +2,13 @@ import logging
 import os
 import json
 import boto3
+import botocore.config
 import snowflake.connector
 
-from typing import List, Dict
-from snowflake.connector.encryption_util import SnowflakeEncryptionUtil
-from snowflake.connector.remote_storage_util import SnowflakeFileEncryptionMaterial
+from typing import List, Dict, Optional
 
-from . import utils
+from . import compression, connection_cache, row_transformer, split_parquet, uploader, utils
+from .client_side_encryption import EncryptingReader
 from .transform_utils import TransformationHelper, SQLFlavor
 
 LOGGER = logging.getLogger(__name__)
@@ -23,10 +23,24 @@ class FastSyncTargetSnowflake:
     Common functions for fastsync to Snowflake
     """
 
+    # Compression codecs of the export files that COPY can load, in the order of preference
+    EXPORT_CODECS = (compression.CODEC_ZSTD, compression.CODEC_GZIP, compression.CODEC_NONE)
+
+    # Encoding of the hashes of the HASH transformations: hex SHA-256, like SHA2(col, 256)
+    HASH_ENCODING = row_transformer.HASH_SHA256_HEX
+
+    # Semantics of the regex_match conditions of the transformations: match of the whole value, like REGEXP
+    REGEX_MATCH = row_transformer.REGEX_FULL_MATCH
+
+    # Column types that are loaded from json strings
+    SEMI_STRUCTURED_TYPES = ('VARIANT', 'OBJECT', 'ARRAY')
+
     # pylint: disable=invalid-name
     def __init__(self, connection_config, transformation_config=None):
         self.connection_config = connection_config
         self.transformation_config = transformation_config
+        # Tables loaded with their transformations applied, nothing left to obfuscate after the load
+        self.tables_transformed_at_load = set()
 
         # Get the required parameters from config file and/or environment variables
         aws_profile = self.connection_config.get('aws_profile') or os.environ.get(
@@ -53,12 +67,16 @@ class FastSyncTargetSnowflake:
         else:
             aws_session = boto3.session.Session(profile_name=aws_profile)
 
-        # Create the s3 client
+        # Create the s3 client, shared by the threads uploading the file parts
         self.s3 = aws_session.client(
             's3',
             region_name=self.connection_config.get('s3_region_name'),
             endpoint_url=self.connection_config.get('s3_endpoint_url'),
+            config=botocore.config.Config(
+                max_pool_connections=uploader.get_max_pool_connections(self.connection_config)
+            ),
         )
+        self.transfer_config = uploader.get_transfer_config(self.connection_config)
 
     def create_query_tag(self, query_tag_props: dict = None) -> str:
         schema = None
@@ -93,10 +111,49 @@ class FastSyncTargetSnowflake:
             },
         )
 
+    def get_connection_key(self):
+        """Connections are shared by the instances with the same connection parameters"""
+        return (
+            'snowflake',
+            self.connection_config['account'],
+            self.connection_config['dbname'],
+            self.connection_config['warehouse'],
+            self.connection_config['user'],
+        )
+
+    @staticmethod
+    def _is_connection_closed(connection):
+        return connection.is_closed()
+
+    @staticmethod
+    def _ping_connection(connection):
+        with connection.cursor() as cur:
+            cur.execute('SELECT 1')
+
+    def reuse_connection(self, query_tag_props=None):
+        """
+        Context manager returning the cached connection of the process, opened on first use and
+        reopened if it's closed. The query tag of the session is changed if needed.
+        """
+        return connection_cache.reuse_connection(
+            self.get_connection_key(),
+            lambda: self.open_connection(query_tag_props),
+            self._is_connection_closed,
+            self._ping_connection,
+        )
+
     def query(self, query, params=None, query_tag_props=None):
         LOGGER.debug('Running query: %s', query)
-        with self.open_connection(query_tag_props) as connection:
-            with connection.cursor(snowflake.connector.DictCursor) as cur:
+        query_tag = self.create_query_tag(query_tag_props)
+
+        with self.reuse_connection(query_tag_props) as cached:
+            with cached.connection.cursor(snowflake.connector.DictCursor) as cur:
+                # the session of a new connection is opened with the query tag
+                cached.state.setdefault('query_tag', query_tag)
+                if cached.state['query_tag'] != query_tag:
+                    cur.execute('ALTER SESSION SET QUERY_TAG = %s', (query_tag,))
+                    cached.state['query_tag'] = query_tag
+
                 cur.execute(query, params)
 
                 if cur.rowcount > 0:
@@ -104,7 +161,7 @@ class FastSyncTargetSnowflake:
 
                 return []
 
-    def upload_to_s3(self, file, tmp_dir=None):
+    def upload_to_s3(self, file):
         bucket = self.connection_config['s3_bucket']
         s3_acl = self.connection_config.get('s3_acl')
         s3_key_prefix = self.connection_config.get('s3_key_prefix', '')
@@ -120,32 +177,23 @@ class FastSyncTargetSnowflake:
         # Encrypt csv if client side encryption enabled
         master_key = self.connection_config.get('client_side_encryption_master_key', '')
         if master_key != '':
-            # Encrypt the file
+            # Encrypt the file while uploading it, without writing an encrypted copy
             LOGGER.info('Encrypting file %s...', file)
-            encryption_material = SnowflakeFileEncryptionMaterial(
-                query_stage_master_key=master_key, query_id='', smk_id=0
-            )
-            encryption_metadata, encrypted_file = SnowflakeEncryptionUtil.encrypt_file(
-                encryption_material, file, tmp_dir=tmp_dir
-            )
+            with open(file, 'rb') as file_obj:
+                encrypting_reader = EncryptingReader(file_obj, master_key)
 
-            # Upload to s3
-            extra_args = {'ACL': s3_acl} if s3_acl else {}
+                # Send key and iv in the metadata, that will be required to decrypt and upload the encrypted file
+                extra_args = {'ACL': s3_acl} if s3_acl else {}
+                extra_args['Metadata'] = encrypting_reader.get_metadata()
 
-            # Send key and iv in the metadata, that will be required to decrypt and upload the encrypted file
-            extra_args['Metadata'] = {
-                'x-amz-key': encryption_metadata.key,
-                'x-amz-iv': encryption_metadata.iv,
-            }
-            self.s3.upload_file(encrypted_file, bucket, s3_key, ExtraArgs=extra_args)
-
-            # Remove the uploaded encrypted file
-            os.remove(encrypted_file)
+                self.s3.upload_fileobj(
+                    encrypting_reader, bucket, s3_key, ExtraArgs=extra_args, Config=self.transfer_config
+                )
 
         # Upload to S3 without encrypting
         else:
             extra_args = {'ACL': s3_acl} if s3_acl else None
-            self.s3.upload_file(file, bucket, s3_key, ExtraArgs=extra_args)
+            self.s3.upload_file(file, bucket, s3_key, ExtraArgs=extra_args, Config=self.transfer_config)
 
         return s3_key
 
@@ -273,6 +321,8 @@ class FastSyncTargetSnowflake:
         size_bytes,
         is_temporary,
         skip_csv_header=False,
+        codec=compression.CODEC_GZIP,
+        export_format=split_parquet.EXPORT_FORMAT_CSV,
     ):
         LOGGER.info('Loading %s into Snowflake...', s3_key)
         table_dict = utils.tablename_to_dict(table_name)
@@ -284,12 +334,27 @@ class FastSyncTargetSnowflake:
         inserts = 0
 
         stage = self.connection_config['stage']
-        sql = (
-            f'COPY INTO {target_schema}."{target_table.upper()}" FROM \'@{stage}/{s3_key}\''
-            f' FILE_FORMAT = (type=CSV escape=\'\\x1e\' escape_unenclosed_field=\'\\x1e\''
-            f' field_optionally_enclosed_by=\'\"\' skip_header={int(skip_csv_header)}'
-            f' compression=GZIP binary_format=HEX)'
-        )
+        if export_format == split_parquet.EXPORT_FORMAT_PARQUET:
+            # Parquet columns are matched to the table columns by name
+            sql = (
+                f'COPY INTO {target_schema}."{target_table.upper()}" FROM \'@{stage}/{s3_key}\''
+                f' FILE_FORMAT = (type=PARQUET) MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE'
+            )
+        else:
+            source = f'\'@{stage}/{s3_key}\''
+
+            # Transform the csv columns while loading, the table is written only once
+            select_list = self.__get_load_select_list(target_schema, table_name, target_table) if is_temporary else None
+            if select_list:
+                source = f'(SELECT {select_list} FROM {source})'
+                self.tables_transformed_at_load.add(table_name)
+
+            sql = (
+                f'COPY INTO {target_schema}."{target_table.upper()}" FROM {source}'
+                f' FILE_FORMAT = (type=CSV escape=\'\\x1e\' escape_unenclosed_field=\'\\x1e\''
+                f' field_optionally_enclosed_by=\'\"\' skip_header={int(skip_csv_header)}'
+                f' compression={codec.upper()} binary_format=HEX)'
+            )
 
         # Get number of inserted records - COPY does insert only
         results = self.query(
@@ -357,27 +422,21 @@ class FastSyncTargetSnowflake:
             target_schema: target schema name
             table_name: table name
         """
+        if table_name in self.tables_transformed_at_load:
+            LOGGER.info('Obfuscation rules applied while loading.')
+            return
+
         LOGGER.info('Starting obfuscation rules...')
 
         table_dict = utils.tablename_to_dict(table_name)
         temp_table = table_dict.get('temp_table_name')
-        transformations = self.transformation_config.get('transformations', [])
-
-        # Input table_name is formatted as {{schema}}.{{table}}
-        # Stream name in taps transformation.json is formatted as {{schema}}-{{table}}
-        #
-        # We need to convert to the same format to find the transformation
-        # has that has to be applied
-        tap_stream_name_by_table_name = (
-            '{}-{}'.format(table_dict['schema_name'], table_dict['table_name'])
-            if table_dict['schema_name'] is not None
-            else table_dict['table_name']
-        )
 
         # Find obfuscation rules for the current table
-        # trans_map = self.__get_stream_transformation_map(tap_stream_name_by_table_name, transformations)
         trans_map = TransformationHelper.get_trans_in_sql_flavor(
-            tap_stream_name_by_table_name, transformations, SQLFlavor('snowflake')
+            utils.get_tap_stream_name(table_name),
+            self.__get_transformations(),
+            SQLFlavor('snowflake'),
+            combined=True,
         )
 
         self.__apply_transformations(trans_map, target_schema, temp_table)
@@ -407,6 +466,48 @@ class FastSyncTargetSnowflake:
             query_tag_props={'schema': schema, 'table': temp_table},
         )
 
+    def __get_transformations(self) -> List[Dict]:
+        return (self.transformation_config or {}).get('transformations', [])
+
+    def __get_load_select_list(self, target_schema: str, table_name: str, target_table: str) -> Optional[str]:
+        """
+        Generate the select list of a COPY transformation that applies the transformations of the
+        table to the columns of the csv files.
+
+        Csv columns are in the order of the table columns. The columns used by the transformations
+        are cast to the types of the table columns, the other columns are converted by COPY.
+
+        Returns: None if the table has no transformation
+        """
+        tap_stream_name = utils.get_tap_stream_name(table_name)
+        if not TransformationHelper.get_trans_in_sql_flavor(
+            tap_stream_name, self.__get_transformations(), SQLFlavor('snowflake')
+        ):
+            return None
+
+        columns = self.query(
+            f'DESC TABLE {target_schema}."{target_table.upper()}"',
+            query_tag_props={'schema': target_schema, 'table': target_table},
+        )
+
+        file_columns = {}
+        column_refs = {}
+        for position, column in enumerate(columns, start=1):
+            safe_column = f'"{column["name"]}"'
+            file_columns[safe_column] = f'${position}'
+            column_type = column['type'].upper()
+            column_refs[safe_column] = (
+                f'PARSE_JSON(${position})'
+                if column_type.startswith(self.SEMI_STRUCTURED_TYPES)
+                else f'${position}::{column_type}'
+            )
+
+        trans_expressions = TransformationHelper.get_trans_expressions(
+            tap_stream_name, self.__get_transformations(), SQLFlavor('snowflake'), column_refs
+        )
+
+        return ', '.join(trans_expressions.get(column, file_column) for column, file_column in file_columns.items())
+
     def __apply_transformations(
         self, transformations: List[Dict], target_schema: str, table_name: str
     ) -> None:
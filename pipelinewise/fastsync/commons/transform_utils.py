@@ -52,7 +52,7 @@ class TransformationHelper:
 
     @classmethod
     def get_trans_in_sql_flavor(
-        cls, stream_name: str, transformations: List[Dict], sql_flavor: SQLFlavor
+        cls, stream_name: str, transformations: List[Dict], sql_flavor: SQLFlavor, combined: bool = False
     ) -> List[Dict]:
 
         """
@@ -62,6 +62,8 @@ class TransformationHelper:
             sql_flavor: sql flavor to use when converting the transformations into sql
             stream_name: the full stream name in the format {schema}-{table}
             transformations: List of transformations
+            combined: combine every transformation into one item, to transform the table with a single
+                      UPDATE. Conditional transformations become CASE WHEN expressions of the columns
 
         Returns: list of dictionaries in the form
                 {
@@ -69,84 +71,167 @@ class TransformationHelper:
                     "conditions": "... AND ... AND ..."
                 }
         """
+        if combined:
+            return cls.__get_combined_trans(stream_name, transformations, sql_flavor)
 
         trans_map = []
 
-        for trans_item in transformations:
+        for trans_item in cls.__get_stream_transformations(stream_name, transformations):
 
-            if trans_item.get('tap_stream_name').lower() == stream_name.lower():
+            transform_type = TransformationType(trans_item['type'])
 
-                transform_type = TransformationType(trans_item['type'])
+            # Make the field id safe in case it's a reserved word
+            column = cls.__safe_column(trans_item['field_id'], sql_flavor)
 
-                # Make the field id safe in case it's a reserved word
-                column = cls.__safe_column(trans_item['field_id'], sql_flavor)
+            transform_conditions = trans_item.get('when')
 
-                transform_conditions = trans_item.get('when')
+            # get the conditions in "when" and convert them to their SF sql equivalent
+            conditions = cls.__conditions_to_sql(transform_conditions, sql_flavor)
 
-                # get the conditions in "when" and convert them to their SF sql equivalent
-                conditions = cls.__conditions_to_sql(transform_conditions, sql_flavor)
+            trans_map.append(
+                {
+                    'trans': f'{column} = {cls.__trans_to_sql(transform_type, column, sql_flavor)}',
+                    'conditions': conditions,
+                }
+            )
 
-                if transform_type == TransformationType.SET_NULL:
-                    trans_map.append(
-                        {'trans': f'{column} = NULL', 'conditions': conditions}
-                    )
+        return trans_map
 
-                elif transform_type == TransformationType.HASH:
+    @classmethod
+    def get_trans_expressions(
+        cls,
+        stream_name: str,
+        transformations: List[Dict],
+        sql_flavor: SQLFlavor,
+        column_refs: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, str]:
+        """
+        Find the transformations to apply to the given stream and combine them into one sql expression
+        per transformed column, to select the transformed values while loading instead of updating the
+        loaded table.
 
-                    trans_map.append(
-                        {
-                            'trans': cls.__hash_to_sql(column, sql_flavor),
-                            'conditions': conditions,
-                        }
-                    )
+        The expressions give the same values as the UPDATEs of get_trans_in_sql_flavor run one after the
+        other: the conditional transformations in order, each one wrapped in a CASE WHEN, then the
+        transformations without conditions.
 
-                elif transform_type.value.startswith('HASH-SKIP-FIRST-'):
+        Args:
+            stream_name: the full stream name in the format {schema}-{table}
+            transformations: List of transformations
+            sql_flavor: sql flavor to use when converting the transformations into sql
+            column_refs: sql expressions of the loaded values by safe column name, the columns are
+                         referenced by their safe name if not given
 
-                    trans_map.append(
-                        {
-                            'trans': cls.__hash_skip_first_to_sql(
-                                transform_type, column, sql_flavor
-                            ),
-                            'conditions': conditions,
-                        }
-                    )
+        Returns: dictionary of safe column names and sql expressions of the transformed values
+        """
+        column_refs = dict(column_refs or {})
+        expressions = {}
+        unconditional_items = []
+
+        for trans_item in cls.__get_stream_transformations(stream_name, transformations):
+            transform_type = TransformationType(trans_item['type'])
+            column = cls.__safe_column(trans_item['field_id'], sql_flavor)
+            values = {**column_refs, **expressions}
+            value = values.get(column, column)
+            conditions = cls.__conditions_to_sql(trans_item.get('when'), sql_flavor, values)
+
+            if not conditions:
+                unconditional_items.append((transform_type, column))
+                continue
 
-                elif transform_type == TransformationType.MASK_DATE:
+            expressions[column] = (
+                f'CASE WHEN {conditions} '
+                f'THEN {cls.__trans_to_sql(transform_type, value, sql_flavor)} '
+                f'ELSE {value} END'
+            )
 
-                    trans_map.append(
-                        {
-                            'trans': cls.__mask_date_to_sql(column, sql_flavor),
-                            'conditions': conditions,
-                        }
-                    )
+        # Transformations without conditions are set by the same UPDATE, they all see the values
+        # of the conditional transformations
+        values = {**column_refs, **expressions}
+        for transform_type, column in unconditional_items:
+            expressions[column] = cls.__trans_to_sql(transform_type, values.get(column, column), sql_flavor)
 
-                elif transform_type == TransformationType.MASK_NUMBER:
-                    trans_map.append(
-                        {'trans': f'{column} = 0', 'conditions': conditions}
-                    )
+        return expressions
 
-                elif transform_type.value.startswith('MASK-STRING-SKIP-ENDS-'):
+    @classmethod
+    # pylint: disable=W0238  # False positive when it is used by another classmethod
+    def __get_combined_trans(cls, stream_name: str, transformations: List[Dict], sql_flavor: SQLFlavor) -> List[Dict]:
+        """
+        Combine the transformations of the given stream into the SET clause and the predicate of one UPDATE
 
-                    trans_map.append(
-                        {
-                            'trans': cls.__mask_string_skip_ends_to_sql(
-                                transform_type, column, sql_flavor
-                            ),
-                            'conditions': conditions,
-                        }
-                    )
+        Returns: empty list if no transformations, otherwise a list of one dictionary in the form
+                {
+                    "trans": "col_1 = ..., col_2 = CASE WHEN ... THEN ... ELSE col_2 END",
+                    "conditions": "(...) OR (...)"
+                }
+        """
+        expressions = cls.get_trans_expressions(stream_name, transformations, sql_flavor)
+        if not expressions:
+            return []
+
+        conditions = [
+            cls.__conditions_to_sql(trans_item.get('when'), sql_flavor)
+            for trans_item in cls.__get_stream_transformations(stream_name, transformations)
+        ]
+
+        # A row is changed only if the condition of one of the transformations matches its original values,
+        # the other rows are not rewritten unless some transformations have no condition
+        return [
+            {
+                'trans': ', '.join(f'{column} = {expression}' for column, expression in expressions.items()),
+                'conditions': ' OR '.join(f'({condition})' for condition in conditions) if all(conditions) else None,
+            }
+        ]
 
-                elif transform_type == TransformationType.MASK_HIDDEN:
-                    trans_map.append(
-                        {'trans': f"{column} = 'hidden'", 'conditions': conditions}
-                    )
+    @classmethod
+    # pylint: disable=W0238  # False positive when it is used by another classmethod
+    def __get_stream_transformations(cls, stream_name: str, transformations: List[Dict]) -> List[Dict]:
+        return [
+            trans_item
+            for trans_item in transformations
+            if trans_item.get('tap_stream_name').lower() == stream_name.lower()
+        ]
 
-        return trans_map
+    @classmethod
+    # pylint: disable=W0238  # False positive when it is used by another classmethod
+    # pylint: disable=too-many-return-statements
+    def __trans_to_sql(cls, transform_type: TransformationType, value: str, sql_flavor: SQLFlavor) -> str:
+        """
+        convert a transformation into the sql expression of the transformed value
+        Args:
+            transform_type: the transformation to apply
+            value: column or sql expression of the value to transform
+            sql_flavor: the sql flavor to use
+
+        Returns: sql expression of the transformed value
+        """
+        if transform_type == TransformationType.SET_NULL:
+            return 'NULL'
+
+        if transform_type == TransformationType.HASH:
+            return cls.__hash_to_sql(value, sql_flavor)
+
+        if transform_type.value.startswith('HASH-SKIP-FIRST-'):
+            return cls.__hash_skip_first_to_sql(transform_type, value, sql_flavor)
+
+        if transform_type == TransformationType.MASK_DATE:
+            return cls.__mask_date_to_sql(value, sql_flavor)
+
+        if transform_type == TransformationType.MASK_NUMBER:
+            return '0'
+
+        if transform_type.value.startswith('MASK-STRING-SKIP-ENDS-'):
+            return cls.__mask_string_skip_ends_to_sql(transform_type, value, sql_flavor)
+
+        # MASK-HIDDEN
+        return "'hidden'"
 
     @classmethod
     # pylint: disable=W0238  # False positive when it is used by another classmethod
     def __conditions_to_sql(
-        cls, transform_conditions: List[Dict], sql_flavor: SQLFlavor
+        cls,
+        transform_conditions: List[Dict],
+        sql_flavor: SQLFlavor,
+        column_refs: Optional[Dict[str, str]] = None,
     ) -> Optional[str]:
         """
         Convert the conditional transformations into equivalent form in SF SQL.
@@ -165,15 +250,21 @@ class TransformationHelper:
                 }
 
                 if no regex_match or equals keys are found, the transformation condition is skipped
+            column_refs: sql expressions of the values of the columns by safe column name, the columns are
+                         referenced by their safe name if not given
 
         Returns: None if no transformations, otherwise a concatenated string of AND conditions
         """
         if not transform_conditions:
             return None
 
+        column_refs = column_refs or {}
         conditions = []
 
         for condition in transform_conditions:
+            safe_column = cls.__safe_column(condition['column'], sql_flavor)
+            column = column_refs.get(safe_column, safe_column)
+
             # for each condition create the sql equivalent of it
             if 'equals' in condition:
                 if condition['equals'] is None:
@@ -201,9 +292,7 @@ class TransformationHelper:
                     operator = '~'
 
                 elif sql_flavor == SQLFlavor.BIGQUERY:
-                    conditions.append(
-                        f"REGEXP_CONTAINS({cls.__safe_column(condition['column'], sql_flavor)}, {value})"
-                    )
+                    conditions.append(f'REGEXP_CONTAINS({column}, {value})')
                     continue
 
                 else:
@@ -215,9 +304,7 @@ class TransformationHelper:
             else:
                 continue
 
-            conditions.append(
-                f"({cls.__safe_column(condition['column'], sql_flavor)} {operator} {value})"
-            )
+            conditions.append(f'({column} {operator} {value})')
 
         return ' AND '.join(conditions)
 
@@ -253,13 +340,13 @@ class TransformationHelper:
         Returns: sql string equivalent of the hash
         """
         if sql_flavor == SQLFlavor.SNOWFLAKE:
-            trans = f'{column} = SHA2({column}, 256)'
+            trans = f'SHA2({column}, 256)'
 
         elif sql_flavor == SQLFlavor.POSTGRES:
-            trans = f'{column} = ENCODE(DIGEST({column}, \'sha256\'), \'hex\')'
+            trans = f'ENCODE(DIGEST({column}, \'sha256\'), \'hex\')'
 
         elif sql_flavor == SQLFlavor.BIGQUERY:
-            trans = f'{column} = TO_BASE64(SHA256({column}))'
+            trans = f'TO_BASE64(SHA256({column}))'
 
         else:
             raise NotImplementedError(
@@ -287,16 +374,16 @@ class TransformationHelper:
         skip_first_n = transform_type.value[-1]
 
         if sql_flavor == SQLFlavor.SNOWFLAKE:
-            trans = '{0} = CONCAT(SUBSTRING({0}, 1, {1}), SHA2(SUBSTRING({0}, {1} + 1), 256))'.format(
+            trans = 'CONCAT(SUBSTRING({0}, 1, {1}), SHA2(SUBSTRING({0}, {1} + 1), 256))'.format(
                 column, skip_first_n
             )
         elif sql_flavor == SQLFlavor.POSTGRES:
             trans = (
-                '{0} = CONCAT(SUBSTRING({0}, 1, {1}), ENCODE(DIGEST(SUBSTRING({0}, {1} + 1), '
+                'CONCAT(SUBSTRING({0}, 1, {1}), ENCODE(DIGEST(SUBSTRING({0}, {1} + 1), '
                 '\'sha256\'), \'hex\'))'.format(column, skip_first_n)
             )
         elif sql_flavor == SQLFlavor.BIGQUERY:
-            trans = '{0} = CONCAT(SUBSTRING({0}, 1, {1}), TO_BASE64(SHA256(SUBSTRING({0}, {1} + 1))))'.format(
+            trans = 'CONCAT(SUBSTRING({0}, 1, {1}), TO_BASE64(SHA256(SUBSTRING({0}, {1} + 1))))'.format(
                 column, skip_first_n
             )
         else:
@@ -322,14 +409,14 @@ class TransformationHelper:
         """
         if sql_flavor == SQLFlavor.SNOWFLAKE:
             trans = (
-                f'{column} = TIMESTAMP_NTZ_FROM_PARTS('
+                f'TIMESTAMP_NTZ_FROM_PARTS('
                 f'DATE_FROM_PARTS(YEAR({column}), 1, 1),'
                 f'TO_TIME({column}))'
             )
 
         elif sql_flavor == SQLFlavor.POSTGRES:
             trans = (
-                '{0} = MAKE_TIMESTAMP('
+                'MAKE_TIMESTAMP('
                 'DATE_PART(\'year\', {0})::int, '
                 '1, '
                 '1, '
@@ -339,7 +426,7 @@ class TransformationHelper:
             )
         elif sql_flavor == SQLFlavor.BIGQUERY:
             trans = (
-                f'{column} = TIMESTAMP(DATETIME('
+                f'TIMESTAMP(DATETIME('
                 f'DATE(EXTRACT(YEAR FROM {column}), 1, 1),'
                 f'TIME({column})))'
             )
@@ -369,17 +456,17 @@ class TransformationHelper:
         skip_ends_n = int(transform_type.value[-1])
 
         if sql_flavor == SQLFlavor.SNOWFLAKE:
-            trans = '{0} = CASE WHEN LENGTH({0}) > 2 * {1} THEN ' \
+            trans = 'CASE WHEN LENGTH({0}) > 2 * {1} THEN ' \
                     'CONCAT(SUBSTRING({0}, 1, {1}), REPEAT(\'*\', LENGTH({0})-(2 * {1})), ' \
                     'SUBSTRING({0}, LENGTH({0})-{1}+1, {1})) ' \
                     'ELSE REPEAT(\'*\', LENGTH({0})) END'.format(column, skip_ends_n)
         elif sql_flavor == SQLFlavor.POSTGRES:
-            trans = '{0} = CASE WHEN LENGTH({0}) > 2 * {1} THEN ' \
+            trans = 'CASE WHEN LENGTH({0}) > 2 * {1} THEN ' \
                     'CONCAT(SUBSTRING({0}, 1, {1}), REPEAT(\'*\', LENGTH({0})-(2 * {1})), ' \
                     'SUBSTRING({0}, LENGTH({0})-{1}+1, {1})) ' \
                     'ELSE REPEAT(\'*\', LENGTH({0})) END'.format(column, skip_ends_n)
         elif sql_flavor == SQLFlavor.BIGQUERY:
-            trans = '{0} = CASE WHEN LENGTH({0}) > 2 * {1} THEN ' \
+            trans = 'CASE WHEN LENGTH({0}) > 2 * {1} THEN ' \
                     'CONCAT(SUBSTRING({0}, 1, {1}), REPEAT(\'*\', LENGTH({0})-(2 * {1})), ' \
                     'SUBSTRING({0}, LENGTH({0})-{1}+1, {1})) ' \
                     'ELSE REPEAT(\'*\', LENGTH({0})) END'.format(column, skip_ends_n)
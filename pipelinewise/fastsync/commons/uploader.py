@@ -0,0 +1,153 @@
+"""Upload exported file parts in the background while the export is still running."""
+import logging
+import os
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from boto3.s3.transfer import TransferConfig
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENT_UPLOADS = 4
+DEFAULT_MULTIPART_CHUNK_SIZE_MB = 8
+DEFAULT_MULTIPART_CONCURRENCY = 10
+
+
+def get_transfer_config(connection_config: Dict) -> TransferConfig:
+    """
+    Multipart settings of the uploads of one file from the s3_multipart_chunk_size_mb and
+    s3_multipart_concurrency keys of the target config. Files bigger than one chunk are uploaded
+    in chunks sent in parallel.
+    """
+    chunk_size = (connection_config.get('s3_multipart_chunk_size_mb') or DEFAULT_MULTIPART_CHUNK_SIZE_MB) * (1 << 20)
+    return TransferConfig(
+        multipart_threshold=chunk_size,
+        multipart_chunksize=chunk_size,
+        max_concurrency=connection_config.get('s3_multipart_concurrency') or DEFAULT_MULTIPART_CONCURRENCY,
+    )
+
+
+def get_max_pool_connections(connection_config: Dict) -> int:
+    """
+    Number of HTTP connections the S3 client needs to send the chunks of every concurrent upload
+    at the same time, the botocore default of 10 would make the upload threads wait for each other
+    """
+    return (connection_config.get('s3_upload_concurrency') or DEFAULT_MAX_CONCURRENT_UPLOADS) * (
+        connection_config.get('s3_multipart_concurrency') or DEFAULT_MULTIPART_CONCURRENCY
+    )
+
+
+# pylint: disable=too-many-instance-attributes
+class BackgroundUploader:
+    """
+    Uploads the finished file parts of an export on background threads and deletes them
+    locally once uploaded, so an export does not need disk space for the whole table.
+
+    The submit method can be passed as the on_chunk_closed callback of split_gzip.open.
+
+    The total size of the files uploading at the same time can be limited, a file bigger than
+    the limit is uploaded alone.
+
+    Usage:
+        with BackgroundUploader(target.upload_to_s3) as uploader:
+            tap.copy_table(table, filepath, on_chunk_closed=uploader.submit)
+            s3_keys = uploader.wait()
+    """
+
+    def __init__(
+        self,
+        upload_fn: Callable[[str], str],
+        max_concurrent_uploads: int = DEFAULT_MAX_CONCURRENT_UPLOADS,
+        max_inflight_bytes: Optional[int] = None,
+    ):
+        """
+        Args:
+            upload_fn: Function that uploads a local file and returns the key of the uploaded object
+            max_concurrent_uploads: Max number of files uploading at the same time. (Default: 4)
+            max_inflight_bytes: Max total size of the files uploading at the same time. (Default: no limit)
+        """
+        self.upload_fn = upload_fn
+        self.max_concurrent_uploads = max_concurrent_uploads
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent_uploads)
+        self.max_inflight_bytes = max_inflight_bytes
+        self.inflight_bytes = 0
+        self.inflight_cond = threading.Condition()
+        self.futures = []
+        self.size_bytes = 0
+        # Size of every uploaded object by key
+        self.key_sizes: Dict[str, int] = {}
+        # Parallel exports can close file parts on multiple threads
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, upload_fn: Callable[[str], str], connection_config: Dict) -> 'BackgroundUploader':
+        """
+        Uploader with the s3_upload_concurrency and s3_upload_max_inflight_mb keys of the target config
+        """
+        max_inflight_mb = connection_config.get('s3_upload_max_inflight_mb')
+        return cls(
+            upload_fn,
+            max_concurrent_uploads=connection_config.get('s3_upload_concurrency') or DEFAULT_MAX_CONCURRENT_UPLOADS,
+            max_inflight_bytes=max_inflight_mb * (1 << 20) if max_inflight_mb else None,
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Do not start the pending uploads if the export failed
+        if exc_type is not None:
+            for future in self.futures:
+                future.cancel()
+        self.executor.shutdown(wait=True)
+
+    def _upload(self, file_part: str) -> str:
+        """
+        Upload one file part and delete it locally, waits while the other uploads use the in-flight budget
+        """
+        size = os.path.getsize(file_part)
+
+        with self.inflight_cond:
+            while (
+                self.max_inflight_bytes is not None
+                and self.inflight_bytes > 0
+                and self.inflight_bytes + size > self.max_inflight_bytes
+            ):
+                self.inflight_cond.wait()
+            self.inflight_bytes += size
+
+        try:
+            key = self.upload_fn(file_part)
+        finally:
+            with self.inflight_cond:
+                self.inflight_bytes -= size
+                self.inflight_cond.notify_all()
+
+        with self.lock:
+            self.key_sizes[key] = size
+
+        os.remove(file_part)
+        return key
+
+    def submit(self, file_part: str) -> None:
+        """
+        Schedule the upload of a finished file part
+
+        Args:
+            file_part: Path of the file part that will not be written anymore
+        """
+        LOGGER.info('Scheduling upload of %s', file_part)
+        with self.lock:
+            self.size_bytes += os.path.getsize(file_part)
+            self.futures.append(self.executor.submit(self._upload, file_part))
+
+    def wait(self) -> List[str]:
+        """
+        Wait until every submitted file part is uploaded
+
+        Returns:
+            List of uploaded keys in the order the file parts were submitted
+        """
+        return [future.result() for future in self.futures]
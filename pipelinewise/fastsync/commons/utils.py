@@ -4,9 +4,11 @@ import multiprocessing
 import os
 import logging
 import datetime
+import math
 
-from typing import Dict
+from typing import Dict, List, Optional, Sequence, Tuple
 from pipelinewise.cli.utils import generate_random_string
+from pipelinewise.fastsync.commons import compression, split_gzip, split_parquet
 
 LOGGER = logging.getLogger(__name__)
 
@@ -75,6 +77,20 @@ def tablename_to_dict(table, separator='.'):
     }
 
 
+def get_tap_stream_name(table: str) -> str:
+    """
+    Stream name of a fully qualified table name in the transformation config of the tap
+
+    Table names are formatted as {{schema}}.{{table}}, stream names as {{schema}}-{{table}}
+    """
+    table_dict = tablename_to_dict(table)
+    return (
+        '{}-{}'.format(table_dict['schema_name'], table_dict['table_name'])
+        if table_dict['schema_name'] is not None
+        else table_dict['table_name']
+    )
+
+
 def get_tables_from_properties(properties: Dict) -> set:
     """Get list of selected tables with schema names from properties json
     The output is used to generate list of tables to sync
@@ -376,7 +392,11 @@ def parse_args(required_config_keys: Dict) -> argparse.Namespace:
 
 
 # pylint: disable=import-outside-toplevel
-def retry_pattern():
+def retry_pattern(giveup_error_codes: Sequence[str] = ()):
+    """
+    Retry the AWS calls failing with a ClientError, the errors with one of the
+    giveup_error_codes are raised at once since retrying cannot solve them
+    """
     import backoff
     from botocore.exceptions import ClientError
 
@@ -385,10 +405,16 @@ def retry_pattern():
         ClientError,
         max_tries=5,
         on_backoff=log_backoff_attempt,
+        giveup=lambda exc: get_client_error_code(exc) in giveup_error_codes,
         factor=10,
     )
 
 
+def get_client_error_code(exc) -> Optional[str]:
+    """Error code of a botocore ClientError, like NoSuchKey"""
+    return exc.response.get('Error', {}).get('Code')
+
+
 def log_backoff_attempt(details):
     LOGGER.error(
         'Error detected communicating with Amazon, triggering backoff: %s try',
@@ -415,7 +441,13 @@ def get_pool_size(tap: Dict) -> int:
 
 
 def gen_export_filename(
-    tap_id: str, table: str, suffix: str = None, postfix: str = None, ext: str = None
+    tap_id: str,
+    table: str,
+    suffix: str = None,
+    postfix: str = None,
+    ext: str = None,
+    codec: str = None,
+    export_format: str = None,
 ) -> str:
     """
     Generates a unique filename used for exported fastsync data that avoids file name collision
@@ -428,7 +460,9 @@ def gen_export_filename(
         table: Name of the table to export
         suffix: Generated filename suffix. Defaults to current timestamp in milliseconds
         postfix: Generated filename postfix. Defaults to a random 8 character length string
-        ext: Filename extension. Defaults to .csv.gz
+        ext: Filename extension. Defaults to the extension of the codec
+        codec: Compression codec of the exported file. Defaults to gzip, that is .csv.gz
+        export_format: Format of the exported file, csv or parquet. Defaults to csv
 
     Returns:
         Unique filename as a string
@@ -440,8 +474,175 @@ def gen_export_filename(
         postfix = generate_random_string()
 
     if not ext:
-        ext = 'csv.gz'
+        if export_format == split_parquet.EXPORT_FORMAT_PARQUET:
+            ext = split_parquet.FILE_EXTENSION
+        else:
+            ext = compression.FILE_EXTENSIONS[codec or compression.CODEC_GZIP]
 
     return 'pipelinewise_{}_{}_{}_fastsync_{}.{}'.format(
         tap_id, table, suffix, postfix, ext
     )
+
+
+def negotiate_export_codec(supported_codecs: Sequence[str], preferred_codec: Optional[str] = None) -> str:
+    """
+    Select the compression codec of the exported files that the target can load
+
+    Args:
+        supported_codecs: Codecs the target can load, in the order of preference of the target
+        preferred_codec: Codec requested in the tap config. Defaults to the first codec of the target
+
+    Returns:
+        Name of the codec
+    """
+    if not preferred_codec:
+        return supported_codecs[0]
+
+    compression.validate_codec(preferred_codec)
+    if preferred_codec not in supported_codecs:
+        raise Exception(
+            f'The target cannot load {preferred_codec} export files. '
+            f'Supported codecs: {", ".join(supported_codecs)}'
+        )
+
+    return preferred_codec
+
+
+def get_slice_aligned_split(
+    slice_count: int,
+    table_size_bytes: Optional[int],
+    max_chunk_size_mb: Optional[int] = None,
+    codec: Optional[str] = None,
+    min_chunks: int = 1,
+) -> Dict:
+    """
+    Split the export of a table into evenly sized file parts, as many as a multiple of the slices of
+    the cluster loading them, so every slice loads the same amount of data in parallel
+
+    The size of the export is estimated from the size of the table in the source database,
+    the last part takes the rows that do not fit into the estimated size. If the size of the
+    table is unknown then the export is not split by slices and keeps its default split.
+
+    Args:
+        slice_count: Number of slices of the cluster
+        table_size_bytes: Size of the table in the source database. None if unknown
+        max_chunk_size_mb: Max size of a file part. Defaults to the default chunk size of split_gzip
+        codec: Compression codec of the export files. Defaults to gzip
+        min_chunks: Min number of file parts, like the number of ranges of a parallel export
+
+    Returns:
+        split_large_files, split_file_chunk_size_mb and split_file_max_chunks arguments of copy_table,
+        empty if the size of the table is unknown
+    """
+    if not table_size_bytes or table_size_bytes <= 0:
+        return {}
+
+    slice_count = max(slice_count, 1)
+    max_chunk_size_mb = max_chunk_size_mb or split_gzip.DEFAULT_CHUNK_SIZE_MB
+    compr_rate = 1.0 if codec == compression.CODEC_NONE else split_gzip.EST_COMPR_RATE
+    est_size_mb = table_size_bytes * compr_rate / (1 << 20)
+
+    chunks_per_slice = max(
+        math.ceil(est_size_mb / (slice_count * max_chunk_size_mb)),
+        math.ceil(min_chunks / slice_count),
+        1,
+    )
+    max_chunks = slice_count * chunks_per_slice
+
+    return {
+        'split_large_files': True,
+        'split_file_chunk_size_mb': max(math.ceil(est_size_mb / max_chunks), 1),
+        'split_file_max_chunks': max_chunks,
+    }
+
+
+def log_split_part_sizes(table: str, split_args: Dict, key_sizes: Dict[str, int]) -> None:
+    """
+    Log the actual sizes of the file parts of a slice aligned split against the estimated size,
+    to show how much the estimate of the export size is off
+
+    Args:
+        table: Name of the exported table
+        split_args: Split arguments returned by get_slice_aligned_split
+        key_sizes: Size of every exported file part by key
+    """
+    if not split_args or not key_sizes:
+        return
+
+    est_chunk_size_mb = split_args['split_file_chunk_size_mb']
+    sizes_mb = sorted(size / (1 << 20) for size in key_sizes.values())
+    LOGGER.info(
+        'Exported %s into %s file parts of %.1f to %.1f MB, estimated %s parts of %s MB',
+        table,
+        len(sizes_mb),
+        sizes_mb[0],
+        sizes_mb[-1],
+        split_args['split_file_max_chunks'],
+        est_chunk_size_mb,
+    )
+    if sizes_mb[-1] > 2 * est_chunk_size_mb:
+        LOGGER.warning(
+            'Largest file part of %s is %.1f MB, more than twice the estimated %s MB. '
+            'The size of the table in the source database underestimates the size of the export '
+            'and the file parts are not loaded evenly by the slices.',
+            table,
+            sizes_mb[-1],
+            est_chunk_size_mb,
+        )
+
+
+def get_key_ranges(
+    min_value: Optional[int], max_value: Optional[int], num_ranges: int
+) -> List[Tuple[Optional[int], Optional[int]]]:
+    """
+    Split the integer key space between min_value and max_value into evenly sized,
+    non-overlapping half-open ranges that can be exported independently
+
+    The lower bound of the first range and the upper bound of the last range are None,
+    meaning they are unbounded, so every key of the table belongs to exactly one range
+    even if the key space changed since min_value and max_value were captured.
+
+    Args:
+        min_value: Smallest key in the table. None if the table is empty
+        max_value: Greatest key in the table. None if the table is empty
+        num_ranges: Number of ranges to generate
+
+    Returns:
+        List of (lower_bound, upper_bound) tuples where lower_bound is inclusive and
+        upper_bound is exclusive
+    """
+    if min_value is None or max_value is None or num_ranges < 2:
+        return [(None, None)]
+
+    # Do not generate more ranges than number of keys
+    num_ranges = min(num_ranges, max_value - min_value + 1)
+    step = (max_value - min_value + 1) / num_ranges
+    boundaries = [min_value + int(step * i) for i in range(1, num_ranges)]
+
+    lower_bounds = [None] + boundaries
+    upper_bounds = boundaries + [None]
+
+    return list(zip(lower_bounds, upper_bounds))
+
+
+def get_key_range_condition(
+    column: str, lower_bound: Optional[int], upper_bound: Optional[int]
+) -> str:
+    """
+    Generate SQL WHERE condition that selects the rows of one key range
+
+    Args:
+        column: Quoted name of the key column
+        lower_bound: Inclusive lower bound of the range. None if unbounded
+        upper_bound: Exclusive upper bound of the range. None if unbounded
+
+    Returns:
+        SQL condition as string
+    """
+    conditions = []
+    if lower_bound is not None:
+        conditions.append(f'{column} >= {int(lower_bound)}')
+    if upper_bound is not None:
+        conditions.append(f'{column} < {int(upper_bound)}')
+
+    return ' AND '.join(conditions) or 'TRUE'
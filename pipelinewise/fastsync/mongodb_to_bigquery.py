@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import glob
 import logging
 import os
 import sys
@@ -46,8 +47,14 @@ def tap_type_to_target_type(mongo_type, *_):
 # pylint: disable=too-many-locals
 def sync_table(table: str, args: Namespace) -> Union[bool, str]:
     """Sync one table"""
-    mongodb = FastSyncTapMongoDB(args.tap, tap_type_to_target_type)
-    bigquery = FastSyncTargetBigquery(args.target, args.transform)
+    mongodb = FastSyncTapMongoDB(
+        args.tap,
+        tap_type_to_target_type,
+        transformation_config=args.transform,
+        hash_encoding=FastSyncTargetBigquery.HASH_ENCODING,
+        regex_match=FastSyncTargetBigquery.REGEX_MATCH,
+    )
+    bigquery = FastSyncTargetBigquery(args.target)
 
     try:
         dbname = args.tap.get('dbname')
@@ -67,7 +74,8 @@ def sync_table(table: str, args: Namespace) -> Union[bool, str]:
 
         # Exporting table data, get table definitions and close connection to avoid timeouts
         mongodb.copy_table(table, filepath, args.temp_dir)
-        size_bytes = os.path.getsize(filepath)
+        file_parts = glob.glob(f'{filepath}*')
+        size_bytes = sum([os.path.getsize(file_part) for file_part in file_parts])
         bigquery_types = mongodb.map_column_types_to_target()
         bigquery_columns = bigquery_types.get('columns', [])
         mongodb.close_connection()
@@ -76,22 +84,22 @@ def sync_table(table: str, args: Namespace) -> Union[bool, str]:
         bigquery.create_schema(target_schema)
         bigquery.create_table(target_schema, table, bigquery_columns, is_temporary=True)
 
-        # Load into Bigquery table
-        bigquery.copy_to_table(
-            filepath,
+        # Load every file part into Bigquery table by concurrent load jobs
+        bigquery.copy_parts_to_table(
+            file_parts,
             target_schema,
             table,
             size_bytes,
             is_temporary=True,
             skip_csv_header=True,
         )
-        os.remove(filepath)
+        for file_part in file_parts:
+            os.remove(file_part)
 
         # Obfuscate columns
         bigquery.obfuscate_columns(target_schema, table)
 
-        # Create target table and swap with the temp table in Bigquery
-        bigquery.create_table(target_schema, table, bigquery_columns)
+        # Replace the target table with the temp table in Bigquery
         bigquery.swap_tables(target_schema, table)
 
         # Save bookmark to singer state file
@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import glob
 import os
 import sys
 import multiprocessing
@@ -45,12 +46,19 @@ def tap_type_to_target_type(mongo_type, *_):
 # pylint: disable=too-many-locals
 def sync_table(table: str, args: Namespace) -> Union[bool, str]:
     """Sync one table"""
-    mongodb = FastSyncTapMongoDB(args.tap, tap_type_to_target_type)
-    postgres = FastSyncTargetPostgres(args.target, args.transform)
+    mongodb = FastSyncTapMongoDB(
+        args.tap,
+        tap_type_to_target_type,
+        transformation_config=args.transform,
+        hash_encoding=FastSyncTargetPostgres.HASH_ENCODING,
+        regex_match=FastSyncTargetPostgres.REGEX_MATCH,
+    )
+    postgres = FastSyncTargetPostgres(args.target)
 
     try:
+        codec = utils.negotiate_export_codec(FastSyncTargetPostgres.EXPORT_CODECS, args.tap.get('export_codec'))
         filename = utils.gen_export_filename(
-            tap_id=args.target.get('tap_id'), table=table
+            tap_id=args.target.get('tap_id'), table=table, codec=codec
         )
         filepath = os.path.join(args.temp_dir, filename)
         target_schema = utils.get_target_schema(args.target, table)
@@ -64,8 +72,9 @@ def sync_table(table: str, args: Namespace) -> Union[bool, str]:
         )
 
         # Exporting table data, get table definitions and close connection to avoid timeouts
-        mongodb.copy_table(table, filepath, args.temp_dir)
-        size_bytes = os.path.getsize(filepath)
+        mongodb.copy_table(table, filepath, args.temp_dir, codec=codec)
+        file_parts = glob.glob(f'{filepath}*')
+        size_bytes = sum([os.path.getsize(file_part) for file_part in file_parts])
         snowflake_types = mongodb.map_column_types_to_target()
         postgres_columns = snowflake_types.get('columns', [])
         primary_key = snowflake_types['primary_key']
@@ -77,20 +86,25 @@ def sync_table(table: str, args: Namespace) -> Union[bool, str]:
             target_schema, table, postgres_columns, primary_key, is_temporary=True
         )
 
-        # Load into Postgres table
-        postgres.copy_to_table(
-            filepath,
+        # Load the file parts into Postgres table over multiple connections
+        postgres.copy_parts_to_table(
+            file_parts,
             target_schema,
             table,
             size_bytes,
             is_temporary=True,
             skip_csv_header=True,
+            codec=codec,
         )
-        os.remove(filepath)
+        for file_part in file_parts:
+            os.remove(file_part)
 
         # Obfuscate columns
         postgres.obfuscate_columns(target_schema, table, is_temporary=True)
 
+        # Build the primary key and make the temp table durable after bulk loads
+        postgres.finish_bulk_load(target_schema, table, primary_key)
+
         # Create target table and swap with the temp table in Postgres
         postgres.swap_tables(target_schema, table)
 
@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
+import glob
 import os
+import re
 import sys
 import multiprocessing
 
@@ -12,6 +14,7 @@ from ..logger import Logger
 from .commons import utils
 from .commons.tap_mongodb import FastSyncTapMongoDB
 from .commons.target_snowflake import FastSyncTargetSnowflake
+from .commons.uploader import BackgroundUploader
 
 LOGGER = Logger().get_logger(__name__)
 
@@ -54,14 +57,21 @@ def tap_type_to_target_type(mongo_type, *_):
 # pylint: disable=too-many-locals
 def sync_table(table: str, args: Namespace) -> Union[bool, str]:
     """Sync one table"""
-    mongodb = FastSyncTapMongoDB(args.tap, tap_type_to_target_type)
-    snowflake = FastSyncTargetSnowflake(args.target, args.transform)
+    mongodb = FastSyncTapMongoDB(
+        args.tap,
+        tap_type_to_target_type,
+        transformation_config=args.transform,
+        hash_encoding=FastSyncTargetSnowflake.HASH_ENCODING,
+        regex_match=FastSyncTargetSnowflake.REGEX_MATCH,
+    )
+    snowflake = FastSyncTargetSnowflake(args.target)
     tap_id = args.target.get('tap_id')
     archive_load_files = args.target.get('archive_load_files', False)
 
     try:
         dbname = args.tap.get('dbname')
-        filename = utils.gen_export_filename(tap_id=tap_id, table=table)
+        codec = utils.negotiate_export_codec(FastSyncTargetSnowflake.EXPORT_CODECS, args.tap.get('export_codec'))
+        filename = utils.gen_export_filename(tap_id=tap_id, table=table, codec=codec)
         filepath = os.path.join(args.temp_dir, filename)
         target_schema = utils.get_target_schema(args.target, table)
 
@@ -74,16 +84,26 @@ def sync_table(table: str, args: Namespace) -> Union[bool, str]:
         )
 
         # Exporting table data, get table definitions and close connection to avoid timeouts
-        mongodb.copy_table(table, filepath, args.temp_dir)
-        size_bytes = os.path.getsize(filepath)
+        mongodb.copy_table(table, filepath, args.temp_dir, codec=codec)
+        file_parts = glob.glob(f'{filepath}*')
+        size_bytes = sum([os.path.getsize(file_part) for file_part in file_parts])
         snowflake_types = mongodb.map_column_types_to_target()
         snowflake_columns = snowflake_types.get('columns', [])
         primary_key = snowflake_types['primary_key']
         mongodb.close_connection()
 
-        # Uploading to S3
-        s3_key = snowflake.upload_to_s3(filepath, tmp_dir=args.temp_dir)
-        # os.remove(filepath)
+        # Uploading all file parts to S3 at once
+        with BackgroundUploader.from_config(snowflake.upload_to_s3, args.target) as uploader:
+            for file_part in file_parts:
+                uploader.submit(file_part)
+            s3_keys = uploader.wait()
+
+        # Create a pattern that match all file parts by removing multipart suffix
+        s3_key_pattern = (
+            re.sub(r'(\.part\d+)+$', '', s3_keys[0])
+            if len(s3_keys) > 0
+            else 'NO_FILES_TO_LOAD'
+        )
 
         # Creating temp table in Snowflake
         snowflake.create_schema(target_schema)
@@ -93,20 +113,22 @@ def sync_table(table: str, args: Namespace) -> Union[bool, str]:
 
         # Load into Snowflake table
         snowflake.copy_to_table(
-            s3_key,
+            s3_key_pattern,
             target_schema,
             table,
             size_bytes,
             is_temporary=True,
+            codec=codec,
             skip_csv_header=True,
         )
 
-        if archive_load_files:
-            # Copy load file to archive
-            snowflake.copy_to_archive(s3_key, tap_id, table)
+        for s3_key in s3_keys:
+            if archive_load_files:
+                # Copy load file to archive
+                snowflake.copy_to_archive(s3_key, tap_id, table)
 
-        # Delete file from s3
-        snowflake.s3.delete_object(Bucket=args.target.get('s3_bucket'), Key=s3_key)
+            # Delete all file parts from s3
+            snowflake.s3.delete_object(Bucket=args.target.get('s3_bucket'), Key=s3_key)
 
         # Obfuscate columns
         snowflake.obfuscate_columns(target_schema, table)
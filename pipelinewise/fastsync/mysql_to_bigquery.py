@@ -3,14 +3,13 @@ import logging
 import os
 import sys
 import glob
-import time
 from functools import partial
 from argparse import Namespace
 import multiprocessing
 from typing import Union
 
 from datetime import datetime
-from .commons import utils
+from .commons import split_parquet, utils
 from .commons.tap_mysql import FastSyncTapMySql
 from .commons.target_bigquery import FastSyncTargetBigquery
 
@@ -66,12 +65,22 @@ def tap_type_to_target_type(mysql_type, mysql_column_type):
 # pylint: disable=too-many-locals
 def sync_table(table: str, args: Namespace) -> Union[bool, str]:
     """Sync one table"""
-    mysql = FastSyncTapMySql(args.tap, tap_type_to_target_type, target_quote='`')
-    bigquery = FastSyncTargetBigquery(args.target, args.transform)
+    mysql = FastSyncTapMySql(
+        args.tap,
+        tap_type_to_target_type,
+        target_quote='`',
+        catalog=getattr(args, 'catalog', None),
+        transformation_config=args.transform,
+        hash_encoding=FastSyncTargetBigquery.HASH_ENCODING,
+        regex_match=FastSyncTargetBigquery.REGEX_MATCH,
+    )
+    bigquery = FastSyncTargetBigquery(args.target)
 
     try:
-        filename = 'pipelinewise_fastsync_{}_{}.csv'.format(
-            table, time.strftime('%Y%m%d-%H%M%S')
+        codec = utils.negotiate_export_codec(FastSyncTargetBigquery.EXPORT_CODECS, args.tap.get('export_codec'))
+        export_format = args.tap.get('export_format', split_parquet.EXPORT_FORMAT_CSV)
+        filename = utils.gen_export_filename(
+            tap_id=args.target.get('tap_id'), table=table, codec=codec, export_format=export_format
         )
         filepath = os.path.join(args.temp_dir, filename)
         target_schema = utils.get_target_schema(args.target, table)
@@ -84,7 +93,15 @@ def sync_table(table: str, args: Namespace) -> Union[bool, str]:
 
         # Exporting table data, get table definitions and close connection to avoid timeouts
         mysql.copy_table(
-            table, filepath, compress=False, max_num=MAX_NUM, date_type='datetime'
+            table,
+            filepath,
+            max_num=MAX_NUM,
+            date_type='datetime',
+            split_large_files=True,
+            split_file_chunk_size_mb=args.target.get('split_file_chunk_size_mb'),
+            split_file_max_chunks=args.target.get('split_file_max_chunks'),
+            codec=codec,
+            export_format=export_format,
         )
         file_parts = glob.glob(f'{filepath}*')
         size_bytes = sum([os.path.getsize(file_part) for file_part in file_parts])
@@ -96,24 +113,22 @@ def sync_table(table: str, args: Namespace) -> Union[bool, str]:
         bigquery.create_schema(target_schema)
         bigquery.create_table(target_schema, table, bigquery_columns, is_temporary=True)
 
-        # Load into Bigquery table
-        for num, file_part in enumerate(file_parts):
-            write_truncate = num == 0
-            bigquery.copy_to_table(
-                filepath,
-                target_schema,
-                table,
-                size_bytes,
-                is_temporary=True,
-                write_truncate=write_truncate,
-            )
+        # Load every file part into Bigquery table by concurrent load jobs
+        bigquery.copy_parts_to_table(
+            file_parts,
+            target_schema,
+            table,
+            size_bytes,
+            is_temporary=True,
+            export_format=export_format,
+        )
+        for file_part in file_parts:
             os.remove(file_part)
 
         # Obfuscate columns
         bigquery.obfuscate_columns(target_schema, table)
 
-        # Create target table and swap with the temp table in Bigquery
-        bigquery.create_table(target_schema, table, bigquery_columns)
+        # Replace the target table with the temp table in Bigquery
         bigquery.swap_tables(target_schema, table)
 
         # Save bookmark to singer state file
@@ -159,6 +174,17 @@ def main_impl():
         pool_size,
     )
 
+    # Get the columns and primary keys of every table in bulk and share them with the sync
+    # processes, so they do not need to query the metadata of the tables one by one
+    try:
+        mysql = FastSyncTapMySql(args.tap, tap_type_to_target_type)
+        mysql.open_connections()
+        args.catalog = mysql.prefetch_catalog(args.tables, max_num=MAX_NUM, date_type='datetime')
+        mysql.close_connections()
+    except Exception as exc:
+        LOGGER.warning('Cannot prefetch the catalog, querying the tables one by one: %s', exc)
+        args.catalog = None
+
     # Start loading tables in parallel in spawning processes
     with multiprocessing.Pool(pool_size) as proc:
         table_sync_excs = list(
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import os
 import sys
+import glob
 from functools import partial
 from argparse import Namespace
 import multiprocessing
@@ -8,7 +9,7 @@ from typing import Union
 
 from datetime import datetime
 from ..logger import Logger
-from .commons import utils
+from .commons import stream_buffer, utils
 from .commons.tap_mysql import FastSyncTapMySql
 from .commons.target_postgres import FastSyncTargetPostgres
 
@@ -70,14 +71,23 @@ def tap_type_to_target_type(mysql_type, mysql_column_type):
     )
 
 
+# pylint: disable=too-many-locals
 def sync_table(table: str, args: Namespace) -> Union[bool, str]:
     """Sync one table"""
-    mysql = FastSyncTapMySql(args.tap, tap_type_to_target_type)
-    postgres = FastSyncTargetPostgres(args.target, args.transform)
+    mysql = FastSyncTapMySql(
+        args.tap,
+        tap_type_to_target_type,
+        catalog=getattr(args, 'catalog', None),
+        transformation_config=args.transform,
+        hash_encoding=FastSyncTargetPostgres.HASH_ENCODING,
+        regex_match=FastSyncTargetPostgres.REGEX_MATCH,
+    )
+    postgres = FastSyncTargetPostgres(args.target)
 
     try:
+        codec = utils.negotiate_export_codec(FastSyncTargetPostgres.EXPORT_CODECS, args.tap.get('export_codec'))
         filename = utils.gen_export_filename(
-            tap_id=args.target.get('tap_id'), table=table
+            tap_id=args.target.get('tap_id'), table=table, codec=codec
         )
         filepath = os.path.join(args.temp_dir, filename)
         target_schema = utils.get_target_schema(args.target, table)
@@ -88,29 +98,48 @@ def sync_table(table: str, args: Namespace) -> Union[bool, str]:
         # Get bookmark - Binlog position or Incremental Key value
         bookmark = utils.get_bookmark_for_table(table, args.properties, mysql)
 
-        # Exporting table data, get table definitions and close connection to avoid timeouts
-        mysql.copy_table(table, filepath)
-        size_bytes = os.path.getsize(filepath)
+        # Get table definitions and create temp table in Postgres
         postgres_types = mysql.map_column_types_to_target(table)
         postgres_columns = postgres_types.get('columns', [])
         primary_key = postgres_types.get('primary_key')
-        mysql.close_connections()
-
-        # Creating temp table in Postgres
         postgres.drop_table(target_schema, table, is_temporary=True)
         postgres.create_table(
             target_schema, table, postgres_columns, primary_key, is_temporary=True
         )
 
-        # Load into Postgres table
-        postgres.copy_to_table(
-            filepath, target_schema, table, size_bytes, is_temporary=True
-        )
-        os.remove(filepath)
+        if args.tap.get('export_streaming'):
+            # Stream table data directly from the source cursor into the temp table without any file
+            stream_buffer.transfer(
+                partial(mysql.stream_table, table),
+                partial(postgres.copy_from_file, target_schema=target_schema, table_name=table, is_temporary=True),
+                args.tap.get('export_stream_buffer_mb'),
+            )
+            mysql.close_connections()
+        else:
+            # Exporting table data and close connection to avoid timeouts
+            mysql.copy_table(
+                table,
+                filepath,
+                split_large_files=args.target.get('split_large_files'),
+                split_file_chunk_size_mb=args.target.get('split_file_chunk_size_mb'),
+                split_file_max_chunks=args.target.get('split_file_max_chunks'),
+                codec=codec,
+            )
+            file_parts = glob.glob(f'{filepath}*')
+            size_bytes = sum([os.path.getsize(file_part) for file_part in file_parts])
+            mysql.close_connections()
+
+            # Load the file parts into Postgres table over multiple connections
+            postgres.copy_parts_to_table(file_parts, target_schema, table, size_bytes, is_temporary=True, codec=codec)
+            for file_part in file_parts:
+                os.remove(file_part)
 
         # Obfuscate columns
         postgres.obfuscate_columns(target_schema, table, is_temporary=True)
 
+        # Build the primary key and make the temp table durable after bulk loads
+        postgres.finish_bulk_load(target_schema, table, primary_key)
+
         # Create target table and swap with the temp table in Postgres
         postgres.swap_tables(target_schema, table)
 
@@ -161,6 +190,17 @@ def main_impl():
     postgres_target = FastSyncTargetPostgres(args.target, args.transform)
     postgres_target.create_schemas(args.tables)
 
+    # Get the columns and primary keys of every table in bulk and share them with the sync
+    # processes, so they do not need to query the metadata of the tables one by one
+    try:
+        mysql = FastSyncTapMySql(args.tap, tap_type_to_target_type)
+        mysql.open_connections()
+        args.catalog = mysql.prefetch_catalog(args.tables)
+        mysql.close_connections()
+    except Exception as exc:
+        LOGGER.warning('Cannot prefetch the catalog, querying the tables one by one: %s', exc)
+        args.catalog = None
+
     # Start loading tables in parallel in spawning processes
     with multiprocessing.Pool(pool_size) as proc:
         table_sync_excs = list(
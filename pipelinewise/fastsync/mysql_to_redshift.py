@@ -8,9 +8,10 @@ from typing import Union
 
 from datetime import datetime
 from ..logger import Logger
-from .commons import utils
+from .commons import split_parquet, utils
 from .commons.tap_mysql import FastSyncTapMySql
 from .commons.target_redshift import FastSyncTargetRedshift
+from .commons.uploader import BackgroundUploader
 
 LOGGER = Logger().get_logger(__name__)
 
@@ -73,14 +74,24 @@ def tap_type_to_target_type(mysql_type, mysql_column_type):
     )
 
 
+# pylint: disable=too-many-locals
 def sync_table(table: str, args: Namespace) -> Union[bool, str]:
     """Sync one table"""
-    mysql = FastSyncTapMySql(args.tap, tap_type_to_target_type)
-    redshift = FastSyncTargetRedshift(args.target, args.transform)
+    mysql = FastSyncTapMySql(
+        args.tap,
+        tap_type_to_target_type,
+        catalog=getattr(args, 'catalog', None),
+        transformation_config=args.transform,
+        hash_encoding=FastSyncTargetRedshift.HASH_ENCODING,
+        regex_match=FastSyncTargetRedshift.REGEX_MATCH,
+    )
+    redshift = FastSyncTargetRedshift(args.target)
 
     try:
+        codec = utils.negotiate_export_codec(FastSyncTargetRedshift.EXPORT_CODECS, args.tap.get('export_codec'))
+        export_format = args.tap.get('export_format', split_parquet.EXPORT_FORMAT_CSV)
         filename = utils.gen_export_filename(
-            tap_id=args.target.get('tap_id'), table=table
+            tap_id=args.target.get('tap_id'), table=table, codec=codec, export_format=export_format
         )
         filepath = os.path.join(args.temp_dir, filename)
         target_schema = utils.get_target_schema(args.target, table)
@@ -91,17 +102,38 @@ def sync_table(table: str, args: Namespace) -> Union[bool, str]:
         # Get bookmark - Binlog position or Incremental Key value
         bookmark = utils.get_bookmark_for_table(table, args.properties, mysql)
 
-        # Exporting table data, get table definitions and close connection to avoid timeouts
-        mysql.copy_table(table, filepath)
-        size_bytes = os.path.getsize(filepath)
-        redshift_types = mysql.map_column_types_to_target(table)
-        redshift_columns = redshift_types.get('columns', [])
-        primary_key = redshift_types.get('primary_key')
-        mysql.close_connections()
+        # Split the export into evenly sized file parts, as many as a multiple of the slices
+        split_args = {}
+        if getattr(args, 'slice_count', None):
+            split_args = utils.get_slice_aligned_split(
+                args.slice_count,
+                mysql.get_table_size(table),
+                max_chunk_size_mb=args.target.get('split_file_chunk_size_mb'),
+                codec=codec,
+                min_chunks=args.tap.get('export_parallelism') or 1,
+            )
 
-        # Uploading to S3
-        s3_key = redshift.upload_to_s3(filepath)
-        os.remove(filepath)
+        # Exporting table data while uploading the finished file parts to S3 in the background,
+        # get table definitions and close connection to avoid timeouts
+        with BackgroundUploader.from_config(redshift.upload_to_s3, args.target) as uploader:
+            mysql.copy_table(
+                table,
+                filepath,
+                on_chunk_closed=uploader.submit,
+                codec=codec,
+                export_format=export_format,
+                **split_args,
+            )
+            redshift_types = mysql.map_column_types_to_target(table)
+            redshift_columns = redshift_types.get('columns', [])
+            primary_key = redshift_types.get('primary_key')
+            mysql.close_connections()
+
+            # Wait for the remaining file parts to be uploaded to S3
+            s3_keys = uploader.wait()
+            size_bytes = uploader.size_bytes
+            key_sizes = uploader.key_sizes
+        utils.log_split_part_sizes(table, split_args, key_sizes)
 
         # Creating temp table in Redshift
         redshift.drop_table(target_schema, table, is_temporary=True)
@@ -109,9 +141,16 @@ def sync_table(table: str, args: Namespace) -> Union[bool, str]:
             target_schema, table, redshift_columns, primary_key, is_temporary=True
         )
 
-        # Load into Redshift table
-        redshift.copy_to_table(
-            s3_key, target_schema, table, size_bytes, is_temporary=True
+        # Load every file part into Redshift table with one COPY
+        redshift.copy_parts_to_table(
+            s3_keys,
+            target_schema,
+            table,
+            size_bytes,
+            is_temporary=True,
+            key_sizes=key_sizes,
+            codec=codec,
+            export_format=export_format,
         )
 
         # Obfuscate columns
@@ -167,6 +206,24 @@ def main_impl():
     redshift = FastSyncTargetRedshift(args.target, args.transform)
     redshift.create_schemas(args.tables)
 
+    # Get the number of slices once, the export of every table is split into a multiple of it
+    try:
+        args.slice_count = redshift.get_slice_count()
+    except Exception as exc:
+        LOGGER.warning('Cannot get the number of slices, exporting every table into one file: %s', exc)
+        args.slice_count = None
+
+    # Get the columns and primary keys of every table in bulk and share them with the sync
+    # processes, so they do not need to query the metadata of the tables one by one
+    try:
+        mysql = FastSyncTapMySql(args.tap, tap_type_to_target_type)
+        mysql.open_connections()
+        args.catalog = mysql.prefetch_catalog(args.tables)
+        mysql.close_connections()
+    except Exception as exc:
+        LOGGER.warning('Cannot prefetch the catalog, querying the tables one by one: %s', exc)
+        args.catalog = None
+
     # Start loading tables in parallel in spawning processes
     with multiprocessing.Pool(pool_size) as proc:
         table_sync_excs = list(
@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 import os
 import sys
-import glob
 import re
 from functools import partial
 from argparse import Namespace
@@ -10,9 +9,10 @@ from typing import Union
 
 from datetime import datetime
 from ..logger import Logger
-from .commons import utils
+from .commons import split_parquet, utils
 from .commons.tap_mysql import FastSyncTapMySql
 from .commons.target_snowflake import FastSyncTargetSnowflake
+from .commons.uploader import BackgroundUploader
 
 LOGGER = Logger().get_logger(__name__)
 
@@ -81,13 +81,22 @@ def tap_type_to_target_type(mysql_type, mysql_column_type):
 # pylint: disable=too-many-locals
 def sync_table(table: str, args: Namespace) -> Union[bool, str]:
     """Sync one table"""
-    mysql = FastSyncTapMySql(args.tap, tap_type_to_target_type)
-    snowflake = FastSyncTargetSnowflake(args.target, args.transform)
+    mysql = FastSyncTapMySql(
+        args.tap,
+        tap_type_to_target_type,
+        catalog=getattr(args, 'catalog', None),
+        transformation_config=args.transform,
+        hash_encoding=FastSyncTargetSnowflake.HASH_ENCODING,
+        regex_match=FastSyncTargetSnowflake.REGEX_MATCH,
+    )
+    snowflake = FastSyncTargetSnowflake(args.target)
     tap_id = args.target.get('tap_id')
     archive_load_files = args.target.get('archive_load_files', False)
 
     try:
-        filename = utils.gen_export_filename(tap_id=tap_id, table=table)
+        codec = utils.negotiate_export_codec(FastSyncTargetSnowflake.EXPORT_CODECS, args.tap.get('export_codec'))
+        export_format = args.tap.get('export_format', split_parquet.EXPORT_FORMAT_CSV)
+        filename = utils.gen_export_filename(tap_id=tap_id, table=table, codec=codec, export_format=export_format)
         filepath = os.path.join(args.temp_dir, filename)
         target_schema = utils.get_target_schema(args.target, table)
 
@@ -97,30 +106,31 @@ def sync_table(table: str, args: Namespace) -> Union[bool, str]:
         # Get bookmark - Binlog position or Incremental Key value
         bookmark = utils.get_bookmark_for_table(table, args.properties, mysql)
 
-        # Exporting table data, get table definitions and close connection to avoid timeouts
-        mysql.copy_table(
-            table,
-            filepath,
-            split_large_files=args.target.get('split_large_files'),
-            split_file_chunk_size_mb=args.target.get('split_file_chunk_size_mb'),
-            split_file_max_chunks=args.target.get('split_file_max_chunks'),
-        )
-        file_parts = glob.glob(f'{filepath}*')
-        size_bytes = sum([os.path.getsize(file_part) for file_part in file_parts])
-        snowflake_types = mysql.map_column_types_to_target(table)
-        snowflake_columns = snowflake_types.get('columns', [])
-        primary_key = snowflake_types.get('primary_key')
-        mysql.close_connections()
+        # Exporting table data while uploading the finished file parts to S3 in the background,
+        # get table definitions and close connection to avoid timeouts
+        with BackgroundUploader.from_config(snowflake.upload_to_s3, args.target) as uploader:
+            mysql.copy_table(
+                table,
+                filepath,
+                split_large_files=args.target.get('split_large_files'),
+                split_file_chunk_size_mb=args.target.get('split_file_chunk_size_mb'),
+                split_file_max_chunks=args.target.get('split_file_max_chunks'),
+                on_chunk_closed=uploader.submit,
+                codec=codec,
+                export_format=export_format,
+            )
+            snowflake_types = mysql.map_column_types_to_target(table)
+            snowflake_columns = snowflake_types.get('columns', [])
+            primary_key = snowflake_types.get('primary_key')
+            mysql.close_connections()
 
-        # Uploading to S3
-        s3_keys = []
-        for file_part in file_parts:
-            s3_keys.append(snowflake.upload_to_s3(file_part, tmp_dir=args.temp_dir))
-            os.remove(file_part)
+            # Wait for the remaining file parts to be uploaded to S3
+            s3_keys = uploader.wait()
+            size_bytes = uploader.size_bytes
 
         # Create a pattern that match all file parts by removing multipart suffix
         s3_key_pattern = (
-            re.sub(r'\.part\d*$', '', s3_keys[0])
+            re.sub(r'(\.part\d+)+$', '', s3_keys[0])
             if len(s3_keys) > 0
             else 'NO_FILES_TO_LOAD'
         )
@@ -133,7 +143,13 @@ def sync_table(table: str, args: Namespace) -> Union[bool, str]:
 
         # Load into Snowflake table
         snowflake.copy_to_table(
-            s3_key_pattern, target_schema, table, size_bytes, is_temporary=True
+            s3_key_pattern,
+            target_schema,
+            table,
+            size_bytes,
+            is_temporary=True,
+            codec=codec,
+            export_format=export_format,
         )
 
         for s3_key in s3_keys:
@@ -194,6 +210,17 @@ def main_impl():
         pool_size,
     )
 
+    # Get the columns and primary keys of every table in bulk and share them with the sync
+    # processes, so they do not need to query the metadata of the tables one by one
+    try:
+        mysql = FastSyncTapMySql(args.tap, tap_type_to_target_type)
+        mysql.open_connections()
+        args.catalog = mysql.prefetch_catalog(args.tables)
+        mysql.close_connections()
+    except Exception as exc:
+        LOGGER.warning('Cannot prefetch the catalog, querying the tables one by one: %s', exc)
+        args.catalog = None
+
     # Start loading tables in parallel in spawning processes
     with multiprocessing.Pool(pool_size) as proc:
         table_sync_excs = list(
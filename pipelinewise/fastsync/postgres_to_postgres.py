@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import os
 import sys
+import glob
 import multiprocessing
 
 from functools import partial
@@ -9,7 +10,7 @@ from typing import Union
 from datetime import datetime
 
 from ..logger import Logger
-from .commons import utils
+from .commons import stream_buffer, utils
 from .commons.tap_postgres import FastSyncTapPostgres
 from .commons.target_postgres import FastSyncTargetPostgres
 
@@ -67,15 +68,17 @@ def tap_type_to_target_type(pg_type, *_):
     }.get(pg_type, 'CHARACTER VARYING')
 
 
+# pylint: disable=too-many-locals
 def sync_table(table: str, args: Namespace) -> Union[bool, str]:
     """Sync one table"""
-    postgres = FastSyncTapPostgres(args.tap, tap_type_to_target_type)
+    postgres = FastSyncTapPostgres(args.tap, tap_type_to_target_type, catalog=getattr(args, 'catalog', None))
     postgres_target = FastSyncTargetPostgres(args.target, args.transform)
 
     try:
         dbname = args.tap.get('dbname')
+        codec = utils.negotiate_export_codec(FastSyncTargetPostgres.EXPORT_CODECS, args.tap.get('export_codec'))
         filename = utils.gen_export_filename(
-            tap_id=args.target.get('tap_id'), table=table
+            tap_id=args.target.get('tap_id'), table=table, codec=codec
         )
         filepath = os.path.join(args.temp_dir, filename)
         target_schema = utils.get_target_schema(args.target, table)
@@ -88,14 +91,10 @@ def sync_table(table: str, args: Namespace) -> Union[bool, str]:
             table, args.properties, postgres, dbname=dbname
         )
 
-        # Exporting table data, get table definitions and close connection to avoid timeouts
-        postgres.copy_table(table, filepath)
+        # Get table definitions and create temp table in Postgres
         postgres_target_types = postgres.map_column_types_to_target(table)
         postgres_target_columns = postgres_target_types.get('columns', [])
         primary_key = postgres_target_types.get('primary_key')
-        postgres.close_connection()
-
-        # Creating temp table in Postgres
         postgres_target.drop_table(target_schema, table, is_temporary=True)
         postgres_target.create_table(
             target_schema,
@@ -105,20 +104,46 @@ def sync_table(table: str, args: Namespace) -> Union[bool, str]:
             is_temporary=True,
         )
 
-        # if table is empty, then there is no exported file at filepath
-        if os.path.exists(filepath):
-            size_bytes = os.path.getsize(filepath)
+        if args.tap.get('export_streaming'):
+            # Stream table data directly from the source COPY into the temp table without any file
+            stream_buffer.transfer(
+                partial(postgres.stream_table, table),
+                partial(
+                    postgres_target.copy_from_file, target_schema=target_schema, table_name=table, is_temporary=True
+                ),
+                args.tap.get('export_stream_buffer_mb'),
+            )
+            postgres.close_connection()
+        else:
+            # Exporting table data and close connection to avoid timeouts
+            postgres.copy_table(
+                table,
+                filepath,
+                split_large_files=args.target.get('split_large_files'),
+                split_file_chunk_size_mb=args.target.get('split_file_chunk_size_mb'),
+                split_file_max_chunks=args.target.get('split_file_max_chunks'),
+                codec=codec,
+            )
+            postgres.close_connection()
+
+            # if table is empty, then there is no exported file at filepath
+            file_parts = glob.glob(f'{filepath}*')
+            if not file_parts:
+                LOGGER.warning('Not export file has been generated, this is likely due to table being empty')
+            size_bytes = sum([os.path.getsize(file_part) for file_part in file_parts])
 
-            # Load into Postgres table
-            postgres_target.copy_to_table(
-                filepath, target_schema, table, size_bytes, is_temporary=True
+            # Load the file parts into Postgres table over multiple connections
+            postgres_target.copy_parts_to_table(
+                file_parts, target_schema, table, size_bytes, is_temporary=True, codec=codec
             )
-            os.remove(filepath)
+            for file_part in file_parts:
+                os.remove(file_part)
 
-            # Obfuscate columns
-            postgres_target.obfuscate_columns(target_schema, table, is_temporary=True)
-        else:
-            LOGGER.warning('Not export file has been generated, this is likely due to table being empty')
+        # Obfuscate columns
+        postgres_target.obfuscate_columns(target_schema, table, is_temporary=True)
+
+        # Build the primary key and make the temp table durable after bulk loads
+        postgres_target.finish_bulk_load(target_schema, table, primary_key)
 
         # Create target table and swap with the temp table in Postgres
         postgres_target.swap_tables(target_schema, table)
@@ -178,6 +203,17 @@ def main_impl():
     postgres_target = FastSyncTargetPostgres(args.target, args.transform)
     postgres_target.create_schemas(args.tables)
 
+    # Get the columns and primary keys of every table in bulk and share them with the sync
+    # processes, so they do not need to query the metadata of the tables one by one
+    try:
+        postgres = FastSyncTapPostgres(args.tap, tap_type_to_target_type)
+        postgres.open_connection()
+        args.catalog = postgres.prefetch_catalog(args.tables)
+        postgres.close_connection()
+    except Exception as exc:
+        LOGGER.warning('Cannot prefetch the catalog, querying the tables one by one: %s', exc)
+        args.catalog = None
+
     # Start loading tables in parallel in spawning processes
     with multiprocessing.Pool(pool_size) as proc:
         table_sync_excs = list(
@@ -12,6 +12,7 @@ from ..logger import Logger
 from .commons import utils
 from .commons.tap_postgres import FastSyncTapPostgres
 from .commons.target_redshift import FastSyncTargetRedshift
+from .commons.uploader import BackgroundUploader
 
 LOGGER = Logger().get_logger(__name__)
 
@@ -67,13 +68,14 @@ def tap_type_to_target_type(pg_type, *_):
 # pylint: disable=too-many-locals
 def sync_table(table: str, args: Namespace) -> Union[bool, str]:
     """Sync one table"""
-    postgres = FastSyncTapPostgres(args.tap, tap_type_to_target_type)
+    postgres = FastSyncTapPostgres(args.tap, tap_type_to_target_type, catalog=getattr(args, 'catalog', None))
     redshift = FastSyncTargetRedshift(args.target, args.transform)
 
     try:
         dbname = args.tap.get('dbname')
+        codec = utils.negotiate_export_codec(FastSyncTargetRedshift.EXPORT_CODECS, args.tap.get('export_codec'))
         filename = utils.gen_export_filename(
-            tap_id=args.target.get('tap_id'), table=table
+            tap_id=args.target.get('tap_id'), table=table, codec=codec
         )
         filepath = os.path.join(args.temp_dir, filename)
         target_schema = utils.get_target_schema(args.target, table)
@@ -86,17 +88,31 @@ def sync_table(table: str, args: Namespace) -> Union[bool, str]:
             table, args.properties, postgres, dbname=dbname
         )
 
-        # Exporting table data, get table definitions and close connection to avoid timeouts
-        postgres.copy_table(table, filepath)
-        size_bytes = os.path.getsize(filepath)
-        redshift_types = postgres.map_column_types_to_target(table)
-        redshift_columns = redshift_types.get('columns', [])
-        primary_key = redshift_types.get('primary_key')
-        postgres.close_connection()
+        # Split the export into evenly sized file parts, as many as a multiple of the slices
+        split_args = {}
+        if getattr(args, 'slice_count', None):
+            split_args = utils.get_slice_aligned_split(
+                args.slice_count,
+                postgres.get_table_size(table),
+                max_chunk_size_mb=args.target.get('split_file_chunk_size_mb'),
+                codec=codec,
+                min_chunks=args.tap.get('export_parallelism') or 1,
+            )
 
-        # Uploading to S3
-        s3_key = redshift.upload_to_s3(filepath)
-        os.remove(filepath)
+        # Exporting table data while uploading the finished file parts to S3 in the background,
+        # get table definitions and close connection to avoid timeouts
+        with BackgroundUploader.from_config(redshift.upload_to_s3, args.target) as uploader:
+            postgres.copy_table(table, filepath, on_chunk_closed=uploader.submit, codec=codec, **split_args)
+            redshift_types = postgres.map_column_types_to_target(table)
+            redshift_columns = redshift_types.get('columns', [])
+            primary_key = redshift_types.get('primary_key')
+            postgres.close_connection()
+
+            # Wait for the remaining file parts to be uploaded to S3
+            s3_keys = uploader.wait()
+            size_bytes = uploader.size_bytes
+            key_sizes = uploader.key_sizes
+        utils.log_split_part_sizes(table, split_args, key_sizes)
 
         # Creating temp table in Redshift
         redshift.drop_table(target_schema, table, is_temporary=True)
@@ -104,9 +120,9 @@ def sync_table(table: str, args: Namespace) -> Union[bool, str]:
             target_schema, table, redshift_columns, primary_key, is_temporary=True
         )
 
-        # Load into Redshift table
-        redshift.copy_to_table(
-            s3_key, target_schema, table, size_bytes, is_temporary=True
+        # Load every file part into Redshift table with one COPY
+        redshift.copy_parts_to_table(
+            s3_keys, target_schema, table, size_bytes, is_temporary=True, key_sizes=key_sizes, codec=codec
         )
 
         # Obfuscate columns
@@ -166,6 +182,24 @@ def main_impl():
     redshift = FastSyncTargetRedshift(args.target, args.transform)
     redshift.create_schemas(args.tables)
 
+    # Get the number of slices once, the export of every table is split into a multiple of it
+    try:
+        args.slice_count = redshift.get_slice_count()
+    except Exception as exc:
+        LOGGER.warning('Cannot get the number of slices, exporting every table into one file: %s', exc)
+        args.slice_count = None
+
+    # Get the columns and primary keys of every table in bulk and share them with the sync
+    # processes, so they do not need to query the metadata of the tables one by one
+    try:
+        postgres = FastSyncTapPostgres(args.tap, tap_type_to_target_type)
+        postgres.open_connection()
+        args.catalog = postgres.prefetch_catalog(args.tables)
+        postgres.close_connection()
+    except Exception as exc:
+        LOGGER.warning('Cannot prefetch the catalog, querying the tables one by one: %s', exc)
+        args.catalog = None
+
     # Start loading tables in parallel in spawning processes
     with multiprocessing.Pool(pool_size) as proc:
         table_sync_excs = list(
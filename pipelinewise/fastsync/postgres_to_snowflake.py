@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 import os
 import sys
-import glob
 import re
 import multiprocessing
 
@@ -14,6 +13,7 @@ from ..logger import Logger
 from .commons import utils
 from .commons.tap_postgres import FastSyncTapPostgres
 from .commons.target_snowflake import FastSyncTargetSnowflake
+from .commons.uploader import BackgroundUploader
 
 LOGGER = Logger().get_logger(__name__)
 
@@ -81,14 +81,15 @@ def tap_type_to_target_type(pg_type, *_):
 # pylint: disable=too-many-locals
 def sync_table(table: str, args: Namespace) -> Union[bool, str]:
     """Sync one table"""
-    postgres = FastSyncTapPostgres(args.tap, tap_type_to_target_type)
+    postgres = FastSyncTapPostgres(args.tap, tap_type_to_target_type, catalog=getattr(args, 'catalog', None))
     snowflake = FastSyncTargetSnowflake(args.target, args.transform)
     tap_id = args.target.get('tap_id')
     archive_load_files = args.target.get('archive_load_files', False)
 
     try:
         dbname = args.tap.get('dbname')
-        filename = utils.gen_export_filename(tap_id=tap_id, table=table)
+        codec = utils.negotiate_export_codec(FastSyncTargetSnowflake.EXPORT_CODECS, args.tap.get('export_codec'))
+        filename = utils.gen_export_filename(tap_id=tap_id, table=table, codec=codec)
         filepath = os.path.join(args.temp_dir, filename)
         target_schema = utils.get_target_schema(args.target, table)
 
@@ -100,30 +101,30 @@ def sync_table(table: str, args: Namespace) -> Union[bool, str]:
             table, args.properties, postgres, dbname=dbname
         )
 
-        # Exporting table data, get table definitions and close connection to avoid timeouts
-        postgres.copy_table(
-            table,
-            filepath,
-            split_large_files=args.target.get('split_large_files'),
-            split_file_chunk_size_mb=args.target.get('split_file_chunk_size_mb'),
-            split_file_max_chunks=args.target.get('split_file_max_chunks'),
-        )
-        file_parts = glob.glob(f'{filepath}*')
-        size_bytes = sum([os.path.getsize(file_part) for file_part in file_parts])
-        snowflake_types = postgres.map_column_types_to_target(table)
-        snowflake_columns = snowflake_types.get('columns', [])
-        primary_key = snowflake_types.get('primary_key')
-        postgres.close_connection()
+        # Exporting table data while uploading the finished file parts to S3 in the background,
+        # get table definitions and close connection to avoid timeouts
+        with BackgroundUploader.from_config(snowflake.upload_to_s3, args.target) as uploader:
+            postgres.copy_table(
+                table,
+                filepath,
+                split_large_files=args.target.get('split_large_files'),
+                split_file_chunk_size_mb=args.target.get('split_file_chunk_size_mb'),
+                split_file_max_chunks=args.target.get('split_file_max_chunks'),
+                on_chunk_closed=uploader.submit,
+                codec=codec,
+            )
+            snowflake_types = postgres.map_column_types_to_target(table)
+            snowflake_columns = snowflake_types.get('columns', [])
+            primary_key = snowflake_types.get('primary_key')
+            postgres.close_connection()
 
-        # Uploading to S3
-        s3_keys = []
-        for file_part in file_parts:
-            s3_keys.append(snowflake.upload_to_s3(file_part, tmp_dir=args.temp_dir))
-            os.remove(file_part)
+            # Wait for the remaining file parts to be uploaded to S3
+            s3_keys = uploader.wait()
+            size_bytes = uploader.size_bytes
 
         # Create a pattern that match all file parts by removing multipart suffix
         s3_key_pattern = (
-            re.sub(r'\.part\d*$', '', s3_keys[0])
+            re.sub(r'(\.part\d+)+$', '', s3_keys[0])
             if len(s3_keys) > 0
             else 'NO_FILES_TO_LOAD'
         )
@@ -136,7 +137,7 @@ def sync_table(table: str, args: Namespace) -> Union[bool, str]:
 
         # Load into Snowflake table
         snowflake.copy_to_table(
-            s3_key_pattern, target_schema, table, size_bytes, is_temporary=True
+            s3_key_pattern, target_schema, table, size_bytes, is_temporary=True, codec=codec
         )
 
         for s3_key in s3_keys:
@@ -201,6 +202,17 @@ def main_impl():
     if args.drop_pg_slot:
         FastSyncTapPostgres.drop_slot(args.tap)
 
+    # Get the columns and primary keys of every table in bulk and share them with the sync
+    # processes, so they do not need to query the metadata of the tables one by one
+    try:
+        postgres = FastSyncTapPostgres(args.tap, tap_type_to_target_type)
+        postgres.open_connection()
+        args.catalog = postgres.prefetch_catalog(args.tables)
+        postgres.close_connection()
+    except Exception as exc:
+        LOGGER.warning('Cannot prefetch the catalog, querying the tables one by one: %s', exc)
+        args.catalog = None
+
     # Start loading tables in parallel in spawning processes
     with multiprocessing.Pool(pool_size) as proc:
         table_sync_excs = list(
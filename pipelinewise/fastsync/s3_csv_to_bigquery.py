@@ -40,8 +40,16 @@ def tap_type_to_target_type(csv_type, *_):
 
 def sync_table(table_name: str, args: Namespace) -> Union[bool, str]:
     """Sync one table"""
-    s3_csv = FastSyncTapS3Csv(args.tap, tap_type_to_target_type, target_quote='`')
-    bigquery = FastSyncTargetBigquery(args.target, args.transform)
+    s3_csv = FastSyncTapS3Csv(
+        args.tap,
+        tap_type_to_target_type,
+        target_quote='`',
+        state_file=args.state,
+        transformation_config=args.transform,
+        hash_encoding=FastSyncTargetBigquery.HASH_ENCODING,
+        regex_match=FastSyncTargetBigquery.REGEX_MATCH,
+    )
+    bigquery = FastSyncTargetBigquery(args.target)
 
     try:
         filename = utils.gen_export_filename(
@@ -81,8 +89,7 @@ def sync_table(table_name: str, args: Namespace) -> Union[bool, str]:
         # Obfuscate columns
         bigquery.obfuscate_columns(target_schema, table_name)
 
-        # Create target table and swap with the temp table in Bigquery
-        bigquery.create_table(target_schema, table_name, bigquery_columns)
+        # Replace the target table with the temp table in Bigquery
         bigquery.swap_tables(target_schema, table_name)
 
         # Get bookmark
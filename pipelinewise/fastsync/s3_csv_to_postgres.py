@@ -37,8 +37,15 @@ def tap_type_to_target_type(csv_type, *_):
 
 def sync_table(table_name: str, args: Namespace) -> Union[bool, str]:
     """Sync one table"""
-    s3_csv = FastSyncTapS3Csv(args.tap, tap_type_to_target_type)
-    postgres = FastSyncTargetPostgres(args.target, args.transform)
+    s3_csv = FastSyncTapS3Csv(
+        args.tap,
+        tap_type_to_target_type,
+        state_file=args.state,
+        transformation_config=args.transform,
+        hash_encoding=FastSyncTargetPostgres.HASH_ENCODING,
+        regex_match=FastSyncTargetPostgres.REGEX_MATCH,
+    )
+    postgres = FastSyncTargetPostgres(args.target)
 
     try:
         filename = utils.gen_export_filename(
@@ -80,6 +87,9 @@ def sync_table(table_name: str, args: Namespace) -> Union[bool, str]:
         # Obfuscate columns
         postgres.obfuscate_columns(target_schema, table_name, is_temporary=True)
 
+        # Build the primary key and make the temp table durable after bulk loads
+        postgres.finish_bulk_load(target_schema, table_name, primary_key)
+
         # Create target table and swap with the temp table in Postgres
         postgres.swap_tables(target_schema, table_name)
 
@@ -37,8 +37,15 @@ def tap_type_to_target_type(csv_type, *_):
 
 def sync_table(table_name: str, args: Namespace) -> Union[bool, str]:
     """Sync one table"""
-    s3_csv = FastSyncTapS3Csv(args.tap, tap_type_to_target_type)
-    redshift = FastSyncTargetRedshift(args.target, args.transform)
+    s3_csv = FastSyncTapS3Csv(
+        args.tap,
+        tap_type_to_target_type,
+        state_file=args.state,
+        transformation_config=args.transform,
+        hash_encoding=FastSyncTargetRedshift.HASH_ENCODING,
+        regex_match=FastSyncTargetRedshift.REGEX_MATCH,
+    )
+    redshift = FastSyncTargetRedshift(args.target)
 
     try:
         filename = utils.gen_export_filename(
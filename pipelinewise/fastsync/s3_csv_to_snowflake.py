@@ -47,8 +47,15 @@ def tap_type_to_target_type(csv_type, *_):
 
 def sync_table(table_name: str, args: Namespace) -> Union[bool, str]:
     """Sync one table"""
-    s3_csv = FastSyncTapS3Csv(args.tap, tap_type_to_target_type)
-    snowflake = FastSyncTargetSnowflake(args.target, args.transform)
+    s3_csv = FastSyncTapS3Csv(
+        args.tap,
+        tap_type_to_target_type,
+        state_file=args.state,
+        transformation_config=args.transform,
+        hash_encoding=FastSyncTargetSnowflake.HASH_ENCODING,
+        regex_match=FastSyncTargetSnowflake.REGEX_MATCH,
+    )
+    snowflake = FastSyncTargetSnowflake(args.target)
 
     try:
         filename = utils.gen_export_filename(
@@ -66,7 +73,7 @@ def sync_table(table_name: str, args: Namespace) -> Union[bool, str]:
         primary_key = snowflake_types['primary_key']
 
         # Uploading to S3
-        s3_key = snowflake.upload_to_s3(filepath, tmp_dir=args.temp_dir)
+        s3_key = snowflake.upload_to_s3(filepath)
         os.remove(filepath)
 
         # Creating temp table in Snowflake
@@ -0,0 +1,177 @@
+"""
+Micro-benchmark of the MongoDB document serialization of FastSync.
+
+Compares the documents per second of the current serializer of tap_mongodb with the previous
+implementation, that rebuilt the conversion table and the path of every value on each call
+and wrote the csv rows as dicts. Both implementations are checked to produce the same csv.
+
+Usage:
+    python scripts/benchmark_mongodb_serializer.py [--documents 20000] [--rounds 3]
+"""
+import argparse
+import base64
+import csv
+import datetime
+import io
+import random
+import time
+import uuid
+
+import bson
+import pytz
+import tzlocal
+import ujson
+from singer.utils import strftime as singer_strftime
+
+from pipelinewise.fastsync.commons import tap_mongodb
+
+COLUMNS = ['_ID', 'DOCUMENT', '_SDC_EXTRACTED_AT', '_SDC_BATCHED_AT', '_SDC_DELETED_AT']
+
+
+def legacy_class_to_string(key_value, key_type):
+    """Previous conversion of the values to string"""
+    if key_type == 'datetime':
+        if key_value.tzinfo is None:
+            timezone = tzlocal.get_localzone()
+            utc_datetime = timezone.localize(key_value).astimezone(pytz.UTC)
+        else:
+            utc_datetime = key_value.astimezone(pytz.UTC)
+        return singer_strftime(utc_datetime)
+    if key_type == 'bytes':
+        return base64.b64encode(key_value).decode('utf-8')
+    return str(key_value)
+
+
+def legacy_transform_value(value, path):
+    """Previous conversion of the values to json friendly ones"""
+    conversion = {
+        list: lambda val, pat: list(
+            map(lambda v: legacy_transform_value(v[1], pat + [v[0]]), enumerate(val))
+        ),
+        dict: lambda val, pat: {
+            k: legacy_transform_value(v, pat + [k]) for k, v in val.items()
+        },
+        uuid.UUID: lambda val, _: legacy_class_to_string(val, 'UUID'),
+        bson.objectid.ObjectId: lambda val, _: legacy_class_to_string(val, 'ObjectId'),
+        bson.timestamp.Timestamp: lambda val, _: singer_strftime(val.as_datetime()),
+        bson.int64.Int64: lambda val, _: legacy_class_to_string(val, 'Int64'),
+        bytes: lambda val, _: legacy_class_to_string(val, 'bytes'),
+        datetime.datetime: lambda val, _: legacy_class_to_string(val, 'datetime'),
+        bson.decimal128.Decimal128: lambda val, _: val.to_decimal(),
+        bson.regex.Regex: lambda val, _: dict(pattern=val.pattern, flags=val.flags),
+        bson.code.Code: lambda val, _: dict(value=str(val), scope=str(val.scope))
+        if val.scope
+        else str(val),
+        bson.dbref.DBRef: lambda val, _: dict(
+            id=str(val.id), collection=val.collection, database=val.database
+        ),
+    }
+
+    if isinstance(value, tuple(conversion.keys())):
+        return conversion[type(value)](value, path)
+
+    return value
+
+
+def legacy_export(documents, extracted_at):
+    """Previous serialization of the documents into csv"""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=COLUMNS)
+    writer.writeheader()
+    rows = []
+    for document in documents:
+        rows.append(
+            {
+                '_ID': str(document['_id']),
+                'DOCUMENT': ujson.dumps(
+                    {
+                        key: legacy_transform_value(val, [key])
+                        for key, val in document.items()
+                        if not isinstance(val, (bson.min_key.MinKey, bson.max_key.MaxKey))
+                    }
+                ),
+                '_SDC_EXTRACTED_AT': extracted_at,
+                '_SDC_BATCHED_AT': extracted_at,
+                '_SDC_DELETED_AT': None,
+            }
+        )
+    writer.writerows(rows)
+    return output.getvalue()
+
+
+def current_export(documents, extracted_at):
+    """Current serialization of the documents into csv"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(COLUMNS)
+    writer.writerows(
+        (
+            str(document['_id']),
+            ujson.dumps(tap_mongodb.serialize_document(document)),
+            extracted_at,
+            extracted_at,
+            None,
+        )
+        for document in documents
+    )
+    return output.getvalue()
+
+
+def generate_document(rnd):
+    """Generate a document with nested values of every supported type"""
+    return {
+        '_id': bson.ObjectId(),
+        'name': ''.join(rnd.choice('abcdefghij') for _ in range(20)),
+        'amount': rnd.random() * 1000,
+        'count': rnd.randint(0, 1000),
+        'big_count': bson.int64.Int64(rnd.randint(0, 1 << 40)),
+        'price': bson.Decimal128(f'{rnd.randint(0, 100000) / 100}'),
+        'active': rnd.random() > 0.5,
+        'created_at': datetime.datetime(2020, 1, 1) + datetime.timedelta(seconds=rnd.randint(0, 10 ** 8)),
+        'updated_at': bson.timestamp.Timestamp(rnd.randint(10 ** 9, 2 * 10 ** 9), 1),
+        'uuid': uuid.UUID(int=rnd.getrandbits(128)),
+        'binary': b'binary data',
+        'missing': None,
+        'min_key': bson.min_key.MinKey(),
+        'address': {'street': 'Main street', 'number': rnd.randint(1, 100), 'geo': [rnd.random(), rnd.random()]},
+        'tags': ['tag_{}'.format(i) for i in range(5)],
+        'events': [
+            {'at': datetime.datetime(2021, 1, 1) + datetime.timedelta(days=i), 'ref': bson.ObjectId()}
+            for i in range(3)
+        ],
+    }
+
+
+def benchmark(export_fn, documents, rounds):
+    """Best documents per second of a few rounds"""
+    best = None
+    for _ in range(rounds):
+        started_at = time.perf_counter()
+        export_fn(documents, '2021-01-01 00:00:00.000000')
+        elapsed = time.perf_counter() - started_at
+        best = elapsed if best is None else min(best, elapsed)
+    return len(documents) / best
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=20000)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    documents = [generate_document(rnd) for _ in range(args.documents)]
+
+    if legacy_export(documents[:100], 'x') != current_export(documents[:100], 'x'):
+        raise SystemExit('Serializers produce different csv')
+
+    legacy = benchmark(legacy_export, documents, args.rounds)
+    current = benchmark(current_export, documents, args.rounds)
+    print(f'Local timezone: {tap_mongodb.get_local_timezone()}')
+    print(f'Previous serializer: {legacy:10.0f} documents/s')
+    print(f'Current serializer:  {current:10.0f} documents/s ({current / legacy:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -39,6 +39,8 @@ setup(name='pipelinewise',
           'psutil==5.8.0',
           'ujson==5.1.0',
           'dnspython==2.1.*',
+          'zstandard==0.17.0',
+          'pyarrow>=3.0.0,<3.1.0',
       ],
       extras_require={
           'test': [
@@ -727,6 +727,19 @@ tap_three  tap-mysql     target_two   target-s3-csv     True       not-configure
         with pytest.raises(InvalidTransformationException):
             pipelinewise.validate()
 
+    def test_validate_command_6(self):
+        """
+        Test validate command should pass with transformation on json properties for a tap whose Fastsync
+        transforms the exported rows
+        """
+        test_validate_command_dir = \
+            f'{os.path.dirname(__file__)}/resources/test_validate_command/json_transformation_in_fastsync_mysql'
+
+        args = CliArgs(dir=test_validate_command_dir)
+        pipelinewise = PipelineWise(args, CONFIG_DIR, VIRTUALENVS_DIR)
+
+        pipelinewise.validate()
+
     # pylint: disable=protected-access
     def test_post_import_checks(self):
         """Test post import checks"""
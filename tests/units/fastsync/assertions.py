@@ -235,3 +235,37 @@ def assert_main_impl_should_exit_with_error_on_failure(
                                 }
                             )
                             multiproc_mock.Pool.assert_called_once_with(10)
+
+
+# pylint: disable=missing-function-docstring,unused-variable,invalid-name
+def assert_sync_table_loads_every_nested_file_part(
+    sync_table: callable, package_nm: str, tap_class_nm: str, target_class_nm: str
+) -> None:
+    """
+    Tests if fastsync sync table function loads the file parts of every range of a parallel
+    export, named <path>.partNNNNN.partNNN, before deleting them from S3
+    """
+    objects_to_mock = _create_object_names_to_mock(
+        package_nm, tap_class_nm, target_class_nm
+    )
+    s3_keys = [
+        'pipelinewise_table_1.csv.gz.part00001.part001',
+        'pipelinewise_table_1.csv.gz.part00000.part001',
+        'pipelinewise_table_1.csv.gz.part00000.part002',
+    ]
+
+    with patch(objects_to_mock.full_tap_class_nm):
+        with patch(objects_to_mock.full_target_class_nm) as target_mock:
+            with patch(objects_to_mock.utils_module_nm):
+                with patch(objects_to_mock.multiproc_module_nm):
+                    with patch(objects_to_mock.os_module_nm):
+                        with patch(f'{package_nm}.BackgroundUploader') as uploader_mock:
+                            uploader = uploader_mock.from_config.return_value.__enter__.return_value
+                            uploader.wait.return_value = s3_keys
+
+                            assert sync_table('table_1', FASTSYNC_NS) is True
+
+                            copy_to_table = target_mock.return_value.copy_to_table
+                            assert copy_to_table.call_count == 1
+                            assert copy_to_table.call_args[0][0] == 'pipelinewise_table_1.csv.gz'
+                            assert target_mock.return_value.s3.delete_object.call_count == len(s3_keys)
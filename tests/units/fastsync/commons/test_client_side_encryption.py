@@ -0,0 +1,82 @@
+import base64
+import io
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from snowflake.connector.encryption_util import EncryptionMetadata, SnowflakeEncryptionUtil
+from snowflake.connector.remote_storage_util import SnowflakeFileEncryptionMaterial
+
+from pipelinewise.fastsync.commons.client_side_encryption import EncryptingReader
+
+MASTER_KEY = base64.b64encode(b'0123456789abcdef0123456789abcdef').decode('utf-8')
+
+
+class TestEncryptingReader(TestCase):
+    """
+    Unit tests for EncryptingReader
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _decrypt(self, encrypted, metadata):
+        encrypted_path = os.path.join(self.temp_dir, 'encrypted')
+        with open(encrypted_path, 'wb') as encrypted_file:
+            encrypted_file.write(encrypted)
+
+        decrypted_path = SnowflakeEncryptionUtil.decrypt_file(
+            EncryptionMetadata(key=metadata['x-amz-key'], iv=metadata['x-amz-iv'], matdesc=None),
+            SnowflakeFileEncryptionMaterial(query_stage_master_key=MASTER_KEY, query_id='', smk_id=0),
+            encrypted_path,
+            tmp_dir=self.temp_dir,
+        )
+        with open(decrypted_path, 'rb') as decrypted_file:
+            return decrypted_file.read()
+
+    def test_encrypted_content_can_be_decrypted_by_snowflake(self):
+        """
+        Content read in chunks should be decrypted by the Snowflake connector to the original content
+        """
+        for size in [0, 15, 16, 1000, 100003]:
+            content = os.urandom(size)
+            reader = EncryptingReader(io.BytesIO(content), MASTER_KEY, read_size=1000)
+
+            chunks = []
+            while True:
+                chunk = reader.read(4096)
+                if not chunk:
+                    break
+                self.assertLessEqual(len(chunk), 4096)
+                chunks.append(chunk)
+
+            encrypted = b''.join(chunks)
+            self.assertEqual(len(encrypted), (size // 16 + 1) * 16)
+            self.assertEqual(self._decrypt(encrypted, reader.get_metadata()), content)
+
+    def test_read_all(self):
+        """
+        Reading without size should return the whole encrypted content
+        """
+        reader = EncryptingReader(io.BytesIO(b'a,b\n1,2\n'), MASTER_KEY)
+
+        encrypted = reader.read()
+
+        self.assertEqual(len(encrypted), 16)
+        self.assertEqual(reader.read(), b'')
+        self.assertFalse(reader.seekable())
+        self.assertEqual(self._decrypt(encrypted, reader.get_metadata()), b'a,b\n1,2\n')
+
+    def test_random_file_key(self):
+        """
+        Every file should be encrypted with a new file key and IV
+        """
+        first = EncryptingReader(io.BytesIO(b'data'), MASTER_KEY)
+        second = EncryptingReader(io.BytesIO(b'data'), MASTER_KEY)
+
+        self.assertNotEqual(first.get_metadata(), second.get_metadata())
+        self.assertNotEqual(first.read(), second.read())
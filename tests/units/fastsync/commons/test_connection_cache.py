@@ -0,0 +1,96 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, Mock, patch
+
+from pipelinewise.fastsync.commons import connection_cache
+from pipelinewise.fastsync.commons.target_postgres import FastSyncTargetPostgres
+
+
+class TestConnectionCache(TestCase):
+    """
+    Unit tests for the target connections reused by a process
+    """
+
+    def setUp(self):
+        self.connect = Mock(side_effect=lambda: Mock(closed=False))
+        self.ping = Mock()
+
+    def tearDown(self):
+        connection_cache.discard(('test', 'db'))
+
+    def _reuse_connection(self):
+        return connection_cache.reuse_connection(
+            ('test', 'db'), self.connect, lambda connection: connection.closed, self.ping
+        )
+
+    def test_reuse_open_connection(self):
+        """Connection should be opened once and reused while it's open"""
+        opened_connections = connection_cache.OPENED_CONNECTIONS['test']
+
+        with self._reuse_connection() as first:
+            pass
+        with self._reuse_connection() as second:
+            pass
+
+        self.assertIs(first.connection, second.connection)
+        self.assertEqual(1, self.connect.call_count)
+        self.assertEqual(opened_connections + 1, connection_cache.OPENED_CONNECTIONS['test'])
+        self.ping.assert_not_called()
+
+    def test_reconnect_closed_connection(self):
+        """Closed connection should be replaced by a new one"""
+        with self._reuse_connection() as first:
+            first.connection.closed = True
+
+        with self._reuse_connection() as second:
+            self.assertIsNot(first.connection, second.connection)
+
+    def test_reconnect_if_ping_fails(self):
+        """Connection idle for a while should be replaced if it does not answer"""
+        with self._reuse_connection() as first:
+            pass
+
+        self.ping.side_effect = Exception('server closed the connection unexpectedly')
+        first.last_used -= connection_cache.HEALTH_CHECK_IDLE_SECONDS + 1
+
+        with self._reuse_connection() as second:
+            self.assertIsNot(first.connection, second.connection)
+        self.ping.assert_called_once_with(first.connection)
+
+    def test_discard_connection_closed_by_error(self):
+        """Connection closed by a failing query should be closed and forgotten"""
+        with self.assertRaises(ValueError):
+            with self._reuse_connection() as first:
+                first.connection.closed = True
+                raise ValueError('connection lost')
+
+        first.connection.close.assert_called_once()
+        with self._reuse_connection() as second:
+            self.assertIsNot(first.connection, second.connection)
+
+    def test_connections_are_not_shared_with_forked_processes(self):
+        """Forked process should open its own connection"""
+        with self._reuse_connection() as first:
+            pass
+
+        with patch('pipelinewise.fastsync.commons.connection_cache.os.getpid', return_value=-1):
+            with self._reuse_connection() as second:
+                self.assertIsNot(first.connection, second.connection)
+            connection_cache.discard(('test', 'db'))
+
+        first.connection.close.assert_not_called()
+
+    @patch('pipelinewise.fastsync.commons.target_postgres.psycopg2.connect')
+    def test_postgres_queries_reuse_connection(self, connect):
+        """Queries of every instance with the same connection parameters should use one connection"""
+        connection = MagicMock(closed=0)
+        connection.__enter__.return_value = connection
+        connection.cursor.return_value.__enter__.return_value.rowcount = 0
+        connect.return_value = connection
+        config = {'host': 'localhost', 'port': 5432, 'dbname': 'db', 'user': 'user', 'password': 'secret'}
+        try:
+            FastSyncTargetPostgres(config).query('CREATE SCHEMA a')
+            FastSyncTargetPostgres(config).query('CREATE SCHEMA b')
+        finally:
+            connection_cache.discard(FastSyncTargetPostgres(config).get_connection_key())
+
+        self.assertEqual(1, connect.call_count)
@@ -0,0 +1,61 @@
+import csv
+import gzip
+import os
+from unittest import TestCase
+
+from pipelinewise.fastsync.commons.csv_type_sampler import CsvTypeSampler
+from pipelinewise.fastsync.commons.tap_s3_csv import FastSyncTapS3Csv
+
+
+class TestCsvTypeSampler(TestCase):
+    """
+    Unit tests for the column type inference over sampled csv rows
+    """
+
+    def test_sample_is_bounded(self):
+        """Sample should keep at most sample_size rows picked from the whole stream"""
+        sampler = CsvTypeSampler(sample_size=10)
+        for i in range(1000):
+            sampler.add({'id': i})
+
+        self.assertEqual(1000, sampler.rows_count)
+        self.assertEqual(10, len(sampler.sample))
+        self.assertTrue(any(row['id'] >= 10 for row in sampler.sample))
+
+    def test_guess_types(self):
+        """Types should be guessed from the values as written into the csv"""
+        sampler = CsvTypeSampler()
+        for row in [
+            {'int': 1, 'num': '1.5', 'str': 'a', 'bool': 'yes', 'mixed': '1'},
+            {'int': '2', 'num': '2', 'str': '3', 'bool': 'no', 'mixed': 'x', 'empty': ''},
+            {'int': None, 'num': None, 'str': None, 'bool': None, 'mixed': None},
+        ]:
+            sampler.add(row)
+
+        self.assertDictEqual(
+            {
+                'int': 'integer',
+                'num': 'number',
+                'str': 'string',
+                'bool': 'boolean',
+                'mixed': 'string',
+                'empty': 'string',
+                'missing': 'string',
+            },
+            sampler.guess_types(['int', 'num', 'str', 'bool', 'mixed', 'empty', 'missing']),
+        )
+
+    def test_guess_types_like_messytables(self):
+        """Types should be the same as the ones guessed by messytables from the exported file"""
+        file_path = f'{os.path.dirname(__file__)}/resources/dummy_data.csv.gz'
+        sampler = CsvTypeSampler()
+        with gzip.open(file_path, 'rt') as csv_file:
+            reader = csv.DictReader(csv_file)
+            for row in reader:
+                sampler.add(row)
+
+        # pylint: disable=protected-access
+        self.assertListEqual(
+            list(FastSyncTapS3Csv._get_table_columns(None, file_path)),
+            list(sampler.guess_types(reader.fieldnames).items()),
+        )
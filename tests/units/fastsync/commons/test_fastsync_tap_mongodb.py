@@ -5,16 +5,19 @@ import string
 import time
 import os
 import random
+import shutil
+import tempfile
 import bson
 
 from unittest import TestCase
-from unittest.mock import patch, Mock, PropertyMock, call
+from unittest.mock import patch, MagicMock, Mock, PropertyMock, call
 from pymongo import MongoClient
+from pymongo.errors import OperationFailure
 from pymongo.change_stream import DatabaseChangeStream
 from pymongo.database import Database
 
-from pipelinewise.fastsync.commons.errors import TableNotFoundError, ExportError
-from pipelinewise.fastsync.commons.tap_mongodb import FastSyncTapMongoDB
+from pipelinewise.fastsync.commons.errors import TableNotFoundError, ExportError, MongoDBInvalidDatetimeError
+from pipelinewise.fastsync.commons.tap_mongodb import FastSyncTapMongoDB, serialize_document
 
 TEST_EXPORT_FILE = 'file.csv.gzip'
 
@@ -315,3 +318,146 @@ class TestFastSyncTapMongoDB(TestCase):
             },
             self.mongo.map_column_types_to_target(),
         )
+
+    def test_get_id_range_filters(self):
+        """
+        Range filters should be disjoint and the first one should match the _id values of any other type
+        """
+        self.assertListEqual([{}], FastSyncTapMongoDB.get_id_range_filters([]))
+        self.assertListEqual(
+            [
+                {'_id': {'$not': {'$gte': 10}}},
+                {'_id': {'$gte': 10, '$lt': 20}},
+                {'_id': {'$gte': 20}},
+            ],
+            FastSyncTapMongoDB.get_id_range_filters([10, 20]),
+        )
+
+    def test_get_id_boundaries_by_split_vector(self):
+        """
+        Boundaries should be picked evenly from the split keys of splitVector
+        """
+        self.mongo.database = MagicMock()
+        self.mongo.database.name = 'my_db'
+        self.mongo.database.command.side_effect = [
+            {'size': 3000},
+            {'splitKeys': [{'_id': key} for key in range(1, 10)]},
+        ]
+
+        self.assertListEqual([4, 7], self.mongo.get_id_boundaries('my_col', 3))
+        self.mongo.database.command.assert_called_with(
+            'splitVector', 'my_db.my_col', keyPattern={'_id': 1}, maxChunkSizeBytes=1000
+        )
+
+    def test_get_id_boundaries_by_sampling(self):
+        """
+        Boundaries should be the quantiles of sampled _id values if splitVector is not allowed
+        """
+        self.mongo.database = MagicMock()
+        self.mongo.database.command.side_effect = OperationFailure('not authorized')
+        self.mongo.database.__getitem__.return_value.aggregate.return_value = [
+            {'_id': key} for key in [8, 2, 6, 4, 2]
+        ]
+
+        self.assertListEqual([4, 6], self.mongo.get_id_boundaries('my_col', 3))
+
+        # _id values of different types cannot be split
+        self.mongo.database.__getitem__.return_value.aggregate.return_value = [{'_id': 1}, {'_id': 'a'}]
+        self.assertListEqual([], self.mongo.get_id_boundaries('my_col', 3))
+
+    def test_copy_table_in_id_ranges(self):
+        """
+        Collection should be exported without mongodump by cursors of the _id ranges into file parts
+        """
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        self.mongo.connection_config['export_parallelism'] = 2
+        self.mongo.database = MagicMock()
+        self.mongo.database.list_collection_names.return_value = ['my_col']
+
+        documents = [{'_id': key, 'value': f'doc {key}'} for key in range(10)]
+
+        def find(range_filter, **_):
+            bounds = range_filter['_id']
+            cursor = MagicMock()
+            cursor.__enter__.return_value = cursor
+            cursor.__iter__.return_value = iter(
+                [doc for doc in documents if bounds.get('$gte', 0) <= doc['_id'] < bounds.get('$lt', 100)]
+                if '$not' not in bounds
+                else [doc for doc in documents if doc['_id'] < bounds['$not']['$gte']]
+            )
+            return cursor
+
+        self.mongo.database.__getitem__.return_value.find.side_effect = find
+        filepath = os.path.join(temp_dir, 'export.csv')
+
+        with patch.object(self.mongo, 'get_id_boundaries', return_value=[3, 7]) as boundaries_mock, \
+                patch('pipelinewise.fastsync.commons.tap_mongodb.subprocess.call') as call_mock:
+            self.mongo.copy_table('my_db.my_col', filepath, temp_dir, compress=False)
+
+        boundaries_mock.assert_called_once_with('my_col', 2)
+        self.assertEqual(call_mock.call_count, 0)
+
+        exported_ids = []
+        for part_no, part_ids in ((1, ['0', '1', '2']), (2, ['3', '4', '5', '6']), (3, ['7', '8', '9'])):
+            with open(f'{filepath}.part{part_no:05d}', encoding='utf-8') as part:
+                lines = part.read().splitlines()
+            self.assertTrue(lines[0].startswith('_ID,DOCUMENT,'))
+            self.assertListEqual(part_ids, [line.split(',')[0] for line in lines[1:]])
+            exported_ids += part_ids
+
+        self.assertEqual(len(exported_ids), len(documents))
+
+    def test_copy_table_in_id_ranges_split_into_chunks(self):
+        """
+        Every _id range should be split into chunks with its own max chunks budget
+        """
+        self.mongo.connection_config['export_parallelism'] = 2
+        self.mongo.database = MagicMock()
+        self.mongo.database.list_collection_names.return_value = ['my_col']
+
+        with patch.object(self.mongo, 'get_id_boundaries', return_value=[5]), \
+                patch.object(self.mongo, 'export_documents', return_value=5) as export_documents_mock:
+            self.mongo.copy_table('my_db.my_col', 'export.csv.gz', 'tmp', split_large_files=True,
+                                  split_file_chunk_size_mb=100, split_file_max_chunks=5)
+
+        self.assertListEqual(
+            sorted(c.args[1] for c in export_documents_mock.call_args_list),
+            ['export.csv.gz.part00001', 'export.csv.gz.part00002'],
+        )
+        for export_call in export_documents_mock.call_args_list:
+            self.assertEqual(export_call.kwargs['chunk_size_mb'], 100)
+            self.assertEqual(export_call.kwargs['max_chunks'], 5)
+
+    def test_serialize_document(self):
+        """
+        Values should be converted to json friendly ones by their type or by the type of their base class
+        """
+        object_id = bson.ObjectId()
+        document = {
+            '_id': object_id,
+            'created_at': datetime.datetime(2021, 3, 4, 5, 6, 7, 8, tzinfo=datetime.timezone.utc),
+            'nested': bson.son.SON([('count', bson.int64.Int64(5)), ('ids', [object_id, b'abc'])]),
+            'flag': True,
+            'min_key': bson.min_key.MinKey(),
+        }
+
+        self.assertDictEqual(
+            {
+                '_id': str(object_id),
+                'created_at': '2021-03-04T05:06:07.000008Z',
+                'nested': {'count': '5', 'ids': [str(object_id), 'YWJj']},
+                'flag': True,
+            },
+            serialize_document(document),
+        )
+
+    def test_serialize_document_with_invalid_datetime(self):
+        """
+        Error of a datetime that cannot be converted to UTC should have the path of the value
+        """
+        invalid_datetime = datetime.datetime(1, 1, 1, tzinfo=datetime.timezone(datetime.timedelta(hours=1)))
+        document = {'_id': 1, 'events': [{'at': datetime.datetime(2021, 1, 1)}, {'at': invalid_datetime}]}
+
+        with self.assertRaisesRegex(MongoDBInvalidDatetimeError, r'Found invalid datetime at \[events\.1\.at\]'):
+            serialize_document(document)
@@ -1,5 +1,5 @@
 from unittest import TestCase
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 
 import pymysql
 from pipelinewise.fastsync.commons import tap_mysql
@@ -147,3 +147,214 @@ class TestFastSyncTapMySql(TestCase):
             'SET SESSION wait_timeout=28800',
         ]
         assert self.mysql.executed_queries_unbuffered == self.mysql.executed_queries
+
+    def test_get_range_split_column(self):
+        """Only single column integer primary keys can be used to split tables into ranges"""
+        self.mysql = FastSyncTapMySql(connection_config=self.connection_config, tap_type_to_target_type=None)
+        table_columns = [
+            {'column_name': 'id', 'data_type': 'bigint'},
+            {'column_name': 'code', 'data_type': 'varchar'},
+        ]
+
+        with patch.object(self.mysql, 'query') as query_mock:
+            query_mock.return_value = [{'Column_name': 'id'}]
+            assert self.mysql.get_range_split_column('my_db.my_table', table_columns) == 'id'
+
+            query_mock.return_value = [{'Column_name': 'code'}]
+            assert self.mysql.get_range_split_column('my_db.my_table', table_columns) is None
+
+            query_mock.return_value = [{'Column_name': 'id'}, {'Column_name': 'code'}]
+            assert self.mysql.get_range_split_column('my_db.my_table', table_columns) is None
+
+            query_mock.return_value = []
+            assert self.mysql.get_range_split_column('my_db.my_table', table_columns) is None
+
+    def test_copy_table_in_ranges(self):
+        """Table should be exported in primary key ranges over connections sharing the same snapshot"""
+        self.mysql = FastSyncTapMySql(
+            connection_config={**self.connection_config, **{'export_parallelism': 2}},
+            tap_type_to_target_type=None,
+        )
+        self.mysql.conn = MagicMock()
+
+        with patch('pymysql.connect') as mysql_connect_mock, \
+                patch.object(self.mysql, 'export_query', return_value=10) as export_query_mock:
+            snapshot_cursor = mysql_connect_mock.return_value.cursor.return_value.__enter__.return_value
+            snapshot_cursor.fetchone.return_value = (1, 100)
+
+            exported_rows = self.mysql.copy_table_in_ranges(
+                'my_db.my_table', 'SELECT * FROM `my_db`.`my_table`', 'export.csv.gz', 'id', num_ranges=4
+            )
+
+        assert exported_rows == 40
+        assert mysql_connect_mock.call_count == 2
+        assert mysql_connect_mock.return_value.close.call_count == 2
+
+        # Table should be locked only until the snapshots are started
+        lock_cursor = self.mysql.conn.cursor.return_value.__enter__.return_value
+        assert [c.args[0] for c in lock_cursor.execute.call_args_list] == [
+            'LOCK TABLES `my_db`.`my_table` READ',
+            'UNLOCK TABLES',
+        ]
+        assert 'START TRANSACTION WITH CONSISTENT SNAPSHOT' in [
+            c.args[0] for c in snapshot_cursor.execute.call_args_list
+        ]
+
+        # Every range should be exported into its own file part
+        assert sorted((c.args[1], c.args[2]) for c in export_query_mock.call_args_list) == [
+            ('SELECT * FROM `my_db`.`my_table` WHERE `id` < 26', 'export.csv.gz.part00001'),
+            ('SELECT * FROM `my_db`.`my_table` WHERE `id` >= 26 AND `id` < 51', 'export.csv.gz.part00002'),
+            ('SELECT * FROM `my_db`.`my_table` WHERE `id` >= 51 AND `id` < 76', 'export.csv.gz.part00003'),
+            ('SELECT * FROM `my_db`.`my_table` WHERE `id` >= 76', 'export.csv.gz.part00004'),
+        ]
+
+    def test_copy_table_in_ranges_split_into_chunks(self):
+        """Every range should be split into chunks with its own max chunks budget"""
+        self.mysql = FastSyncTapMySql(
+            connection_config={**self.connection_config, **{'export_parallelism': 2}},
+            tap_type_to_target_type=None,
+        )
+        self.mysql.conn = MagicMock()
+
+        with patch('pymysql.connect') as mysql_connect_mock, \
+                patch.object(self.mysql, 'export_query', return_value=10) as export_query_mock:
+            snapshot_cursor = mysql_connect_mock.return_value.cursor.return_value.__enter__.return_value
+            snapshot_cursor.fetchone.return_value = (1, 100)
+
+            self.mysql.copy_table_in_ranges(
+                'my_db.my_table', 'SELECT * FROM `my_db`.`my_table`', 'export.csv.gz', 'id', num_ranges=2,
+                chunk_size_mb=100, max_chunks=5,
+            )
+
+        assert export_query_mock.call_count == 2
+        for call in export_query_mock.call_args_list:
+            assert call.kwargs['chunk_size_mb'] == 100
+            assert call.kwargs['max_chunks'] == 5
+
+    def test_copy_table_in_ranges_without_lock_privilege(self):
+        """Range export should be skipped if the table cannot be locked to synchronise the snapshots"""
+        self.mysql = FastSyncTapMySql(
+            connection_config={**self.connection_config, **{'export_parallelism': 2}},
+            tap_type_to_target_type=None,
+        )
+        self.mysql.conn = MagicMock()
+        self.mysql.conn.cursor.return_value.__enter__.return_value.execute.side_effect = \
+            pymysql.err.OperationalError(1044, 'Access denied')
+
+        with patch('pymysql.connect') as mysql_connect_mock:
+            assert self.mysql.copy_table_in_ranges(
+                'my_db.my_table', 'SELECT * FROM `my_db`.`my_table`', 'export.csv.gz', 'id', num_ranges=4
+            ) is None
+
+        assert mysql_connect_mock.call_count == 0
+
+    def test_get_arrow_schema(self):
+        """Exported columns should be mapped to arrow types followed by the metadata columns"""
+        table_columns = [
+            {'column_name': 'id', 'data_type': 'bigint', 'column_type': 'bigint(20) unsigned'},
+            {'column_name': 'amount', 'data_type': 'decimal', 'column_type': 'decimal(10,2)'},
+            {'column_name': 'big_amount', 'data_type': 'decimal', 'column_type': 'decimal(65,30) unsigned'},
+            {'column_name': 'is_active', 'data_type': 'tinyint', 'column_type': 'tinyint(1)'},
+            {'column_name': 'is_deleted', 'data_type': 'bit', 'column_type': 'bit(1)'},
+            {'column_name': 'created_on', 'data_type': 'date', 'column_type': 'date'},
+            {'column_name': 'updated_at', 'data_type': 'datetime', 'column_type': 'datetime'},
+            {'column_name': 'name', 'data_type': 'varchar', 'column_type': 'varchar(64)'},
+        ]
+
+        schema = FastSyncTapMySql.get_arrow_schema(table_columns)
+        assert [(field.name, str(field.type)) for field in schema] == [
+            ('id', 'uint64'),
+            ('amount', 'decimal128(10, 2)'),
+            ('big_amount', 'string'),
+            ('is_active', 'bool'),
+            ('is_deleted', 'bool'),
+            ('created_on', 'date32[day]'),
+            ('updated_at', 'timestamp[us]'),
+            ('name', 'string'),
+            ('_SDC_EXTRACTED_AT', 'timestamp[us]'),
+            ('_SDC_BATCHED_AT', 'timestamp[us]'),
+            ('_SDC_DELETED_AT', 'string'),
+        ]
+
+        # Dates should be exported as timestamps if casted to datetime
+        schema = FastSyncTapMySql.get_arrow_schema(table_columns, date_type='datetime')
+        assert str(schema.field('created_on').type) == 'timestamp[us]'
+
+    def test_prefetch_catalog(self):
+        """Columns and primary keys of every table should be queried in bulk and served from the catalog"""
+        columns = [
+            {'column_name': 'id', 'data_type': 'int', 'table_schema': 'db', 'table_name': 'table_one'},
+            {'column_name': 'name', 'data_type': 'varchar', 'table_schema': 'db', 'table_name': 'table_one'},
+            {'column_name': 'code', 'data_type': 'varchar', 'table_schema': 'db', 'table_name': 'table_two'},
+        ]
+        primary_keys = [{'table_schema': 'db', 'table_name': 'table_one', 'column_name': 'id'}]
+        self.mysql = FastSyncTapMySql(self.connection_config, lambda *_: 'VARCHAR')
+
+        with patch.object(self.mysql, 'query', side_effect=[columns, primary_keys]) as query_mock:
+            catalog = self.mysql.prefetch_catalog(['db.table_one', 'db.table_two', 'db.missing'])
+
+            assert query_mock.call_count == 2
+            assert "(table_schema, table_name) IN (('db', 'table_one'),('db', 'table_two'),('db', 'missing'))" in \
+                query_mock.call_args_list[0][0][0]
+
+        assert set(catalog['tables']) == {'db.table_one', 'db.table_two'}
+
+        # Catalog is shared with other tap objects that should not query the metadata again
+        mysql = FastSyncTapMySql(self.connection_config, lambda *_: 'VARCHAR', catalog=catalog)
+        with patch.object(mysql, 'query') as query_mock:
+            assert mysql.get_table_columns('db.table_one') == columns[:2]
+            assert mysql.get_primary_keys('db.table_one') == ['"ID"']
+            assert mysql.get_primary_keys('db.table_two') is None
+            assert mysql.map_column_types_to_target('db.table_two') == {
+                'columns': ['"CODE" VARCHAR'],
+                'primary_key': None,
+            }
+            assert query_mock.call_count == 0
+
+            # Columns exported in a different way and tables missing from the catalog should be queried
+            query_mock.return_value = []
+            mysql.get_table_columns('db.table_one', date_type='datetime')
+            mysql.get_table_columns('db.missing')
+            assert query_mock.call_count == 2
+
+    def test_stream_table(self):
+        """Rows should be written into the stream as csv in one write per batch"""
+        self.mysql = FastSyncTapMySql({**self.connection_config, 'export_batch_rows': 2}, lambda *_: 'VARCHAR')
+        self.mysql.conn_unbuffered = MagicMock()
+        cur = self.mysql.conn_unbuffered.cursor.return_value.__enter__.return_value
+        cur.fetchmany.side_effect = [[(1, 'a,b'), (2, 'c')], [(3, None)], []]
+        fileobj = MagicMock()
+
+        with patch.object(self.mysql, 'get_table_columns', return_value=[{'safe_sql_value': '`id`'}]):
+            assert self.mysql.stream_table('db.table_one', fileobj) == 3
+
+        assert 'FROM `db`.`table_one`' in cur.execute.call_args[0][0]
+        assert [c[0][0] for c in fileobj.write.call_args_list] == ['1,"a,b"\r\n2,c\r\n', '3,\r\n']
+
+    def test_stream_table_with_transformations(self):
+        """Rows should be transformed before they are written when the table has transformations"""
+        self.mysql = FastSyncTapMySql(
+            self.connection_config,
+            lambda *_: 'VARCHAR',
+            transformation_config={
+                'transformations': [
+                    {'tap_stream_name': 'db-table_one', 'field_id': 'name', 'type': 'MASK-HIDDEN', 'when': None},
+                ]
+            },
+        )
+        self.mysql.conn_unbuffered = MagicMock()
+        cur = self.mysql.conn_unbuffered.cursor.return_value.__enter__.return_value
+        cur.fetchmany.side_effect = [[(1, 'john', 'x', 'x', None)], []]
+        fileobj = MagicMock()
+
+        with patch.object(
+            self.mysql,
+            'get_table_columns',
+            return_value=[
+                {'column_name': 'id', 'safe_sql_value': '`id`'},
+                {'column_name': 'name', 'safe_sql_value': '`name`'},
+            ],
+        ):
+            assert self.mysql.stream_table('db.table_one', fileobj) == 1
+
+        assert fileobj.write.call_args[0][0] == '1,hidden,x,x,\r\n'
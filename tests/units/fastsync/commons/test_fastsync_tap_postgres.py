@@ -4,9 +4,12 @@ from decimal import Decimal
 from unittest import TestCase
 from unittest.mock import MagicMock, Mock, PropertyMock, patch
 
+import psycopg2.errors
+
 from pipelinewise.fastsync.commons.tap_postgres import FastSyncTapPostgres
 
 
+# pylint: disable=too-many-public-methods
 class TestFastSyncTapPostgres(TestCase):
     """
     Unit tests for fastsync tap postgres
@@ -390,3 +393,130 @@ class TestFastSyncTapPostgres(TestCase):
                 'replication_key_value': 4.222222222,
                 'version': 1,
             }, state)
+
+    def test_get_ctid_range_condition(self):
+        """Validate the SQL conditions of ctid block ranges"""
+        assert self.postgres.get_ctid_range_condition(None, 10) == "ctid < '(10,0)'::tid"
+        assert self.postgres.get_ctid_range_condition(10, 20) == "ctid >= '(10,0)'::tid AND ctid < '(20,0)'::tid"
+        assert self.postgres.get_ctid_range_condition(20, None) == "ctid >= '(20,0)'::tid"
+        assert self.postgres.get_ctid_range_condition(None, None) == 'TRUE'
+
+    def test_get_range_conditions_by_primary_key(self):
+        """Tables with single column integer primary key should be split by primary key ranges"""
+        cur = MagicMock()
+        cur.fetchone.return_value = (1, 100)
+        table_columns = [
+            {'column_name': 'id', 'data_type': 'bigint'},
+            {'column_name': 'code', 'data_type': 'character varying'},
+        ]
+
+        with patch.object(self.postgres, 'get_primary_key_columns', return_value=['id']):
+            assert self.postgres.get_range_conditions(cur, 'public.my_table', table_columns, 2) == [
+                '"id" < 51',
+                '"id" >= 51',
+            ]
+
+        cur.execute.assert_called_once_with('SELECT MIN("id"), MAX("id") FROM public."my_table"')
+
+    def test_get_range_conditions_by_ctid(self):
+        """Tables without integer primary key should be split by ctid ranges only if TID range scans supported"""
+        cur = MagicMock()
+        table_columns = [{'column_name': 'code', 'data_type': 'character varying'}]
+
+        with patch.object(self.postgres, 'get_primary_key_columns', return_value=['code']):
+            cur.fetchone.side_effect = [(140005,), (1000,)]
+            assert self.postgres.get_range_conditions(cur, 'public.my_table', table_columns, 2) == [
+                "ctid < '(500,0)'::tid",
+                "ctid >= '(500,0)'::tid",
+            ]
+
+            cur.fetchone.side_effect = [(140005,), (0,)]
+            assert self.postgres.get_range_conditions(cur, 'public.my_table', table_columns, 2) == ['TRUE']
+
+            cur.fetchone.side_effect = [(130010,)]
+            assert self.postgres.get_range_conditions(cur, 'public.my_table', table_columns, 2) is None
+
+    @patch('pipelinewise.fastsync.commons.tap_postgres.psycopg2.connect')
+    def test_copy_table_in_ranges(self, connect_mock):
+        """Table should be exported in ranges over connections importing the same snapshot"""
+        self.postgres.connection_config.update({'host': 'foo', 'port': 5432, 'user': 'bar', 'password': 'baz',
+                                                'export_parallelism': 2})
+        cursor_mock = connect_mock.return_value.cursor.return_value.__enter__.return_value
+        cursor_mock.fetchone.return_value = ('00000003-0000001B-1',)
+
+        with patch.object(self.postgres, 'get_range_conditions', return_value=['"id" < 51', '"id" >= 51']), \
+                patch.object(self.postgres, 'export_query') as export_query_mock:
+            assert self.postgres.copy_table_in_ranges(
+                'public.my_table', 'SELECT * FROM public."my_table"', 'export.csv.gz', [], num_ranges=2,
+                chunk_size_mb=100, max_chunks=5,
+            ) is True
+
+        # One connection exports the snapshot and two workers import it
+        assert connect_mock.call_count == 3
+        assert connect_mock.return_value.close.call_count == 3
+        cursor_mock.execute.assert_any_call('SELECT pg_export_snapshot()')
+        cursor_mock.execute.assert_any_call('SET TRANSACTION SNAPSHOT %s', ('00000003-0000001B-1',))
+
+        # Every range should be exported into its own file part
+        assert sorted((c.args[1], c.args[2]) for c in export_query_mock.call_args_list) == [
+            ('SELECT * FROM public."my_table" WHERE "id" < 51', 'export.csv.gz.part00001'),
+            ('SELECT * FROM public."my_table" WHERE "id" >= 51', 'export.csv.gz.part00002'),
+        ]
+
+        # Every range should be split into chunks with its own max chunks budget
+        for call in export_query_mock.call_args_list:
+            assert call.kwargs['chunk_size_mb'] == 100
+            assert call.kwargs['max_chunks'] == 5
+
+    @patch('pipelinewise.fastsync.commons.tap_postgres.psycopg2.connect')
+    def test_copy_table_in_ranges_without_snapshot(self, connect_mock):
+        """Range export should be skipped if the snapshot cannot be exported"""
+        self.postgres.connection_config.update({'host': 'foo', 'port': 5432, 'user': 'bar', 'password': 'baz',
+                                                'export_parallelism': 2})
+        cursor_mock = connect_mock.return_value.cursor.return_value.__enter__.return_value
+        cursor_mock.execute.side_effect = psycopg2.errors.FeatureNotSupported(  # pylint: disable=no-member
+            'cannot export a snapshot'
+        )
+
+        assert self.postgres.copy_table_in_ranges(
+            'public.my_table', 'SELECT * FROM public."my_table"', 'export.csv.gz', [], num_ranges=2
+        ) is False
+
+        assert connect_mock.call_count == 1
+        assert connect_mock.return_value.close.call_count == 1
+
+    def test_prefetch_catalog(self):
+        """Columns and primary keys of every table should be queried in bulk and served from the catalog"""
+        columns = [
+            ('id', 'integer', '"id"', None, 'public', 'table_one'),
+            ('name', 'text', '"name"', None, 'public', 'table_one'),
+            ('code', 'text', '"code"', None, 'public', 'table_two'),
+        ]
+        primary_keys = [('public', 'table_one', 'id')]
+
+        with patch.object(self.postgres, 'query', side_effect=[columns, primary_keys]) as query_mock:
+            catalog = self.postgres.prefetch_catalog(['public.table_one', 'public.table_two', 'public.missing'])
+
+            assert query_mock.call_count == 2
+            assert "IN (('public', 'table_one'),('public', 'table_two'),('public', 'missing'))" in \
+                query_mock.call_args_list[0][0][0]
+
+        assert set(catalog['tables']) == {'public.table_one', 'public.table_two'}
+
+        # Catalog is shared with other tap objects that should not query the metadata again
+        postgres = FastSyncTapPostgres({'dbname': 'test_database'}, lambda *_: 'VARCHAR', catalog=catalog)
+        with patch.object(postgres, 'query') as query_mock:
+            assert postgres.get_table_columns('public.table_one') == columns[:2]
+            assert postgres.get_primary_keys('public.table_one') == ['"ID"']
+            assert postgres.get_primary_keys('public.table_two') is None
+            assert postgres.map_column_types_to_target('public.table_two') == {
+                'columns': ['"CODE" VARCHAR'],
+                'primary_key': None,
+            }
+            assert query_mock.call_count == 0
+
+            # Columns exported in a different way and tables missing from the catalog should be queried
+            query_mock.return_value = []
+            postgres.get_table_columns('public.table_one', max_num='999.99')
+            postgres.get_table_columns('public.missing')
+            assert query_mock.call_count == 2
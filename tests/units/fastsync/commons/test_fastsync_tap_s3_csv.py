@@ -1,9 +1,17 @@
+import csv
 import datetime
+import glob
+import gzip
 import os
+import tempfile
 from unittest import TestCase
 from unittest.mock import patch, Mock
 
-from pipelinewise.fastsync.commons.tap_s3_csv import FastSyncTapS3Csv, S3Helper
+from botocore.exceptions import ClientError
+
+from pipelinewise.fastsync.commons import split_gzip
+from pipelinewise.fastsync.commons.s3_key_manifest import S3KeyManifest
+from pipelinewise.fastsync.commons.tap_s3_csv import FastSyncTapS3Csv, S3Helper, _iter_lines, get_byte_ranges
 
 
 # pylint: disable=missing-function-docstring,protected-access,invalid-name
@@ -64,117 +72,305 @@ class TestFastSyncTapS3Csv(TestCase):
             ]
 
             with patch.object(
+                self.fs_tap_s3_csv, '_get_files_headers'
+            ) as get_files_headers_mock, patch.object(
                 self.fs_tap_s3_csv, '_get_file_records'
-            ) as get_file_rec_mock:
-                get_file_rec_mock.return_value = 'test'
+            ) as get_file_rec_mock, patch(
+                'pipelinewise.fastsync.commons.tap_s3_csv.split_gzip'
+            ) as split_gzip_mock:
+                get_files_headers_mock.side_effect = lambda s3_files, *_: (s3_files, {'"ID"'})
+                get_file_rec_mock.return_value = [{'"ID"': 1}]
+
+                self.fs_tap_s3_csv.copy_table('table 2', 'file_path.csv.gz')
+
+                self.assertEqual(2, get_file_rec_mock.call_count)
+                split_gzip_mock.open.assert_called_once_with(
+                    'file_path.csv.gz', mode='wt', chunk_size_mb=1000, max_chunks=0, header='"""ID"""\r\n'
+                )
+                self.assertIn('table 2', self.fs_tap_s3_csv.tables_last_modified)
+                self.assertEqual(
+                    '2001-10-05',
+                    self.fs_tap_s3_csv.tables_last_modified['table 2'].strftime(
+                        '%Y-%m-%d'
+                    ),
+                )
+
+    def test_copy_table_streams_the_rows_of_every_file(self):
+        files = {
+            'file_1.csv': b'id,group\n1,A\n2,B\n',
+            'file_2.csv': b'id,group,test\n3,A,yes\n4,B,no,extra\n',
+            'file_3.csv': b'id,unknown\n',
+        }
 
-                with patch(
-                    'pipelinewise.fastsync.commons.tap_s3_csv.gzip'
-                ) as gzip_mock:
-                    mock_enter = Mock()
-                    mock_enter.return_value.open.return_value = ''
+        def get_file_handle(_, s3_path, **__):
+            handle = Mock()
+            handle._raw_stream = iter(files[s3_path].splitlines(keepends=True))
+            return handle
 
-                    gzip_mock.return_value.__enter__ = mock_enter
-                    gzip_mock.return_value.__exit__ = Mock()
+        def download_file(_, s3_path, byte_range=None, etag=None, **__):
+            self.assertEqual('"etag"' if byte_range else None, etag)
+            data = files[s3_path]
+            return data[byte_range[0]:byte_range[1] + 1] if byte_range else data
 
-                    self.fs_tap_s3_csv.copy_table('table 2', 'file_path.csv.gz')
+        with patch(
+            'pipelinewise.fastsync.commons.tap_s3_csv.S3Helper.get_input_files_for_table'
+        ) as get_input_files_mock, patch.object(
+            S3Helper, 'get_s3_client'
+        ), patch.object(
+            S3Helper, 'get_file_handle', side_effect=get_file_handle
+        ), patch.object(
+            S3Helper, 'download_file', side_effect=download_file
+        ), patch(
+            'pipelinewise.fastsync.commons.tap_s3_csv.get_byte_ranges',
+            # download the files in ranges of a few bytes
+            side_effect=lambda size, _: get_byte_ranges(size, 5),
+        ), tempfile.TemporaryDirectory() as temp_dir:
+            get_input_files_mock.return_value = [
+                {
+                    'key': key,
+                    'last_modified': datetime.datetime(2001, 7, 13),
+                    'size': len(data),
+                    'etag': '"etag"',
+                }
+                for key, data in files.items()
+            ]
+            file_path = os.path.join(temp_dir, 'table.csv.gz')
 
-                    self.assertEqual(2, get_file_rec_mock.call_count)
-                    self.assertIn('table 2', self.fs_tap_s3_csv.tables_last_modified)
-                    self.assertEqual(
-                        '2001-10-05',
-                        self.fs_tap_s3_csv.tables_last_modified['table 2'].strftime(
-                            '%Y-%m-%d'
-                        ),
-                    )
+            self.fs_tap_s3_csv.copy_table('table 2', file_path)
 
-    def test_get_file_records(self):
-        with patch.object(S3Helper, 'get_file_handle') as get_file_handle_mock:
-            handle = Mock().return_value
-            handle.configure_mock(**{'_raw_stream.return_value': 'file handle'})
+            with gzip.open(file_path, 'rt') as gzfile:
+                rows = list(csv.DictReader(gzfile))
+
+        self.assertListEqual(
+            [
+                '"GROUP"',
+                '"ID"',
+                '"TEST"',
+                '"_SDC_EXTRA"',
+                '_SDC_BATCHED_AT',
+                '_SDC_DELETED_AT',
+                '_SDC_EXTRACTED_AT',
+                '_sdc_source_bucket',
+                '_sdc_source_file',
+                '_sdc_source_lineno',
+            ],
+            list(rows[0].keys()),
+        )
+        self.assertListEqual(
+            [
+                ('1', 'A', '', 'file_1.csv', '1'),
+                ('2', 'B', '', 'file_1.csv', '2'),
+                ('3', 'A', 'yes', 'file_2.csv', '3'),
+                ('4', 'B', 'no', 'file_2.csv', '4'),
+            ],
+            [
+                (row['"ID"'], row['"GROUP"'], row['"TEST"'], row['_sdc_source_file'], row['_sdc_source_lineno'])
+                for row in rows
+            ],
+        )
+        self.assertEqual("['extra']", rows[3]['"_SDC_EXTRA"'])
+        self.assertEqual('integer', self.fs_tap_s3_csv.tables_column_types['table 2']['"ID"'])
+        self.assertEqual('boolean', self.fs_tap_s3_csv.tables_column_types['table 2']['"TEST"'])
+
+    def test_copy_table_into_multiple_chunks(self):
+        data = b'id,name\n' + b''.join(b'%d,name_%d\n' % (i, i) for i in range(100))
+
+        def open_small_chunks(base_filename, mode, chunk_size_mb, max_chunks, header):
+            self.assertEqual(10, max_chunks)
+            # chunks of a few hundred bytes, smaller than split_gzip.open accepts
+            return split_gzip.SplitGzipFile(
+                base_filename,
+                mode,
+                chunk_size_mb=split_gzip.SplitGzipFile._bytes_to_megabytes(500),
+                max_chunks=max_chunks,
+                est_compr_rate=1,
+                header=header,
+            )
+
+        with patch(
+            'pipelinewise.fastsync.commons.tap_s3_csv.S3Helper.get_input_files_for_table'
+        ) as get_input_files_mock, patch.object(
+            S3Helper, 'get_s3_client'
+        ), patch.object(
+            S3Helper, 'get_file_handle', return_value=Mock(_raw_stream=iter(data.splitlines(keepends=True)))
+        ), patch.object(
+            S3Helper, 'download_file', return_value=data
+        ), patch(
+            'pipelinewise.fastsync.commons.tap_s3_csv.split_gzip.open', side_effect=open_small_chunks
+        ), tempfile.TemporaryDirectory() as temp_dir:
+            get_input_files_mock.return_value = [
+                {'key': 'file_1.csv', 'last_modified': datetime.datetime(2001, 7, 13), 'size': len(data)}
+            ]
+            file_path = os.path.join(temp_dir, 'table.csv.gz')
+
+            self.fs_tap_s3_csv.copy_table('table 2', file_path, split_large_files=True, split_file_max_chunks=10)
+
+            chunks = sorted(glob.glob(f'{file_path}.part*'))
+            self.assertGreater(len(chunks), 1)
+
+            ids = []
+            for chunk in chunks:
+                with gzip.open(chunk, 'rt') as chunk_file:
+                    header = chunk_file.readline()
+                    ids.extend(row[0] for row in csv.reader(chunk_file))
+                self.assertEqual(
+                    '"""ID""","""NAME""",_SDC_BATCHED_AT,_SDC_DELETED_AT,_SDC_EXTRACTED_AT,'
+                    '_sdc_source_bucket,_sdc_source_file,_sdc_source_lineno\n',
+                    header,
+                )
+
+        self.assertListEqual([str(i) for i in range(100)], ids)
+
+    def test_copy_table_with_cached_column_types(self):
+        table_spec = self.fs_tap_s3_csv._find_table_spec_by_name('table 2')
+        self.fs_tap_s3_csv.connection_config['export_type_cache'] = True
+
+        with patch(
+            'pipelinewise.fastsync.commons.tap_s3_csv.S3Helper'
+        ), patch.object(
+            self.fs_tap_s3_csv, '_get_files_headers'
+        ) as get_files_headers_mock, patch.object(
+            self.fs_tap_s3_csv, '_write_files_records'
+        ) as write_files_records_mock, tempfile.TemporaryDirectory() as temp_dir:
+            self.fs_tap_s3_csv.state_file = os.path.join(temp_dir, 'state.json')
+            self.fs_tap_s3_csv._save_column_types('table 2', table_spec, {'"ID"': 'integer', '"NAME"': 'string'})
+
+            get_files_headers_mock.return_value = ([], {'"ID"'})
+            self.fs_tap_s3_csv.copy_table('table 2', 'file_path.csv.gz')
+            self.assertIsNone(write_files_records_mock.call_args[1]['sampler'])
+            self.assertDictEqual({'"ID"': 'integer'}, self.fs_tap_s3_csv.tables_column_types['table 2'])
+
+            # types are inferred again if a column is not in the cache
+            get_files_headers_mock.return_value = ([], {'"ID"', '"NEW"'})
+            self.fs_tap_s3_csv.copy_table('table 2', 'file_path.csv.gz')
+            self.assertIsNotNone(write_files_records_mock.call_args[1]['sampler'])
+            self.assertDictEqual(
+                {'"ID"': 'string', '"NEW"': 'string'},
+                self.fs_tap_s3_csv._load_column_types('table 2', table_spec),
+            )
+
+    def _get_manifest_files_headers(self, get_file_handle, get_file_metadata=None):
+        manifest = S3KeyManifest('manifest.json.gz', 'testBucket', None, '.csv')
+        for key in ['deleted.csv', 'file.csv']:
+            manifest.add(
+                {'key': key, 'last_modified': datetime.datetime(2001, 7, 13), 'size': 20, 'etag': '"old"'}
+            )
+
+        with patch.object(S3Helper, 'get_file_handle', side_effect=get_file_handle) as get_file_handle_mock, \
+                patch.object(S3Helper, 'get_file_metadata', side_effect=get_file_metadata):
+            s3_files, headers = self.fs_tap_s3_csv._get_files_headers(
+                list(manifest.get_files()), {}, Mock(), manifest=manifest
+            )
+
+        return manifest, s3_files, headers, get_file_handle_mock
+
+    def test_get_files_headers_skips_deleted_manifest_files(self):
+        def get_file_handle(_, s3_path, **__):
+            if s3_path == 'deleted.csv':
+                raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+            return Mock(_raw_stream=iter([b'id,name\n', b'1,foo\n']))
+
+        manifest, s3_files, headers, _ = self._get_manifest_files_headers(get_file_handle)
+
+        self.assertListEqual(['file.csv'], [s3_file['key'] for s3_file in s3_files])
+        self.assertListEqual(['file.csv'], list(manifest.files))
+        self.assertIn('"ID"', headers)
+
+    def test_get_files_headers_refreshes_overwritten_manifest_files(self):
+        new_file = {'key': 'file.csv', 'last_modified': datetime.datetime(2001, 8, 1), 'size': 40, 'etag': '"new"'}
+
+        def get_file_handle(_, s3_path, etag=None, **__):
+            if etag == '"old"' and s3_path == 'file.csv':
+                raise ClientError({'Error': {'Code': 'PreconditionFailed'}}, 'GetObject')
+            return Mock(_raw_stream=iter([b'id,name\n', b'1,foo\n']))
+
+        manifest, s3_files, _, get_file_handle_mock = self._get_manifest_files_headers(
+            get_file_handle, get_file_metadata=lambda *_, **__: dict(new_file)
+        )
+
+        # the overwritten file is downloaded again with its new ETag
+        self.assertListEqual(
+            ['"old"', '"old"', '"new"'],
+            [call[1]['etag'] for call in get_file_handle_mock.call_args_list],
+        )
+        self.assertDictEqual(new_file, s3_files[1])
+        self.assertDictEqual(new_file, manifest.files['file.csv'])
+        self.assertEqual('"old"', manifest.files['deleted.csv']['etag'])
 
-            get_file_handle_mock.return_value = handle.return_value
+    def test_get_byte_ranges(self):
+        self.assertListEqual([None], get_byte_ranges(None, 10))
+        self.assertListEqual([None], get_byte_ranges(10, 10))
+        self.assertListEqual([(0, 9), (10, 19), (20, 24)], get_byte_ranges(25, 10))
+
+    def test_iter_lines(self):
+        self.assertListEqual(
+            [b'id,name\n', b'1,"multi\n', b'line"\n', b'2,last'],
+            list(_iter_lines([b'id,na', b'me\n1,"multi\nli', b'', b'ne"\n', b'2,la', b'st'])),
+        )
+
+    def test_get_file_records(self):
+        with patch(
+            'pipelinewise.fastsync.commons.tap_s3_csv.singer_encodings_csv'
+        ) as singer_encodings_csv_mock:
+            singer_encodings_csv_mock.get_row_iterator.return_value = [
+                {
+                    'id': 1,
+                    'group': 'A',
+                },
+                {'id': 2, 'group': 'A', 'test': True},
+                {
+                    'id': 3,
+                    'group': 'B',
+                },
+            ]
 
             with patch(
-                'pipelinewise.fastsync.commons.tap_s3_csv.singer_encodings_csv'
-            ) as singer_encodings_csv_mock:
-                singer_encodings_csv_mock.get_row_iterator.return_value = [
-                    {
-                        'id': 1,
-                        'group': 'A',
-                    },
-                    {'id': 2, 'group': 'A', 'test': True},
-                    {
-                        'id': 3,
-                        'group': 'B',
-                    },
-                ]
-
-                with patch(
-                    'pipelinewise.fastsync.commons.tap_s3_csv.datetime'
-                ) as datetime_mock:
-                    datetime_mock.utcnow.return_value.strftime.return_value = (
-                        '2019-11-21'
-                    )
-
-                    records = []
-                    headers = set()
-
-                    self.fs_tap_s3_csv._get_file_records(
-                        's3 path 1', {}, records, headers
-                    )
-
-                    self.assertListEqual(
-                        [
-                            {
-                                S3Helper.SDC_SOURCE_BUCKET_COLUMN: 'testBucket',
-                                S3Helper.SDC_SOURCE_FILE_COLUMN: 's3 path 1',
-                                S3Helper.SDC_SOURCE_LINENO_COLUMN: 1,
-                                '_SDC_EXTRACTED_AT': '2019-11-21',
-                                '_SDC_BATCHED_AT': '2019-11-21',
-                                '_SDC_DELETED_AT': None,
-                                '"ID"': 1,
-                                '"GROUP"': 'A',
-                            },
-                            {
-                                S3Helper.SDC_SOURCE_BUCKET_COLUMN: 'testBucket',
-                                S3Helper.SDC_SOURCE_FILE_COLUMN: 's3 path 1',
-                                S3Helper.SDC_SOURCE_LINENO_COLUMN: 2,
-                                '_SDC_EXTRACTED_AT': '2019-11-21',
-                                '_SDC_BATCHED_AT': '2019-11-21',
-                                '_SDC_DELETED_AT': None,
-                                '"ID"': 2,
-                                '"GROUP"': 'A',
-                                '"TEST"': True,
-                            },
-                            {
-                                S3Helper.SDC_SOURCE_BUCKET_COLUMN: 'testBucket',
-                                S3Helper.SDC_SOURCE_FILE_COLUMN: 's3 path 1',
-                                S3Helper.SDC_SOURCE_LINENO_COLUMN: 3,
-                                '_SDC_EXTRACTED_AT': '2019-11-21',
-                                '_SDC_BATCHED_AT': '2019-11-21',
-                                '_SDC_DELETED_AT': None,
-                                '"ID"': 3,
-                                '"GROUP"': 'B',
-                            },
-                        ],
-                        records,
-                    )
-
-                    self.assertSetEqual(
+                'pipelinewise.fastsync.commons.tap_s3_csv.datetime'
+            ) as datetime_mock:
+                datetime_mock.utcnow.return_value.strftime.return_value = (
+                    '2019-11-21'
+                )
+
+                records = list(
+                    self.fs_tap_s3_csv._get_file_records('s3 path 1', {}, [])
+                )
+
+                self.assertListEqual(
+                    [
+                        {
+                            S3Helper.SDC_SOURCE_BUCKET_COLUMN: 'testBucket',
+                            S3Helper.SDC_SOURCE_FILE_COLUMN: 's3 path 1',
+                            S3Helper.SDC_SOURCE_LINENO_COLUMN: 1,
+                            '_SDC_EXTRACTED_AT': '2019-11-21',
+                            '_SDC_BATCHED_AT': '2019-11-21',
+                            '_SDC_DELETED_AT': None,
+                            '"ID"': 1,
+                            '"GROUP"': 'A',
+                        },
+                        {
+                            S3Helper.SDC_SOURCE_BUCKET_COLUMN: 'testBucket',
+                            S3Helper.SDC_SOURCE_FILE_COLUMN: 's3 path 1',
+                            S3Helper.SDC_SOURCE_LINENO_COLUMN: 2,
+                            '_SDC_EXTRACTED_AT': '2019-11-21',
+                            '_SDC_BATCHED_AT': '2019-11-21',
+                            '_SDC_DELETED_AT': None,
+                            '"ID"': 2,
+                            '"GROUP"': 'A',
+                            '"TEST"': True,
+                        },
                         {
-                            '"ID"',
-                            '"GROUP"',
-                            '"TEST"',
-                            S3Helper.SDC_SOURCE_LINENO_COLUMN,
-                            S3Helper.SDC_SOURCE_FILE_COLUMN,
-                            S3Helper.SDC_SOURCE_BUCKET_COLUMN,
-                            '_SDC_EXTRACTED_AT',
-                            '_SDC_BATCHED_AT',
-                            '_SDC_DELETED_AT',
+                            S3Helper.SDC_SOURCE_BUCKET_COLUMN: 'testBucket',
+                            S3Helper.SDC_SOURCE_FILE_COLUMN: 's3 path 1',
+                            S3Helper.SDC_SOURCE_LINENO_COLUMN: 3,
+                            '_SDC_EXTRACTED_AT': '2019-11-21',
+                            '_SDC_BATCHED_AT': '2019-11-21',
+                            '_SDC_DELETED_AT': None,
+                            '"ID"': 3,
+                            '"GROUP"': 'B',
                         },
-                        headers,
-                    )
+                    ],
+                    records,
+                )
 
     def test_fetch_current_incremental_key_pos_with_no_tables_in_dictionary_returns_empty_dict(
         self,
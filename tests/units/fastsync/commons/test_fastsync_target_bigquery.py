@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import Mock, patch, ANY, mock_open
 from google.cloud import bigquery
+from pipelinewise.fastsync.commons.errors import ExportError
 from pipelinewise.fastsync.commons.target_bigquery import FastSyncTargetBigquery
 
 
@@ -238,6 +239,20 @@ class TestFastSyncTargetBigquery:
         )
         assert client().load_table_from_file.call_count == 3
 
+        # LOAD parquet file
+        with patch('pipelinewise.fastsync.commons.target_bigquery.open', mocked_open):
+            self.bigquery.copy_to_table(
+                filepath='/path/to/dummy-file.parquet',
+                target_schema='test_schema',
+                table_name='test_table',
+                size_bytes=1000,
+                is_temporary=False,
+                export_format='parquet',
+            )
+        mocked_open.assert_called_with('/path/to/dummy-file.parquet', 'rb')
+        assert load_job_config.return_value.source_format == bigquery.SourceFormat.PARQUET
+        assert client().load_table_from_file.call_count == 4
+
     @patch('pipelinewise.fastsync.commons.target_bigquery.bigquery.Client')
     def test_grant_select_on_table(self, client, bigquery_job):
         """Validate if GRANT command generated correctly"""
@@ -297,32 +312,27 @@ class TestFastSyncTargetBigquery:
             job_config=ANY,
         )
 
-    @patch('pipelinewise.fastsync.commons.target_bigquery.bigquery.CopyJobConfig')
     @patch('pipelinewise.fastsync.commons.target_bigquery.bigquery.Client')
-    def test_swap_tables(
-        self, client, copy_job_config, bigquery_job_config, bigquery_job
-    ):
+    def test_swap_tables(self, client, bigquery_job):
         """Validate if swap table commands generated correctly"""
         # Swap tables with standard table and column names
-        client().copy_table.return_value = bigquery_job
-        copy_job_config.return_value = bigquery_job_config
+        client().query.return_value = bigquery_job
         self.bigquery.swap_tables(schema='test_schema', table_name='test_table')
-        assert bigquery_job_config.write_disposition == 'WRITE_TRUNCATE'
-        client().copy_table.assert_called_with(
-            'dummy-project.test_schema.test_table_temp',
-            'dummy-project.test_schema.test_table',
+        client().query.assert_called_with(
+            'CREATE OR REPLACE TABLE `dummy-project.test_schema.test_table` '
+            'CLONE `dummy-project.test_schema.test_table_temp`',
             job_config=ANY,
         )
         client().delete_table.assert_called_with(
             'dummy-project.test_schema.test_table_temp'
         )
+        assert client().copy_table.call_count == 0
 
         # Swap tables with reserved word in table and column names in temp table
         self.bigquery.swap_tables(schema='test_schema', table_name='full')
-        assert bigquery_job_config.write_disposition == 'WRITE_TRUNCATE'
-        client().copy_table.assert_called_with(
-            'dummy-project.test_schema.full_temp',
-            'dummy-project.test_schema.full',
+        client().query.assert_called_with(
+            'CREATE OR REPLACE TABLE `dummy-project.test_schema.full` '
+            'CLONE `dummy-project.test_schema.full_temp`',
             job_config=ANY,
         )
         client().delete_table.assert_called_with('dummy-project.test_schema.full_temp')
@@ -331,12 +341,98 @@ class TestFastSyncTargetBigquery:
         self.bigquery.swap_tables(
             schema='test_schema', table_name='table with SPACE and UPPERCASE'
         )
-        assert bigquery_job_config.write_disposition == 'WRITE_TRUNCATE'
-        client().copy_table.assert_called_with(
-            'dummy-project.test_schema.table_with_space_and_uppercase_temp',
-            'dummy-project.test_schema.table_with_space_and_uppercase',
+        client().query.assert_called_with(
+            'CREATE OR REPLACE TABLE `dummy-project.test_schema.table_with_space_and_uppercase` '
+            'CLONE `dummy-project.test_schema.table_with_space_and_uppercase_temp`',
             job_config=ANY,
         )
         client().delete_table.assert_called_with(
             'dummy-project.test_schema.table_with_space_and_uppercase_temp'
         )
+
+    @patch('pipelinewise.fastsync.commons.target_bigquery.bigquery.LoadJobConfig')
+    @patch('pipelinewise.fastsync.commons.target_bigquery.bigquery.Client')
+    def test_copy_parts_to_table(
+        self, client, load_job_config, bigquery_job_config, bigquery_job
+    ):
+        """Validate if every file part is appended to the table"""
+        bigquery_job.output_rows = 10
+        client().load_table_from_file.return_value = bigquery_job
+        load_job_config.return_value = bigquery_job_config
+        mocked_open = mock_open()
+        with patch('pipelinewise.fastsync.commons.target_bigquery.open', mocked_open), \
+                patch('pipelinewise.fastsync.commons.target_bigquery.os.path.getsize', return_value=1000):
+            self.bigquery.copy_parts_to_table(
+                file_parts=['/path/to/file.csv.gz.part00001', '/path/to/file.csv.gz.part00002'],
+                target_schema='test_schema',
+                table_name='test_table',
+                size_bytes=1000,
+                is_temporary=True,
+            )
+        mocked_open.assert_any_call('/path/to/file.csv.gz.part00001', 'rb')
+        mocked_open.assert_any_call('/path/to/file.csv.gz.part00002', 'rb')
+        assert bigquery_job_config.source_format == bigquery.SourceFormat.CSV
+        assert bigquery_job_config.write_disposition == 'WRITE_APPEND'
+        client().dataset().table.assert_called_with('test_table_temp')
+        assert client().load_table_from_file.call_count == 2
+        assert client().create_table.call_count == 0
+
+    @patch('pipelinewise.fastsync.commons.target_bigquery.bigquery.Client')
+    def test_copy_parts_to_table_with_too_large_file_part(self, client):
+        """Validate if nothing is loaded if a gzip compressed file part is larger than 4 GB"""
+        with patch('pipelinewise.fastsync.commons.target_bigquery.os.path.getsize',
+                   side_effect=[1000, 5 * (1 << 30)]), \
+                pytest.raises(ExportError, match='file.csv.gz.part00002 is 5368709120 bytes'):
+            self.bigquery.copy_parts_to_table(
+                file_parts=['/path/to/file.csv.gz.part00001', '/path/to/file.csv.gz.part00002'],
+                target_schema='test_schema',
+                table_name='test_table',
+                size_bytes=1000,
+                is_temporary=True,
+            )
+        assert client().load_table_from_file.call_count == 0
+
+    @patch('pipelinewise.fastsync.commons.target_bigquery.bigquery.LoadJobConfig')
+    @patch('pipelinewise.fastsync.commons.target_bigquery.bigquery.Client')
+    def test_copy_to_table_with_transformations(
+        self, client, load_job_config, bigquery_job_config, bigquery_job
+    ):
+        """Validate if transformations are applied by inserting the rows of a staging table"""
+        self.bigquery.transformation_config = {
+            'transformations': [
+                {'tap_stream_name': 'test_schema-test_table', 'field_id': 'email', 'type': 'HASH'},
+                {
+                    'tap_stream_name': 'test_schema-test_table',
+                    'field_id': 'name',
+                    'type': 'MASK-HIDDEN',
+                    'when': [{'column': 'country', 'equals': 'FR'}],
+                },
+            ]
+        }
+        client().load_table_from_file.return_value = bigquery_job
+        client().query.return_value = bigquery_job
+        load_job_config.return_value = bigquery_job_config
+        with patch('pipelinewise.fastsync.commons.target_bigquery.open', mock_open()):
+            self.bigquery.copy_to_table(
+                filepath='/path/to/dummy-file.csv.gz',
+                target_schema='test_schema',
+                table_name='test_schema.test_table',
+                size_bytes=1000,
+                is_temporary=True,
+                write_truncate=False,
+            )
+
+        client().dataset().table.assert_called_with('test_table_temp_staging')
+        assert bigquery_job_config.write_disposition == 'WRITE_TRUNCATE'
+        client().query.assert_called_with(
+            'INSERT INTO test_schema.`test_table_temp` SELECT * REPLACE ('
+            'CASE WHEN (`country` = \'FR\') THEN \'hidden\' ELSE `name` END AS `name`, '
+            'TO_BASE64(SHA256(`email`)) AS `email`'
+            ') FROM test_schema.`test_table_temp_staging`',
+            job_config=ANY,
+        )
+        assert client().delete_table.call_count == 1
+
+        # Transformations are not applied again
+        self.bigquery.obfuscate_columns('test_schema', 'test_schema.test_table')
+        assert client().query.call_count == 1
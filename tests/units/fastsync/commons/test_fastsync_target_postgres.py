@@ -1,4 +1,7 @@
+import os
+import tempfile
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
 
 from pipelinewise.fastsync.commons.target_postgres import FastSyncTargetPostgres
 
@@ -206,6 +209,41 @@ class TestFastSyncTargetPostgres(TestCase):
             'GRANT SELECT ON ALL TABLES IN SCHEMA test_schema TO GROUP test_role'
         ]
 
+    def test_copy_parts_to_table(self):
+        """Validate if file parts are loaded over multiple connections"""
+        connections = []
+
+        def open_connection():
+            connection = MagicMock()
+            connection.cursor.return_value.__enter__.return_value.rowcount = 5
+            connections.append(connection)
+            return connection
+
+        self.postgres.connection_config = {'load_concurrency': 2}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_parts = []
+            for num in range(3):
+                file_part = os.path.join(temp_dir, f'export.csv.part0000{num + 1}')
+                with open(file_part, 'w', encoding='utf-8') as file:
+                    file.write('1,a\n')
+                file_parts.append(file_part)
+
+            with patch.object(self.postgres, 'open_connection', side_effect=open_connection):
+                inserts = self.postgres.copy_parts_to_table(
+                    file_parts, 'test_schema', 'test_table', 12, is_temporary=True, codec='none'
+                )
+
+        assert inserts == 15
+        assert len(connections) == 2
+        copied_files = [
+            call[0][0]
+            for connection in connections
+            for call in connection.cursor.return_value.__enter__.return_value.copy_expert.call_args_list
+        ]
+        assert len(copied_files) == 3
+        assert all('COPY test_schema."test_table_temp"' in copy_sql for copy_sql in copied_files)
+        assert all(connection.close.called for connection in connections)
+
     def test_swap_tables(self):
         """Validate if swap table commands generated correctly"""
         # Swap tables with standard table and column names
@@ -235,6 +273,42 @@ class TestFastSyncTargetPostgres(TestCase):
             'RENAME TO "table with space and uppercase"',
         ]
 
+    def test_bulk_load(self):
+        """Validate if bulk loads create unlogged temp tables and build the primary key after the load"""
+        self.postgres.connection_config = {'bulk_load': True}
+        self.postgres.create_table(
+            target_schema='test_schema',
+            table_name='test_table',
+            columns=['"id" INTEGER', '"txt" CHARACTER VARYING'],
+            primary_key=['"id"'],
+            is_temporary=True,
+        )
+        self.postgres.finish_bulk_load('test_schema', 'test_table', ['"ID"'])
+        assert self.postgres.executed_queries == [
+            'CREATE UNLOGGED TABLE IF NOT EXISTS test_schema."test_table_temp" ('
+            '"id" integer,"txt" character varying,'
+            '_sdc_extracted_at timestamp without time zone,'
+            '_sdc_batched_at timestamp without time zone,'
+            '_sdc_deleted_at character varying)',
+            'ALTER TABLE test_schema."test_table_temp" SET LOGGED',
+            'ALTER TABLE test_schema."test_table_temp" ADD PRIMARY KEY ("id")',
+            'ANALYZE test_schema."test_table_temp"',
+        ]
+
+        # Target tables and tables of normal loads are created with their primary key
+        self.postgres.executed_queries = []
+        self.postgres.create_table('test_schema', 'test_table', ['"id" INTEGER'], ['"id"'])
+        self.postgres.connection_config = {}
+        self.postgres.finish_bulk_load('test_schema', 'test_table', ['"id"'])
+        assert self.postgres.executed_queries == [
+            'CREATE TABLE IF NOT EXISTS test_schema."test_table" ('
+            '"id" integer,'
+            '_sdc_extracted_at timestamp without time zone,'
+            '_sdc_batched_at timestamp without time zone,'
+            '_sdc_deleted_at character varying'
+            ', PRIMARY KEY ("id"))'
+        ]
+
     def test_obfuscate_columns_case1(self):
         """
         Test obfuscation where given transformations are emtpy
@@ -407,25 +481,25 @@ class TestFastSyncTargetPostgres(TestCase):
 
         self.postgres.obfuscate_columns(target_schema, table_name, is_temporary=True)
 
+        # Conditional transformations see the values transformed by the previous ones, in one UPDATE
+        col_2 = 'CASE WHEN ("col_4" IS NULL) THEN \'hidden\' ELSE "col_2" END'
         self.assertListEqual(
             self.postgres.executed_queries,
             [
-                'UPDATE "my_schema"."my_table_temp" SET "col_2" = \'hidden\' WHERE ("col_4" IS NULL);',
                 'UPDATE "my_schema"."my_table_temp" SET '
-                '"col_3" = MAKE_TIMESTAMP(DATE_PART(\'year\', "col_3")::int, 1, 1, DATE_PART(\'hour\', "col_3")::int, '
+                f'"col_2" = {col_2}, '
+                '"col_3" = CASE WHEN ("col_5" = \'some_value\') THEN '
+                'MAKE_TIMESTAMP(DATE_PART(\'year\', "col_3")::int, 1, 1, DATE_PART(\'hour\', "col_3")::int, '
                 'DATE_PART(\'minute\', "col_3")::int, DATE_PART(\'second\', "col_3")::double precision) '
-                'WHERE ("col_5" = \'some_value\');',
-                'UPDATE "my_schema"."my_table_temp" SET '
-                '"col_6" = CONCAT(SUBSTRING("col_6", 1, 5), '
-                'ENCODE(DIGEST(SUBSTRING("col_6", 5 + 1), \'sha256\'), \'hex\')) WHERE ("col_1" = 30) AND '
-                '("col_2" ~ \'[0-9]{3}\.[0-9]{3}\');',  # pylint: disable=W1401  # noqa: W605
-                'UPDATE "my_schema"."my_table_temp" SET '
-                '"col_7" = CASE WHEN LENGTH("col_7") > 2 * 3 THEN '
+                'ELSE "col_3" END, '
+                f'"col_6" = CASE WHEN ("col_1" = 30) AND ({col_2} ~ \'[0-9]{{3}}\\.[0-9]{{3}}\') '
+                'THEN CONCAT(SUBSTRING("col_6", 1, 5), '
+                'ENCODE(DIGEST(SUBSTRING("col_6", 5 + 1), \'sha256\'), \'hex\')) ELSE "col_6" END, '
+                f'"col_7" = CASE WHEN ("col_1" = 30) AND ({col_2} ~ \'[0-9]{{3}}\\.[0-9]{{3}}\') '
+                'AND ("col_4" IS NULL) THEN CASE WHEN LENGTH("col_7") > 2 * 3 THEN '
                 'CONCAT(SUBSTRING("col_7", 1, 3), REPEAT(\'*\', LENGTH("col_7")-(2 * 3)), '
                 'SUBSTRING("col_7", LENGTH("col_7")-3+1, 3)) '
-                'ELSE REPEAT(\'*\', LENGTH("col_7")) END WHERE ("col_1" = 30) AND '
-                '("col_2" ~ \'[0-9]{3}\.[0-9]{3}\') AND ("col_4" IS NULL);',  # pylint: disable=W1401  # noqa: W605
-                'UPDATE "my_schema"."my_table_temp" SET "col_1" = NULL, '
-                '"col_4" = 0, "col_5" = ENCODE(DIGEST("col_5", \'sha256\'), \'hex\');',
+                'ELSE REPEAT(\'*\', LENGTH("col_7")) END ELSE "col_7" END, '
+                '"col_1" = NULL, "col_4" = 0, "col_5" = ENCODE(DIGEST("col_5", \'sha256\'), \'hex\');',
             ],
         )
@@ -0,0 +1,141 @@
+import json
+from unittest import TestCase
+
+from pipelinewise.fastsync.commons.target_redshift import FastSyncTargetRedshift
+
+
+class S3Mock:
+    """
+    Mocked boto3
+    """
+
+    def __init__(self):
+        self.put_objects = {}
+        self.deleted_keys = []
+
+    # pylint: disable=invalid-name
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        """Keep the content of the uploaded object"""
+        self.put_objects[Key] = {'bucket': Bucket, 'body': Body, **kwargs}
+
+    # pylint: disable=invalid-name,unused-argument
+    def delete_object(self, Bucket, Key):
+        """Keep the deleted key"""
+        self.deleted_keys.append(Key)
+
+
+class FastSyncTargetRedshiftMock(FastSyncTargetRedshift):
+    """
+    Mocked FastSyncTargetRedshift class
+    """
+
+    def __init__(self, connection_config, transformation_config=None):
+        super().__init__(connection_config, transformation_config)
+
+        self.executed_queries = []
+        self.failing_query = None
+        self.s3 = S3Mock()
+
+    def query(self, query, params=None):
+        self.executed_queries.append(query)
+        if self.failing_query and query.startswith(self.failing_query):
+            raise Exception(f'Failed query: {query}')
+        return []
+
+
+class TestFastSyncTargetRedshift(TestCase):
+    """
+    Unit tests for fastsync target redshift
+    """
+
+    def setUp(self) -> None:
+        """Initialise test FastSyncTargetRedshift object"""
+        self.redshift = FastSyncTargetRedshiftMock(
+            connection_config={
+                's3_bucket': 'dummy_bucket',
+                'aws_redshift_copy_role_arn': 'arn:aws:iam::123:role/copy',
+            },
+        )
+
+    def test_upload_manifest(self):
+        """The manifest should list every file part with its size"""
+        manifest_key = self.redshift.upload_manifest(
+            ['prefix/export.csv.gz.part00001', 'prefix/export.csv.gz.part00002'],
+            {'prefix/export.csv.gz.part00001': 10, 'prefix/export.csv.gz.part00002': 5},
+        )
+
+        self.assertEqual('prefix/export.csv.gz.manifest', manifest_key)
+        self.assertDictEqual(
+            {
+                'entries': [
+                    {
+                        'url': 's3://dummy_bucket/prefix/export.csv.gz.part00001',
+                        'mandatory': True,
+                        'meta': {'content_length': 10},
+                    },
+                    {
+                        'url': 's3://dummy_bucket/prefix/export.csv.gz.part00002',
+                        'mandatory': True,
+                        'meta': {'content_length': 5},
+                    },
+                ]
+            },
+            json.loads(self.redshift.s3.put_objects[manifest_key]['body']),
+        )
+
+    def test_copy_parts_to_table(self):
+        """Multiple file parts should be loaded with one COPY from a manifest and deleted"""
+        s3_keys = ['export.csv.gz.part00001', 'export.csv.gz.part00002']
+        self.redshift.copy_parts_to_table(s3_keys, 'test_schema', 'test_table', 15, is_temporary=True)
+
+        self.assertEqual(1, len(self.redshift.executed_queries))
+        copy_sql = ' '.join(self.redshift.executed_queries[0].split())
+        self.assertTrue(
+            copy_sql.startswith('COPY test_schema."TEST_TABLE_TEMP" FROM \'s3://dummy_bucket/export.csv.gz.manifest\'')
+        )
+        self.assertTrue(copy_sql.endswith('CSV GZIP MANIFEST'))
+        self.assertListEqual(['export.csv.gz.manifest'] + s3_keys, self.redshift.s3.deleted_keys)
+
+    def test_copy_single_part_to_table(self):
+        """A single file should be loaded without manifest"""
+        self.redshift.copy_parts_to_table(['export.csv.gz'], 'test_schema', 'test_table', 15, is_temporary=True)
+
+        copy_sql = ' '.join(self.redshift.executed_queries[0].split())
+        self.assertIn('FROM \'s3://dummy_bucket/export.csv.gz\'', copy_sql)
+        self.assertNotIn('MANIFEST', copy_sql)
+        self.assertDictEqual({}, self.redshift.s3.put_objects)
+        self.assertListEqual(['export.csv.gz'], self.redshift.s3.deleted_keys)
+
+    def _copy_transformed_table(self):
+        self.redshift.transformation_config = {
+            'transformations': [{'tap_stream_name': 'test_schema-test_table', 'field_id': 'col', 'type': 'HASH'}]
+        }
+        self.redshift.copy_to_table('export.csv.gz', 'test_schema', 'test_schema.test_table', 15, is_temporary=True)
+
+    def test_copy_to_table_with_transformations(self):
+        """Tables with transformations should be loaded through a uniquely named staging table"""
+        self._copy_transformed_table()
+
+        create_sql, copy_sql, _, insert_sql, drop_sql = self.redshift.executed_queries
+        staging_table = create_sql.split()[3]
+        self.assertRegex(staging_table, r'^"TEST_SCHEMA_TEST_TABLE_TEMP_STAGING_[A-Z0-9]{8}"$')
+        self.assertEqual(f'CREATE TEMP TABLE {staging_table} (LIKE test_schema."TEST_TABLE_TEMP")', create_sql)
+        self.assertTrue(copy_sql.startswith(f'COPY {staging_table} FROM'))
+        self.assertTrue(insert_sql.startswith('INSERT INTO test_schema."TEST_TABLE_TEMP" SELECT'))
+        self.assertEqual(f'DROP TABLE IF EXISTS {staging_table}', drop_sql)
+        self.assertIn('test_schema.test_table', self.redshift.tables_transformed_at_load)
+
+        self.redshift.executed_queries = []
+        self._copy_transformed_table()
+        self.assertNotEqual(staging_table, self.redshift.executed_queries[0].split()[3])
+
+    def test_copy_to_table_with_transformations_drops_staging_table_on_failure(self):
+        """The staging table should be dropped if the load fails"""
+        self.redshift.failing_query = 'COPY'
+
+        with self.assertRaises(Exception):
+            self._copy_transformed_table()
+
+        staging_table = self.redshift.executed_queries[0].split()[3]
+        self.assertEqual(f'DROP TABLE IF EXISTS {staging_table}', self.redshift.executed_queries[-1])
+        self.assertNotIn('test_schema.test_table', self.redshift.tables_transformed_at_load)
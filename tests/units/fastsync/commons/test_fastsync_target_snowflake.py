@@ -1,4 +1,6 @@
 import json
+import os
+import tempfile
 from unittest import TestCase
 from unittest.mock import MagicMock
 
@@ -12,7 +14,7 @@ class S3Mock:
     """
 
     def __init__(self):
-        pass
+        self.uploaded = {}
 
     # pylint: disable=invalid-name
     def delete_object(self, Bucket, Key):
@@ -26,6 +28,10 @@ class S3Mock:
         """Mock if needed"""
         return {}
 
+    def upload_fileobj(self, fileobj, bucket, key, **kwargs):
+        """Read the uploaded file object"""
+        self.uploaded = {'content': fileobj.read(), 'bucket': bucket, 'key': key, **kwargs}
+
 
 class FastSyncTargetSnowflakeMock(FastSyncTargetSnowflake):
     """
@@ -224,6 +230,39 @@ class TestFastSyncTargetSnowflake(TestCase):
             ' compression=GZIP binary_format=HEX)'
         ]
 
+        # COPY zstd compressed files
+        self.snowflake.executed_queries = []
+        self.snowflake.copy_to_table(
+            s3_key='s3_key',
+            target_schema='test_schema',
+            table_name='test_table',
+            size_bytes=1000,
+            is_temporary=False,
+            skip_csv_header=False,
+            codec='zstd',
+        )
+        assert self.snowflake.executed_queries == [
+            'COPY INTO test_schema."TEST_TABLE" FROM \'@dummy_stage/s3_key\''
+            ' FILE_FORMAT = (type=CSV escape=\'\\x1e\' escape_unenclosed_field=\'\\x1e\''
+            ' field_optionally_enclosed_by=\'\"\' skip_header=0'
+            ' compression=ZSTD binary_format=HEX)'
+        ]
+
+        # COPY parquet files by column names
+        self.snowflake.executed_queries = []
+        self.snowflake.copy_to_table(
+            s3_key='s3_key',
+            target_schema='test_schema',
+            table_name='test_table',
+            size_bytes=1000,
+            is_temporary=False,
+            export_format='parquet',
+        )
+        assert self.snowflake.executed_queries == [
+            'COPY INTO test_schema."TEST_TABLE" FROM \'@dummy_stage/s3_key\''
+            ' FILE_FORMAT = (type=PARQUET) MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE'
+        ]
+
     def test_grant_select_on_table(self):
         """Validate if GRANT command generated correctly"""
         # GRANT table with standard table and column names
@@ -581,23 +620,23 @@ class TestFastSyncTargetSnowflake(TestCase):
 
         self.snowflake.obfuscate_columns(target_schema, table_name)
 
+        # Conditional transformations see the values transformed by the previous ones, in one UPDATE
+        col_2 = 'CASE WHEN ("COL_4" IS NULL) THEN \'hidden\' ELSE "COL_2" END'
         self.assertListEqual(
             self.snowflake.executed_queries,
             [
-                'UPDATE "MY_SCHEMA"."MY_TABLE_TEMP" SET "COL_2" = \'hidden\' WHERE ("COL_4" IS NULL);',
-                'UPDATE "MY_SCHEMA"."MY_TABLE_TEMP" SET "COL_3" = TIMESTAMP_NTZ_FROM_PARTS('
-                'DATE_FROM_PARTS(YEAR("COL_3"), 1, 1),TO_TIME("COL_3")) WHERE ("COL_5" = \'some_value\');',
                 'UPDATE "MY_SCHEMA"."MY_TABLE_TEMP" SET '
-                '"COL_6" = CONCAT(SUBSTRING("COL_6", 1, 5), SHA2(SUBSTRING("COL_6", 5 + 1), 256)) '
-                'WHERE ("COL_1" = 30) AND ("COL_2" '
-                'REGEXP \'[0-9]{3}\.[0-9]{3}\');',  # pylint: disable=W1401  # noqa: W605
-                'UPDATE "MY_SCHEMA"."MY_TABLE_TEMP" SET '
-                '"COL_7" = CASE WHEN LENGTH("COL_7") > 2 * 3 THEN '
+                f'"COL_2" = {col_2}, '
+                '"COL_3" = CASE WHEN ("COL_5" = \'some_value\') THEN TIMESTAMP_NTZ_FROM_PARTS('
+                'DATE_FROM_PARTS(YEAR("COL_3"), 1, 1),TO_TIME("COL_3")) ELSE "COL_3" END, '
+                f'"COL_6" = CASE WHEN ("COL_1" = 30) AND ({col_2} REGEXP \'[0-9]{{3}}\\.[0-9]{{3}}\') '
+                'THEN CONCAT(SUBSTRING("COL_6", 1, 5), SHA2(SUBSTRING("COL_6", 5 + 1), 256)) ELSE "COL_6" END, '
+                f'"COL_7" = CASE WHEN ("COL_1" = 30) AND ({col_2} REGEXP \'[0-9]{{3}}\\.[0-9]{{3}}\') '
+                'AND ("COL_4" IS NULL) THEN CASE WHEN LENGTH("COL_7") > 2 * 3 THEN '
                 'CONCAT(SUBSTRING("COL_7", 1, 3), REPEAT(\'*\', LENGTH("COL_7")-(2 * 3)), '
                 'SUBSTRING("COL_7", LENGTH("COL_7")-3+1, 3)) '
-                'ELSE REPEAT(\'*\', LENGTH("COL_7")) END WHERE ("COL_1" = 30) AND ("COL_2" '
-                'REGEXP \'[0-9]{3}\.[0-9]{3}\') AND ("COL_4" IS NULL);',  # pylint: disable=W1401  # noqa: W605
-                'UPDATE "MY_SCHEMA"."MY_TABLE_TEMP" SET "COL_1" = NULL, "COL_4" = 0, "COL_5" = SHA2("COL_5", 256);',
+                'ELSE REPEAT(\'*\', LENGTH("COL_7")) END ELSE "COL_7" END, '
+                '"COL_1" = NULL, "COL_4" = 0, "COL_5" = SHA2("COL_5", 256);',
             ],
         )
 
@@ -693,3 +732,72 @@ class TestFastSyncTargetSnowflake(TestCase):
             },
             MetadataDirective='REPLACE',
         )
+
+    def test_upload_to_s3_with_client_side_encryption(self):
+        """
+        Files should be encrypted while uploaded, with the encryption metadata sent to S3
+        """
+        self.snowflake.connection_config['client_side_encryption_master_key'] = 'MDEyMzQ1Njc4OWFiY2RlZg=='
+        self.snowflake.connection_config['s3_key_prefix'] = 'snowflake-import/'
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file = os.path.join(temp_dir, 'export.csv.gz')
+            with open(file, 'wb') as export_file:
+                export_file.write(b'x' * 100)
+
+            s3_key = self.snowflake.upload_to_s3(file)
+
+            self.assertEqual(os.listdir(temp_dir), ['export.csv.gz'])
+
+        uploaded = self.snowflake.s3.uploaded
+        self.assertEqual(s3_key, 'snowflake-import/export.csv.gz')
+        self.assertEqual(uploaded['bucket'], 'dummy_bucket')
+        self.assertEqual(uploaded['key'], s3_key)
+        self.assertEqual(len(uploaded['content']), 112)
+        self.assertEqual(set(uploaded['ExtraArgs']['Metadata']), {'x-amz-key', 'x-amz-iv'})
+        self.assertIs(uploaded['Config'], self.snowflake.transfer_config)
+
+    def test_copy_to_table_with_transformations(self):
+        """Validate if transformations are applied by the COPY command"""
+        table_columns = [
+            {'name': 'ID', 'type': 'NUMBER(38,0)'},
+            {'name': 'EMAIL', 'type': 'VARCHAR(16777216)'},
+            {'name': 'PAYLOAD', 'type': 'VARIANT'},
+            {'name': '_SDC_DELETED_AT', 'type': 'VARCHAR(16777216)'},
+        ]
+        self.snowflake.query = lambda query, params=None, query_tag_props=None: (
+            self.snowflake.executed_queries.append(query) or (table_columns if query.startswith('DESC') else [])
+        )
+        self.snowflake.transformation_config = {
+            'transformations': [
+                {
+                    'tap_stream_name': 'test_schema-test_table',
+                    'field_id': 'email',
+                    'type': 'HASH',
+                    'when': [{'column': 'id', 'equals': 1}, {'column': 'payload', 'equals': None}],
+                },
+            ]
+        }
+
+        self.snowflake.copy_to_table(
+            s3_key='s3_key',
+            target_schema='test_schema',
+            table_name='test_schema.test_table',
+            size_bytes=1000,
+            is_temporary=True,
+        )
+
+        assert self.snowflake.executed_queries == [
+            'DESC TABLE test_schema."TEST_TABLE_TEMP"',
+            'COPY INTO test_schema."TEST_TABLE_TEMP" FROM (SELECT $1, '
+            'CASE WHEN ($1::NUMBER(38,0) = 1) AND (PARSE_JSON($3) IS NULL) '
+            'THEN SHA2($2::VARCHAR(16777216), 256) ELSE $2::VARCHAR(16777216) END, '
+            '$3, $4 FROM \'@dummy_stage/s3_key\')'
+            ' FILE_FORMAT = (type=CSV escape=\'\\x1e\' escape_unenclosed_field=\'\\x1e\''
+            ' field_optionally_enclosed_by=\'\"\' skip_header=0'
+            ' compression=GZIP binary_format=HEX)',
+        ]
+
+        # Transformations are not applied again
+        self.snowflake.obfuscate_columns('test_schema', 'test_schema.test_table')
+        assert len(self.snowflake.executed_queries) == 2
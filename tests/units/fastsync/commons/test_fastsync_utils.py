@@ -12,7 +12,7 @@ from pipelinewise.fastsync.commons.utils import NotSelectedTableException
 RESOURCES_DIR = '{}/resources'.format(os.path.dirname(__file__))
 
 
-# pylint: disable=missing-function-docstring,no-self-use,invalid-name,too-few-public-methods
+# pylint: disable=missing-function-docstring,no-self-use,invalid-name,too-few-public-methods,too-many-public-methods
 class MySqlMock:
     """
     MySQL mock
@@ -62,6 +62,21 @@ class TestFastSyncUtils(TestCase):
     Unit tests for fastsync common functions
     """
 
+    def test_retry_pattern_gives_up_on_error_codes(self):
+        """Errors with one of the give up error codes should not be retried"""
+        from botocore.exceptions import ClientError
+
+        calls = []
+
+        @utils.retry_pattern(giveup_error_codes=('NoSuchKey',))
+        def get_object():
+            calls.append(1)
+            raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+
+        with self.assertRaises(ClientError):
+            get_object()
+        self.assertEqual(1, len(calls))
+
     def test_tablename_to_dict(self):
         """Test identifying schema and table names from fully qualified table names"""
 
@@ -631,3 +646,105 @@ class TestFastSyncUtils(TestCase):
             ),
             'pipelinewise_tap_table_suffix_fastsync_postfix.ext',
         )
+
+        # Extension should be set by the codec
+        self.assertRegex(
+            utils.gen_export_filename('tap', 'table', codec='zstd'),
+            r'pipelinewise_tap_table_(\d{8})-(\d{6})-(\d{6})_fastsync_(.{8}).csv.zst',
+        )
+        self.assertRegex(
+            utils.gen_export_filename('tap', 'table', codec='none'),
+            r'pipelinewise_tap_table_(\d{8})-(\d{6})-(\d{6})_fastsync_(.{8}).csv$',
+        )
+
+    def test_negotiate_export_codec(self):
+        """
+        Test selecting the compression codec of the export files
+        """
+        # First codec of the target should be selected by default
+        self.assertEqual(utils.negotiate_export_codec(('zstd', 'gzip', 'none')), 'zstd')
+        self.assertEqual(utils.negotiate_export_codec(('zstd', 'gzip', 'none'), 'gzip'), 'gzip')
+
+        # Codecs not supported by the target should raise exception
+        with self.assertRaises(Exception):
+            utils.negotiate_export_codec(('none',), 'zstd')
+        with self.assertRaises(ValueError):
+            utils.negotiate_export_codec(('zstd', 'gzip', 'none'), 'lz4')
+
+    def test_get_slice_aligned_split(self):
+        """
+        Test splitting exports into a multiple of the slices
+        """
+        # Small tables should be split into one part by slice
+        self.assertDictEqual(
+            utils.get_slice_aligned_split(4, 1000 * (1 << 20), max_chunk_size_mb=1000, codec='none'),
+            {'split_large_files': True, 'split_file_chunk_size_mb': 250, 'split_file_max_chunks': 4},
+        )
+
+        # Parts should not be bigger than the max chunk size
+        self.assertDictEqual(
+            utils.get_slice_aligned_split(4, 10000 * (1 << 20), max_chunk_size_mb=1000, codec='none'),
+            {'split_large_files': True, 'split_file_chunk_size_mb': 834, 'split_file_max_chunks': 12},
+        )
+
+        # Size of compressed exports should be estimated by the compression rate
+        self.assertDictEqual(
+            utils.get_slice_aligned_split(2, 1000 * (1 << 20), codec='gzip'),
+            {'split_large_files': True, 'split_file_chunk_size_mb': 60, 'split_file_max_chunks': 2},
+        )
+
+        # Parallel exports should have at least one part by range
+        self.assertDictEqual(
+            utils.get_slice_aligned_split(4, 1000 * (1 << 20), max_chunk_size_mb=1000, codec='none', min_chunks=6),
+            {'split_large_files': True, 'split_file_chunk_size_mb': 125, 'split_file_max_chunks': 8},
+        )
+
+        # Exports of unknown sizes should keep their default split
+        self.assertDictEqual(utils.get_slice_aligned_split(4, None, min_chunks=6), {})
+        self.assertDictEqual(utils.get_slice_aligned_split(4, 0), {})
+
+    def test_log_split_part_sizes(self):
+        """
+        Test logging the actual sizes of the file parts against the estimated size
+        """
+        split_args = {'split_large_files': True, 'split_file_chunk_size_mb': 10, 'split_file_max_chunks': 2}
+
+        with self.assertLogs(utils.LOGGER, level='INFO') as logs:
+            utils.log_split_part_sizes('db.table', split_args, {'key.part00001': 10 << 20, 'key.part00002': 8 << 20})
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('2 file parts of 8.0 to 10.0 MB, estimated 2 parts of 10 MB', logs.output[0])
+
+        # Parts much bigger than estimated should be warned about
+        with self.assertLogs(utils.LOGGER, level='WARNING') as logs:
+            utils.log_split_part_sizes('db.table', split_args, {'key.part00001': 10 << 20, 'key.part00002': 50 << 20})
+        self.assertIn('Largest file part of db.table is 50.0 MB', logs.output[0])
+
+    def test_get_key_ranges(self):
+        """
+        Test splitting integer key space into ranges
+        """
+        # Empty table should be exported in one unbounded range
+        self.assertEqual(utils.get_key_ranges(None, None, 4), [(None, None)])
+
+        # One range requested should not split the table
+        self.assertEqual(utils.get_key_ranges(1, 100, 1), [(None, None)])
+
+        # Key space should be split evenly with unbounded first and last ranges
+        self.assertEqual(
+            utils.get_key_ranges(1, 100, 4),
+            [(None, 26), (26, 51), (51, 76), (76, None)],
+        )
+
+        # Number of ranges should not be greater than number of keys
+        self.assertEqual(utils.get_key_ranges(10, 11, 4), [(None, 11), (11, None)])
+
+    def test_get_key_range_condition(self):
+        """
+        Test generating SQL conditions of key ranges
+        """
+        self.assertEqual(utils.get_key_range_condition('`id`', None, None), 'TRUE')
+        self.assertEqual(utils.get_key_range_condition('`id`', None, 26), '`id` < 26')
+        self.assertEqual(utils.get_key_range_condition('`id`', 76, None), '`id` >= 76')
+        self.assertEqual(
+            utils.get_key_range_condition('`id`', 26, 51), '`id` >= 26 AND `id` < 51'
+        )
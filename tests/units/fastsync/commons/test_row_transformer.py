@@ -0,0 +1,304 @@
+import csv
+import datetime
+import decimal
+import hashlib
+import io
+import json
+from unittest import TestCase
+
+from pipelinewise.fastsync.commons.row_transformer import RowTransformer
+from pipelinewise.fastsync.commons.target_bigquery import FastSyncTargetBigquery
+from pipelinewise.fastsync.commons.target_postgres import FastSyncTargetPostgres
+from pipelinewise.fastsync.commons.target_redshift import FastSyncTargetRedshift
+from pipelinewise.fastsync.commons.target_snowflake import FastSyncTargetSnowflake
+from pipelinewise.fastsync.commons.transform_utils import SQLFlavor, TransformationHelper
+
+# HASH transformation of every target, as (target, sql flavor, sql function, output of the sql function for 'abc')
+TARGET_HASHES = [
+    (
+        FastSyncTargetSnowflake,
+        SQLFlavor.SNOWFLAKE,
+        'SHA2(',
+        'ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad',
+    ),
+    (
+        FastSyncTargetPostgres,
+        SQLFlavor.POSTGRES,
+        'ENCODE(DIGEST(',
+        'ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad',
+    ),
+    (
+        FastSyncTargetBigquery,
+        SQLFlavor.BIGQUERY,
+        'TO_BASE64(SHA256(',
+        'ungWv48Bz+pBQUDeXa4iI7ADYaOWF3qctBD/YfIAFa0=',
+    ),
+    # Redshift has its own transformations, not in TransformationHelper
+    (FastSyncTargetRedshift, None, 'FUNC_SHA1(', 'a9993e364706816aba3e25717850c26c9cd0d89d'),
+]
+
+
+def sha256(value: str) -> str:
+    """Hex encoded SHA-256 of a string"""
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+class TestRowTransformer(TestCase):
+    """
+    Unit tests for the transformations of the exported rows
+    """
+
+    def test_from_config_without_stream_transformations(self):
+        """No transformer should be created for the streams without transformations"""
+        config = {
+            'transformations': [
+                {'tap_stream_name': 'db-other', 'field_id': 'col', 'type': 'HASH', 'when': None},
+            ]
+        }
+
+        self.assertIsNone(RowTransformer.from_config(None, 'db-table', ['col']))
+        self.assertIsNone(RowTransformer.from_config(config, 'db-table', ['col']))
+        self.assertIsNotNone(RowTransformer.from_config(config, 'DB-OTHER', ['col']))
+
+    def test_unknown_column(self):
+        """Transformations of columns that are not exported should fail"""
+        with self.assertRaises(ValueError):
+            RowTransformer([{'field_id': 'missing', 'type': 'HASH'}], ['col'])
+
+    def test_unknown_hash_encoding(self):
+        """Transformers with unknown hash encodings should fail"""
+        with self.assertRaises(ValueError):
+            RowTransformer([{'field_id': 'col', 'type': 'HASH'}], ['col'], hash_encoding='md5')
+
+    def test_hash_encodings_of_the_targets(self):
+        """Hashes should be the same as the ones of the SQL HASH transformations of every target"""
+        for target, sql_flavor, sql_function, sql_hash in TARGET_HASHES:
+            if sql_flavor is not None:
+                sql = TransformationHelper.get_trans_in_sql_flavor(
+                    'db-table',
+                    [{'tap_stream_name': 'db-table', 'field_id': 'col', 'type': 'HASH', 'when': None}],
+                    sql_flavor,
+                )
+                self.assertIn(sql_function, sql[0]['trans'])
+
+            transformer = RowTransformer(
+                [{'field_id': 'hash', 'type': 'HASH'}, {'field_id': 'hash_skip', 'type': 'HASH-SKIP-FIRST-2'}],
+                ['hash', 'hash_skip'],
+                hash_encoding=target.HASH_ENCODING,
+            )
+            self.assertListEqual(
+                [[sql_hash, 'xy' + sql_hash]],
+                transformer.transform_rows([('abc', 'xyabc')]),
+                target.__name__,
+            )
+
+    def test_transform_rows(self):
+        """Every transformation type should give the same values as the targets"""
+        transformer = RowTransformer(
+            [
+                {'field_id': 'set_null', 'type': 'SET-NULL'},
+                {'field_id': 'hash', 'type': 'HASH'},
+                {'field_id': 'hash_skip', 'type': 'HASH-SKIP-FIRST-2'},
+                {'field_id': 'mask_date', 'type': 'MASK-DATE'},
+                {'field_id': 'mask_date_str', 'type': 'MASK-DATE'},
+                {'field_id': 'mask_number', 'type': 'MASK-NUMBER'},
+                {'field_id': 'mask_hidden', 'type': 'MASK-HIDDEN'},
+                {'field_id': 'mask_ends', 'type': 'MASK-STRING-SKIP-ENDS-2'},
+            ],
+            [
+                '"SET_NULL"',
+                'Hash',
+                'hash_skip',
+                'mask_date',
+                'mask_date_str',
+                'mask_number',
+                'mask_hidden',
+                'mask_ends',
+            ],
+        )
+
+        self.assertListEqual(
+            [
+                [
+                    None,
+                    sha256('value'),
+                    'ab' + sha256('cdef'),
+                    datetime.datetime(2021, 1, 1, 10, 20, 30),
+                    '2019-01-01T12:00:00',
+                    0,
+                    'hidden',
+                    'ab****gh',
+                ],
+                [None, None, None, None, None, 0, 'hidden', '***'],
+            ],
+            transformer.transform_rows(
+                [
+                    (
+                        'value',
+                        'value',
+                        'abcdef',
+                        datetime.datetime(2021, 6, 15, 10, 20, 30),
+                        '2019-03-04 12:00:00',
+                        123.4,
+                        'secret',
+                        'abcdefgh',
+                    ),
+                    (None, None, None, None, None, None, None, 'abc'),
+                ]
+            ),
+        )
+
+    def test_conditional_transformations(self):
+        """Conditional transformations should be applied in order before the other transformations"""
+        transformer = RowTransformer(
+            [
+                {'field_id': 'value', 'type': 'MASK-HIDDEN'},
+                {
+                    'field_id': 'value',
+                    'type': 'HASH',
+                    'when': [
+                        {'column': 'class', 'equals': 'user'},
+                        {'column': 'property', 'regex_match': 'pass|salt'},
+                    ],
+                },
+                {'field_id': 'class', 'type': 'SET-NULL', 'when': [{'column': 'id', 'equals': 2}]},
+            ],
+            ['id', 'class', 'property', 'value'],
+        )
+
+        self.assertListEqual(
+            [
+                ['1', 'user', 'password', 'hidden'],
+                ['2', None, 'password', 'hidden'],
+                ['3', 'admin', 'salt', 'hidden'],
+            ],
+            transformer.transform_rows(
+                [
+                    ('1', 'user', 'password', 'secret'),
+                    ('2', 'user', 'password', 'secret'),
+                    ('3', 'admin', 'salt', 'secret'),
+                ]
+            ),
+        )
+
+        self.assertListEqual(
+            [[1, 'user', 'password', sha256('secret')]],
+            RowTransformer(
+                [
+                    {
+                        'field_id': 'value',
+                        'type': 'HASH',
+                        'when': [{'column': 'class', 'equals': 'user'}, {'column': 'id', 'equals': None}],
+                    },
+                    {'field_id': 'value', 'type': 'HASH', 'when': [{'column': 'property', 'regex_match': 'word$'}]},
+                ],
+                ['id', 'class', 'property', 'value'],
+            ).transform_rows([(1, 'user', 'password', 'secret')]),
+        )
+
+    def test_hash_exported_text(self):
+        """Values that are not strings should be hashed as the text written into the csv export files"""
+        row = (datetime.datetime(2020, 1, 1), decimal.Decimal('1.50'), 0.1, 'abc')
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(row)
+        csv_texts = buffer.getvalue().rstrip('\r\n').split(',')
+
+        self.assertListEqual(['2020-01-01 00:00:00', '1.50', '0.1', 'abc'], csv_texts)
+        self.assertListEqual(
+            [[sha256(text) for text in csv_texts[:-1]] + ['ab' + sha256('c')]],
+            RowTransformer(
+                [
+                    {'field_id': 'datetime', 'type': 'HASH'},
+                    {'field_id': 'decimal', 'type': 'HASH'},
+                    {'field_id': 'float', 'type': 'HASH'},
+                    {'field_id': 'text', 'type': 'HASH-SKIP-FIRST-2'},
+                ],
+                ['datetime', 'decimal', 'float', 'text'],
+            ).transform_rows([row]),
+        )
+
+    def test_regex_match_of_the_targets(self):
+        """Regexes should match the whole value for Snowflake and any part of it for the other targets"""
+        sql = TransformationHelper.get_trans_in_sql_flavor(
+            'db-table',
+            [
+                {
+                    'tap_stream_name': 'db-table',
+                    'field_id': 'value',
+                    'type': 'SET-NULL',
+                    'when': [{'column': 'property', 'regex_match': 'pass'}],
+                }
+            ],
+            SQLFlavor.SNOWFLAKE,
+        )
+        self.assertIn("REGEXP 'pass'", sql[0]['conditions'])
+
+        for target, partial_match in [
+            (FastSyncTargetSnowflake, 'secret'),
+            (FastSyncTargetPostgres, None),
+            (FastSyncTargetBigquery, None),
+            (FastSyncTargetRedshift, None),
+        ]:
+            transformer = RowTransformer(
+                [{'field_id': 'value', 'type': 'SET-NULL', 'when': [{'column': 'property', 'regex_match': 'pass'}]}],
+                ['property', 'value'],
+                hash_encoding=target.HASH_ENCODING,
+                regex_match=target.REGEX_MATCH,
+            )
+            self.assertListEqual(
+                [['pass', None], ['password', partial_match]],
+                transformer.transform_rows([('pass', 'secret'), ('password', 'secret')]),
+                target.__name__,
+            )
+
+    def test_unknown_regex_match(self):
+        """Transformers with unknown regex semantics should fail"""
+        with self.assertRaises(ValueError):
+            RowTransformer([{'field_id': 'col', 'type': 'HASH'}], ['col'], regex_match='match')
+
+    def test_json_transformations(self):
+        """Properties of json columns should be transformed and used in conditions"""
+        transformer = RowTransformer(
+            [
+                {'field_id': 'document', 'type': 'SET-NULL', 'field_paths': ['user/phone', 'tags/1', 'missing/key']},
+                {
+                    'field_id': 'email',
+                    'type': 'MASK-HIDDEN',
+                    'when': [{'column': 'document', 'field_path': 'user/type', 'equals': 'customer'}],
+                },
+            ],
+            ['document', 'email'],
+        )
+
+        rows = transformer.transform_rows(
+            [
+                (json.dumps({'user': {'phone': '123', 'type': 'customer'}, 'tags': ['a', 'b']}), 'a@b.c'),
+                (json.dumps({'user': {'type': 'staff'}}), 'd@e.f'),
+                (None, 'g@h.i'),
+            ]
+        )
+
+        self.assertDictEqual({'user': {'phone': None, 'type': 'customer'}, 'tags': ['a', None]}, json.loads(rows[0][0]))
+        self.assertEqual('hidden', rows[0][1])
+        self.assertDictEqual({'user': {'type': 'staff'}}, json.loads(rows[1][0]))
+        self.assertEqual('d@e.f', rows[1][1])
+        self.assertListEqual([None, 'g@h.i'], rows[2])
+
+    def test_transform_record(self):
+        """Records keyed by column name should be transformed in place, missing values are NULLs"""
+        transformer = RowTransformer(
+            [
+                {'field_id': 'name', 'type': 'HASH'},
+                {'field_id': 'age', 'type': 'MASK-NUMBER', 'when': [{'column': 'country', 'equals': 'uk'}]},
+            ],
+            ['"AGE"', '"COUNTRY"', '"NAME"'],
+        )
+
+        record = {'"AGE"': '30', '"COUNTRY"': 'uk', '"NAME"': 'john'}
+        self.assertIs(record, transformer.transform_record(record))
+        self.assertDictEqual({'"AGE"': 0, '"COUNTRY"': 'uk', '"NAME"': sha256('john')}, record)
+
+        self.assertDictEqual(
+            {'"AGE"': '30', '"NAME"': ''},
+            transformer.transform_record({'"AGE"': '30', '"NAME"': ''}),
+        )
@@ -0,0 +1,134 @@
+import datetime
+import os
+import tempfile
+from unittest import TestCase
+
+from pipelinewise.fastsync.commons.s3_key_manifest import S3KeyManifest
+from pipelinewise.fastsync.commons.tap_s3_csv import S3Helper
+
+
+# pylint: disable=missing-function-docstring,invalid-name,unused-argument
+class FakeS3Client:
+    """S3 client listing the given keys in lexicographic order like list_objects_v2"""
+
+    def __init__(self, keys):
+        self.keys = sorted(keys)
+        self.listed_keys = []
+
+    def get_paginator(self, _):
+        return self
+
+    def paginate(self, Bucket, Prefix='', Delimiter=None, StartAfter='', **_):
+        contents = []
+        common_prefixes = []
+        for key in self.keys:
+            if not key.startswith(Prefix) or key <= StartAfter:
+                continue
+
+            if Delimiter and Delimiter in key[len(Prefix):]:
+                common_prefix = key[:key.index(Delimiter, len(Prefix)) + 1]
+                if common_prefix > StartAfter and {'Prefix': common_prefix} not in common_prefixes:
+                    common_prefixes.append({'Prefix': common_prefix})
+                continue
+
+            self.listed_keys.append(key)
+            contents.append(
+                {
+                    'Key': key,
+                    'LastModified': datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc),
+                    'Size': 10,
+                    'ETag': f'"{key}"',
+                }
+            )
+
+        yield {'Contents': contents, 'CommonPrefixes': common_prefixes}
+
+
+# pylint: disable=consider-using-with
+class TestS3KeyManifest(TestCase):
+    """
+    Unit tests for the S3 key manifest
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'key_manifest_table.jsonl.gz')
+        self.table_spec = {'table_name': 'table', 'search_prefix': 'feed/', 'search_pattern': r'\.csv$'}
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _new_manifest(self, search_pattern=r'\.csv$'):
+        manifest = S3KeyManifest(self.path, 'bucket', 'feed/', search_pattern)
+        manifest.load()
+        return manifest
+
+    def _list_files(self, s3_client, manifest):
+        return [
+            s3_file['key']
+            for s3_file in S3Helper.get_input_files_for_table(
+                {'bucket': 'bucket'},
+                self.table_spec,
+                manifest=manifest,
+                s3_client=s3_client,
+                parallelism=2,
+            )
+        ]
+
+    def test_save_and_load(self):
+        """Saved files and last listed keys should be loaded by the next manifest of the same listing"""
+        manifest = self._new_manifest()
+        manifest.last_key = 'feed/top.csv'
+        manifest.shard_last_keys = {'feed/dt=2021-01-01/': 'feed/dt=2021-01-01/a.csv'}
+        manifest.add(
+            {
+                'key': 'feed/dt=2021-01-01/a.csv',
+                'last_modified': datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc),
+                'size': 10,
+                'etag': '"abc"',
+            }
+        )
+        manifest.save()
+
+        loaded = self._new_manifest()
+        self.assertEqual(manifest.files, loaded.files)
+        self.assertEqual(manifest.shard_last_keys, loaded.shard_last_keys)
+        self.assertEqual('feed/top.csv', loaded.last_key)
+
+        self.assertEqual({}, self._new_manifest(search_pattern='other').files)
+
+    def test_lists_only_new_keys(self):
+        """Keys should be listed by shard from the last key of the previous listing"""
+        keys = [
+            'feed/dt=2021-01-01/a.csv',
+            'feed/dt=2021-01-01/b.txt',
+            'feed/dt=2021-01-02/a.csv',
+            'feed/top.csv',
+            'other/a.csv',
+        ]
+        s3_client = FakeS3Client(keys)
+        manifest = self._new_manifest()
+        self.assertListEqual(
+            ['feed/dt=2021-01-01/a.csv', 'feed/dt=2021-01-02/a.csv', 'feed/top.csv'],
+            self._list_files(s3_client, manifest),
+        )
+        manifest.save()
+
+        s3_client = FakeS3Client(
+            keys + ['feed/dt=2021-01-02/b.csv', 'feed/dt=2021-01-03/a.csv', 'feed/zz.csv']
+        )
+        self.assertListEqual(
+            [
+                'feed/dt=2021-01-01/a.csv',
+                'feed/dt=2021-01-02/a.csv',
+                'feed/dt=2021-01-02/b.csv',
+                'feed/dt=2021-01-03/a.csv',
+                'feed/top.csv',
+                'feed/zz.csv',
+            ],
+            self._list_files(s3_client, self._new_manifest()),
+        )
+        self.assertListEqual(
+            ['feed/dt=2021-01-02/b.csv', 'feed/dt=2021-01-03/a.csv', 'feed/top.csv', 'feed/zz.csv'],
+            sorted(s3_client.listed_keys),
+        )
@@ -5,7 +5,7 @@ import glob
 import os
 from unittest import TestCase
 
-from pipelinewise.fastsync.commons import split_gzip
+from pipelinewise.fastsync.commons import compression, split_gzip
 
 
 DATA_WITH_100_BYTES = b"""0,12345678
@@ -74,6 +74,14 @@ class TestSplitGzipFile(TestCase):
             split_gzip.open('basefile', mode='wt', chunk_size_mb=0)
         with self.assertRaises(ValueError):
             split_gzip.open('basefile', max_chunks=-1)
+        with self.assertRaises(ValueError):
+            split_gzip.open('basefile', compresslevel=10)
+        with self.assertRaises(ValueError):
+            split_gzip.open('basefile', compress_threads=0)
+        with self.assertRaises(ValueError):
+            split_gzip.open('basefile', codec='lz4')
+        with self.assertRaises(ValueError):
+            split_gzip.open('basefile', codec='zstd', compresslevel=23)
 
     # pylint: disable=W0212
     def test_gen_export_chunk_filename(self):
@@ -198,3 +206,175 @@ class TestSplitGzipFile(TestCase):
         # Last chunk should be smaller
         with gzip.open(f'{self.filename}.part00006', 'rb') as f_read:
             self.assertEqual(f_read.read(), DATA_WITH_100_BYTES)
+
+    def test_write_with_header(self):
+        """
+        Every chunk should start with the header
+        """
+        with split_gzip.SplitGzipFile(
+            self.filename,
+            'wb',
+            chunk_size_mb=split_gzip.SplitGzipFile._bytes_to_megabytes(200),
+            max_chunks=20,
+            est_compr_rate=1,
+            header=b'id,value\n',
+        ) as f_write:
+            # Write 300 bytes of test data
+            for _ in itertools.repeat(None, 3):
+                f_write.write(DATA_WITH_100_BYTES)
+
+        with gzip.open(f'{self.filename}.part00001', 'rb') as f_read:
+            self.assertEqual(f_read.read(), b'id,value\n' + DATA_WITH_100_BYTES * 2)
+        with gzip.open(f'{self.filename}.part00002', 'rb') as f_read:
+            self.assertEqual(f_read.read(), b'id,value\n' + DATA_WITH_100_BYTES)
+
+    def test_on_chunk_closed_callback(self):
+        """
+        Every chunk should be reported once it is closed and not written anymore
+        """
+        closed_chunks = []
+
+        def on_chunk_closed(chunk_filename):
+            # The closed chunk should be complete and readable at callback time
+            with gzip.open(chunk_filename, 'rb') as f_read:
+                closed_chunks.append((chunk_filename, f_read.read()))
+
+        with split_gzip.SplitGzipFile(
+            self.filename,
+            'wb',
+            chunk_size_mb=split_gzip.SplitGzipFile._bytes_to_megabytes(200),
+            max_chunks=20,
+            est_compr_rate=1,
+            on_chunk_closed=on_chunk_closed,
+        ) as f_write:
+            # Write 500 bytes of test data
+            for _ in itertools.repeat(None, 5):
+                f_write.write(DATA_WITH_100_BYTES)
+
+            # Only the finished chunks should be reported while writing
+            self.assertEqual(len(closed_chunks), 2)
+
+        self.assertEqual(
+            closed_chunks,
+            [
+                (f'{self.filename}.part00001', DATA_WITH_100_BYTES * 2),
+                (f'{self.filename}.part00002', DATA_WITH_100_BYTES * 2),
+                (f'{self.filename}.part00003', DATA_WITH_100_BYTES),
+            ],
+        )
+
+    def test_on_chunk_closed_callback_on_failure(self):
+        """
+        The active chunk should not be reported if the export fails
+        """
+        closed_chunks = []
+
+        with self.assertRaises(ValueError):
+            with split_gzip.SplitGzipFile(
+                self.filename,
+                'wb',
+                chunk_size_mb=split_gzip.SplitGzipFile._bytes_to_megabytes(200),
+                max_chunks=20,
+                est_compr_rate=1,
+                on_chunk_closed=closed_chunks.append,
+            ) as f_write:
+                for _ in itertools.repeat(None, 3):
+                    f_write.write(DATA_WITH_100_BYTES)
+                raise ValueError('Export failed')
+
+        # Only the finished chunk should be reported, the truncated one is closed
+        self.assertListEqual(closed_chunks, [f'{self.filename}.part00001'])
+        self.assertIsNone(f_write.chunk_file)
+
+    def test_write_with_parallel_compression(self):
+        """
+        Write gzip by compressing blocks in parallel and reading it
+        """
+        # Every block should be compressed into the same gzip member in binary mode
+        with split_gzip.ParallelGzipFile(self.filename, compresslevel=1, threads=4, block_size=256) as f_write:
+            for _ in itertools.repeat(None, 50):
+                f_write.write(DATA_WITH_100_BYTES)
+
+        with gzip.open(self.filename, 'rb') as f_read:
+            self.assertEqual(f_read.read(), DATA_WITH_100_BYTES * 50)
+
+        # Text mode with multiple chunks
+        with split_gzip.SplitGzipFile(
+            self.filename,
+            'wt',
+            chunk_size_mb=split_gzip.SplitGzipFile._bytes_to_megabytes(200),
+            max_chunks=20,
+            est_compr_rate=1,
+            compress_threads=2,
+        ) as f_write:
+            for _ in itertools.repeat(None, 3):
+                f_write.write(DATA_WITH_100_BYTES.decode())
+
+        with gzip.open(f'{self.filename}.part00001', 'rt') as f_read:
+            self.assertEqual(f_read.read(), DATA_WITH_100_BYTES.decode() * 2)
+        with gzip.open(f'{self.filename}.part00002', 'rt') as f_read:
+            self.assertEqual(f_read.read(), DATA_WITH_100_BYTES.decode())
+
+    def test_write_empty_file_with_parallel_compression(self):
+        """
+        Closing a parallel gzip file without data should create a valid empty gzip file
+        """
+        with split_gzip.ParallelGzipFile(self.filename, threads=2):
+            pass
+
+        with gzip.open(self.filename, 'rb') as f_read:
+            self.assertEqual(f_read.read(), b'')
+
+    def test_write_with_zstd(self):
+        """
+        Write zstd compressed chunks and reading them
+        """
+        for compress_threads in [1, 2]:
+            with split_gzip.SplitGzipFile(
+                self.filename,
+                'wt',
+                chunk_size_mb=split_gzip.SplitGzipFile._bytes_to_megabytes(200),
+                max_chunks=20,
+                est_compr_rate=1,
+                compress_threads=compress_threads,
+                codec=compression.CODEC_ZSTD,
+            ) as f_write:
+                for _ in itertools.repeat(None, 3):
+                    f_write.write(DATA_WITH_100_BYTES.decode())
+
+            with compression.open_reader(f'{self.filename}.part00001', compression.CODEC_ZSTD) as f_read:
+                self.assertEqual(f_read.read(), DATA_WITH_100_BYTES * 2)
+            with compression.open_reader(f'{self.filename}.part00002', compression.CODEC_ZSTD) as f_read:
+                self.assertEqual(f_read.read(), DATA_WITH_100_BYTES)
+
+            for temp_file in glob.glob(f'{self.filename}*'):
+                unlink(temp_file)
+
+    def test_split_by_compressed_size(self):
+        """
+        Chunks should be split by the actual compressed size even if the data compresses much worse than estimated
+        """
+        # Random hex data compresses to around half of its size, far from the default estimate
+        random_data = os.urandom(1 << 20).hex().encode()
+
+        for compress_threads in [1, 4]:
+            with split_gzip.SplitGzipFile(
+                self.filename,
+                'wb',
+                chunk_size_mb=1,
+                max_chunks=20,
+                compresslevel=1,
+                compress_threads=compress_threads,
+            ) as f_write:
+                for pos in range(0, len(random_data), 8192):
+                    f_write.write(random_data[pos:pos + 8192])
+
+            chunk_sizes = [os.path.getsize(chunk) for chunk in sorted(glob.glob(f'{self.filename}.part*'))]
+            self.assertGreater(len(chunk_sizes), 1)
+
+            # Every chunk except the last one should be close to the requested size
+            for chunk_size in chunk_sizes[:-1]:
+                self.assertAlmostEqual(chunk_size / (1 << 20), 1, delta=0.15)
+
+            for temp_file in glob.glob(f'{self.filename}*'):
+                unlink(temp_file)
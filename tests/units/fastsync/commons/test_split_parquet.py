@@ -0,0 +1,138 @@
+import datetime
+import decimal
+import glob
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import pyarrow
+import pyarrow.parquet
+
+from pipelinewise.fastsync.commons import split_parquet
+
+SCHEMA = pyarrow.schema(
+    [
+        pyarrow.field('id', pyarrow.int64()),
+        pyarrow.field('amount', pyarrow.float64()),
+        pyarrow.field('updated_at', pyarrow.timestamp('us')),
+        pyarrow.field('name', pyarrow.string()),
+    ]
+)
+
+ROWS = [
+    (1, decimal.Decimal('1.25'), datetime.datetime(2021, 1, 1, 12, 30), 'foo'),
+    (2, None, None, None),
+]
+
+
+class TestSplitParquetFile(TestCase):
+    """
+    Unit tests for SplitParquetFile
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.temp_dir, 'export.parquet')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_parameter_validation(self):
+        """
+        Test if passing invalid parameters raising exceptions
+        """
+        with self.assertRaises(ValueError):
+            split_parquet.open('basefile', SCHEMA, chunk_size_mb=0)
+        with self.assertRaises(ValueError):
+            split_parquet.open('basefile', SCHEMA, max_chunks=-1)
+
+    def test_rows_to_record_batch(self):
+        """
+        Rows should be converted to columns of the schema types
+        """
+        batch = split_parquet.rows_to_record_batch(ROWS, SCHEMA)
+
+        self.assertEqual(batch.schema, SCHEMA)
+        self.assertEqual(batch.column(1).to_pylist(), [1.25, None])
+        self.assertEqual(batch.column(2).to_pylist(), [datetime.datetime(2021, 1, 1, 12, 30), None])
+
+        # Exact decimals, wide decimals exported as strings and integer flags should keep their values
+        schema = pyarrow.schema(
+            [
+                pyarrow.field('amount', pyarrow.decimal128(38, 9)),
+                pyarrow.field('big_amount', pyarrow.string()),
+                pyarrow.field('is_active', pyarrow.bool_()),
+            ]
+        )
+        batch = split_parquet.rows_to_record_batch(
+            [
+                (decimal.Decimal('12345678901234567890.123456789'), decimal.Decimal('1.5'), 1),
+                (decimal.Decimal('-0.5'), None, 0),
+                (None, decimal.Decimal('-2'), None),
+            ],
+            schema,
+        )
+        self.assertEqual(
+            batch.column(0).to_pylist(),
+            [decimal.Decimal('12345678901234567890.123456789'), decimal.Decimal('-0.500000000'), None],
+        )
+        self.assertEqual(batch.column(1).to_pylist(), ['1.5', None, '-2'])
+        self.assertEqual(batch.column(2).to_pylist(), [True, False, None])
+
+        # Values that cannot be converted to the schema types should raise exception
+        with self.assertRaises(pyarrow.ArrowException):
+            split_parquet.rows_to_record_batch([('not-a-number', None, None, None)], SCHEMA)
+
+    def test_write_with_no_split(self):
+        """
+        Write every batch into one single parquet file
+        """
+        with split_parquet.open(self.filename, SCHEMA, max_chunks=0) as f_write:
+            f_write.write_rows(ROWS)
+            f_write.write_rows([])
+            f_write.write_rows(ROWS)
+
+        table = pyarrow.parquet.read_table(self.filename)
+        self.assertEqual(table.schema, SCHEMA)
+        self.assertEqual(table.column('id').to_pylist(), [1, 2, 1, 2])
+
+    def test_write_with_multiple_chunks(self):
+        """
+        Start a new chunk once the active chunk reaches the chunk size
+        """
+        closed_chunks = []
+        rows = [(i, float(i), None, os.urandom(512).hex()) for i in range(1000)]
+
+        with split_parquet.SplitParquetFile(
+            self.filename,
+            SCHEMA,
+            chunk_size_mb=1,
+            max_chunks=20,
+            on_chunk_closed=closed_chunks.append,
+        ) as f_write:
+            for pos in range(0, len(rows) * 3, 100):
+                f_write.write_rows(rows[pos % len(rows):pos % len(rows) + 100])
+
+        chunks = sorted(glob.glob(f'{self.filename}.part*'))
+        self.assertEqual(closed_chunks, chunks)
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(
+            sum(pyarrow.parquet.read_metadata(chunk).num_rows for chunk in chunks), len(rows) * 3
+        )
+
+    def test_on_chunk_closed_callback_on_failure(self):
+        """
+        The active chunk should not be reported if the export fails
+        """
+        closed_chunks = []
+
+        with self.assertRaises(ValueError):
+            with split_parquet.SplitParquetFile(
+                self.filename, SCHEMA, max_chunks=20, on_chunk_closed=closed_chunks.append
+            ) as f_write:
+                f_write.write_rows([(1, 1.0, None, 'a')])
+                raise ValueError('Export failed')
+
+        self.assertListEqual(closed_chunks, [])
+        self.assertIsNone(f_write.chunk_writer)
@@ -0,0 +1,103 @@
+import threading
+from unittest import TestCase
+
+from pipelinewise.fastsync.commons import stream_buffer
+from pipelinewise.fastsync.commons.stream_buffer import StreamAborted, StreamBuffer
+
+
+class TestStreamBuffer(TestCase):
+    """
+    Unit tests for the stream buffer
+    """
+
+    def test_read_in_requested_sizes(self):
+        """Written chunks should be read in the requested sizes until the end of the stream"""
+        stream = StreamBuffer(max_size=100)
+        stream.write(b'abc')
+        stream.write('défg')
+        stream.close()
+
+        self.assertEqual(stream.read(2), b'ab')
+        self.assertEqual(stream.read(4), 'cdé'.encode('utf-8'))
+        self.assertEqual(stream.read(), b'fg')
+        self.assertEqual(stream.read(10), b'')
+        self.assertEqual(stream.total_size, 8)
+
+    def test_write_blocks_while_buffer_is_full(self):
+        """Writer should wait until the reader frees space in the buffer"""
+        stream = StreamBuffer(max_size=4)
+        stream.write(b'1234')
+        written = threading.Event()
+
+        def write():
+            stream.write(b'5678')
+            written.set()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        self.assertFalse(written.wait(0.1))
+
+        self.assertEqual(stream.read(2), b'12')
+        writer.join(1)
+        self.assertTrue(written.is_set())
+        self.assertEqual(stream.size, 6)
+
+    def test_abort_stops_blocked_writer(self):
+        """Writer should not wait for the buffer if the stream is not read anymore"""
+        stream = StreamBuffer(max_size=1)
+        stream.write(b'1')
+        stream.abort()
+
+        with self.assertRaises(StreamAborted):
+            stream.write(b'2')
+
+    def test_transfer(self):
+        """Data of the producer should be streamed to the consumer through the buffer"""
+        chunks = [str(i).encode() * 1000 for i in range(100)]
+        consumed = []
+
+        def produce(stream):
+            for chunk in chunks:
+                stream.write(chunk)
+
+        def consume(stream):
+            while True:
+                data = stream.read(777)
+                if not data:
+                    return
+                consumed.append(data)
+
+        stream = stream_buffer.transfer(produce, consume, buffer_size_mb=1)
+        self.assertEqual(b''.join(consumed), b''.join(chunks))
+        self.assertEqual(stream.total_size, sum(len(chunk) for chunk in chunks))
+
+    def test_transfer_raises_producer_error(self):
+        """Failure of the producer should fail the consumer instead of ending the stream"""
+        def produce(stream):
+            stream.write(b'partial')
+            raise ValueError('source failed')
+
+        def consume(stream):
+            while stream.read(10):
+                pass
+
+        with self.assertRaisesRegex(ValueError, 'source failed'):
+            stream_buffer.transfer(produce, consume)
+
+    def test_transfer_stops_producer_on_consumer_error(self):
+        """Producer blocked on the full buffer should stop if the consumer fails"""
+        produced = []
+
+        def produce(stream):
+            while True:
+                stream.write(b'x' * 1024)
+                produced.append(1)
+
+        def consume(stream):
+            stream.read(10)
+            raise ValueError('target failed')
+
+        with self.assertRaisesRegex(ValueError, 'target failed'):
+            stream_buffer.transfer(produce, consume, buffer_size_mb=1)
+
+        self.assertLessEqual(len(produced), 1025)
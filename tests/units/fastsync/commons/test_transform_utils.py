@@ -445,3 +445,122 @@ class TestTransformHelper(unittest.TestCase):
                 },
             ],
         )
+
+    def test_get_trans_expressions(self):
+        """
+        Test transformations combined into one expression per column, in the order of the UPDATEs
+        """
+        transformations = [
+            {
+                'field_id': 'col_1',
+                'tap_stream_name': 'public-my_table',
+                'type': 'SET-NULL',
+            },
+            {
+                'field_id': 'col_2',
+                'tap_stream_name': 'public-my_table',
+                'type': 'MASK-HIDDEN',
+                'when': [{'column': 'col_3', 'regex_match': '^x'}],
+            },
+            {
+                'field_id': 'col_3',
+                'tap_stream_name': 'public-my_table',
+                'type': 'MASK-NUMBER',
+                'when': [{'column': 'col_2', 'equals': 'hidden'}],
+            },
+            {
+                'field_id': 'col_2',
+                'tap_stream_name': 'public-my_table',
+                'type': 'HASH',
+            },
+            {
+                'field_id': 'col_4',
+                'tap_stream_name': 'public-my_other_table',
+                'type': 'HASH',
+            },
+        ]
+
+        expressions = TransformationHelper.get_trans_expressions(
+            'public-my_table', transformations, SQLFlavor('bigquery')
+        )
+
+        mask_col_2 = 'CASE WHEN REGEXP_CONTAINS(`col_3`, \'^x\') THEN \'hidden\' ELSE `col_2` END'
+        self.assertDictEqual(
+            expressions,
+            {
+                '`col_2`': f'TO_BASE64(SHA256({mask_col_2}))',
+                '`col_3`': f'CASE WHEN ({mask_col_2} = \'hidden\') THEN 0 ELSE `col_3` END',
+                '`col_1`': 'NULL',
+            },
+        )
+
+        # Columns referenced by the expressions of the loaded values
+        expressions = TransformationHelper.get_trans_expressions(
+            'public-my_table',
+            transformations[2:3],
+            SQLFlavor('snowflake'),
+            {'"COL_2"': '$2::VARCHAR', '"COL_3"': '$3::NUMBER(38,0)'},
+        )
+
+        self.assertDictEqual(
+            expressions,
+            {'"COL_3"': 'CASE WHEN ($2::VARCHAR = \'hidden\') THEN 0 ELSE $3::NUMBER(38,0) END'},
+        )
+
+    def test_get_trans_in_sql_combined(self):
+        """
+        Test combining the transformations of a stream into one UPDATE, the rows are filtered only if
+        every transformation has conditions
+        """
+        transformations = [
+            {
+                'field_id': 'col_1',
+                'tap_stream_name': 'public-my_table',
+                'type': 'MASK-HIDDEN',
+                'when': [{'column': 'col_2', 'equals': 'x'}],
+            },
+            {
+                'field_id': 'col_2',
+                'tap_stream_name': 'public-my_table',
+                'type': 'SET-NULL',
+                'when': [{'column': 'col_1', 'regex_match': '^a'}],
+            },
+            {
+                'field_id': 'col_3',
+                'tap_stream_name': 'public-my_table',
+                'type': 'MASK-NUMBER',
+            },
+        ]
+
+        self.assertListEqual(
+            TransformationHelper.get_trans_in_sql_flavor(
+                'public-my_table', transformations[:2], SQLFlavor('postgres'), combined=True
+            ),
+            [
+                {
+                    'trans': '"col_1" = CASE WHEN ("col_2" = \'x\') THEN \'hidden\' ELSE "col_1" END, '
+                    '"col_2" = CASE WHEN (CASE WHEN ("col_2" = \'x\') THEN \'hidden\' ELSE "col_1" END ~ \'^a\') '
+                    'THEN NULL ELSE "col_2" END',
+                    'conditions': '(("col_2" = \'x\')) OR (("col_1" ~ \'^a\'))',
+                }
+            ],
+        )
+
+        self.assertListEqual(
+            TransformationHelper.get_trans_in_sql_flavor(
+                'public-my_table', transformations[::2], SQLFlavor('snowflake'), combined=True
+            ),
+            [
+                {
+                    'trans': '"COL_1" = CASE WHEN ("COL_2" = \'x\') THEN \'hidden\' ELSE "COL_1" END, "COL_3" = 0',
+                    'conditions': None,
+                }
+            ],
+        )
+
+        self.assertListEqual(
+            TransformationHelper.get_trans_in_sql_flavor(
+                'public-other_table', transformations, SQLFlavor('bigquery'), combined=True
+            ),
+            [],
+        )
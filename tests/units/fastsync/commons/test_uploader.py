@@ -0,0 +1,121 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import Mock
+
+from pipelinewise.fastsync.commons.uploader import (
+    DEFAULT_MAX_CONCURRENT_UPLOADS,
+    BackgroundUploader,
+    get_max_pool_connections,
+    get_transfer_config,
+)
+
+
+class TestBackgroundUploader(TestCase):
+    """
+    Unit tests for BackgroundUploader
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _create_file(self, filename, size):
+        path = os.path.join(self.temp_dir, filename)
+        with open(path, 'wb') as file:
+            file.write(b'x' * size)
+        return path
+
+    def test_upload_and_delete_file_parts(self):
+        """
+        Submitted file parts should be uploaded in order and deleted locally
+        """
+        upload_fn = Mock(side_effect=lambda file_part: f'prefix/{os.path.basename(file_part)}')
+        file_parts = [self._create_file('export.csv.gz.part00001', 10),
+                      self._create_file('export.csv.gz.part00002', 5)]
+
+        with BackgroundUploader(upload_fn, max_concurrent_uploads=2) as uploader:
+            for file_part in file_parts:
+                uploader.submit(file_part)
+            s3_keys = uploader.wait()
+
+        self.assertEqual(s3_keys, ['prefix/export.csv.gz.part00001', 'prefix/export.csv.gz.part00002'])
+        self.assertEqual(uploader.size_bytes, 15)
+        self.assertEqual(
+            uploader.key_sizes, {'prefix/export.csv.gz.part00001': 10, 'prefix/export.csv.gz.part00002': 5}
+        )
+        self.assertEqual(upload_fn.call_count, 2)
+        self.assertFalse(any(os.path.exists(file_part) for file_part in file_parts))
+
+    def test_upload_error(self):
+        """
+        Upload errors should be raised when waiting for the uploads and the file part kept
+        """
+        upload_fn = Mock(side_effect=Exception('Access Denied'))
+        file_part = self._create_file('export.csv.gz', 10)
+
+        with BackgroundUploader(upload_fn) as uploader:
+            uploader.submit(file_part)
+
+            with self.assertRaisesRegex(Exception, 'Access Denied'):
+                uploader.wait()
+
+        self.assertTrue(os.path.exists(file_part))
+
+    def test_max_inflight_bytes(self):
+        """
+        Files should not start uploading while the in-flight budget is used, except alone
+        """
+        inflight = []
+        max_inflight = []
+        lock = threading.Lock()
+
+        def upload_fn(file_part):
+            with lock:
+                inflight.append(os.path.getsize(file_part))
+                max_inflight.append(sum(inflight))
+            time.sleep(0.05)
+            with lock:
+                inflight.remove(os.path.getsize(file_part))
+            return file_part
+
+        file_parts = [self._create_file(f'export.csv.gz.part{i:05d}', size) for i, size in enumerate([6, 4, 6, 12])]
+
+        with BackgroundUploader(upload_fn, max_concurrent_uploads=4, max_inflight_bytes=10) as uploader:
+            for file_part in file_parts:
+                uploader.submit(file_part)
+            s3_keys = uploader.wait()
+
+        self.assertEqual(s3_keys, file_parts)
+        self.assertLessEqual(max(max_inflight), 12)
+        self.assertIn(12, max_inflight)
+        self.assertEqual(uploader.inflight_bytes, 0)
+
+    def test_from_config(self):
+        """
+        Concurrency and in-flight budget should be read from the target config
+        """
+        uploader = BackgroundUploader.from_config(
+            Mock(), {'s3_upload_concurrency': 8, 's3_upload_max_inflight_mb': 100}
+        )
+        self.assertEqual(uploader.max_concurrent_uploads, 8)
+        self.assertEqual(uploader.max_inflight_bytes, 100 * 1024 * 1024)
+
+        uploader = BackgroundUploader.from_config(Mock(), {})
+        self.assertEqual(uploader.max_concurrent_uploads, DEFAULT_MAX_CONCURRENT_UPLOADS)
+        self.assertIsNone(uploader.max_inflight_bytes)
+
+    def test_get_transfer_config(self):
+        """
+        Multipart chunk size and concurrency should be read from the target config
+        """
+        transfer_config = get_transfer_config({'s3_multipart_chunk_size_mb': 64, 's3_multipart_concurrency': 4})
+        self.assertEqual(transfer_config.multipart_chunksize, 64 * 1024 * 1024)
+        self.assertEqual(transfer_config.multipart_threshold, 64 * 1024 * 1024)
+        self.assertEqual(transfer_config.max_concurrency, 4)
+        self.assertEqual(get_max_pool_connections({'s3_upload_concurrency': 3, 's3_multipart_concurrency': 4}), 12)
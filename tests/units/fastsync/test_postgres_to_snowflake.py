@@ -40,6 +40,12 @@ class PostgresToSnowflake(unittest.TestCase):
             sync_table, PACKAGE_IN_SCOPE, TAP, TARGET
         )
 
+    @staticmethod
+    def test_sync_table_loads_every_nested_file_part():
+        assertions.assert_sync_table_loads_every_nested_file_part(
+            sync_table, PACKAGE_IN_SCOPE, TAP, TARGET
+        )
+
     @staticmethod
     def test_main_impl_with_all_tables_synced_successfully_should_exit_normally():
         assertions.assert_main_impl_exit_normally_on_success(